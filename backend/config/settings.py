@@ -87,6 +87,21 @@ DATABASES = {
     },
 }
 
+# "shared" - кэш в базе данных, общий для всех процессов и сохраняющийся
+# после перезапуска (таблица создается командой createcachetable)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": os.getenv("SHARED_CACHE_TABLE", "pcr_shared_cache"),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "50000")),
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -179,6 +194,95 @@ LOGGING = {
         "handlers": ["console"],
         "level": "INFO",
     },
+    "loggers": {
+        # Трассировки расчетов (ошибки, выборка): одна строка JSON на запрос
+        "formulas.calculation_trace": {
+            "level": "INFO",
+        },
+    },
 }
 
 AUTH_USER_MODEL = "formulas.CustomUser"
+
+# Кэш результатов расчета: размер кэша в процессе, алиас общего кэша Django
+# (CACHES) для нескольких процессов и время жизни записей в нем, сек.
+# Тот же общий кэш хранит состояния для инкрементального пересчета.
+CALCULATION_RESULT_CACHE_SIZE = int(os.getenv("CALCULATION_RESULT_CACHE_SIZE", "1024"))
+CALCULATION_STATE_CACHE_SIZE = int(os.getenv("CALCULATION_STATE_CACHE_SIZE", "1024"))
+CALCULATION_RESULT_CACHE_BACKEND = os.getenv("CALCULATION_RESULT_CACHE_BACKEND") or None
+CALCULATION_RESULT_CACHE_TIMEOUT = int(
+    os.getenv("CALCULATION_RESULT_CACHE_TIMEOUT", "3600")
+)
+
+# Кэш ФИО сотрудников из HR-API: размер кэша в процессе, алиас общего кэша
+# Django (CACHES) для нескольких процессов, время жизни ФИО и неудачных
+# запросов, сек. По умолчанию ФИО хранятся в кэше "shared" (в базе данных);
+# пустое значение EMPLOYEE_NAME_CACHE_BACKEND оставляет только кэш процесса.
+# При запуске процесса ФИО исполнителей расчетов за
+# EMPLOYEE_NAME_WARMUP_DAYS дней загружаются из общего кэша (0 - отключено).
+EMPLOYEE_NAME_CACHE_SIZE = int(os.getenv("EMPLOYEE_NAME_CACHE_SIZE", "4096"))
+EMPLOYEE_NAME_CACHE_BACKEND = (
+    os.getenv(
+        "EMPLOYEE_NAME_CACHE_BACKEND", CALCULATION_RESULT_CACHE_BACKEND or "shared"
+    )
+    or None
+)
+EMPLOYEE_NAME_CACHE_TIMEOUT = int(os.getenv("EMPLOYEE_NAME_CACHE_TIMEOUT", "86400"))
+EMPLOYEE_NAME_NEGATIVE_TIMEOUT = int(os.getenv("EMPLOYEE_NAME_NEGATIVE_TIMEOUT", "300"))
+EMPLOYEE_NAME_WARMUP_DAYS = int(os.getenv("EMPLOYEE_NAME_WARMUP_DAYS", "180"))
+
+# Каталог для кода, сгенерированного по методам исследования (общий для
+# всех процессов); по умолчанию код на диск не сохраняется. Каталог должен
+# принадлежать пользователю приложения и быть недоступным для записи
+# остальным (иначе он не используется); файлы подписываются SECRET_KEY.
+METHOD_CODE_CACHE_DIR = os.getenv("METHOD_CODE_CACHE_DIR", "")
+
+# Как часто (в секундах) процесс проверяет изменения справочных таблиц
+REFERENCE_TABLES_CHECK_INTERVAL = float(
+    os.getenv("REFERENCE_TABLES_CHECK_INTERVAL", "5")
+)
+
+# Трассировка расчетов: количество последних событий в буфере запроса и
+# доля успешных запросов (0 - 1), трассировка которых пишется в журнал.
+# Трассировки запросов с ошибками пишутся всегда.
+CALCULATION_TRACE_BUFFER_SIZE = int(os.getenv("CALCULATION_TRACE_BUFFER_SIZE", "200"))
+CALCULATION_TRACE_SAMPLE_RATE = float(os.getenv("CALCULATION_TRACE_SAMPLE_RATE", "0"))
+
+# Keycloak: realm, адрес открытых ключей (JWKS) и сертификат CA для HTTPS.
+# Ключи кэшируются в процессе на KEYCLOAK_KEYS_TTL секунд; при недоступности
+# Keycloak устаревшие ключи используются еще KEYCLOAK_KEYS_STALE_TTL секунд.
+KEYCLOAK_REALM_URL = os.getenv(
+    "KEYCLOAK_REALM_URL", "https://kc.gd-urengoy.gazprom.ru/realms/GDU"
+)
+KEYCLOAK_CERTS_URL = os.getenv(
+    "KEYCLOAK_CERTS_URL", f"{KEYCLOAK_REALM_URL}/protocol/openid-connect/certs"
+)
+KEYCLOAK_CA_BUNDLE = os.getenv(
+    "KEYCLOAK_CA_BUNDLE", "/usr/local/share/ca-certificates/root.crt"
+)
+KEYCLOAK_TIMEOUT = float(os.getenv("KEYCLOAK_TIMEOUT", "5"))
+KEYCLOAK_KEYS_TTL = float(os.getenv("KEYCLOAK_KEYS_TTL", "300"))
+KEYCLOAK_KEYS_STALE_TTL = float(os.getenv("KEYCLOAK_KEYS_STALE_TTL", "86400"))
+KEYCLOAK_MIN_REFRESH_INTERVAL = float(os.getenv("KEYCLOAK_MIN_REFRESH_INTERVAL", "10"))
+# Проверка подписи и срока действия токена (допуск расхождения часов, сек.)
+KEYCLOAK_VERIFY_SIGNATURE = os.getenv("KEYCLOAK_VERIFY_SIGNATURE", "True") == "True"
+KEYCLOAK_LEEWAY = float(os.getenv("KEYCLOAK_LEEWAY", "30"))
+
+# Исходящие HTTP-запросы (Keycloak, HR-API): таймауты соединения и чтения,
+# сек., количество повторов GET-запроса (при ошибке соединения и статусах
+# 502, 503, 504; таймаут чтения не повторяется) с задержкой
+# HTTP_RETRY_BACKOFF * 2 ** (номер повтора - 1) и количество соединений в
+# пуле одного хоста
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.2"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+
+# Кэш аутентификации: количество токенов и наибольшее время жизни записи, сек.
+# (запись действует до истечения токена, но не дольше этого времени)
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1024"))
+AUTH_TOKEN_CACHE_MAX_TTL = float(os.getenv("AUTH_TOKEN_CACHE_MAX_TTL", "300"))
+
+# Количество профилей расчетов (cProfile), хранимых в процессе
+CALCULATION_PROFILE_LIMIT = int(os.getenv("CALCULATION_PROFILE_LIMIT", "20"))
@@ -5,3 +5,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+# ФИО исполнителей из общего кэша загружаются при запуске каждого процесса
+from formulas.utils.employee_utils import start_employee_names_warm_up  # noqa: E402
+
+start_employee_names_warm_up()
@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import Laboratory, Department
+from django.contrib import admin, messages
+from .models import Calculation, Laboratory, Department, ReferenceTable
+from .services.recalculation_service import recalculate_calculations
 
 
 @admin.register(Laboratory)
@@ -20,3 +21,58 @@ class DepartmentAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related("laboratory")
+
+
+@admin.register(ReferenceTable)
+class ReferenceTableAdmin(admin.ModelAdmin):
+    list_display = ("code", "name", "nd_code", "updated_at")
+    list_filter = ("is_deleted",)
+    search_fields = ("code", "name", "nd_code")
+    ordering = ("code",)
+    list_per_page = 20
+
+
+@admin.register(Calculation)
+class CalculationAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "sample",
+        "research_method",
+        "result",
+        "measurement_error",
+        "laboratory",
+        "updated_at",
+    )
+    list_filter = ("research_method", "laboratory", "is_deleted")
+    search_fields = ("sample__registration_number", "research_method__name")
+    ordering = ("-created_at",)
+    list_per_page = 20
+    actions = ("preview_recalculation", "recalculate")
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("sample", "research_method", "laboratory")
+        )
+
+    def _recalculate(self, request, queryset, dry_run):
+        report = recalculate_calculations(
+            queryset, dry_run=dry_run, user=request.user.get_username()
+        )
+        message = (
+            f"Всего: {report.total}, изменилось: {report.changed}, "
+            f"без изменений: {report.unchanged}, ошибок: {report.failed}"
+        )
+        if not dry_run:
+            message += f", обновлено: {report.updated}"
+        level = messages.WARNING if report.failed else messages.SUCCESS
+        self.message_user(request, message, level)
+
+    @admin.action(description="Проверить пересчет выбранных расчетов (без изменений)")
+    def preview_recalculation(self, request, queryset):
+        self._recalculate(request, queryset, dry_run=True)
+
+    @admin.action(description="Пересчитать выбранные расчеты")
+    def recalculate(self, request, queryset):
+        self._recalculate(request, queryset, dry_run=False)
@@ -1,10 +1,11 @@
 from django.db import IntegrityError
+from django.http import HttpResponse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from decimal import Decimal
+import functools
 import logging
 from ..models import (
     ResearchObject,
@@ -14,143 +15,126 @@ from ..models import (
     Calculation,
 )
 from ..serializers import CalculationSerializer, SampleSerializer
-from ..utils.formula_utils import (
-    round_result,
-    evaluate_formula,
-    calculate_convergence_steps,
+from ..services.calculation_service import (
+    CalculationError,
+    EvaluationStateError,
+    MethodVersionError,
+    execute_calculation_batch,
+    execute_calculation_plan_cached,
+    execute_calculation_plan_incremental,
+    get_calculation_cache_info,
+    get_calculation_plan,
+    get_method_plan,
+    prepare_input_data,
 )
+from ..services.uncertainty_service import (
+    MONTE_CARLO_DEFAULT_SAMPLES,
+    propagate_uncertainty,
+)
+from ..utils.calculation_metrics import (
+    get_calculation_metrics,
+    get_method_key,
+    get_profile,
+    get_profiles,
+    measure_method,
+    request_profile,
+)
+from ..utils.calculation_trace import calculation_trace, trace
+from ..views.user_views import is_editor
 
 logger = logging.getLogger(__name__)
 
 
-def round_value(
-    value,
-    rounding_type=None,
-    rounding_decimal=None,
-    threshold_table_values=None,
-    variables=None,
-):
-    try:
-        if value is None:
-            return value
+# Максимальное количество наборов входных данных в одном пакетном расчете
+MAX_BATCH_SIZE = 1000
 
-        # Преобразуем value в число, если оно передано как строка
-        if isinstance(value, str):
-            value = float(value.replace(",", "."))
-        else:
-            value = float(value)
-
-        if rounding_type == "threshold_table":
-            logger.info(f"Начало табличного округления. Входные параметры:")
-            logger.info(f"value: {value}")
-            logger.info(f"threshold_table_values: {threshold_table_values}")
-            logger.info(f"variables: {variables}")
-
-            if (
-                not threshold_table_values
-                or not isinstance(threshold_table_values, dict)
-                or not variables
-            ):
-                logger.error(
-                    "Отсутствуют необходимые параметры для табличного округления"
-                )
-                return value
 
-            target_variable = threshold_table_values.get("target_variable")
-            higher_variable = threshold_table_values.get("higher_variable")
-            lower_variable = threshold_table_values.get("lower_variable")
-            formula = threshold_table_values.get("formula")
+def traced(view):
+    """
+    Собирает трассировку расчета для запроса.
 
-            logger.info(f"Полученные переменные:")
-            logger.info(f"target_variable: {target_variable}")
-            logger.info(f"higher_variable: {higher_variable}")
-            logger.info(f"lower_variable: {lower_variable}")
-            logger.info(f"formula: {formula}")
+    События накапливаются в буфере запроса и сериализуются, только если:
+    - запрос завершился ошибкой (трассировка пишется в журнал, ее ID
+      возвращается в ответе);
+    - запрос попал в выборку CALCULATION_TRACE_SAMPLE_RATE (пишется в журнал);
+    - редактор передал параметр ?trace=1 (трассировка возвращается в ответе).
+    """
 
-            if not all([target_variable, higher_variable, lower_variable, formula]):
-                logger.error("Не все необходимые переменные определены")
-                return value
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with calculation_trace() as current:
+            response = view(request, *args, **kwargs)
 
-            # Получаем значения из variables
-            try:
-                target_value = float(
-                    str(variables.get(target_variable, "0")).replace(",", ".")
-                )
-                formula_value = float(
-                    str(variables.get(formula, "0")).replace(",", ".")
-                )
-                higher_value = float(
-                    str(variables.get(higher_variable, "0")).replace(",", ".")
-                )
-                lower_value = float(
-                    str(variables.get(lower_variable, "0")).replace(",", ".")
-                )
+        failed = response.status_code >= 400
+        if failed or current.sampled:
+            current.write("error" if failed else "sample")
+            if failed and isinstance(response.data, dict) and "error" in response.data:
+                response.data["trace_id"] = current.trace_id
+        if (
+            request.query_params.get("trace") == "1"
+            and isinstance(response.data, dict)
+            and is_editor(request)
+        ):
+            response.data["trace"] = current.as_dict()
+        return response
+
+    return wrapper
 
-                logger.info(f"Значения для сравнения:")
-                logger.info(f"{target_variable}: {target_value}")
-                logger.info(f"{formula}: {formula_value}")
-                logger.info(f"{higher_variable}: {higher_value}")
-                logger.info(f"{lower_variable}: {lower_value}")
-
-            except (ValueError, TypeError) as e:
-                logger.error(f"Ошибка преобразования значений: {str(e)}")
-                logger.error(f"target={variables.get(target_variable)}")
-                logger.error(f"formula={variables.get(formula)}")
-                logger.error(f"higher={variables.get(higher_variable)}")
-                logger.error(f"lower={variables.get(lower_variable)}")
-                return value
-
-            # Сравнение и выбор значения
-            if formula_value < target_value:
-                logger.info(
-                    f"formula_value ({formula_value}) < target_value ({target_value})"
-                )
-                logger.info(f"Выбрано верхнее значение: {higher_value}")
-                return higher_value
-            else:
-                logger.info(
-                    f"formula_value ({formula_value}) >= target_value ({target_value})"
-                )
-                logger.info(f"Выбрано нижнее значение: {lower_value}")
-                return lower_value
 
-        elif rounding_type == "multiple":
-            if not rounding_decimal:
-                return value
-            return round(value / rounding_decimal) * rounding_decimal
+def _get_request_plan(data):
+    """
+    Возвращает план расчета и версию метода по данным запроса.
+
+    Метод задается либо ID сохраненного метода (method_id и необязательная
+    method_version), либо полным описанием метода (research_method).
+    """
+    method_id = data.get("method_id")
+    if method_id is not None:
+        # Метод берется с сервера, клиент передает только его ID
+        trace("method", method_id=method_id, method_version=data.get("method_version"))
+        return get_method_plan(method_id, data.get("method_version"))
 
-        elif rounding_type == "decimal":
-            if rounding_decimal is None:
-                return value
-            return round(value, rounding_decimal)
+    research_method = data.get("research_method", {})
+    trace(
+        "method", method_id=research_method.get("id"), name=research_method.get("name")
+    )
+    return get_calculation_plan(research_method), None
 
-        return value
 
-    except (ValueError, TypeError) as e:
-        logger.error(f"Ошибка в round_value: {str(e)}")
-        return value
+def _measure(data, plan, kind="request"):
+    """
+    Возвращает замер расчета метода из данных запроса для метрик.
+    """
+    research_method = data.get("research_method") or {}
+    method_id = data.get("method_id")
+    if method_id is None:
+        method_id = research_method.get("id")
+    return measure_method(
+        get_method_key(method_id, plan), research_method.get("name"), kind
+    )
 
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@traced
 def calculate_result(request):
     """
     Вычисляет результат расчета.
     """
     try:
-        logger.info("Начало расчета")
-
         input_data = request.data.get("input_data", {})
         research_method = request.data.get("research_method", {})
-
-        logger.info(f"Полученные входные данные: {input_data}")
-        logger.info(
-            f"Метод исследования: {research_method['name']} (ID: {research_method['id']})"
+        method_id = request.data.get("method_id")
+        # Инкрементальный расчет: токен предыдущего расчета и измененные поля
+        evaluation_token = request.data.get("evaluation_token")
+        changed_inputs = request.data.get("changed_inputs")
+        incremental = bool(request.data.get("incremental") or evaluation_token)
+        trace("request", input_data=input_data, incremental=incremental)
+
+        has_input = bool(input_data) or (
+            bool(evaluation_token) and isinstance(changed_inputs, dict)
         )
-        logger.info(f"Формула расчета: {research_method['formula']}")
-        logger.info(f"Погрешность: {research_method['measurement_error']}")
-
-        if not input_data or not research_method:
+        if not has_input or not (research_method or method_id):
             logger.error("Отсутствуют необходимые данные для расчета")
             return Response(
                 {
@@ -159,304 +143,284 @@ def calculate_result(request):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Заменяем пустые значения на '0'
-        processed_input_data = {}
-        for key, value in input_data.items():
-            if value is None or value.strip() == "":
-                processed_input_data[key] = "0"
-                logger.info(f"Пустое значение в поле {key} заменено на '0'")
-            else:
-                processed_input_data[key] = value
+        try:
+            plan, method_version = _get_request_plan(request.data)
+            with _measure(request.data, plan):
+                if incremental:
+                    response_data = execute_calculation_plan_incremental(
+                        plan, input_data or None, evaluation_token, changed_inputs
+                    )
+                else:
+                    response_data = execute_calculation_plan_cached(
+                        plan, prepare_input_data(input_data)
+                    )
+        except ResearchMethod.DoesNotExist:
+            return Response(
+                {"error": "Метод исследования не найден"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except (MethodVersionError, EvaluationStateError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except CalculationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if method_version:
+            response_data["method_version"] = method_version
+
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        trace("failed", error=e)
+        logger.error(f"Необработанная ошибка при расчете: {str(e)}", exc_info=True)
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@traced
+def calculate_uncertainty(request):
+    """
+    Оценивает неопределенность результата методом Монте-Карло.
 
-        input_data = processed_input_data
+    Метод задается так же, как в calculate_result. input_data - значения
+    входных величин, uncertainties - их неопределенности (стандартная
+    неопределенность или {"distribution": "normal" | "uniform" |
+    "triangular", "value": ...}), samples - количество выборок, seed -
+    начальное значение генератора.
+    """
+    try:
+        input_data = request.data.get("input_data")
+        uncertainties = request.data.get("uncertainties")
+        research_method = request.data.get("research_method", {})
+        method_id = request.data.get("method_id")
 
-        # Проверяем тип округления
-        if research_method["rounding_type"] not in ["decimal", "significant"]:
-            logger.error(f"Неверный тип округления: {research_method['rounding_type']}")
+        if not isinstance(input_data, dict) or not input_data:
             return Response(
-                {"error": "Неверный тип округления"},
+                {"error": "Необходимо предоставить входные данные"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not (research_method or method_id):
+            return Response(
+                {"error": "Необходимо указать метод исследования"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            samples = int(request.data.get("samples", MONTE_CARLO_DEFAULT_SAMPLES))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Количество выборок должно быть целым числом"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Сначала вычисляем промежуточные результаты
-        logger.info("Начало вычисления промежуточных результатов")
-        intermediate_results = {}
-        variables = dict(input_data)
+        try:
+            plan, method_version = _get_request_plan(request.data)
+            with _measure(request.data, plan, "monte_carlo"):
+                response_data = propagate_uncertainty(
+                    plan,
+                    input_data,
+                    uncertainties,
+                    samples,
+                    request.data.get("seed"),
+                )
+        except ResearchMethod.DoesNotExist:
+            return Response(
+                {"error": "Метод исследования не найден"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except MethodVersionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except CalculationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        for field in research_method["intermediate_data"]["fields"]:
-            # Пропускаем поля с пустыми именами или формулами
-            if not field["name"].strip() or not field["formula"].strip():
-                logger.info(f"Пропущено пустое промежуточное поле: {field}")
-                continue
+        if method_version:
+            response_data["method_version"] = method_version
+        return Response(response_data, status=status.HTTP_200_OK)
 
-            try:
-                logger.info(
-                    f"Вычисление промежуточного результата: {field['name']}, формула: {field['formula']}"
-                )
+    except Exception as e:
+        trace("failed", error=e)
+        logger.error(
+            f"Необработанная ошибка при расчете неопределенности: {str(e)}",
+            exc_info=True,
+        )
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-                # Если используется метод ближайших табличных значений
-                if field.get("use_threshold_table"):
-                    # Находим поле с формулой для target_variable
-                    target_field = next(
-                        (
-                            f
-                            for f in research_method["intermediate_data"]["fields"]
-                            if f["name"]
-                            == field["threshold_table_values"]["target_variable"]
-                        ),
-                        None,
-                    )
 
-                    if target_field:
-                        formula = target_field["formula"]
-                    else:
-                        formula = field["formula"]
-
-                    intermediate_value = round_value(
-                        value=0,
-                        rounding_type="threshold_table",
-                        threshold_table_values={
-                            "target_variable": field["threshold_table_values"][
-                                "target_variable"
-                            ],
-                            "higher_variable": field["threshold_table_values"][
-                                "higher_variable"
-                            ],
-                            "lower_variable": field["threshold_table_values"][
-                                "lower_variable"
-                            ],
-                            "formula": formula,
-                        },
-                        variables=variables,
-                    )
-                else:
-                    # Подготавливаем параметры округления
-                    rounding_params = None
-                    if field.get("use_multiple_rounding"):
-                        rounding_params = {
-                            "use_multiple_rounding": True,
-                            "rounding_type": field.get("rounding_type"),
-                            "rounding_decimal": field.get("rounding_decimal"),
-                            "multiple_value": field.get("multiple_value"),
-                        }
-
-                    # Проверяем наличие диапазонного расчета
-                    range_calculation = field.get("range_calculation")
-
-                    intermediate_value = evaluate_formula(
-                        field["formula"],
-                        variables,
-                        range_calculation=range_calculation,
-                        rounding_params=rounding_params,
-                    )
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_calculation_cache_stats(request):
+    """
+    Возвращает статистику кэшей расчета (попадания, промахи, размер).
+    """
+    if not is_editor(request):
+        return Response(
+            {"error": "Статистика кэшей доступна только редакторам"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
 
-                logger.info(
-                    f"Промежуточный результат {field['name']} = {intermediate_value}"
-                )
-                # Добавляем результат в словарь только если show_calculation = true
-                if field.get("show_calculation", True):
-                    intermediate_results[field["name"]] = str(intermediate_value)
-                # В любом случае добавляем значение в переменные для дальнейших расчетов
-                variables[field["name"]] = intermediate_value
-            except Exception as e:
-                logger.error(
-                    f"Ошибка при вычислении промежуточного результата {field['name']}: {str(e)}"
-                )
-                return Response(
-                    {
-                        "error": f"Ошибка при вычислении промежуточного результата: {str(e)}"
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+    return Response(get_calculation_cache_info(), status=status.HTTP_200_OK)
 
-        logger.info("Начало проверки условий повторяемости")
-        satisfied_conditions = []
 
-        for condition in research_method["convergence_conditions"]["formulas"]:
-            try:
-                logger.info(f"Проверка условия: {condition['formula']}")
-                condition_result = evaluate_formula(
-                    condition["formula"], variables, is_condition=True
-                )
-                logger.info(
-                    f"Результат проверки условия: {condition_result} (тип: {condition['convergence_value']}"
-                )
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_calculation_metrics_stats(request):
+    """
+    Возвращает гистограммы времени расчета по методам исследования и
+    этапам расчета (промежуточные поля, повторяемость, результат,
+    погрешность; запрос целиком).
+    """
+    if not is_editor(request):
+        return Response(
+            {"error": "Метрики расчетов доступны только редакторам"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
 
-                if condition_result:
-                    satisfied_conditions.append(condition["convergence_value"])
-                    logger.info(
-                        f"Условие {condition['formula']} выполнено, тип: {condition['convergence_value']}"
-                    )
-            except Exception as e:
-                logger.error(f"Ошибка при проверке условия повторяемости: {str(e)}")
-                return Response(
-                    {"error": f"Ошибка при проверке условия повторяемости: {str(e)}"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+    data = get_calculation_metrics()
+    # Названия методов, которые рассчитывались по ID
+    method_ids = [
+        int(key)
+        for key, metrics in data["methods"].items()
+        if metrics["name"] is None and key.isdigit()
+    ]
+    if method_ids:
+        names = dict(
+            ResearchMethod.objects.filter(id__in=method_ids).values_list("id", "name")
+        )
+        for method_id, name in names.items():
+            data["methods"][str(method_id)]["name"] = name
+    return Response(data, status=status.HTTP_200_OK)
 
-        logger.info(f"Все выполненные условия: {satisfied_conditions}")
 
-        # Проверяем условия в порядке приоритета
-        convergence_result = "satisfactory"
-        custom_value = None
+@api_view(["GET", "POST"])
+@permission_classes([AllowAny])
+def calculation_profiles(request):
+    """
+    GET - список профилей расчетов процесса; POST - запрос профиля (cProfile)
+    следующих расчетов метода: method_id и количество расчетов calculations.
+    """
+    if not is_editor(request):
+        return Response(
+            {"error": "Профилирование доступно только редакторам"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
 
-        # Проверяем наличие кастомного значения
-        for condition in research_method["convergence_conditions"]["formulas"]:
-            if condition["convergence_value"] == "custom" and condition.get(
-                "custom_value"
-            ):
-                try:
-                    condition_result = evaluate_formula(
-                        condition["formula"], variables, is_condition=True
-                    )
-                    if condition_result:
-                        convergence_result = "custom"
-                        custom_value = condition["custom_value"]
-                        break
-                except Exception as e:
-                    logger.error(f"Ошибка при проверке кастомного условия: {str(e)}")
-                    continue
-
-        # Если кастомное условие не сработало, проверяем остальные условия
-        if convergence_result != "custom":
-            if "absence" in satisfied_conditions:
-                convergence_result = "absence"
-            elif "traces" in satisfied_conditions:
-                convergence_result = "traces"
-            elif "unsatisfactory" in satisfied_conditions:
-                convergence_result = "unsatisfactory"
-
-        # Сохраняем информацию только о выбранном условии
-        conditions_info = []
-        for condition in research_method["convergence_conditions"]["formulas"]:
-            if condition["convergence_value"] == convergence_result:
-                try:
-                    condition_result = evaluate_formula(
-                        condition["formula"], variables, is_condition=True
-                    )
-                    conditions_info.append(
-                        {
-                            "formula": condition["formula"],
-                            "satisfied": condition_result,
-                            "convergence_value": condition["convergence_value"],
-                            "calculation_steps": calculate_convergence_steps(
-                                condition["formula"], variables
-                            ),
-                        }
-                    )
-                except Exception as e:
-                    logger.error(f"Ошибка при проверке условия повторяемости: {str(e)}")
-                    return Response(
-                        {
-                            "error": f"Ошибка при проверке условия повторяемости: {str(e)}"
-                        },
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
+    if request.method == "GET":
+        return Response(
+            [profile.as_dict() for profile in get_profiles()],
+            status=status.HTTP_200_OK,
+        )
 
-        # Если выбрано особое условие или кастомное значение, возвращаем его
-        if convergence_result in ["absence", "traces", "unsatisfactory", "custom"]:
-            logger.info(f"Найдено особое условие: {convergence_result}")
+    method_id = request.data.get("method_id")
+    if method_id in (None, ""):
+        return Response(
+            {"error": "Необходимо указать метод исследования"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        calculations = int(request.data.get("calculations", 1))
+        profile = request_profile(method_id, calculations)
+    except (TypeError, ValueError) as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(profile.as_dict(), status=status.HTTP_201_CREATED)
 
-            return Response(
-                {
-                    "convergence": convergence_result,
-                    "intermediate_results": intermediate_results,
-                    "result": custom_value if convergence_result == "custom" else None,
-                    "measurement_error": None,
-                    "unit": research_method["unit"],
-                    "conditions_info": conditions_info,
-                },
-                status=status.HTTP_200_OK,
-            )
 
-        # Если особых условий нет, считаем результат удовлетворительным
-        logger.info("Условия повторяемости удовлетворительны, продолжаем расчет")
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def download_calculation_profile(request, profile_id):
+    """
+    Возвращает готовый профиль расчетов: файл pstats или, с параметром
+    ?summary=1, текстовую сводку.
+    """
+    if not is_editor(request):
+        return Response(
+            {"error": "Профилирование доступно только редакторам"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
 
-        # Если повторяемость удовлетворительная, вычисляем результат
-        result = None
-        measurement_error = None
+    profile = get_profile(profile_id)
+    if profile is None:
+        return Response(
+            {"error": "Профиль не найден"}, status=status.HTTP_404_NOT_FOUND
+        )
+    if profile.data is None:
+        return Response(
+            {"error": "Профиль еще не готов", **profile.as_dict()},
+            status=status.HTTP_409_CONFLICT,
+        )
 
-        if convergence_result == "satisfactory":
-            # Затем вычисляем основной результат
-            try:
-                logger.info(
-                    f"Вычисление основного результата по формуле: {research_method['formula']}"
-                )
-                logger.info(f"Используемые переменные: {variables}")
-                result = evaluate_formula(research_method["formula"], variables)
-                logger.info(f"Неокругленный результат: {result}")
-            except Exception as e:
-                logger.error(f"Ошибка при вычислении основного результата: {str(e)}")
-                return Response(
-                    {"error": f"Ошибка при вычислении результата: {str(e)}"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+    if request.query_params.get("summary") == "1":
+        return HttpResponse(profile.summary(), content_type="text/plain; charset=utf-8")
+    response = HttpResponse(profile.data, content_type="application/octet-stream")
+    response["Content-Disposition"] = (
+        f'attachment; filename="calculation-{profile.profile_id}.prof"'
+    )
+    return response
 
-            # Округляем результат
-            logger.info(
-                f"Округление результата: тип={research_method['rounding_type']}, знаков={research_method['rounding_decimal']}"
-            )
-            result = round_result(
-                result,
-                research_method["rounding_type"],
-                research_method["rounding_decimal"],
-            )
-            logger.info(f"Окончательный результат после округления: {result}")
 
-            # Вычисляем количество знаков после запятой в результате
-            result_decimal_places = (
-                len(str(result).split(".")[-1]) if "." in str(result) else 0
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@traced
+def calculate_batch(request):
+    """
+    Вычисляет результаты расчета по одному методу для списка проб.
+
+    Ошибка в одном наборе входных данных не прерывает расчет остальных:
+    для каждого элемента возвращается либо результат, либо текст ошибки.
+    """
+    try:
+        input_data_list = request.data.get("input_data_list")
+        research_method = request.data.get("research_method", {})
+        method_id = request.data.get("method_id")
+
+        if not isinstance(input_data_list, list) or not (research_method or method_id):
+            return Response(
+                {
+                    "error": "Необходимо предоставить список входных данных и метод исследования"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            logger.info(
-                f"Количество знаков после запятой в результате: {result_decimal_places}"
+
+        if len(input_data_list) > MAX_BATCH_SIZE:
+            return Response(
+                {
+                    "error": f"Количество наборов входных данных не может превышать {MAX_BATCH_SIZE}"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-            # Вычисляем погрешность
-            try:
-                error_config = research_method["measurement_error"]
-                logger.info(f"Вычисление погрешности: {error_config}")
-
-                if error_config["type"] == "fixed":
-                    measurement_error = float(error_config["value"])
-                elif error_config["type"] == "formula":
-                    variables["result"] = result
-                    measurement_error = float(
-                        evaluate_formula(error_config["value"], variables)
-                    )
-                else:
-                    logger.warning("Неподдерживаемый тип погрешности")
-                    measurement_error = 0
+        trace("batch", size=len(input_data_list))
 
-                # Округляем погрешность до того же количества знаков после запятой, что и результат
-                if measurement_error is not None:
-                    measurement_error = round(
-                        Decimal(str(measurement_error)), result_decimal_places
-                    )
-                    logger.info(f"Погрешность после округления: {measurement_error}")
+        try:
+            plan, method_version = _get_request_plan(request.data)
+        except ResearchMethod.DoesNotExist:
+            return Response(
+                {"error": "Метод исследования не найден"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except MethodVersionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except CalculationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            except Exception as e:
-                logger.error(f"Ошибка при вычислении погрешности: {str(e)}")
-                return Response(
-                    {"error": f"Ошибка при вычислении погрешности: {str(e)}"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        with _measure(request.data, plan, "batch"):
+            results = execute_calculation_batch(plan, input_data_list)
+        failed = sum(1 for item in results if item["status"] == "error")
 
         response_data = {
-            "convergence": convergence_result,
-            "intermediate_results": intermediate_results,
-            "result": str(result) if result is not None else None,
-            "measurement_error": (
-                str(measurement_error) if measurement_error is not None else None
-            ),
-            "unit": research_method["unit"],
-            "conditions_info": conditions_info,
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed,
         }
-        logger.info(f"Подготовлен ответ: {response_data}")
+        if method_version:
+            response_data["method_version"] = method_version
+
+        trace("batch_done", succeeded=len(results) - failed, failed=failed)
 
         return Response(response_data, status=status.HTTP_200_OK)
 
     except Exception as e:
-        logger.error(f"Необработанная ошибка при расчете: {str(e)}", exc_info=True)
+        logger.error(
+            f"Необработанная ошибка при пакетном расчете: {str(e)}", exc_info=True
+        )
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -562,6 +526,7 @@ def update_methods_order(request, page_id):
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@traced
 def save_calculation(request):
     """
     Сохраняет расчет.
@@ -571,9 +536,7 @@ def save_calculation(request):
         sample_data = None
         calculation_data = None
 
-        logger.info(f"Получены данные для сохранения расчета: {data}")
-        logger.info(f"Значение поля executor: {data.get('executor')}")
-        logger.info(f"Данные об оборудовании: {data.get('equipment_data')}")
+        trace("request", data=data)
 
         if "sample_id" in data:
             existing_calculation = Calculation.objects.filter(
@@ -603,10 +566,6 @@ def save_calculation(request):
                 "laboratory_activity_date": data.get("laboratory_activity_date"),
                 "executor": data.get("executor"),
             }
-
-            logger.info(
-                f"Подготовленные данные для создания расчета: {calculation_data}"
-            )
         else:
             # Создаем новую пробу
             sample_data = {
@@ -653,8 +612,8 @@ def save_calculation(request):
                     sample_serializer.errors, status=status.HTTP_400_BAD_REQUEST
                 )
 
+        trace("calculation", calculation_data=calculation_data)
         calculation_serializer = CalculationSerializer(data=calculation_data)
-        logger.info(f"Данные для сериализатора: {calculation_data}")
         if calculation_serializer.is_valid():
             try:
                 calculation = calculation_serializer.save()
@@ -671,11 +630,13 @@ def save_calculation(request):
                     },
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+        trace("validation_failed", errors=calculation_serializer.errors)
         return Response(
             calculation_serializer.errors, status=status.HTTP_400_BAD_REQUEST
         )
 
     except Exception as e:
+        trace("failed", error=e)
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
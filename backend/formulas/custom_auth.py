@@ -1,13 +1,33 @@
 import jwt
-import requests
+from django.conf import settings
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from .models import CustomUser
+from .utils.keycloak_keys import PublicKeyError, get_public_keys
+from .utils.token_cache import authentication_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _get_user_state(user):
+    """
+    Возвращает неизменяемый снимок полей пользователя для кэша
+    аутентификации: (алиас базы данных, имена полей, значения).
+    """
+    names = tuple(field.attname for field in user._meta.concrete_fields)
+    return user._state.db, names, tuple(getattr(user, name) for name in names)
+
+
+def _restore_user(user_state):
+    """
+    Создает пользователя по снимку без запроса к базе данных; каждый запрос
+    получает собственный объект.
+    """
+    db, names, values = user_state
+    return CustomUser.from_db(db, names, values)
+
+
 class CustomJWTAuthentication(BaseAuthentication):
     def authenticate(self, request):
         auth_header = request.headers.get("Authorization")
@@ -21,34 +41,37 @@ class CustomJWTAuthentication(BaseAuthentication):
             logger.error("Invalid token format")
             raise AuthenticationFailed("Invalid token format")
 
-        public_key_url = "https://kc.gd-urengoy.gazprom.ru/realms/GDU"
-        try:
-            response = requests.get(
-                public_key_url, verify="/usr/local/share/ca-certificates/root.crt"
-            )
-            if response.status_code != 200:
-                logger.error("Failed to retrieve public key")
-                raise AuthenticationFailed("Failed to retrieve public key")
-
-            public_key = response.json().get("public_key")
-            if not public_key:
-                logger.error("Public key is missing")
-                raise AuthenticationFailed("Public key is missing")
-
-            logger.info(f"Public key: {public_key}")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {e}")
-            raise AuthenticationFailed("Request failed")
+        # Повторные запросы с тем же токеном не декодируют его и не
+        # обращаются к базе за пользователем
+        cache_key = None
+        if authentication_cache.enabled:
+            cache_key = authentication_cache.make_key(token)
+            cached = authentication_cache.get(cache_key)
+            if cached is not None:
+                decoded_token, user_state = cached
+                request.decoded_token = dict(decoded_token)
+                return (_restore_user(user_state), None)
 
+        verify_signature = settings.KEYCLOAK_VERIFY_SIGNATURE
         try:
+            public_key = None
+            if verify_signature:
+                # Ключ берется из кэша ключей realm; запрос к Keycloak
+                # выполняется только при истечении срока или новом kid
+                kid = jwt.get_unverified_header(token).get("kid")
+                public_key = get_public_keys().get_key(kid)
+
             decoded_token = jwt.decode(
                 token,
                 public_key,
                 algorithms=["RS256"],
-                options={"verify_signature": False},
+                leeway=settings.KEYCLOAK_LEEWAY,
+                options={"verify_signature": verify_signature, "verify_aud": False},
             )
-            logger.info(f"Decoded token: {decoded_token}")
             request.decoded_token = decoded_token
+        except PublicKeyError as e:
+            logger.error(f"Failed to retrieve public key: {e}")
+            raise AuthenticationFailed("Failed to retrieve public key")
         except jwt.InvalidTokenError as e:
             logger.error(f"Invalid token: {e}")
             raise AuthenticationFailed("Invalid token")
@@ -59,4 +82,8 @@ class CustomJWTAuthentication(BaseAuthentication):
             raise AuthenticationFailed("Username is missing in the token")
 
         user, created = CustomUser.objects.get_or_create(username=username)
+        if cache_key is not None:
+            authentication_cache.set(
+                cache_key, dict(decoded_token), _get_user_state(user)
+            )
         return (user, None)
@@ -0,0 +1,97 @@
+from http.server import ThreadingHTTPServer
+import logging
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from ...custom_auth import CustomJWTAuthentication
+from ...tests.stub_servers import KeycloakRealm, make_keycloak_handler
+from ...utils.http_client import clear_http_client
+from ...utils.keycloak_keys import clear_public_keys
+from ...utils.token_cache import authentication_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время аутентификации на локальном заменителе Keycloak с "
+        "загрузкой ключа на каждый запрос, с кэшем ключей и с кэшем токенов "
+        "(поведение кэша ключей проверяют тесты formulas.tests.test_keycloak_keys)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Количество запросов в замере",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=20,
+            help="Задержка ответа заменителя Keycloak, мс",
+        )
+
+    def handle(self, *args, **options):
+        realm = KeycloakRealm(options["latency"] / 1000)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_keycloak_handler(realm))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/certs"
+
+        logging.disable(logging.CRITICAL)
+        try:
+            with override_settings(
+                KEYCLOAK_CERTS_URL=url,
+                KEYCLOAK_CA_BUNDLE="",
+                KEYCLOAK_VERIFY_SIGNATURE=True,
+                # Каждая загрузка ключей - один запрос
+                HTTP_RETRIES=0,
+            ):
+                clear_http_client()
+                clear_public_keys()
+                self._benchmark(realm, options)
+        finally:
+            logging.disable(logging.NOTSET)
+            clear_public_keys()
+            clear_http_client()
+            server.shutdown()
+
+    def _authenticate(self, token, use_token_cache=False):
+        if not use_token_cache:
+            # Замер без кэша токенов обращается к ключам
+            authentication_cache.clear()
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        try:
+            user, _ = CustomJWTAuthentication().authenticate(request)
+            return user is not None
+        except AuthenticationFailed:
+            return False
+
+    def _benchmark(self, realm, options):
+        token = realm.token()
+        count = options["requests"]
+
+        def measure(before_request):
+            started = time.perf_counter()
+            for _ in range(count):
+                before_request()
+                self._authenticate(token)
+            return (time.perf_counter() - started) / count * 1000
+
+        def measure_cached():
+            started = time.perf_counter()
+            for _ in range(count):
+                self._authenticate(token, use_token_cache=True)
+            return (time.perf_counter() - started) / count * 1000
+
+        # Загрузка ключа на каждый запрос, как до кэширования
+        uncached = measure(clear_public_keys)
+        self._authenticate(token)
+        cached = measure(lambda: None)
+        token_cached = measure_cached()
+        self.stdout.write(
+            f"Аутентификация, мс на запрос (задержка Keycloak "
+            f"{options['latency']:g} мс): без кэша {uncached:.2f}, "
+            f"с кэшем ключей {cached:.2f}, с кэшем токенов {token_cached:.3f}"
+        )
@@ -0,0 +1,78 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+from ...api.calculation_api import calculate_batch, calculate_result
+from ...utils.benchmark_utils import generate_input_sets, load_fixture_methods
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность пакетного расчета (/calculate-batch/) "
+        "и расчета по одной пробе (/calculate/) на методах из research_methods_fixtures"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=1000,
+            help="Количество наборов входных данных на метод",
+        )
+        parser.add_argument(
+            "--fixture",
+            action="append",
+            help="Имя фикстуры (например, oil_products/01); по умолчанию все",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        # Логирование расчета не должно влиять на замеры
+        logging.disable(logging.CRITICAL)
+        try:
+            self._run(options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def _run(self, options):
+        factory = APIRequestFactory()
+        methods = load_fixture_methods()
+        if options["fixture"]:
+            methods = [item for item in methods if item[0] in options["fixture"]]
+
+        self.stdout.write(
+            f"{'Метод':<22}{'по одной, с':>14}{'проб/с':>10}"
+            f"{'пакет, с':>12}{'проб/с':>10}{'ускорение':>12}"
+        )
+        for fixture_name, method in methods:
+            input_sets = generate_input_sets(method, options["count"], options["seed"])
+
+            started = time.perf_counter()
+            for input_data in input_sets:
+                request = factory.post(
+                    "/api/calculate/",
+                    {"input_data": input_data, "research_method": method},
+                    format="json",
+                )
+                calculate_result(request)
+            single_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            request = factory.post(
+                "/api/calculate-batch/",
+                {"input_data_list": input_sets, "research_method": method},
+                format="json",
+            )
+            response = calculate_batch(request)
+            batch_time = time.perf_counter() - started
+
+            if response.status_code != 200:
+                self.stderr.write(f"{fixture_name}: {response.data}")
+                continue
+
+            count = len(input_sets)
+            self.stdout.write(
+                f"{fixture_name:<22}{single_time:>14.3f}{count / single_time:>10.0f}"
+                f"{batch_time:>12.3f}{count / batch_time:>10.0f}"
+                f"{single_time / batch_time:>11.1f}x"
+            )
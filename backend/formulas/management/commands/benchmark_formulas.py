@@ -0,0 +1,242 @@
+import json
+import logging
+import platform
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+from ...api.calculation_api import calculate_result
+from ...services.calculation_service import (
+    CalculationError,
+    _evaluate_steps,
+    get_calculation_plan,
+    prepare_input_data,
+)
+from ...services.result_cache import result_cache
+from ...utils.benchmark_utils import (
+    generate_input_sets,
+    load_fixture_methods,
+    measure_allocations,
+    summarize_timings,
+)
+from ...utils.formula_utils import calculate_convergence_steps, evaluate_formula
+
+# Версия формата файла с базовыми замерами
+BASELINE_VERSION = 1
+
+OPERATIONS = ("evaluate_formula", "calculate_convergence_steps", "calculate_result")
+
+
+def _evaluate_formulas(plan, variables):
+    """
+    Вычисляет все формулы метода: промежуточные поля и результат.
+    """
+    for step in plan["steps"]:
+        if step["kind"] == "range":
+            evaluate_formula(
+                step["formula"], variables, range_calculation=step["range_calculation"]
+            )
+        elif step["kind"] == "formula":
+            evaluate_formula(
+                step["formula"], variables, rounding_params=step["rounding_params"]
+            )
+    evaluate_formula(plan["formula"], variables)
+
+
+def _calculate_convergence_steps(plan, variables):
+    for condition in plan["convergence_conditions"]:
+        calculate_convergence_steps(condition["formula"], variables)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет задержку (p50/p95), пропускную способность и выделение памяти "
+        "evaluate_formula, calculate_convergence_steps и /calculate/ на методах "
+        "из research_methods_fixtures и сравнивает с базовыми замерами"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=500,
+            help="Количество наборов входных данных на метод",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=20,
+            help="Количество наборов для прогрева (не входят в замер)",
+        )
+        parser.add_argument(
+            "--alloc-count",
+            type=int,
+            default=50,
+            help="Количество наборов для замера выделения памяти",
+        )
+        parser.add_argument(
+            "--fixture",
+            action="append",
+            help="Имя фикстуры (например, oil_products/01); по умолчанию все",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--save-baseline",
+            help="Сохранить замеры в JSON-файл",
+        )
+        parser.add_argument(
+            "--baseline",
+            help="JSON-файл с базовыми замерами для сравнения",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Допустимое замедление p50 относительно базовых замеров (доля)",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"], "r", encoding="utf-8") as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Не удалось прочитать базовые замеры: {str(e)}")
+            if baseline.get("version") != BASELINE_VERSION:
+                raise CommandError("Неподдерживаемая версия файла базовых замеров")
+
+        # Логирование расчета не должно влиять на замеры
+        logging.disable(logging.CRITICAL)
+        try:
+            results = self._run(options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if options["save_baseline"]:
+            data = {
+                "version": BASELINE_VERSION,
+                "python": platform.python_version(),
+                "count": options["count"],
+                "seed": options["seed"],
+                "results": results,
+            }
+            with open(options["save_baseline"], "w", encoding="utf-8") as file:
+                json.dump(data, file, ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(f"Замеры сохранены в {options['save_baseline']}")
+
+        if baseline is not None:
+            regressions = self._compare(results, baseline["results"], options)
+            if regressions:
+                raise CommandError(f"Найдено замедлений: {regressions}")
+            self.stdout.write(self.style.SUCCESS("Замедлений нет"))
+
+    def _run(self, options):
+        factory = APIRequestFactory()
+        methods = load_fixture_methods()
+        if options["fixture"]:
+            methods = [item for item in methods if item[0] in options["fixture"]]
+
+        self.stdout.write(
+            f"{'Метод':<22}{'операция':<30}{'p50, мкс':>11}{'p95, мкс':>11}"
+            f"{'выз./с':>10}{'пик, КиБ':>10}"
+        )
+        results = {}
+        for fixture_name, method in methods:
+            plan = get_calculation_plan(method)
+            input_sets = generate_input_sets(
+                method, options["count"] + options["warmup"], options["seed"]
+            )
+            # Прогрев на отдельных наборах, чтобы замеры /calculate/ не
+            # попадали в кэш результатов
+            warmup_sets = input_sets[options["count"] :]
+            input_sets = input_sets[: options["count"]]
+
+            contexts = []
+            for input_data in input_sets:
+                try:
+                    variables, _, _ = _evaluate_steps(
+                        plan, prepare_input_data(input_data)
+                    )
+                except CalculationError:
+                    continue
+                contexts.append((plan, variables))
+
+            def post(input_data):
+                request = factory.post(
+                    "/api/calculate/",
+                    {"input_data": input_data, "research_method": method},
+                    format="json",
+                )
+                return calculate_result(request)
+
+            calls = {
+                "evaluate_formula": (_evaluate_formulas, contexts),
+                "calculate_convergence_steps": (
+                    _calculate_convergence_steps,
+                    contexts,
+                ),
+                "calculate_result": (post, [(item,) for item in input_sets]),
+            }
+            for input_data in warmup_sets:
+                post(input_data)
+
+            result_cache.clear()
+            method_results = {}
+            for operation in OPERATIONS:
+                function, arguments = calls[operation]
+                metrics = self._measure(function, arguments)
+                result_cache.clear()
+                metrics.update(
+                    measure_allocations(function, arguments[: options["alloc_count"]])
+                )
+                result_cache.clear()
+                method_results[operation] = metrics
+                self._write_row(fixture_name, operation, metrics)
+            results[fixture_name] = method_results
+        return results
+
+    def _measure(self, function, arguments):
+        timings = []
+        for args in arguments:
+            started = time.perf_counter()
+            try:
+                function(*args)
+            except Exception:
+                # Наборы с ошибками вычисления тоже входят в замер
+                pass
+            timings.append(time.perf_counter() - started)
+        return summarize_timings(timings)
+
+    def _write_row(self, fixture_name, operation, metrics):
+        if not metrics["count"]:
+            self.stdout.write(f"{fixture_name:<22}{operation:<30}{'нет наборов':>11}")
+            return
+        peak = metrics["peak_bytes"] / 1024 if metrics["peak_bytes"] else 0
+        self.stdout.write(
+            f"{fixture_name:<22}{operation:<30}{metrics['p50_us']:>11.1f}"
+            f"{metrics['p95_us']:>11.1f}{metrics['ops_per_sec']:>10.0f}{peak:>10.1f}"
+        )
+
+    def _compare(self, results, baseline, options):
+        """
+        Сравнивает p50 с базовыми замерами и выводит замедления.
+
+        Returns:
+            int: Количество замедлений больше допустимого
+        """
+        regressions = 0
+        for fixture_name, operations in results.items():
+            for operation, metrics in operations.items():
+                expected = baseline.get(fixture_name, {}).get(operation)
+                if not expected or not expected.get("p50_us") or not metrics["p50_us"]:
+                    continue
+                ratio = metrics["p50_us"] / expected["p50_us"]
+                if ratio > 1 + options["tolerance"]:
+                    regressions += 1
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"{fixture_name} {operation}: p50 {metrics['p50_us']:.1f} мкс, "
+                            f"базовый {expected['p50_us']:.1f} мкс ({ratio:.2f}x)"
+                        )
+                    )
+        return regressions
@@ -0,0 +1,184 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from ...services.calculation_service import (
+    CalculationError,
+    _complete_calculation,
+    _evaluate_step,
+    _evaluate_steps,
+    get_calculation_plan,
+    prepare_input_data,
+)
+from ...utils.benchmark_utils import generate_input_sets, load_fixture_methods
+from ...utils.formula_utils import normalize_name
+
+# Прежняя таблица замены подстрочных символов (для сравнения)
+_LEGACY_SUBSCRIPT_MAP = {
+    "₀": "0",
+    "₁": "1",
+    "₂": "2",
+    "₃": "3",
+    "₄": "4",
+    "₅": "5",
+    "₆": "6",
+    "₇": "7",
+    "₈": "8",
+    "₉": "9",
+    "ₐ": "a",
+    "ₑ": "e",
+    "ₕ": "h",
+    "ᵢ": "i",
+    "ⱼ": "j",
+    "ₖ": "k",
+    "ₗ": "l",
+    "ₘ": "m",
+    "ₙ": "n",
+    "ₒ": "o",
+    "ₚ": "p",
+    "ᵣ": "r",
+    "ₛ": "s",
+    "ₜ": "t",
+    "ᵤ": "u",
+    "ᵥ": "v",
+    "ₓ": "x",
+    "ᵦ": "β",
+    "ᵧ": "γ",
+    "ᵨ": "ρ",
+    "ᵩ": "φ",
+    "ᵪ": "χ",
+}
+
+
+def _legacy_replace_subscript_digits(text):
+    for subscript, normal in _LEGACY_SUBSCRIPT_MAP.items():
+        text = text.replace(subscript, normal)
+    return text
+
+
+def _names(plan, input_data):
+    return list(input_data) + [step["name"] for step in plan["steps"]]
+
+
+def _normalize_legacy(names):
+    for name in names:
+        _legacy_replace_subscript_digits(name)
+
+
+def _normalize(names):
+    for name in names:
+        normalize_name(name)
+
+
+def _calculate_with_dict(plan, input_data):
+    # Переменные передаются обычным словарем: каждое вычисление формулы
+    # заново нормализует имена и преобразует значения
+    variables = dict(input_data)
+    intermediate_results = {}
+    for step in plan["steps"]:
+        value = _evaluate_step(step, variables)
+        if step["show"]:
+            intermediate_results[step["name"]] = str(value)
+        variables[step["name"]] = value
+    return _complete_calculation(plan, variables, intermediate_results)
+
+
+def _calculate_with_binding(plan, input_data):
+    variables, intermediate_results, _ = _evaluate_steps(plan, input_data)
+    return _complete_calculation(plan, variables, intermediate_results)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает затраты на нормализацию имен переменных и расчет по одной "
+        "пробе с обычным словарем переменных и с VariableBinding на методах "
+        "с несколькими параллельными определениями"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=500,
+            help="Количество наборов входных данных на метод",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Количество повторов замера (берется лучший)",
+        )
+        parser.add_argument(
+            "--min-inputs",
+            type=int,
+            default=6,
+            help="Минимальное количество входных полей метода",
+        )
+        parser.add_argument(
+            "--fixture",
+            action="append",
+            help="Имя фикстуры (например, oil_products/01); по умолчанию все",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        # Логирование расчета не должно влиять на замеры
+        logging.disable(logging.CRITICAL)
+        try:
+            self._run(options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def _run(self, options):
+        methods = load_fixture_methods()
+        if options["fixture"]:
+            methods = [item for item in methods if item[0] in options["fixture"]]
+
+        self.stdout.write(
+            f"{'Метод':<22}{'имен':>6}{'норм. было':>12}{'стало':>8}"
+            f"{'словарь':>10}{'binding':>10}{'экономия':>10}"
+        )
+        for fixture_name, method in methods:
+            plan = get_calculation_plan(method)
+            input_sets = []
+            for input_data in generate_input_sets(
+                method, options["count"], options["seed"]
+            ):
+                input_data = prepare_input_data(input_data)
+                try:
+                    _calculate_with_binding(plan, input_data)
+                except CalculationError:
+                    continue
+                input_sets.append(input_data)
+            if not input_sets or len(input_sets[0]) < options["min_inputs"]:
+                continue
+
+            names = [_names(plan, input_data) for input_data in input_sets]
+            timings = [
+                self._measure(function, arguments, options["repeat"])
+                for function, arguments in (
+                    (_normalize_legacy, [(item,) for item in names]),
+                    (_normalize, [(item,) for item in names]),
+                    (_calculate_with_dict, [(plan, item) for item in input_sets]),
+                    (_calculate_with_binding, [(plan, item) for item in input_sets]),
+                )
+            ]
+            saving = timings[2] - timings[3]
+            self.stdout.write(
+                f"{fixture_name:<22}{len(names[0]):>6}{timings[0]:>12.2f}"
+                f"{timings[1]:>8.2f}{timings[2]:>10.1f}{timings[3]:>10.1f}"
+                f"{saving:>7.1f} мкс"
+            )
+        self.stdout.write("Время - мкс на один расчет")
+
+    def _measure(self, function, arguments, repeat):
+        """
+        Возвращает лучшее из repeat среднее время вызова в микросекундах.
+        """
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for args in arguments:
+                function(*args)
+            elapsed = (time.perf_counter() - started) / len(arguments) * 1e6
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from ...models import ResearchMethod
+from ...utils.calculation_plan import (
+    PLAN_SOURCE_FIELDS,
+    build_calculation_plan,
+    is_plan_current,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит планы расчета для сохраненных методов исследования и выводит "
+        "методы, план которых построить нельзя (циклические зависимости, "
+        "ошибки в формулах)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--method",
+            type=int,
+            action="append",
+            help="ID метода исследования; по умолчанию все методы",
+        )
+        parser.add_argument(
+            "--save",
+            action="store_true",
+            help="Сохранить построенные планы методов, план которых устарел",
+        )
+
+    def handle(self, *args, **options):
+        queryset = ResearchMethod.objects.filter(is_deleted=False).order_by("id")
+        if options["method"]:
+            queryset = queryset.filter(id__in=options["method"])
+
+        errors = 0
+        saved = 0
+        total = 0
+        for method in queryset.only(
+            "id", "name", "calculation_plan", *PLAN_SOURCE_FIELDS
+        ):
+            total += 1
+            method_data = {key: getattr(method, key) for key in PLAN_SOURCE_FIELDS}
+            try:
+                plan = build_calculation_plan(method_data)
+            except ValueError as e:
+                errors += 1
+                self.stdout.write(f"{method.id}\t{method.name}\t{str(e)}")
+                continue
+            if options["save"] and not is_plan_current(
+                method.calculation_plan, method_data
+            ):
+                # update() не меняет updated_at: версия метода для клиентов
+                # остается прежней
+                ResearchMethod.objects.filter(id=method.id).update(
+                    calculation_plan=plan
+                )
+                saved += 1
+
+        self.stdout.write(
+            f"Методов: {total}, с ошибками плана: {errors}, сохранено планов: {saved}"
+        )
+        if errors:
+            raise CommandError(f"План не строится для методов: {errors}")
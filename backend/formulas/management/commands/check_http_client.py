@@ -0,0 +1,194 @@
+from urllib.parse import urlsplit
+import logging
+import time
+import uuid
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from ...tests.stub_servers import LocalServer
+from ...utils import employee_utils
+from ...utils.http_client import clear_http_client, get_http_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет запросы HR-API через общий HTTP-клиент на локальном сервере "
+        "(переиспользование соединения, получение ФИО списком, общий кэш ФИО) "
+        "и сравнивает время запроса с новым соединением и через пул "
+        "(пул, повторы и таймауты клиента проверяют тесты "
+        "formulas.tests.test_http_client)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Количество запросов в замере",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Размер пула соединений",
+        )
+
+    def handle(self, *args, **options):
+        server = LocalServer()
+        server.start()
+        logging.disable(logging.CRITICAL)
+        hr_api_url = employee_utils.HR_API_URL
+        try:
+            with override_settings(
+                HTTP_CONNECT_TIMEOUT=1,
+                HTTP_READ_TIMEOUT=0.3,
+                HTTP_RETRIES=2,
+                HTTP_RETRY_BACKOFF=0.01,
+                HTTP_POOL_MAXSIZE=options["threads"],
+            ):
+                clear_http_client()
+                failures = self._check(server, options)
+                self._benchmark(server, options)
+        finally:
+            employee_utils.HR_API_URL = hr_api_url
+            employee_utils.clear_employee_names()
+            logging.disable(logging.NOTSET)
+            clear_http_client()
+            server.stop()
+
+        if failures:
+            raise CommandError(f"Не пройдено проверок: {failures}")
+        self.stdout.write(self.style.SUCCESS("Все проверки пройдены"))
+
+    def _report(self, name, passed, details):
+        status = "OK" if passed else "ОШИБКА"
+        self.stdout.write(f"{status:<8}{name}: {details}")
+        return 0 if passed else 1
+
+    def _check(self, server, options):
+        failures = 0
+        client = get_http_client()
+        host = urlsplit(server.url).netloc
+
+        # Запросы HR-API идут через общий пул
+        employee_utils.HR_API_URL = server.url
+        employee_utils.clear_employee_names()
+        server.reset()
+        names = [
+            employee_utils.get_employee_name(f"hash{index}") for index in range(20)
+        ]
+        failures += self._report(
+            "HR-API",
+            names[3] == "Сотрудник hash3" and len(server.connections) == 1,
+            f"20 запросов, соединений {len(server.connections)}",
+        )
+
+        # ФИО списком: повторы и ФИО из кэша не запрашиваются, остальные
+        # запрашиваются одновременно
+        server.reset()
+        server.employee_delay = 0.05
+        hashes = [f"hash{index % 60}" for index in range(120)] + ["", None]
+        started = time.perf_counter()
+        names = employee_utils.resolve_employee_names(hashes)
+        elapsed = time.perf_counter() - started
+        server.employee_delay = 0
+        serial = 40 * 0.05
+        failures += self._report(
+            "ФИО списком",
+            len(names) == 60
+            and names["hash42"] == "Сотрудник hash42"
+            and server.employee_requests == 40
+            and elapsed < serial / 2,
+            f"122 hashMd5, запросов {server.employee_requests}, "
+            f"{elapsed * 1000:.0f} мс (по одному ~{serial * 1000:.0f} мс)",
+        )
+
+        failures += self._check_shared_names(server)
+
+        metrics = client.info()[host]
+        self.stdout.write(
+            f"Метрики {host}: запросов {metrics['requests']}, ошибок "
+            f"{metrics['errors']}, повторов {metrics['retries']}, открытых "
+            f"соединений {metrics['connections']} (создано "
+            f"{metrics['connections_created']}), p50 "
+            f"{metrics['latency']['p50_ms']} мс"
+        )
+        return failures
+
+    def _check_shared_names(self, server):
+        """
+        Проверяет общий кэш ФИО на двух кэшах с общим бэкендом "default"
+        (как в двух процессах).
+        """
+        failures = 0
+        process_cache = employee_utils.employee_name_cache
+        first, second = [
+            employee_utils.EmployeeNameCache(
+                maxsize=100, backend="default", timeout=60, negative_timeout=0.2
+            )
+            for _ in range(2)
+        ]
+        # Уникальные hashMd5: записи прошлых запусков в общем кэше не мешают
+        prefix = uuid.uuid4().hex[:8]
+        hashes = [f"{prefix}-{index}" for index in range(10)] + [f"unknown-{prefix}"]
+        try:
+            server.reset()
+            employee_utils.employee_name_cache = first
+            employee_utils.resolve_employee_names(hashes)
+            first_requests = server.employee_requests
+
+            server.reset()
+            employee_utils.employee_name_cache = second
+            names = employee_utils.resolve_employee_names(hashes)
+            failures += self._report(
+                "общий кэш ФИО",
+                first_requests == 11
+                and server.employee_requests == 0
+                and names[f"{prefix}-3"] == f"Сотрудник {prefix}-3"
+                and names[f"unknown-{prefix}"] == "",
+                f"запросов в первом процессе {first_requests}, во втором "
+                f"{server.employee_requests}",
+            )
+
+            # Неудачный запрос повторяется после negative_timeout
+            time.sleep(0.3)
+            server.reset()
+            employee_utils.resolve_employee_names(hashes)
+            failures += self._report(
+                "неудачный запрос",
+                server.employee_requests == 1,
+                f"запросов после истечения записи {server.employee_requests}",
+            )
+
+            # Загрузка при запуске процесса: ФИО берутся из общего кэша
+            third = employee_utils.EmployeeNameCache(
+                maxsize=100, backend="default", timeout=60, negative_timeout=0.2
+            )
+            loaded = third.get_many(hashes)
+            failures += self._report(
+                "загрузка из общего кэша",
+                len(loaded) == 11 and third.info()["shared_hits"] == 11,
+                f"загружено {len(loaded)} записей, неудачных "
+                f"{sum(not name for name in loaded.values())}",
+            )
+        finally:
+            employee_utils.employee_name_cache = process_cache
+        return failures
+
+    def _benchmark(self, server, options):
+        client = get_http_client()
+        count = options["requests"]
+        url = f"{server.url}/ok"
+
+        def measure(get):
+            started = time.perf_counter()
+            for _ in range(count):
+                get(url, timeout=1)
+            return (time.perf_counter() - started) / count * 1000
+
+        new_connection = measure(requests.get)
+        pooled = measure(client.get)
+        self.stdout.write(
+            f"GET-запрос, мс: новое соединение {new_connection:.3f}, "
+            f"пул соединений {pooled:.3f} (локальный сервер без TLS)"
+        )
@@ -0,0 +1,125 @@
+from decimal import Decimal, ROUND_HALF_UP
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ...utils.rounding import (
+    _round_to_significant_figures,
+    _round_to_significant_figures_text,
+    round_result,
+)
+
+
+def _legacy_round_decimal(result, rounding_decimal):
+    d = Decimal(str(float(result)))
+    return d.quantize(Decimal("0.1") ** rounding_decimal, rounding=ROUND_HALF_UP)
+
+
+def _outcome(function, *args):
+    """
+    Результат вызова в сравнимом виде (тип и запись числа или ошибка).
+    """
+    try:
+        value = function(*args)
+    except Exception as e:
+        return ("error", type(e).__name__, str(e))
+    return (type(value).__name__, repr(value))
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет арифметическое округление (значащие цифры, знаки после "
+        "запятой) со строковым алгоритмом на случайных числах и замеряет время"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=100000,
+            help="Количество случайных чисел",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        numbers = self._generate(options["count"], random.Random(options["seed"]))
+
+        checks = [
+            (
+                "значащие цифры",
+                [
+                    (number, figures)
+                    for number in numbers
+                    for figures in (1, 2, 3, 4, 6)
+                ],
+                _round_to_significant_figures,
+                _round_to_significant_figures_text,
+            ),
+            (
+                "знаки после запятой",
+                [(number, places) for number in numbers for places in (0, 1, 2, 4)],
+                lambda number, places: round_result(number, "decimal", places),
+                _legacy_round_decimal,
+            ),
+        ]
+
+        mismatches = 0
+        for name, cases, function, reference in checks:
+            failed = 0
+            for case in cases:
+                expected = _outcome(reference, *case)
+                actual = _outcome(function, *case)
+                if expected != actual:
+                    failed += 1
+                    if failed <= 5:
+                        self.stderr.write(f"{name} {case}: {expected} != {actual}")
+            mismatches += failed
+
+            reference_time = self._measure(reference, cases)
+            function_time = self._measure(function, cases)
+            self.stdout.write(
+                f"{name}: {len(cases)} проверок, расхождений {failed}, "
+                f"{reference_time * 1e9 / len(cases):.0f} нс -> "
+                f"{function_time * 1e9 / len(cases):.0f} нс на вызов"
+            )
+
+        if mismatches:
+            raise CommandError(f"Найдено расхождений: {mismatches}")
+        self.stdout.write(self.style.SUCCESS("Расхождений нет"))
+
+    def _measure(self, function, cases, repeat=5):
+        """
+        Наименьшее время из repeat прогонов: на нагруженной машине отдельные
+        прогоны заметно различаются.
+        """
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for case in cases:
+                try:
+                    function(*case)
+                except Exception:
+                    pass
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def _generate(self, count, rnd):
+        """
+        Случайные числа разных порядков, включая границы округления
+        (…5, …95, …9995) и отрицательные значения.
+        """
+        numbers = [0, 0.0, -0.0, 1, 5, 10, 100, 0.5, 9.95, 99.5, 0.995, 1e-7, 1.5e-7]
+        while len(numbers) < count:
+            digits = "".join(
+                rnd.choice("0123456789") for _ in range(rnd.randint(1, 16))
+            )
+            digits = digits.lstrip("0") or "1"
+            kind = rnd.random()
+            if kind < 0.3:
+                digits += "5"
+            elif kind < 0.45:
+                digits += "9" * rnd.randint(1, 4) + "5"
+            number = float(f"{digits}e{rnd.randint(-12, 12) - len(digits)}")
+            if rnd.random() < 0.1:
+                number = -number
+            numbers.append(number if rnd.random() < 0.8 else Decimal(str(number)))
+        return numbers
@@ -0,0 +1,94 @@
+import json
+import logging
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ...services.calculation_service import (
+    execute_calculation_batch,
+    get_calculation_plan,
+    prepare_input_data,
+)
+from ...services.vectorized_calculation import execute_calculation_plan_vectorized
+from ...utils.benchmark_utils import generate_edge_input_sets, load_fixture_methods
+from ...utils.vectorized_formula import is_vectorization_available
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет векторный движок расчета со скалярным на методах из "
+        "research_methods_fixtures (ответы должны совпадать полностью)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=1000,
+            help="Количество наборов входных данных на метод",
+        )
+        parser.add_argument(
+            "--fixture",
+            action="append",
+            help="Имя фикстуры (например, oil_products/01); по умолчанию все",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not is_vectorization_available():
+            raise CommandError("NumPy не установлен, векторный движок недоступен")
+
+        logging.disable(logging.CRITICAL)
+        try:
+            mismatches = self._run(options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if mismatches:
+            raise CommandError(f"Найдено расхождений: {mismatches}")
+        self.stdout.write(self.style.SUCCESS("Расхождений нет"))
+
+    def _run(self, options):
+        methods = load_fixture_methods()
+        if options["fixture"]:
+            methods = [item for item in methods if item[0] in options["fixture"]]
+
+        self.stdout.write(
+            f"{'Метод':<22}{'наборов':>9}{'векторно':>10}{'расхожд.':>10}"
+            f"{'скаляр, с':>11}{'вектор, с':>11}"
+        )
+        total_mismatches = 0
+        for fixture_name, method in methods:
+            plan = get_calculation_plan(method)
+            input_sets = generate_edge_input_sets(
+                method, options["count"], options["seed"]
+            )
+
+            started = time.perf_counter()
+            scalar = execute_calculation_batch(plan, input_sets, vectorize=False)
+            scalar_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            vectorized = execute_calculation_batch(plan, input_sets)
+            vector_time = time.perf_counter() - started
+
+            covered = execute_calculation_plan_vectorized(
+                plan, [prepare_input_data(item) for item in input_sets]
+            )
+            mismatches = 0
+            for expected, actual in zip(scalar, vectorized):
+                if json.dumps(expected, sort_keys=True) != json.dumps(
+                    actual, sort_keys=True
+                ):
+                    mismatches += 1
+                    if mismatches <= 3:
+                        self.stderr.write(
+                            f"{fixture_name}, набор {expected['index']}:\n"
+                            f"  скалярно: {expected}\n  векторно: {actual}"
+                        )
+            total_mismatches += mismatches
+
+            self.stdout.write(
+                f"{fixture_name:<22}{len(input_sets):>9}"
+                f"{sum(item is not None for item in covered):>10}{mismatches:>10}"
+                f"{scalar_time:>11.3f}{vector_time:>11.3f}"
+            )
+        return total_mismatches
@@ -0,0 +1,55 @@
+import json
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from ...models import ReferenceTable
+
+# Поля таблицы, которые берутся из файла
+TABLE_FIELDS = ("name", "nd_code", "row_values", "column_values", "values")
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает справочные таблицы из JSON-файла (список объектов с полями "
+        "code, name, nd_code, row_values, column_values, values); таблицы с "
+        "существующими кодами обновляются"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к JSON-файлу")
+        parser.add_argument(
+            "--user",
+            help="Пользователь, записываемый в created_by и updated_by",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], "r", encoding="utf-8") as file:
+                items = json.load(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Не удалось прочитать файл: {str(e)}")
+        if not isinstance(items, list):
+            raise CommandError("Файл должен содержать список таблиц")
+
+        created = updated = 0
+        with transaction.atomic():
+            for item in items:
+                code = str(item.get("code") or "").strip()
+                table = ReferenceTable.objects.filter(
+                    code=code, is_deleted=False
+                ).first()
+                if table is None:
+                    table = ReferenceTable(code=code, created_by=options["user"])
+                    created += 1
+                else:
+                    updated += 1
+                for field in TABLE_FIELDS:
+                    if field in item:
+                        setattr(table, field, item[field])
+                table.updated_by = options["user"] or table.updated_by
+                try:
+                    table.save()
+                except ValidationError as e:
+                    raise CommandError(f"Таблица {code or '(без кода)'}: {e}")
+
+        self.stdout.write(f"Создано таблиц: {created}, обновлено: {updated}")
@@ -0,0 +1,143 @@
+import csv
+import logging
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from ...models import Calculation
+from ...services.recalculation_service import (
+    RECALCULATION_CHUNK_SIZE,
+    recalculate_calculations,
+)
+
+# Как часто выводить ход пересчета (в расчетах)
+PROGRESS_INTERVAL = 50000
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает сохраненные расчеты по текущим формулам и правилам "
+        "округления методов и выводит отчет об изменениях"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--method",
+            type=int,
+            action="append",
+            help="ID метода исследования; по умолчанию все методы",
+        )
+        parser.add_argument(
+            "--stale-only",
+            action="store_true",
+            help="Только расчеты, сохраненные до последнего изменения метода",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только сравнить результаты, не изменяя базу",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Количество процессов",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=RECALCULATION_CHUNK_SIZE,
+            help="Количество расчетов в одной части",
+        )
+        parser.add_argument(
+            "--report",
+            help="Путь к CSV-файлу с изменившимися и ошибочными расчетами",
+        )
+        parser.add_argument(
+            "--user",
+            help="Пользователь, записываемый в updated_by",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--workers и --chunk-size должны быть больше нуля")
+
+        queryset = Calculation.objects.all()
+        if options["method"]:
+            queryset = queryset.filter(research_method_id__in=options["method"])
+        if options["stale_only"]:
+            queryset = queryset.filter(updated_at__lt=F("research_method__updated_at"))
+
+        report_file = None
+        writer = None
+        if options["report"]:
+            report_file = open(options["report"], "w", newline="", encoding="utf-8")
+            writer = csv.writer(report_file)
+            writer.writerow(
+                [
+                    "id",
+                    "research_method_id",
+                    "status",
+                    "old_result",
+                    "new_result",
+                    "old_measurement_error",
+                    "new_measurement_error",
+                    "old_unit",
+                    "new_unit",
+                    "error",
+                ]
+            )
+
+        started = time.perf_counter()
+        processed = 0
+
+        def on_row(status, row, values, error):
+            nonlocal processed
+            processed += 1
+            if processed % PROGRESS_INTERVAL == 0:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"Обработано {processed} расчетов за {elapsed:.1f} с")
+            if writer is None or status == "unchanged":
+                return
+            values = values or {}
+            writer.writerow(
+                [
+                    row[0],
+                    row[1],
+                    status,
+                    row[3],
+                    values.get("result"),
+                    row[4],
+                    values.get("measurement_error"),
+                    row[5],
+                    values.get("unit"),
+                    error or "",
+                ]
+            )
+
+        # Логирование каждого вычисления не нужно при массовом пересчете
+        logging.disable(logging.INFO)
+        try:
+            report = recalculate_calculations(
+                queryset,
+                dry_run=options["dry_run"],
+                workers=options["workers"],
+                chunk_size=options["chunk_size"],
+                user=options["user"],
+                on_row=on_row,
+            )
+        finally:
+            logging.disable(logging.NOTSET)
+            if report_file is not None:
+                report_file.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Всего: {report.total}, изменилось: {report.changed}, "
+            f"без изменений: {report.unchanged}, ошибок: {report.failed}"
+        )
+        if options["dry_run"]:
+            self.stdout.write("Пробный запуск: база данных не изменена")
+        else:
+            self.stdout.write(f"Обновлено расчетов: {report.updated}")
+        self.stdout.write(f"Время: {elapsed:.1f} с")
@@ -0,0 +1,72 @@
+import time
+from django.core.management.base import BaseCommand
+from ...utils.employee_utils import (
+    employee_name_cache,
+    fetch_employee_names,
+    get_executor_hashes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Обновляет ФИО исполнителей расчетов в кэше ФИО (в общем кэше, если "
+        "он задан EMPLOYEE_NAME_CACHE_BACKEND), запрашивая HR-API "
+        "одновременно для нескольких сотрудников"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=0,
+            help="Только исполнители расчетов за последние дни (0 - все)",
+        )
+        parser.add_argument(
+            "--hash",
+            action="append",
+            default=[],
+            help="hashMd5 сотрудника (можно указать несколько раз)",
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Только сотрудники, ФИО которых нет в кэше",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Количество одновременных запросов к HR-API",
+        )
+
+    def handle(self, *args, **options):
+        hashes = options["hash"] or get_executor_hashes(options["days"])
+        if options["missing"]:
+            cached = employee_name_cache.get_many(hashes)
+            hashes = [hash_md5 for hash_md5 in hashes if not cached.get(hash_md5)]
+        if not hashes:
+            self.stdout.write("Нет сотрудников для обновления")
+            return
+
+        started = time.perf_counter()
+        fetched = fetch_employee_names(hashes, options["workers"])
+        elapsed = time.perf_counter() - started
+
+        # Неудачный запрос не заменяет сохраненное ранее ФИО
+        found = {hash_md5: name for hash_md5, name in fetched.items() if name}
+        employee_name_cache.set_many(found)
+        failed = [hash_md5 for hash_md5, name in fetched.items() if not name]
+
+        self.stdout.write(
+            f"Запрошено ФИО: {len(hashes)}, получено {len(found)}, "
+            f"не получено {len(failed)}, {elapsed:.1f} с"
+        )
+        for hash_md5 in failed[:20]:
+            self.stdout.write(f"  не получено ФИО: {hash_md5}")
+        if len(failed) > 20:
+            self.stdout.write(f"  ... и еще {len(failed) - 20}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Кэш ФИО обновлен (общий кэш: {employee_name_cache.backend or 'нет'})"
+            )
+        )
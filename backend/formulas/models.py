@@ -2,6 +2,10 @@ from django.db import models, connection
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone, formats
+import re
+
+# Код справочной таблицы записывается в формулах как имя переменной
+REFERENCE_TABLE_CODE_RE = re.compile(r"^[^\W\d]\w*$")
 
 
 class BaseModel(models.Model):
@@ -372,6 +376,12 @@ class ResearchMethod(BaseModel):
         verbose_name="Является частью группы",
         help_text="Указывает, входит ли метод в группу или является самостоятельным",
     )
+    calculation_plan = models.JSONField(
+        verbose_name="План расчета",
+        help_text="Скомпилированный план расчета, строится при сохранении метода",
+        default=dict,
+        blank=True,
+    )
 
     class Meta:
         verbose_name = "Метод исследования"
@@ -421,6 +431,84 @@ class ResearchMethodGroup(BaseModel):
         return self.name
 
 
+class ReferenceTable(BaseModel):
+    code = models.CharField(
+        max_length=100,
+        verbose_name="Код",
+        help_text="Код таблицы для функций table() и interp() в формулах",
+    )
+    name = models.CharField(
+        max_length=255,
+        verbose_name="Наименование",
+        help_text="Наименование справочной таблицы",
+    )
+    nd_code = models.CharField(
+        max_length=255,
+        verbose_name="Шифр НД",
+        help_text="Шифр нормативной документации, из которой взята таблица",
+        blank=True,
+        default="",
+    )
+    row_values = models.JSONField(
+        verbose_name="Ключи строк",
+        help_text="Значения первого аргумента по возрастанию",
+        default=list,
+    )
+    column_values = models.JSONField(
+        verbose_name="Ключи столбцов",
+        help_text="Значения второго аргумента по возрастанию (для двумерной таблицы)",
+        null=True,
+        blank=True,
+    )
+    values = models.JSONField(
+        verbose_name="Значения",
+        help_text="Список значений или, для двумерной таблицы, список строк значений",
+        default=list,
+    )
+
+    class Meta:
+        verbose_name = "Справочная таблица"
+        verbose_name_plural = "Справочные таблицы"
+        ordering = ("code",)
+        indexes = [
+            models.Index(fields=["code"]),
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["updated_at"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["code"],
+                condition=models.Q(is_deleted=False),
+                name="unique_reference_table_code",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.code} - {self.name}"
+
+    def clean(self):
+        from .utils.formula_compiler import KEYWORDS
+        from .utils.reference_tables import LookupTable
+
+        if self.code:
+            self.code = self.code.strip()
+        if not REFERENCE_TABLE_CODE_RE.match(self.code or "") or self.code in KEYWORDS:
+            raise ValidationError(
+                {
+                    "code": "Код должен начинаться с буквы и содержать только буквы, "
+                    "цифры и _"
+                }
+            )
+        try:
+            LookupTable(self.code, self.row_values, self.values, self.column_values)
+        except ValueError as e:
+            raise ValidationError({"values": str(e)})
+
+    def save(self, *args, **kwargs):
+        self.clean()
+        super().save(*args, **kwargs)
+
+
 class Sample(BaseModel):
     registration_number = models.CharField(
         max_length=50,
@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+import logging
 import re
 from .models import (
+    REFERENCE_TABLE_CODE_RE,
     Laboratory,
     Department,
     ResearchMethod,
@@ -11,8 +13,27 @@ from .models import (
     ExcelTemplate,
     Protocol,
     Equipment,
+    ReferenceTable,
     Sample,
 )
+from .utils.calculation_plan import PLAN_SOURCE_FIELDS, build_calculation_plan
+from .utils.formula_compiler import KEYWORDS
+from .utils.formula_utils import check_formula_syntax, normalize_name
+from .utils.reference_tables import LookupTable
+
+logger = logging.getLogger(__name__)
+
+
+def get_stored_plan_error(method):
+    """
+    Возвращает ошибку построения плана для сохраненного метода или None.
+    """
+    method_data = {key: getattr(method, key) for key in PLAN_SOURCE_FIELDS}
+    try:
+        build_calculation_plan(method_data)
+    except ValueError as e:
+        return str(e)
+    return None
 
 
 User = get_user_model()
@@ -383,45 +404,57 @@ class ResearchMethodSerializer(BaseModelSerializer):
                     f"Значение повторяемости должно быть одним из: {', '.join(valid_convergence_values)} или иметь custom_value"
                 )
 
-            # Проверяем структуру формулы на наличие операторов И/ИЛИ
+            # Проверяем, что условие разбирается и содержит оператор сравнения
             formula = formula_data["formula"]
-            if " and " in formula or " or " in formula:
-                # Разбиваем на подусловия
-                conditions = []
-                if " or " in formula:
-                    conditions = formula.split(" or ")
-                else:
-                    conditions = [formula]
-
-                for condition in conditions:
-                    if " and " in condition:
-                        sub_conditions = condition.strip().split(" and ")
-                        for sub_condition in sub_conditions:
-                            sub_condition = sub_condition.strip().strip("()")
-                            if not any(
-                                op in sub_condition
-                                for op in ["<=", ">=", ">", "<", "="]
-                            ):
-                                raise serializers.ValidationError(
-                                    f"Некорректное условие: {sub_condition}. Должен присутствовать оператор сравнения"
-                                )
-                    else:
-                        condition = condition.strip().strip("()")
-                        if not any(
-                            op in condition for op in ["<=", ">=", ">", "<", "="]
-                        ):
-                            raise serializers.ValidationError(
-                                f"Некорректное условие: {condition}. Должен присутствовать оператор сравнения"
-                            )
-            else:
-                # Проверяем простое условие
-                if not any(op in formula for op in ["<=", ">=", ">", "<", "="]):
-                    raise serializers.ValidationError(
-                        f"Некорректное условие: {formula}. Должен присутствовать оператор сравнения"
-                    )
+            try:
+                check_formula_syntax(formula, is_condition=True)
+            except ValueError as e:
+                raise serializers.ValidationError(
+                    f"Некорректное условие: {formula}. {str(e)}"
+                )
 
         return value
 
+    def validate(self, data):
+        # Строим план расчета по итоговому состоянию метода
+        method_data = {
+            key: data.get(key, getattr(self.instance, key, None))
+            for key in PLAN_SOURCE_FIELDS
+        }
+        try:
+            data["calculation_plan"] = build_calculation_plan(method_data)
+        except ValueError as e:
+            # Методы, сохраненные до появления плана, могут содержать циклы.
+            # Такие методы остаются редактируемыми, чтобы их можно было
+            # исправить; план строится, когда ошибка исправлена. Новые
+            # методы и изменения, вносящие ошибку в корректный метод,
+            # отклоняются.
+            if self.instance is None or get_stored_plan_error(self.instance) is None:
+                raise serializers.ValidationError({"calculation_plan": str(e)})
+            logger.warning(
+                f"Метод {self.instance.pk} сохранен без плана расчета: {str(e)}"
+            )
+            data["calculation_plan"] = {}
+            return data
+
+        tables = data["calculation_plan"]["tables"]
+        if tables:
+            existing = {
+                normalize_name(code)
+                for code in ReferenceTable.objects.filter(is_deleted=False).values_list(
+                    "code", flat=True
+                )
+            }
+            missing = [code for code in tables if code not in existing]
+            if missing:
+                raise serializers.ValidationError(
+                    {
+                        "calculation_plan": "Справочные таблицы не найдены: "
+                        + ", ".join(missing)
+                    }
+                )
+        return data
+
 
 class ResearchMethodBriefSerializer(BaseModelSerializer):
     class Meta:
@@ -967,3 +1000,47 @@ class EquipmentSerializer(BaseModelSerializer):
                 "Тип прибора должен быть одним из: " + ", ".join(valid_types)
             )
         return value
+
+
+class ReferenceTableSerializer(BaseModelSerializer):
+    class Meta:
+        model = ReferenceTable
+        fields = (
+            "id",
+            "code",
+            "name",
+            "nd_code",
+            "row_values",
+            "column_values",
+            "values",
+            "created_at",
+            "updated_at",
+            "is_deleted",
+            "deleted_at",
+        )
+        read_only_fields = ("created_at", "updated_at", "is_deleted", "deleted_at")
+
+    def validate_code(self, value):
+        value = value.strip()
+        if not REFERENCE_TABLE_CODE_RE.match(value) or value in KEYWORDS:
+            raise serializers.ValidationError(
+                "Код должен начинаться с буквы и содержать только буквы, цифры и _"
+            )
+        duplicates = ReferenceTable.objects.filter(code=value, is_deleted=False)
+        if self.instance:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError("Таблица с таким кодом уже существует")
+        return value
+
+    def validate(self, data):
+        def get(key):
+            return data.get(key, getattr(self.instance, key, None))
+
+        try:
+            LookupTable(
+                get("code"), get("row_values"), get("values"), get("column_values")
+            )
+        except ValueError as e:
+            raise serializers.ValidationError({"values": str(e)})
+        return data
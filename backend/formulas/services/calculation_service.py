@@ -0,0 +1,657 @@
+from collections import OrderedDict
+from decimal import Decimal
+import functools
+import json
+import logging
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from ..models import ResearchMethod
+from ..utils.calculation_metrics import record_phase, record_phases, start_phases
+from ..utils.calculation_trace import trace
+from ..utils.calculation_plan import (
+    PLAN_SOURCE_FIELDS,
+    build_calculation_plan,
+    is_plan_current,
+)
+from .result_cache import CalculationResultCache, result_cache
+from .vectorized_calculation import execute_calculation_plan_vectorized
+from ..utils.formula_utils import (
+    ConditionEvaluation,
+    VariableBinding,
+    _prepare_variables,
+    get_formula_cache_info,
+    normalize_name,
+    round_value,
+    evaluate_formula,
+)
+from ..utils.method_codegen import get_method_function, get_method_function_cache_info
+from ..utils.reference_tables import (
+    get_reference_table_versions,
+    get_reference_tables_info,
+)
+from ..utils.rounding import round_result
+
+logger = logging.getLogger(__name__)
+
+# Количество планов, построенных по присланным клиентом методам (на один процесс)
+PLAN_CACHE_SIZE = 256
+
+# Количество планов сохраненных методов, хранимых в процессе
+METHOD_PLAN_CACHE_SIZE = 256
+
+# Минимальный размер пакета, начиная с которого используется векторное вычисление
+VECTORIZE_MIN_BATCH = 16
+
+# Состояния расчетов для инкрементального пересчета (токен -> состояние)
+evaluation_states = CalculationResultCache(
+    maxsize=getattr(settings, "CALCULATION_STATE_CACHE_SIZE", 1024),
+    backend=getattr(settings, "CALCULATION_RESULT_CACHE_BACKEND", None),
+    timeout=getattr(settings, "CALCULATION_RESULT_CACHE_TIMEOUT", 3600),
+)
+
+# method_id -> (updated_at, план)
+_method_plans = OrderedDict()
+_method_plans_lock = threading.Lock()
+
+
+class CalculationError(Exception):
+    """
+    Ошибка расчета, о которой сообщается клиенту (HTTP 400).
+    """
+
+
+class MethodVersionError(CalculationError):
+    """
+    Версия метода, указанная клиентом, не совпадает с текущей (HTTP 409).
+    """
+
+
+class EvaluationStateError(CalculationError):
+    """
+    Состояние предыдущего расчета не найдено, а полные входные данные не
+    переданы (HTTP 409).
+    """
+
+
+@functools.lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _build_plan_from_json(method_json):
+    return build_calculation_plan(json.loads(method_json))
+
+
+def get_calculation_plan(research_method):
+    """
+    Возвращает план расчета для метода, переданного в виде словаря.
+
+    Планы кэшируются по содержимому полей метода, поэтому повторные расчеты
+    по одному и тому же методу не разбирают его заново.
+
+    Raises:
+        CalculationError: Если метод содержит ошибки
+    """
+    source = {key: research_method.get(key) for key in PLAN_SOURCE_FIELDS}
+    method_json = json.dumps(source, sort_keys=True, ensure_ascii=False, default=str)
+    try:
+        return _build_plan_from_json(method_json)
+    except ValueError as e:
+        raise CalculationError(str(e))
+
+
+def get_method_version(updated_at):
+    """
+    Возвращает версию метода исследования для передачи клиенту.
+    """
+    return updated_at.isoformat()
+
+
+def get_method_plan(method_id, method_version=None):
+    """
+    Возвращает план расчета сохраненного метода исследования.
+
+    Планы хранятся в процессе и пересобираются, только когда меняется
+    ResearchMethod.updated_at, поэтому на каждый расчет приходится один
+    легкий запрос даты изменения метода.
+
+    Args:
+        method_id (int): ID метода исследования
+        method_version (str): Версия метода, с которой работает клиент
+
+    Returns:
+        tuple: (план расчета, версия метода)
+
+    Raises:
+        ResearchMethod.DoesNotExist: Если метод не найден
+        MethodVersionError: Если метод изменился после загрузки клиентом
+        CalculationError: Если метод содержит ошибки
+    """
+    try:
+        method_id = int(method_id)
+    except (TypeError, ValueError):
+        raise CalculationError("Некорректный ID метода исследования")
+
+    updated_at = (
+        ResearchMethod.objects.filter(id=method_id, is_deleted=False)
+        .values_list("updated_at", flat=True)
+        .first()
+    )
+    if updated_at is None:
+        raise ResearchMethod.DoesNotExist(f"Метод исследования {method_id} не найден")
+
+    if method_version:
+        client_updated_at = parse_datetime(str(method_version))
+        if client_updated_at is None or client_updated_at != updated_at:
+            raise MethodVersionError(
+                "Метод исследования был изменен. Обновите страницу и повторите расчет"
+            )
+
+    with _method_plans_lock:
+        cached = _method_plans.get(method_id)
+        if cached and cached[0] == updated_at:
+            _method_plans.move_to_end(method_id)
+            return cached[1], get_method_version(updated_at)
+
+    method = ResearchMethod.objects.only(
+        "updated_at", "calculation_plan", *PLAN_SOURCE_FIELDS
+    ).get(id=method_id)
+    method_data = {key: getattr(method, key) for key in PLAN_SOURCE_FIELDS}
+
+    # Сохраненный план используется, если он построен текущей версией компилятора
+    plan = method.calculation_plan
+    if not is_plan_current(plan, method_data):
+        try:
+            plan = build_calculation_plan(method_data)
+        except ValueError as e:
+            raise CalculationError(str(e))
+
+    with _method_plans_lock:
+        _method_plans[method_id] = (method.updated_at, plan)
+        _method_plans.move_to_end(method_id)
+        while len(_method_plans) > METHOD_PLAN_CACHE_SIZE:
+            _method_plans.popitem(last=False)
+
+    return plan, get_method_version(method.updated_at)
+
+
+def prepare_input_data(input_data):
+    """
+    Заменяет пустые входные значения на '0'.
+    """
+    processed_input_data = {}
+    for key, value in input_data.items():
+        if value is None or str(value).strip() == "":
+            processed_input_data[key] = "0"
+        else:
+            processed_input_data[key] = value
+    return processed_input_data
+
+
+def _evaluate_step(step, variables):
+    """
+    Вычисляет значение одного промежуточного поля плана.
+    """
+    if step["kind"] == "threshold":
+        return round_value(
+            value=0,
+            rounding_type="threshold_table",
+            threshold_table_values=step["threshold_table_values"],
+            variables=variables,
+        )
+    if step["kind"] == "range":
+        return evaluate_formula(
+            step["formula"], variables, range_calculation=step["range_calculation"]
+        )
+    return evaluate_formula(
+        step["formula"], variables, rounding_params=step["rounding_params"]
+    )
+
+
+def select_convergence(conditions, results):
+    """
+    Выбирает результат повторяемости по результатам условий.
+
+    Приоритет: кастомное значение (первое выполненное условие), отсутствие,
+    следы, неудовлетворительная; иначе повторяемость удовлетворительная.
+
+    Returns:
+        tuple: (результат повторяемости, кастомное значение или None)
+    """
+    for condition, result in zip(conditions, results):
+        if (
+            condition["convergence_value"] == "custom"
+            and condition.get("custom_value")
+            and result
+        ):
+            return "custom", condition["custom_value"]
+
+    satisfied_conditions = {
+        condition["convergence_value"]
+        for condition, result in zip(conditions, results)
+        if result
+    }
+    for convergence_result in ("absence", "traces", "unsatisfactory"):
+        if convergence_result in satisfied_conditions:
+            return convergence_result, None
+    return "satisfactory", None
+
+
+def execute_calculation_plan(plan, input_data):
+    """
+    Выполняет план расчета для подготовленных входных данных.
+
+    Returns:
+        dict: Данные ответа: повторяемость, промежуточные результаты,
+            результат, погрешность, единица измерения и информация об условиях
+
+    Raises:
+        CalculationError: Если не удалось вычислить одно из значений
+    """
+    marks = start_phases()
+    method_function = get_method_function(plan)
+    if method_function is not None:
+        # Сгенерированная функция метода; при любой ошибке расчет
+        # повторяется обычным способом, который формирует текст ошибки
+        try:
+            response_data = method_function(input_data, marks)
+        except Exception as e:
+            trace("generated_code_failed", error=e)
+            response_data = None
+        if response_data is not None:
+            trace("generated_code", result=response_data["result"])
+            record_phases(marks)
+            return response_data
+        if marks is not None:
+            del marks[1:]
+
+    variables, intermediate_results, _ = _evaluate_steps(plan, input_data)
+    if marks is not None:
+        marks.append(time.perf_counter())
+    response_data = _complete_calculation(plan, variables, intermediate_results, marks)
+    record_phases(marks)
+    return response_data
+
+
+def _evaluate_steps(plan, input_data, previous_values=None, changed_names=None):
+    """
+    Вычисляет промежуточные поля плана.
+
+    При инкрементальном расчете (previous_values задан) пересчитываются
+    только поля, зависящие от измененных переменных; для остальных берутся
+    значения предыдущего расчета. Если пересчитанное значение не
+    изменилось, зависимые от него поля тоже не пересчитываются.
+
+    Args:
+        plan (dict): План расчета
+        input_data (dict): Подготовленные входные данные
+        previous_values (dict): Значения полей предыдущего расчета
+        changed_names (set): Нормализованные имена измененных входных данных
+
+    Returns:
+        tuple: (переменные (VariableBinding), отображаемые промежуточные
+            результаты, имена пересчитанных полей)
+    """
+    intermediate_results = {}
+    recalculated = []
+    variables = VariableBinding(input_data)
+    changed_names = set(changed_names or ())
+
+    for step in plan["steps"]:
+        name = step["name"]
+        if previous_values is not None and not changed_names.intersection(step["uses"]):
+            intermediate_value = previous_values[name]
+            trace("step_reused", name=name, value=intermediate_value)
+        else:
+            try:
+                intermediate_value = _evaluate_step(step, variables)
+            except Exception as e:
+                trace("step_failed", name=name, error=e)
+                logger.error(
+                    f"Ошибка при вычислении промежуточного результата {name}: {str(e)}"
+                )
+                raise CalculationError(
+                    f"Ошибка при вычислении промежуточного результата: {str(e)}"
+                )
+            trace("step", name=name, value=intermediate_value)
+            recalculated.append(name)
+            if previous_values is not None and not _same_value(
+                intermediate_value, previous_values[name]
+            ):
+                changed_names.add(normalize_name(name))
+
+        # Добавляем результат в словарь только если show_calculation = true
+        if step["show"]:
+            intermediate_results[name] = str(intermediate_value)
+        # В любом случае добавляем значение в переменные для дальнейших расчетов
+        variables[name] = intermediate_value
+
+    return variables, intermediate_results, recalculated
+
+
+def _same_value(value, previous_value):
+    return type(value) is type(previous_value) and str(value) == str(previous_value)
+
+
+def _complete_calculation(plan, variables, intermediate_results, marks=None):
+    """
+    Проверяет условия повторяемости и вычисляет результат и погрешность.
+
+    В список marks (если передан) добавляется время окончания каждого этапа.
+    """
+    conditions = plan["convergence_conditions"]
+    try:
+        evaluation = ConditionEvaluation(
+            [condition["formula"] for condition in conditions], variables
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при проверке условия повторяемости: {str(e)}")
+        raise CalculationError(f"Ошибка при проверке условия повторяемости: {str(e)}")
+
+    convergence_result, custom_value = select_convergence(
+        conditions, evaluation.results
+    )
+    trace("convergence", convergence=convergence_result, conditions=evaluation.results)
+
+    # Сохраняем информацию только о выбранном условии
+    conditions_info = []
+    for index, condition in enumerate(conditions):
+        if condition["convergence_value"] == convergence_result:
+            conditions_info.append(
+                {
+                    "formula": condition["formula"],
+                    "satisfied": evaluation.results[index],
+                    "convergence_value": condition["convergence_value"],
+                    "calculation_steps": evaluation.calculation_steps(index),
+                }
+            )
+
+    if marks is not None:
+        marks.append(time.perf_counter())
+
+    # Если выбрано особое условие или кастомное значение, возвращаем его
+    if convergence_result in ["absence", "traces", "unsatisfactory", "custom"]:
+        return {
+            "convergence": convergence_result,
+            "intermediate_results": intermediate_results,
+            "result": custom_value if convergence_result == "custom" else None,
+            "measurement_error": None,
+            "unit": plan["unit"],
+            "conditions_info": conditions_info,
+        }
+
+    # Если повторяемость удовлетворительная, вычисляем результат
+    try:
+        result = evaluate_formula(plan["formula"], variables)
+    except Exception as e:
+        logger.error(f"Ошибка при вычислении основного результата: {str(e)}")
+        raise CalculationError(f"Ошибка при вычислении результата: {str(e)}")
+
+    result = round_result(result, plan["rounding_type"], plan["rounding_decimal"])
+
+    # Вычисляем количество знаков после запятой в результате
+    result_decimal_places = len(str(result).split(".")[-1]) if "." in str(result) else 0
+    if marks is not None:
+        marks.append(time.perf_counter())
+
+    # Вычисляем погрешность
+    try:
+        error_config = plan["measurement_error"]
+
+        if error_config["type"] == "fixed":
+            measurement_error = float(error_config["value"])
+        elif error_config["type"] == "formula":
+            variables["result"] = result
+            measurement_error = float(
+                evaluate_formula(error_config["value"], variables)
+            )
+        else:
+            logger.warning("Неподдерживаемый тип погрешности")
+            measurement_error = 0
+
+        # Округляем погрешность до того же количества знаков после запятой, что и результат
+        if measurement_error is not None:
+            measurement_error = round(
+                Decimal(str(measurement_error)), result_decimal_places
+            )
+    except Exception as e:
+        logger.error(f"Ошибка при вычислении погрешности: {str(e)}")
+        raise CalculationError(f"Ошибка при вычислении погрешности: {str(e)}")
+    if marks is not None:
+        marks.append(time.perf_counter())
+
+    trace("result", result=result, measurement_error=measurement_error)
+    return {
+        "convergence": convergence_result,
+        "intermediate_results": intermediate_results,
+        "result": str(result) if result is not None else None,
+        "measurement_error": (
+            str(measurement_error) if measurement_error is not None else None
+        ),
+        "unit": plan["unit"],
+        "conditions_info": conditions_info,
+    }
+
+
+def execute_calculation_plan_cached(plan, input_data):
+    """
+    Выполняет план расчета, используя кэш результатов.
+
+    Повторный расчет с теми же входными данными по той же версии метода
+    возвращает сохраненный результат. Ошибки расчета не кэшируются.
+    """
+    key = result_cache.make_key(plan, input_data) if result_cache.enabled else None
+    if key is not None:
+        response_data = result_cache.get(key)
+        if response_data is not None:
+            trace("result_cache_hit", result=response_data["result"])
+            return response_data
+
+    response_data = execute_calculation_plan(plan, input_data)
+    if key is not None:
+        result_cache.set(key, response_data)
+    return response_data
+
+
+def execute_calculation_plan_incremental(
+    plan, input_data=None, evaluation_token=None, changed_inputs=None
+):
+    """
+    Выполняет план расчета с пересчетом только затронутых полей.
+
+    Состояние каждого расчета (входные данные и значения промежуточных
+    полей) сохраняется под токеном, который возвращается клиенту. При
+    следующем расчете клиент передает токен и либо измененные входные
+    данные (changed_inputs), либо все входные данные (input_data); тогда
+    пересчитываются только поля, зависящие от изменившихся значений.
+    Ответ совпадает с ответом полного расчета.
+
+    Если состояние не найдено, построено по другой версии метода или
+    изменился состав входных данных, выполняется полный расчет. Результат
+    для тех же входных данных берется из кэша результатов, как и при
+    обычном расчете.
+
+    Args:
+        plan (dict): План расчета
+        input_data (dict): Все входные данные (необработанные)
+        evaluation_token (str): Токен предыдущего расчета
+        changed_inputs (dict): Измененные входные данные (необработанные)
+
+    Returns:
+        dict: Данные ответа, токен нового состояния (evaluation_token) и
+            имена пересчитанных полей (recalculated_fields)
+
+    Raises:
+        EvaluationStateError: Если состояние не найдено и не переданы все
+            входные данные
+        CalculationError: Если не удалось вычислить одно из значений
+    """
+    plan_identity = [
+        plan.get("version"),
+        plan.get("source_hash"),
+        get_reference_table_versions(plan.get("tables")),
+    ]
+    state = None
+    if isinstance(evaluation_token, str) and evaluation_token:
+        state = evaluation_states.get(_get_state_key(evaluation_token))
+        if state is not None and state["plan"] != plan_identity:
+            state = None
+
+    if state is None and input_data is None:
+        raise EvaluationStateError(
+            "Состояние расчета не найдено. Повторите расчет со всеми входными данными"
+        )
+
+    previous_values = None
+    changed_names = None
+    if state is not None:
+        previous_input = state["input_data"]
+        if input_data is not None:
+            input_data = prepare_input_data(input_data)
+        else:
+            input_data = dict(previous_input)
+            input_data.update(prepare_input_data(changed_inputs or {}))
+
+        # Инкрементальный расчет возможен, если состав полей не изменился, а
+        # новые значения преобразуются в числа (иначе ошибка должна быть
+        # такой же, как при полном расчете)
+        if list(input_data) == list(previous_input):
+            changed = {
+                key: value
+                for key, value in input_data.items()
+                if value != previous_input[key]
+            }
+            try:
+                _prepare_variables(changed)
+                previous_values = state["values"]
+                changed_names = {normalize_name(key) for key in changed}
+            except ValueError:
+                pass
+    else:
+        input_data = prepare_input_data(input_data)
+
+    key = result_cache.make_key(plan, input_data) if result_cache.enabled else None
+    response_data = result_cache.get(key) if key is not None else None
+    if response_data is not None:
+        # Значения полей в кэше результатов не хранятся: следующий расчет
+        # по этому токену пересчитает все поля
+        trace("result_cache_hit", result=response_data["result"])
+        values = None
+        recalculated = []
+    else:
+        marks = start_phases()
+        variables, intermediate_results, recalculated = _evaluate_steps(
+            plan, input_data, previous_values, changed_names
+        )
+        if marks is not None:
+            marks.append(time.perf_counter())
+        response_data = _complete_calculation(
+            plan, variables, intermediate_results, marks
+        )
+        record_phases(marks)
+        values = {step["name"]: variables[step["name"]] for step in plan["steps"]}
+        if key is not None:
+            result_cache.set(key, response_data)
+
+    token = uuid.uuid4().hex
+    evaluation_states.set(
+        _get_state_key(token),
+        {
+            "plan": plan_identity,
+            "input_data": input_data,
+            "values": values,
+        },
+    )
+    response_data["evaluation_token"] = token
+    response_data["recalculated_fields"] = recalculated
+    return response_data
+
+
+def _get_state_key(evaluation_token):
+    return f"calculation_state:{evaluation_token}"
+
+
+def get_calculation_cache_info():
+    """
+    Возвращает статистику кэшей расчета: результатов, планов, формул,
+    сгенерированных функций методов и справочных таблиц.
+    """
+    plan_info = _build_plan_from_json.cache_info()
+    with _method_plans_lock:
+        method_plans = len(_method_plans)
+    return {
+        "results": result_cache.info(),
+        "evaluation_states": evaluation_states.info(),
+        "plans": {
+            "hits": plan_info.hits,
+            "misses": plan_info.misses,
+            "maxsize": plan_info.maxsize,
+            "currsize": plan_info.currsize,
+            "method_plans": method_plans,
+        },
+        "formulas": get_formula_cache_info(),
+        "method_functions": get_method_function_cache_info(),
+        "reference_tables": get_reference_tables_info(),
+    }
+
+
+def execute_calculation_batch(plan, input_data_list, vectorize=True):
+    """
+    Выполняет план расчета для списка наборов входных данных.
+
+    Большие пакеты вычисляются над массивами NumPy (если он установлен);
+    наборы, которые нельзя вычислить векторно, считаются по одному.
+
+    Args:
+        plan (dict): План расчета
+        input_data_list (list): Наборы входных данных
+        vectorize (bool): Разрешить векторное вычисление
+
+    Returns:
+        list: Для каждого набора словарь с индексом и статусом "success"
+            (вместе с данными результата) или "error" (с текстом ошибки)
+    """
+    prepared = [
+        (
+            prepare_input_data(input_data)
+            if isinstance(input_data, dict) and input_data
+            else None
+        )
+        for input_data in input_data_list
+    ]
+
+    vectorized = [None] * len(prepared)
+    if vectorize and len(prepared) >= VECTORIZE_MIN_BATCH:
+        started = time.perf_counter()
+        try:
+            vectorized = execute_calculation_plan_vectorized(plan, prepared)
+        except Exception as e:
+            logger.error(f"Ошибка векторного расчета: {str(e)}", exc_info=True)
+        count = len(vectorized) - vectorized.count(None)
+        if count:
+            # Время векторного расчета на один набор
+            record_phase(
+                "vectorized", (time.perf_counter() - started) / len(prepared), count
+            )
+
+    results = []
+    for index, input_data in enumerate(prepared):
+        item = vectorized[index]
+        if item is not None:
+            item.update({"index": index, "status": "success"})
+            results.append(item)
+            continue
+        try:
+            if input_data is None:
+                raise CalculationError("Необходимо предоставить входные данные")
+            item = execute_calculation_plan(plan, input_data)
+            item.update({"index": index, "status": "success"})
+        except CalculationError as e:
+            item = {"index": index, "status": "error", "error": str(e)}
+        except Exception as e:
+            logger.error(
+                f"Необработанная ошибка при расчете набора {index}: {str(e)}",
+                exc_info=True,
+            )
+            item = {"index": index, "status": "error", "error": str(e)}
+        results.append(item)
+    return results
@@ -5,7 +5,7 @@ from copy import copy
 from django.http import HttpResponse, HttpResponseBadRequest
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
-from ..models import Protocol, ExcelTemplate, ResearchObjectMethod
+from ..models import Protocol, ExcelTemplate, ResearchObjectMethod, Calculation
 from django.db import models
 from ..models import Equipment
 from django.utils import formats
@@ -20,7 +20,7 @@ from ..utils.protocol_generator_utils import (
     A4_HEIGHT_POINTS,
     DEFAULT_ROW_HEIGHT,
 )
-from ..utils.employee_utils import get_employee_name
+from ..utils.employee_utils import resolve_employee_names
 from openpyxl.worksheet.header_footer import _HeaderFooterPart
 
 logger = logging.getLogger(__name__)
@@ -1566,14 +1566,20 @@ def process_between_tables(
     if not next_table_start:
         return current_sheet, current_row
 
-    # Получаем уникальные ФИО исполнителей из hashMd5
-    executors_cache = set()
-    for sample in protocol.samples.filter(is_deleted=False):
-        for calc in sample.calculations.filter(is_deleted=False):
-            if calc.executor:
-                name = get_employee_name(calc.executor)
-                if name:
-                    executors_cache.add(name)
+    # Получаем уникальные ФИО исполнителей из hashMd5 одним списком
+    executor_hashes = (
+        Calculation.objects.filter(
+            sample__protocol=protocol,
+            sample__is_deleted=False,
+            is_deleted=False,
+        )
+        .values_list("executor", flat=True)
+        .order_by()
+        .distinct()
+    )
+    executors_cache = {
+        name for name in resolve_employee_names(executor_hashes).values() if name
+    }
 
     executors = sorted(executors_cache) if executors_cache else []
 
@@ -2019,7 +2025,7 @@ def generate_protocol_excel(request):
                 current_sheet,
                 table1_end + 1,
                 merged_cells_map,
-                    current_row,
+                current_row,
                 len(new_workbook.sheetnames),
             )
             if not current_sheet:
@@ -2082,10 +2088,10 @@ def generate_protocol_excel(request):
                     # Обрабатываем оставшиеся строки после таблицы 3
                     current_sheet = process_footer(
                         protocol,
-                    template_sheet,
+                        template_sheet,
                         current_sheet,
                         table3_end,
-                    merged_cells_map,
+                        merged_cells_map,
                         current_sheet.max_row + 1,
                         len(new_workbook.sheetnames),
                     )
@@ -2115,22 +2121,22 @@ def generate_protocol_excel(request):
                 )
 
             # Сохраняем результат
-        output = BytesIO()
-        new_workbook.save(output)
-        output.seek(0)
+            output = BytesIO()
+            new_workbook.save(output)
+            output.seek(0)
 
             logger.info("Файл успешно сохранен в BytesIO")
 
-        response = HttpResponse(
+            response = HttpResponse(
                 output.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
             response["Content-Disposition"] = (
                 f'attachment; filename="protocol_{protocol_id}.xlsx"'
             )
 
             logger.info("Протокол успешно сгенерирован")
-        return response
+            return response
 
         except Exception as save_error:
             logger.error(f"Ошибка при сохранении файла: {str(save_error)}")
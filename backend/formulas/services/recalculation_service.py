@@ -0,0 +1,325 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import logging
+import multiprocessing
+from django.db import connections
+from django.utils import timezone
+from ..models import Calculation, ResearchMethod
+from .calculation_service import (
+    CalculationError,
+    execute_calculation_batch,
+    get_method_plan,
+)
+
+logger = logging.getLogger(__name__)
+
+# Количество расчетов, передаваемых в процесс за один раз и записываемых
+# одним bulk_update
+RECALCULATION_CHUNK_SIZE = 1000
+
+# Поля расчета, которые обновляются при пересчете
+RECALCULATED_FIELDS = ("result", "measurement_error", "unit")
+
+# Обозначения отсутствия погрешности: интерфейс сохраняет "-" или null
+NO_MEASUREMENT_ERROR = (None, "", "-")
+
+# Записи особых результатов повторяемости (как их сохраняет интерфейс)
+CONVERGENCE_LABELS = {
+    "unsatisfactory": "Неудовлетворительно",
+    "traces": "Следы",
+    "absence": "Отсутствие",
+}
+
+# Планы методов в процессах пула (method_id -> план)
+_worker_plans = {}
+
+
+def format_calculation_result(response_data, unit=None):
+    """
+    Преобразует ответ расчета в значения полей сохраненного расчета.
+
+    Значения записываются так же, как их сохраняет интерфейс: десятичный
+    разделитель - запятая, для особых результатов повторяемости вместо
+    числа записывается ее название, а погрешность - "-".
+
+    Args:
+        response_data (dict): Данные ответа execute_calculation_plan
+        unit (str): Единица измерения, если в плане она не указана
+
+    Returns:
+        dict: Значения полей result, measurement_error и unit
+    """
+    convergence = response_data.get("convergence")
+    result = response_data.get("result")
+    measurement_error = response_data.get("measurement_error")
+
+    if convergence in CONVERGENCE_LABELS:
+        result = CONVERGENCE_LABELS[convergence]
+        measurement_error = None
+    elif result:
+        result = str(result).replace(".", ",", 1)
+
+    return {
+        "result": result,
+        "measurement_error": (
+            str(measurement_error).replace(".", ",", 1) if measurement_error else "-"
+        ),
+        "unit": response_data.get("unit") or unit,
+    }
+
+
+def _load_plans(method_ids):
+    """
+    Загружает планы расчета методов.
+
+    Returns:
+        tuple: (method_id -> план, method_id -> текст ошибки)
+    """
+    plans = {}
+    errors = {}
+    for method_id in method_ids:
+        try:
+            plans[method_id], _ = get_method_plan(method_id)
+        except ResearchMethod.DoesNotExist:
+            errors[method_id] = "Метод исследования не найден"
+        except CalculationError as e:
+            errors[method_id] = str(e)
+    return plans, errors
+
+
+def _init_worker(plans):
+    global _worker_plans
+    _worker_plans = plans
+
+
+def _recalculate_chunk(rows, plans=None):
+    """
+    Пересчитывает часть расчетов.
+
+    Расчеты группируются по методам, и каждая группа вычисляется одним
+    пакетом (векторно, если установлен NumPy).
+
+    Args:
+        rows (list): Кортежи (id, method_id, input_data, result,
+            measurement_error, unit)
+        plans (dict): Планы методов; в процессах пула берутся из _worker_plans
+
+    Returns:
+        list: Для каждого расчета кортеж (строка, новые значения полей или
+            None, текст ошибки или None)
+    """
+    if plans is None:
+        plans = _worker_plans
+
+    rows_by_method = {}
+    for row in rows:
+        rows_by_method.setdefault(row[1], []).append(row)
+
+    outcomes = []
+    for method_id, method_rows in rows_by_method.items():
+        results = execute_calculation_batch(
+            plans[method_id], [row[2] for row in method_rows]
+        )
+        for row, item in zip(method_rows, results):
+            if item["status"] == "success":
+                outcomes.append((row, format_calculation_result(item, row[5]), None))
+            else:
+                outcomes.append((row, None, item["error"]))
+    return outcomes
+
+
+def _normalize_value(value):
+    """
+    Приводит значение результата или погрешности к виду для сравнения: без
+    знака ± и с точкой в качестве десятичного разделителя. Отсутствие
+    погрешности ("-" или None) приводится к None.
+    """
+    if value in NO_MEASUREMENT_ERROR:
+        return None
+    return str(value).strip().lstrip("±").replace(",", ".")
+
+
+def _keep_stored_format(value, stored_value):
+    """
+    Записывает новое значение в формате сохраненного: с тем же десятичным
+    разделителем, знаком ± и обозначением отсутствия погрешности.
+    """
+    if value in NO_MEASUREMENT_ERROR:
+        return stored_value if stored_value in NO_MEASUREMENT_ERROR else value
+    if isinstance(stored_value, str):
+        if "." in stored_value and "," not in stored_value:
+            value = value.replace(",", ".", 1)
+        if stored_value.startswith("±"):
+            value = "±" + value
+    return value
+
+
+def _is_unchanged(values, stored_values):
+    return values["unit"] == stored_values["unit"] and all(
+        _normalize_value(values[field]) == _normalize_value(stored_values[field])
+        for field in ("result", "measurement_error")
+    )
+
+
+def _iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _get_pool_context():
+    # Процессы пула наследуют настроенный Django только при запуске через fork
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+class RecalculationReport:
+    """
+    Итоги пересчета сохраненных расчетов.
+
+    Attributes:
+        total (int): Количество обработанных расчетов
+        changed (int): Расчеты, у которых изменился результат
+        unchanged (int): Расчеты, результат которых не изменился
+        failed (int): Расчеты, которые не удалось пересчитать
+        updated (int): Записанные в базу расчеты (0 при пробном запуске)
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.updated = 0
+
+    def as_dict(self):
+        return {
+            "total": self.total,
+            "changed": self.changed,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "updated": self.updated,
+        }
+
+
+def recalculate_calculations(
+    queryset,
+    dry_run=False,
+    workers=1,
+    chunk_size=RECALCULATION_CHUNK_SIZE,
+    user=None,
+    on_row=None,
+):
+    """
+    Пересчитывает сохраненные расчеты по текущим версиям методов.
+
+    Расчеты читаются из базы потоком (iterator) и пересчитываются частями
+    по chunk_size; одновременно в памяти находится не больше 2 * workers
+    частей. Изменившиеся значения записываются через bulk_update.
+
+    Args:
+        queryset (QuerySet): Расчеты для пересчета (удаленные пропускаются)
+        dry_run (bool): Только сравнить результаты, не изменяя базу
+        workers (int): Количество процессов; 1 - пересчет в текущем процессе
+        chunk_size (int): Размер части
+        user (str): Пользователь, записываемый в updated_by
+        on_row (callable): Вызывается для каждого расчета с аргументами
+            (статус, строка, новые значения, текст ошибки); статус -
+            "changed", "unchanged" или "failed"
+
+    Returns:
+        RecalculationReport: Итоги пересчета
+    """
+    queryset = queryset.filter(is_deleted=False).order_by("pk")
+    method_ids = list(
+        queryset.order_by().values_list("research_method_id", flat=True).distinct()
+    )
+    plans, plan_errors = _load_plans(method_ids)
+
+    report = RecalculationReport()
+    pending_updates = []
+
+    fields = list(RECALCULATED_FIELDS) + ["updated_at"]
+    if user:
+        fields.append("updated_by")
+
+    def write_updates():
+        if not dry_run and pending_updates:
+            Calculation.objects.bulk_update(
+                pending_updates, fields, batch_size=chunk_size
+            )
+            report.updated += len(pending_updates)
+        pending_updates.clear()
+
+    def apply(outcomes):
+        updated_at = timezone.now()
+        for row, values, error in outcomes:
+            report.total += 1
+            stored_values = dict(zip(RECALCULATED_FIELDS, row[3:]))
+            if values is None or not values["result"]:
+                status = "failed"
+                error = error or "Расчет не вернул результат"
+                report.failed += 1
+            elif _is_unchanged(values, stored_values):
+                status = "unchanged"
+                report.unchanged += 1
+            else:
+                status = "changed"
+                report.changed += 1
+                for field in ("result", "measurement_error"):
+                    values[field] = _keep_stored_format(
+                        values[field], stored_values[field]
+                    )
+                calculation = Calculation(id=row[0], updated_at=updated_at, **values)
+                if user:
+                    calculation.updated_by = user
+                pending_updates.append(calculation)
+            if on_row is not None:
+                on_row(status, row, values, error)
+        if len(pending_updates) >= chunk_size:
+            write_updates()
+
+    rows = queryset.values_list(
+        "id", "research_method_id", "input_data", *RECALCULATED_FIELDS
+    ).iterator(chunk_size=chunk_size)
+
+    def split(chunk):
+        # Расчеты методов с ошибками не пересчитываются
+        failed = [
+            (row, None, plan_errors[row[1]]) for row in chunk if row[1] in plan_errors
+        ]
+        return [row for row in chunk if row[1] in plans], failed
+
+    context = _get_pool_context() if workers > 1 else None
+    if context is None:
+        for chunk in _iter_chunks(rows, chunk_size):
+            chunk, failed = split(chunk)
+            apply(failed + _recalculate_chunk(chunk, plans))
+        write_updates()
+        return report
+
+    # Соединения закрываются до запуска процессов, чтобы процессы пула
+    # не унаследовали открытые сокеты базы данных
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(plans,),
+    ) as executor:
+        futures = deque()
+        for chunk in _iter_chunks(rows, chunk_size):
+            chunk, failed = split(chunk)
+            apply(failed)
+            futures.append(executor.submit(_recalculate_chunk, chunk))
+            if len(futures) >= workers * 2:
+                apply(futures.popleft().result())
+        while futures:
+            apply(futures.popleft().result())
+    write_updates()
+    return report
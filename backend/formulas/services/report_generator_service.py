@@ -14,7 +14,7 @@ from ..utils.protocol_generator_utils import (
     copy_row_formatting,
     copy_column_dimensions,
 )
-from ..utils.employee_utils import get_employee_name
+from ..utils.employee_utils import get_employee_name, resolve_employee_names
 
 
 def find_month_markers(sheet):
@@ -62,8 +62,14 @@ def get_month_data(samples, year, month, global_start_date, global_end_date):
     ).order_by("sampling_date")
 
 
-def fill_template_row(row, sample, template_row, sheet):
-    """Заполняет строку данными из sample"""
+def fill_template_row(row, sample, template_row, sheet, employee_names=None):
+    """
+    Заполняет строку данными из sample.
+
+    employee_names - ФИО исполнителей по hashMd5, полученные заранее
+    (resolve_employee_names); отсутствующие запрашиваются по одному.
+    """
+    employee_names = employee_names or {}
     # Находим все объединенные диапазоны для текущей строки
     merged_ranges = []
     for merged_range in sheet.merged_cells.ranges:
@@ -137,7 +143,7 @@ def fill_template_row(row, sample, template_row, sheet):
             new_cell.value = value.replace("{quantity}", str(quantity))
         elif "{executor}" in value:
             executors = {
-                get_employee_name(calc.executor)
+                employee_names.get(calc.executor) or get_employee_name(calc.executor)
                 for calc in sample.calculations.filter(is_deleted=False)
                 if calc.executor
             }
@@ -281,6 +287,14 @@ def generate_report(request):
         if not samples.exists():
             return Response({"detail": "Нет данных за выбранный период"}, status=400)
 
+        # ФИО всех исполнителей за период запрашиваются одним списком
+        employee_names = resolve_employee_names(
+            Calculation.objects.filter(sample__in=samples, is_deleted=False)
+            .values_list("executor", flat=True)
+            .order_by()
+            .distinct()
+        )
+
         # Копируем заголовок таблицы
         current_row = 1
         for row in range(1, sheet.max_row + 1):
@@ -386,7 +400,8 @@ def generate_report(request):
                     # Получаем данные для строки
                     calculations = sample.calculations.filter(is_deleted=False)
                     executors = {
-                        get_employee_name(calc.executor)
+                        employee_names.get(calc.executor)
+                        or get_employee_name(calc.executor)
                         for calc in sample.calculations.filter(is_deleted=False)
                         if calc.executor
                     }
@@ -0,0 +1,163 @@
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import logging
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from ..utils.reference_tables import get_reference_table_versions
+
+logger = logging.getLogger(__name__)
+
+# Версия формата ключей и значений кэша. Меняется вместе с логикой расчета,
+# чтобы общий кэш не отдавал результаты предыдущей версии.
+RESULT_CACHE_VERSION = 2
+
+RESULT_CACHE_KEY_PREFIX = "calculation_result"
+
+
+def canonicalize_input_data(input_data):
+    """
+    Приводит подготовленные входные данные к виду, от которого зависит
+    результат расчета: пробелы по краям и десятичная запятая не влияют на
+    результат, поэтому "1,5" и " 1.5" дают один ключ.
+
+    Returns:
+        list: Пары (имя, значение) в исходном порядке или None, если среди
+            значений есть неподдерживаемые типы
+    """
+    canonical = []
+    for name, value in input_data.items():
+        if isinstance(value, str):
+            canonical.append((name, value.strip().replace(",", ".")))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            canonical.append((name, [type(value).__name__, repr(value)]))
+        else:
+            return None
+    return canonical
+
+
+class CalculationResultCache:
+    """
+    Кэш результатов расчета.
+
+    Ключ строится из версии и хэша плана расчета (меняется при любом
+    изменении полей метода, от которых зависит расчет) и канонизированных
+    входных данных. Записи хранятся в LRU-кэше процесса и, если задан
+    алиас, в общем кэше Django.
+    """
+
+    def __init__(self, maxsize, backend=None, timeout=None):
+        self.maxsize = maxsize
+        self.backend = backend
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local_hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 or self.backend is not None
+
+    def make_key(self, plan, input_data):
+        """
+        Возвращает ключ кэша или None, если результат не кэшируется.
+
+        Если формулы метода используют справочные таблицы, в ключ входят их
+        версии, чтобы после изменения таблицы результат вычислялся заново.
+        """
+        canonical = canonicalize_input_data(input_data)
+        if canonical is None or not plan.get("source_hash"):
+            return None
+        dump = json.dumps(
+            [
+                RESULT_CACHE_VERSION,
+                plan["version"],
+                plan["source_hash"],
+                get_reference_table_versions(plan.get("tables")),
+                canonical,
+            ],
+            ensure_ascii=False,
+        )
+        digest = hashlib.sha1(dump.encode("utf-8")).hexdigest()
+        return f"{RESULT_CACHE_KEY_PREFIX}:{digest}"
+
+    def get(self, key):
+        """
+        Возвращает копию сохраненного результата или None.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._local_hits += 1
+                return copy.deepcopy(value)
+
+        value = self._get_shared(key)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._shared_hits += 1
+            self._store_local(key, value)
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._store_local(key, value)
+        if self.backend is not None:
+            try:
+                caches[self.backend].set(key, value, self.timeout)
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить результат в общий кэш: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._local_hits = self._shared_hits = self._misses = 0
+
+    def info(self):
+        """
+        Возвращает статистику кэша.
+        """
+        with self._lock:
+            hits = self._local_hits + self._shared_hits
+            requests = hits + self._misses
+            return {
+                "hits": hits,
+                "local_hits": self._local_hits,
+                "shared_hits": self._shared_hits,
+                "misses": self._misses,
+                "hit_rate": round(hits / requests, 4) if requests else None,
+                "maxsize": self.maxsize,
+                "currsize": len(self._entries),
+                "backend": self.backend,
+            }
+
+    def _get_shared(self, key):
+        if self.backend is None:
+            return None
+        try:
+            return caches[self.backend].get(key)
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать результат из общего кэша: {str(e)}")
+            return None
+
+    def _store_local(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+result_cache = CalculationResultCache(
+    maxsize=getattr(settings, "CALCULATION_RESULT_CACHE_SIZE", 1024),
+    backend=getattr(settings, "CALCULATION_RESULT_CACHE_BACKEND", None),
+    timeout=getattr(settings, "CALCULATION_RESULT_CACHE_TIMEOUT", 3600),
+)
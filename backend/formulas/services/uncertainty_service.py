@@ -0,0 +1,297 @@
+from collections import Counter, OrderedDict
+import logging
+import math
+from .calculation_service import (
+    CalculationError,
+    execute_calculation_plan,
+    prepare_input_data,
+)
+from .vectorized_calculation import (
+    _Column,
+    _compile_plan,
+    _evaluate_range_step,
+    _evaluate_threshold_step,
+    _get_convergence,
+    _normalize_columns,
+)
+from ..utils.vectorized_formula import VectorContext, np
+
+logger = logging.getLogger(__name__)
+
+# Количество выборок по умолчанию и наибольшее количество выборок
+MONTE_CARLO_DEFAULT_SAMPLES = 100000
+MONTE_CARLO_MAX_SAMPLES = 1000000
+
+# Процентили распределения результата в ответе
+MONTE_CARLO_PERCENTILES = (2.5, 5, 25, 50, 75, 95, 97.5)
+
+# Законы распределения входных величин; value - стандартная неопределенность
+# для нормального закона и полуширина интервала для остальных
+DISTRIBUTIONS = ("normal", "uniform", "triangular")
+
+
+def _parse_uncertainty(name, spec):
+    """
+    Возвращает закон распределения и параметр неопределенности входной
+    величины. Число означает стандартную неопределенность (нормальный закон).
+
+    Raises:
+        CalculationError: Если неопределенность задана некорректно
+    """
+    distribution = "normal"
+    value = spec
+    if isinstance(spec, dict):
+        distribution = spec.get("distribution", "normal")
+        value = spec.get("value")
+    if distribution not in DISTRIBUTIONS:
+        raise CalculationError(
+            f"Неизвестный закон распределения для {name}: {distribution}"
+        )
+    try:
+        if isinstance(value, str):
+            value = value.strip().replace(",", ".")
+        value = float(value)
+    except (TypeError, ValueError):
+        raise CalculationError(f"Неопределенность {name} должна быть числом")
+    if not math.isfinite(value) or value < 0:
+        raise CalculationError(
+            f"Неопределенность {name} должна быть неотрицательным числом"
+        )
+    return distribution, value
+
+
+def _sample(rng, distribution, nominal, value, size):
+    if value == 0:
+        return np.full(size, nominal)
+    if distribution == "normal":
+        return rng.normal(nominal, value, size)
+    if distribution == "uniform":
+        return rng.uniform(nominal - value, nominal + value, size)
+    return rng.triangular(nominal - value, nominal, nominal + value, size)
+
+
+def _round_values(values, rounding_type, rounding_decimal):
+    """
+    Округляет массив значений как round_result или _round_to_multiple.
+
+    Округление выполняется в двоичной арифметике, поэтому на границах
+    округления может отличаться от десятичного; на распределение это не
+    влияет.
+    """
+    with np.errstate(all="ignore"):
+        if rounding_type == "multiple":
+            return np.round(values / rounding_decimal) * rounding_decimal
+        if rounding_type == "decimal":
+            scale = 10.0**rounding_decimal
+        else:
+            # Значащие цифры: масштаб по порядку каждого значения
+            magnitude = np.floor(np.log10(np.abs(np.where(values == 0, 1, values))))
+            scale = 10.0 ** (rounding_decimal - 1 - magnitude)
+        # ROUND_HALF_UP: половина округляется от нуля
+        return np.sign(values) * np.floor(np.abs(values) * scale + 0.5) / scale
+
+
+def _round_step(values, rounding_params):
+    """
+    Округляет значения промежуточного поля по его параметрам округления
+    (см. apply_rounding_params).
+    """
+    if not rounding_params or not rounding_params.get("use_multiple_rounding"):
+        return values
+    try:
+        if rounding_params.get("rounding_type") == "multiple":
+            multiple = float(rounding_params.get("multiple_value", "1"))
+            return _round_values(values, "multiple", multiple)
+        rounding_type = rounding_params.get("rounding_type")
+        rounding_decimal = int(rounding_params.get("rounding_decimal"))
+    except (TypeError, ValueError):
+        raise CalculationError("Некорректные параметры округления промежуточного поля")
+    if rounding_type not in ("decimal", "significant"):
+        return values
+    return _round_values(values, rounding_type, rounding_decimal)
+
+
+def _load_nominal(input_data):
+    """
+    Преобразует входные данные в числа.
+
+    Raises:
+        CalculationError: Если значение не является конечным числом
+    """
+    nominal = OrderedDict()
+    for name, value in prepare_input_data(input_data).items():
+        try:
+            if isinstance(value, str):
+                value = value.strip().replace(",", ".")
+            elif isinstance(value, bool):
+                raise TypeError(type(value).__name__)
+            value = float(value)
+        except (TypeError, ValueError):
+            raise CalculationError(f"Значение {name} должно быть числом")
+        if not math.isfinite(value):
+            raise CalculationError(f"Значение {name} должно быть конечным числом")
+        nominal[name] = value
+    return nominal
+
+
+def _describe(values):
+    """
+    Возвращает характеристики распределения значений.
+    """
+    percentiles = np.percentile(values, MONTE_CARLO_PERCENTILES)
+    low, high = percentiles[0], percentiles[-1]
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "percentiles": {
+            f"{percentile:g}": float(value)
+            for percentile, value in zip(MONTE_CARLO_PERCENTILES, percentiles)
+        },
+        # Интервал охвата 95 % и его полуширина (расширенная неопределенность)
+        "coverage_interval": [float(low), float(high)],
+        "expanded_uncertainty": float(high - low) / 2,
+    }
+
+
+def _contributions(samples, result, valid):
+    """
+    Оценивает вклад входных величин в дисперсию результата квадратом
+    коэффициента корреляции с результатом (доля от суммы вкладов).
+    """
+    correlations = {}
+    for name, values in samples.items():
+        values = values[valid]
+        if values.std() == 0 or result.std() == 0:
+            correlations[name] = 0.0
+        else:
+            correlations[name] = float(np.corrcoef(values, result)[0, 1])
+    total = sum(value * value for value in correlations.values())
+    contributions = [
+        {
+            "name": name,
+            "correlation": correlation,
+            "share": correlation * correlation / total if total else 0.0,
+        }
+        for name, correlation in correlations.items()
+    ]
+    contributions.sort(key=lambda item: item["share"], reverse=True)
+    return contributions
+
+
+def propagate_uncertainty(
+    plan, input_data, uncertainties, samples=MONTE_CARLO_DEFAULT_SAMPLES, seed=None
+):
+    """
+    Оценивает неопределенность результата методом Монте-Карло.
+
+    Входные величины с заданной неопределенностью разыгрываются samples раз,
+    план расчета вычисляется сразу для всех выборок над массивами NumPy.
+    Распределение результата строится по выборкам с удовлетворительной
+    повторяемостью, без округления результата (промежуточные поля
+    округляются по своим параметрам).
+
+    Args:
+        plan (dict): План расчета
+        input_data (dict): Значения входных величин
+        uncertainties (dict): Имя входной величины -> стандартная
+            неопределенность или {"distribution": закон, "value": параметр}
+        samples (int): Количество выборок
+        seed (int): Начальное значение генератора (для воспроизводимости)
+
+    Returns:
+        dict: Номинальный расчет, распределение результата, повторяемость
+            по выборкам и вклады входных величин в дисперсию
+
+    Raises:
+        CalculationError: Если NumPy не установлен, метод нельзя вычислить
+            векторно или данные некорректны
+    """
+    if np is None:
+        raise CalculationError("Для расчета неопределенности необходим NumPy")
+    if not isinstance(uncertainties, dict) or not uncertainties:
+        raise CalculationError("Необходимо указать неопределенности входных величин")
+    if not 2 <= samples <= MONTE_CARLO_MAX_SAMPLES:
+        raise CalculationError(
+            f"Количество выборок должно быть от 2 до {MONTE_CARLO_MAX_SAMPLES}"
+        )
+
+    program = _compile_plan(plan)
+    if program is None:
+        raise CalculationError(
+            "Метод содержит формулы, которые нельзя вычислить векторно"
+        )
+
+    nominal = _load_nominal(input_data)
+    unknown = [name for name in uncertainties if name not in nominal]
+    if unknown:
+        raise CalculationError(f"Неизвестные входные величины: {', '.join(unknown)}")
+
+    try:
+        rng = np.random.default_rng(seed)
+    except (TypeError, ValueError):
+        raise CalculationError("Начальное значение генератора должно быть целым числом")
+
+    columns = OrderedDict()
+    sampled = OrderedDict()
+    for name, value in nominal.items():
+        if name in uncertainties:
+            distribution, parameter = _parse_uncertainty(name, uncertainties[name])
+            values = _sample(rng, distribution, value, parameter, samples)
+            sampled[name] = values
+        else:
+            values = np.full(samples, value)
+        columns[name] = _Column(values, None)
+
+    context = VectorContext(_normalize_columns(columns), samples)
+    for step, compiled in program["steps"]:
+        if step["kind"] == "threshold":
+            column = _evaluate_threshold_step(step, columns, samples)
+        elif step["kind"] == "range":
+            column = _evaluate_range_step(context, compiled)
+        else:
+            formula = compiled[0]
+            if formula.literal is not None:
+                values = np.full(samples, float(formula.literal))
+            else:
+                values = _round_step(formula.evaluate(context), step["rounding_params"])
+                context.check(values)
+            column = _Column(values, None)
+        columns[step["name"]] = column
+        context.columns = _normalize_columns(columns)
+
+    conditions = program["conditions"]
+    condition_results = [formula.evaluate(context) for _, formula in conditions]
+    labels, _ = _get_convergence(conditions, condition_results, samples)
+
+    result_formula = program["result_formula"]
+    if result_formula.literal is not None:
+        result = np.full(samples, float(result_formula.literal))
+    else:
+        result = context.check(result_formula.evaluate(context))
+
+    satisfactory = np.array([label == "satisfactory" for label in labels])
+    valid = satisfactory & ~context.invalid
+
+    try:
+        nominal_result = execute_calculation_plan(plan, prepare_input_data(input_data))
+    except CalculationError as e:
+        nominal_result = {"error": str(e)}
+
+    response_data = {
+        "samples": samples,
+        "valid_samples": int(valid.sum()),
+        # Выборки, в которых значение не вычисляется (деление на ноль и т.п.)
+        "invalid_samples": int(context.invalid.sum()),
+        "convergence": dict(Counter(labels)),
+        "nominal": nominal_result,
+        "result": None,
+        "contributions": [],
+        "unit": plan["unit"],
+    }
+    if valid.any():
+        values = result[valid]
+        response_data["result"] = _describe(values)
+        response_data["contributions"] = _contributions(sampled, values, valid)
+    return response_data
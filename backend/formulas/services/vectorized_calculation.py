@@ -0,0 +1,466 @@
+from collections import OrderedDict
+from decimal import Decimal
+import logging
+from ..utils.formula_utils import (
+    build_convergence_steps,
+    format_condition_step,
+    normalize_name,
+)
+from ..utils.rounding import _round_to_multiple, round_result
+from ..utils.vectorized_formula import (
+    VectorContext,
+    compile_vector_formula,
+    get_operand_values,
+    np,
+)
+
+logger = logging.getLogger(__name__)
+
+# Порядок приоритета особых условий повторяемости (по возрастанию)
+CONVERGENCE_PRIORITY = ("unsatisfactory", "traces", "absence")
+
+
+class _Column:
+    """
+    Значения одной переменной во всех наборах.
+
+    Attributes:
+        values (ndarray): Значения для подстановки в формулы
+        texts (list): Строковые значения (для промежуточных результатов и
+            шагов расчета повторяемости), вычисляются при первом обращении
+    """
+
+    __slots__ = ("values", "_texts", "_make_texts")
+
+    def __init__(self, values, make_texts):
+        self.values = values
+        self._texts = None
+        self._make_texts = make_texts
+
+    @property
+    def texts(self):
+        if self._texts is None:
+            self._texts = self._make_texts()
+        return self._texts
+
+
+def _decimal_texts(values):
+    # Скалярный движок хранит результат формулы как Decimal(str(float))
+    return lambda: [str(Decimal(str(value))) for value in values.tolist()]
+
+
+def _compile_plan(plan):
+    """
+    Компилирует формулы плана для вычисления над столбцами значений.
+
+    Returns:
+        dict: Скомпилированные формулы или None, если план нельзя векторизовать
+    """
+    steps = []
+    for step in plan["steps"]:
+        if step["kind"] == "threshold":
+            steps.append((step, None))
+        elif step["kind"] == "range":
+            ranges = []
+            for range_item in step["range_calculation"]["ranges"]:
+                condition = compile_vector_formula(range_item["condition"], True)
+                formula = compile_vector_formula(range_item["formula"])
+                if condition is None or condition.evaluate is None or formula is None:
+                    return None
+                ranges.append((condition, formula))
+            steps.append((step, ranges))
+        else:
+            formula = compile_vector_formula(step["formula"])
+            if formula is None:
+                return None
+            rounding = None
+            rounding_params = step["rounding_params"]
+            if rounding_params and rounding_params.get("use_multiple_rounding"):
+                if rounding_params.get("rounding_type") == "multiple":
+                    try:
+                        multiple = float(rounding_params.get("multiple_value", "1"))
+                    except (TypeError, ValueError):
+                        return None
+                    rounding = lambda result, multiple=multiple: _round_to_multiple(
+                        result, multiple
+                    )
+                else:
+                    rounding = lambda result, params=rounding_params: round_result(
+                        result,
+                        params.get("rounding_type"),
+                        params.get("rounding_decimal"),
+                    )
+            steps.append((step, (formula, rounding)))
+
+    conditions = []
+    for condition in plan["convergence_conditions"]:
+        formula = compile_vector_formula(condition["formula"], True)
+        if formula is None or formula.evaluate is None:
+            return None
+        conditions.append((condition, formula))
+
+    result_formula = compile_vector_formula(plan["formula"])
+    if result_formula is None:
+        return None
+
+    error_config = plan["measurement_error"]
+    error_formula = None
+    if not isinstance(error_config, dict) or "type" not in error_config:
+        return None
+    if error_config["type"] == "fixed":
+        try:
+            float(error_config["value"])
+        except (KeyError, TypeError, ValueError):
+            return None
+    elif error_config["type"] == "formula":
+        error_formula = compile_vector_formula(str(error_config.get("value")))
+        if error_formula is None:
+            return None
+
+    return {
+        "steps": steps,
+        "conditions": conditions,
+        "result_formula": result_formula,
+        "error_formula": error_formula,
+    }
+
+
+def _load_input_columns(input_data_list, size):
+    """
+    Собирает столбцы входных данных.
+
+    Векторно считаются наборы с тем же составом полей, что и первый набор,
+    и со значениями, которые преобразуются в конечные числа.
+
+    Returns:
+        tuple: (столбцы по исходным именам, маска наборов для скалярного движка)
+    """
+    invalid = np.zeros(size, dtype=bool)
+    reference = next((item for item in input_data_list if item), None)
+    if reference is None:
+        invalid[:] = True
+        return OrderedDict(), invalid
+
+    keys = list(reference)
+    for index, input_data in enumerate(input_data_list):
+        if not input_data or list(input_data) != keys:
+            invalid[index] = True
+
+    columns = OrderedDict()
+    for key in keys:
+        values = np.zeros(size)
+        texts = [""] * size
+        for index, input_data in enumerate(input_data_list):
+            if invalid[index]:
+                continue
+            value = input_data[key]
+            try:
+                if isinstance(value, str):
+                    value = value.strip().replace(",", ".")
+                elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise TypeError(type(value).__name__)
+                values[index] = float(value)
+                texts[index] = str(value)
+            except (TypeError, ValueError, OverflowError):
+                invalid[index] = True
+        columns[key] = _Column(values, lambda texts=texts: texts)
+
+    for column in columns.values():
+        invalid |= ~np.isfinite(column.values)
+    return columns, invalid
+
+
+def _normalize_columns(columns):
+    """
+    Возвращает значения переменных по нормализованным именам.
+    """
+    return {normalize_name(name): column.values for name, column in columns.items()}
+
+
+def _evaluate_threshold_step(step, columns, size):
+    """
+    Выбор ближайшего табличного значения (см. round_value).
+    """
+    threshold_values = step["threshold_table_values"]
+    names = [
+        threshold_values.get("target_variable"),
+        threshold_values.get("higher_variable"),
+        threshold_values.get("lower_variable"),
+        threshold_values.get("formula"),
+    ]
+    if not all(names):
+        values = np.zeros(size)
+    else:
+        target, higher, lower, formula = [
+            columns[name].values if name in columns else np.zeros(size)
+            for name in names
+        ]
+        values = np.where(formula < target, higher, lower)
+    # Табличное значение хранится как float
+    return _Column(values, lambda: [str(value) for value in values.tolist()])
+
+
+def _evaluate_range_step(context, ranges):
+    """
+    Диапазонный расчет: значение первого диапазона, условие которого выполнено.
+    """
+    size = context.size
+    selected = np.zeros(size, dtype=bool)
+    values = np.zeros(size)
+    for condition, formula in ranges:
+        met = condition.evaluate(context) & ~selected
+        if formula.literal is not None:
+            branch = float(formula.literal)
+        else:
+            branch = formula.evaluate(context)
+        values = np.where(met, branch, values)
+        selected |= met
+
+    make_texts = _decimal_texts(values)
+
+    def texts():
+        # Если ни одно условие не выполнилось, результат равен Decimal("0")
+        return [
+            text if is_selected else "0"
+            for text, is_selected in zip(make_texts(), selected.tolist())
+        ]
+
+    return _Column(values, texts)
+
+
+def _evaluate_formula_step(context, formula, rounding, invalid):
+    """
+    Вычисление формулы промежуточного поля с округлением.
+    """
+    size = context.size
+    if formula.literal is not None:
+        # Простое число возвращается без округления
+        text = str(formula.literal)
+        return _Column(np.full(size, float(formula.literal)), lambda: [text] * size)
+
+    values = formula.evaluate(context)
+    if rounding is None:
+        return _Column(values, _decimal_texts(values))
+
+    # Округление выполняется скалярным ядром, чтобы совпадать до последнего знака
+    rounded = []
+    rounded_values = np.zeros(size)
+    for index, value in enumerate(values.tolist()):
+        if invalid[index] or context.invalid[index]:
+            rounded.append(None)
+            continue
+        try:
+            result = rounding(Decimal(str(value)))
+            rounded_values[index] = float(result)
+        except Exception:
+            invalid[index] = True
+            result = None
+        rounded.append(result)
+    return _Column(rounded_values, lambda: [str(result) for result in rounded])
+
+
+def _get_convergence(conditions, condition_results, size):
+    """
+    Выбирает результат повторяемости для каждого набора.
+
+    Returns:
+        tuple: (список результатов повторяемости, список кастомных значений)
+    """
+    labels = np.full(size, "satisfactory", dtype=object)
+    for convergence_value in CONVERGENCE_PRIORITY:
+        for (condition, _), results in zip(conditions, condition_results):
+            if condition["convergence_value"] == convergence_value:
+                labels[results] = convergence_value
+
+    custom_values = [None] * size
+    custom_selected = np.zeros(size, dtype=bool)
+    for (condition, _), results in zip(conditions, condition_results):
+        if condition["convergence_value"] == "custom" and condition.get("custom_value"):
+            mask = results & ~custom_selected
+            for index in np.flatnonzero(mask).tolist():
+                custom_values[index] = condition["custom_value"]
+            labels[mask] = "custom"
+            custom_selected |= mask
+    return labels.tolist(), custom_values
+
+
+def _evaluate_result(plan, program, context, columns, satisfactory, invalid):
+    """
+    Вычисляет результат и погрешность для наборов с удовлетворительной
+    повторяемостью.
+
+    Returns:
+        tuple: (строки результата, строки погрешности) для каждого набора
+    """
+    size = context.size
+    result_texts = [None] * size
+    error_texts = [None] * size
+    if not satisfactory.any():
+        return result_texts, error_texts
+
+    formula = program["result_formula"]
+    context.invalid = np.zeros(size, dtype=bool)
+    values = None if formula.literal is not None else formula.evaluate(context).tolist()
+    invalid |= context.invalid & satisfactory
+
+    result_values = np.zeros(size)
+    decimal_places = [0] * size
+    for index in np.flatnonzero(satisfactory & ~invalid).tolist():
+        result = formula.literal if values is None else Decimal(str(values[index]))
+        try:
+            result = round_result(
+                result, plan["rounding_type"], plan["rounding_decimal"]
+            )
+            result_values[index] = float(result)
+        except Exception:
+            invalid[index] = True
+            continue
+        text = str(result)
+        result_texts[index] = text
+        # Количество знаков после запятой в результате
+        decimal_places[index] = len(text.split(".")[-1]) if "." in text else 0
+
+    error_config = plan["measurement_error"]
+    if error_config["type"] == "fixed":
+        errors = [float(error_config["value"])] * size
+    elif error_config["type"] == "formula":
+        error_formula = program["error_formula"]
+        if error_formula.literal is not None:
+            errors = [float(error_formula.literal)] * size
+        else:
+            error_columns = OrderedDict(columns)
+            error_columns["result"] = _Column(result_values, None)
+            context.columns = _normalize_columns(error_columns)
+            context.invalid = np.zeros(size, dtype=bool)
+            errors = error_formula.evaluate(context).tolist()
+            invalid |= context.invalid & satisfactory
+    else:
+        logger.warning("Неподдерживаемый тип погрешности")
+        errors = [0] * size
+
+    for index in np.flatnonzero(satisfactory & ~invalid).tolist():
+        # Округляем погрешность до того же количества знаков, что и результат
+        try:
+            error = round(Decimal(str(errors[index])), decimal_places[index])
+        except Exception:
+            invalid[index] = True
+            continue
+        error_texts[index] = str(error)
+
+    return result_texts, error_texts
+
+
+def execute_calculation_plan_vectorized(plan, input_data_list):
+    """
+    Выполняет план расчета сразу для списка наборов входных данных.
+
+    Формулы вычисляются над массивами NumPy (по одному массиву на
+    переменную), а округление - скалярными функциями, поэтому ответы
+    совпадают с execute_calculation_plan до последнего знака. Наборы, для
+    которых это не гарантируется (ошибки преобразования, деление на ноль,
+    переполнение, неподдерживаемые функции), не вычисляются.
+
+    Args:
+        plan (dict): План расчета
+        input_data_list (list): Подготовленные входные данные (None - набор
+            пропускается)
+
+    Returns:
+        list: Данные ответа для каждого набора или None, если набор нужно
+            вычислить скалярным движком
+    """
+    size = len(input_data_list)
+    results = [None] * size
+    if np is None or not size:
+        return results
+
+    program = _compile_plan(plan)
+    if program is None:
+        logger.info("План расчета не поддерживает векторное вычисление")
+        return results
+
+    columns, invalid = _load_input_columns(input_data_list, size)
+    if invalid.all():
+        return results
+
+    context = VectorContext(_normalize_columns(columns), size)
+    intermediate_names = []
+
+    for step, compiled in program["steps"]:
+        if step["kind"] == "threshold":
+            column = _evaluate_threshold_step(step, columns, size)
+        elif step["kind"] == "range":
+            column = _evaluate_range_step(context, compiled)
+        else:
+            formula, rounding = compiled
+            column = _evaluate_formula_step(context, formula, rounding, invalid)
+        columns[step["name"]] = column
+        context.columns = _normalize_columns(columns)
+        if step["show"]:
+            intermediate_names.append(step["name"])
+
+    conditions = program["conditions"]
+    condition_results = [formula.evaluate(context) for _, formula in conditions]
+    invalid |= context.invalid
+    labels, custom_values = _get_convergence(conditions, condition_results, size)
+
+    # Значения переменных для подстановки в текст условий (до добавления result)
+    display_columns = {normalize_name(name): column for name, column in columns.items()}
+
+    satisfactory = np.array([label == "satisfactory" for label in labels]) & ~invalid
+    result_texts, error_texts = _evaluate_result(
+        plan, program, context, columns, satisfactory, invalid
+    )
+
+    for index in range(size):
+        if invalid[index]:
+            continue
+        convergence = labels[index]
+        conditions_info = []
+        display_values = None
+        for (condition, formula), satisfied in zip(conditions, condition_results):
+            if condition["convergence_value"] != convergence:
+                continue
+            if display_values is None:
+                display_values = {
+                    name: column.texts[index]
+                    for name, column in display_columns.items()
+                }
+            steps_by_node = {
+                node: format_condition_step(
+                    condition["formula"],
+                    node,
+                    display_values,
+                    *get_operand_values(context, node, index),
+                )
+                for node in formula.comparisons
+            }
+            conditions_info.append(
+                {
+                    "formula": condition["formula"],
+                    "satisfied": bool(satisfied[index]),
+                    "convergence_value": condition["convergence_value"],
+                    "calculation_steps": build_convergence_steps(
+                        formula.tree, steps_by_node
+                    ),
+                }
+            )
+
+        response = {
+            "convergence": convergence,
+            "intermediate_results": {
+                name: columns[name].texts[index] for name in intermediate_names
+            },
+            "result": None,
+            "measurement_error": None,
+            "unit": plan["unit"],
+            "conditions_info": conditions_info,
+        }
+        if convergence == "custom":
+            response["result"] = custom_values[index]
+        elif convergence == "satisfactory":
+            response["result"] = result_texts[index]
+            response["measurement_error"] = error_texts[index]
+        results[index] = response
+
+    return results
@@ -0,0 +1,161 @@
+"""
+Локальные заменители внешних сервисов для тестов и команд проверки.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import json
+import threading
+import time
+from cryptography.hazmat.primitives.asymmetric import rsa
+import jwt
+
+
+class KeycloakRealm:
+    """
+    Состояние заменителя Keycloak: ключи подписи, задержка и режим отказа.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.failing = False
+        # Количество следующих запросов, завершающихся статусом 503
+        self.failures = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.private_keys = {}
+        self.rotate("key-1")
+
+    def rotate(self, kid):
+        self.private_keys = {
+            kid: rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        }
+
+    def jwks(self):
+        keys = []
+        for kid, private_key in self.private_keys.items():
+            key = json.loads(
+                jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key())
+            )
+            key.update({"kid": kid, "use": "sig", "alg": "RS256"})
+            keys.append(key)
+        return {"keys": keys}
+
+    def token(self, kid=None, username="benchmark"):
+        kid = kid or next(iter(self.private_keys))
+        private_key = self.private_keys.get(kid) or next(
+            iter(self.private_keys.values())
+        )
+        payload = {
+            "preferred_username": username,
+            "hashSnils": "benchmark",
+            "exp": int(time.time()) + 3600,
+        }
+        return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+def make_keycloak_handler(realm):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with realm.lock:
+                realm.requests += 1
+                failed = realm.failures > 0
+                realm.failures -= failed
+            time.sleep(realm.latency)
+            if realm.failing or failed:
+                self.send_response(503)
+                self.end_headers()
+                return
+            body = json.dumps(realm.jwks()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class LocalServer:
+    """
+    Локальный HTTP-сервер с keep-alive, считающий соединения и запросы.
+    """
+
+    def __init__(self):
+        self.connections = set()
+        self.attempts = {}
+        # Запросы ФИО и задержка ответа HR-API, сек.
+        self.employee_requests = 0
+        self.employee_delay = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _make_server_handler(self))
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.connections.clear()
+            self.attempts.clear()
+            self.employee_requests = 0
+
+
+def _make_server_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Заголовки и тело отправляются отдельно; без TCP_NODELAY ответ по
+        # keep-alive соединению ждет подтверждения клиента (~40 мс)
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            with server.lock:
+                server.connections.add(self.client_address)
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/flaky":
+                # Первые fail запросов с ключом key завершаются статусом 503
+                key = query["key"][0]
+                with server.lock:
+                    attempt = server.attempts[key] = server.attempts.get(key, 0) + 1
+                if attempt <= int(query["fail"][0]):
+                    return self._send(503, {"error": "unavailable"})
+            elif url.path == "/slow":
+                time.sleep(float(query["delay"][0]))
+            elif url.path.startswith("/api/Employee/by-hash/"):
+                hash_md5 = url.path.rsplit("/", 1)[1]
+                with server.lock:
+                    server.employee_requests += 1
+                time.sleep(server.employee_delay)
+                if hash_md5.startswith("unknown"):
+                    return self._send(404, {"error": "not found"})
+                return self._send(200, {"fullName": f"Сотрудник {hash_md5}"})
+            self._send(200, {"status": "ok"})
+
+        def do_POST(self):
+            # Тело читается, чтобы соединение можно было использовать дальше
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.do_GET()
+
+        def _send(self, code, data):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
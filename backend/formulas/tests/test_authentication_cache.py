@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+from unittest import mock
+import jwt
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from ..custom_auth import CustomJWTAuthentication
+from ..models import CustomUser
+from ..utils.token_cache import authentication_cache
+
+
+@override_settings(KEYCLOAK_VERIFY_SIGNATURE=False)
+class AuthenticationCacheTests(SimpleTestCase):
+    """
+    Повторная аутентификация тем же токеном не обращается к базе данных и
+    не передает один объект пользователя разным запросам.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        authentication_cache.clear()
+        self.addCleanup(authentication_cache.clear)
+
+        self.user = CustomUser(
+            id=7, username="ivanov", full_name="Иванов И. И.", is_staff=True
+        )
+        self.user._state.adding = False
+        self.user._state.db = "default"
+        patcher = mock.patch.object(
+            CustomUser.objects, "get_or_create", return_value=(self.user, False)
+        )
+        self.get_or_create = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.token = jwt.encode(
+            {"preferred_username": "ivanov", "exp": int(time.time()) + 3600},
+            "test-signing-key-not-verified-here",
+            algorithm="HS256",
+        )
+
+    def _authenticate(self):
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        user, _ = CustomJWTAuthentication().authenticate(request)
+        return user
+
+    def test_cached_user_is_a_copy(self):
+        first = self._authenticate()
+        second = self._authenticate()
+        self.assertEqual(self.get_or_create.call_count, 1)
+        self.assertEqual(authentication_cache.info()["hits"], 1)
+
+        self.assertIsNot(second, first)
+        self.assertEqual(second.pk, 7)
+        self.assertEqual(second.username, "ivanov")
+        self.assertEqual(second.full_name, "Иванов И. И.")
+        self.assertTrue(second.is_staff)
+        self.assertFalse(second._state.adding)
+        self.assertEqual(second._state.db, "default")
+
+        # Изменения объекта в одном запросе не видны в других
+        second.full_name = "Петров П. П."
+        second.is_staff = False
+        third = self._authenticate()
+        self.assertEqual(third.full_name, "Иванов И. И.")
+        self.assertTrue(third.is_staff)
+
+    def test_threads_get_own_objects(self):
+        self._authenticate()
+        users = []
+        threads = [
+            threading.Thread(target=lambda: users.append(self._authenticate()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(user) for user in users}), 8)
+        self.assertEqual(self.get_or_create.call_count, 1)
@@ -0,0 +1,142 @@
+import json
+import logging
+from unittest import mock, skipUnless
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory
+from ..api.calculation_api import MAX_BATCH_SIZE, calculate_batch
+from ..services import calculation_service
+from ..services.calculation_service import (
+    VECTORIZE_MIN_BATCH,
+    execute_calculation_batch,
+    get_calculation_plan,
+    prepare_input_data,
+)
+from ..services.vectorized_calculation import execute_calculation_plan_vectorized
+from ..utils.vectorized_formula import is_vectorization_available
+
+# Результат q = x / y; повторяемость неудовлетворительна при |x - y| > 10
+METHOD = {
+    "name": "Отношение",
+    "formula": "q",
+    "measurement_error": {"type": "formula", "value": "q*0.01"},
+    "unit": "у.е.",
+    "input_data": {"fields": [{"name": "x"}, {"name": "y"}]},
+    "intermediate_data": {
+        "fields": [{"name": "q", "formula": "x/y", "show_calculation": True}]
+    },
+    "convergence_conditions": {
+        "formulas": [
+            {"formula": "abs(x-y)>10", "convergence_value": "unsatisfactory"},
+        ]
+    },
+    "rounding_type": "decimal",
+    "rounding_decimal": 2,
+}
+
+
+def _input_sets(count):
+    return [{"x": str(index + 1), "y": "4"} for index in range(count)]
+
+
+class BatchCalculationTests(SimpleTestCase):
+    """
+    Пакетный расчет: выбор векторного движка по размеру пакета и ошибки
+    отдельных наборов.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.plan = get_calculation_plan(METHOD)
+
+    def _spy(self):
+        patcher = mock.patch.object(
+            calculation_service,
+            "execute_calculation_plan_vectorized",
+            wraps=calculation_service.execute_calculation_plan_vectorized,
+        )
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_vectorize_threshold(self):
+        spy = self._spy()
+        execute_calculation_batch(self.plan, _input_sets(VECTORIZE_MIN_BATCH - 1))
+        spy.assert_not_called()
+        execute_calculation_batch(self.plan, _input_sets(VECTORIZE_MIN_BATCH))
+        spy.assert_called_once()
+        execute_calculation_batch(
+            self.plan, _input_sets(VECTORIZE_MIN_BATCH), vectorize=False
+        )
+        spy.assert_called_once()
+
+    @skipUnless(is_vectorization_available(), "NumPy не установлен")
+    def test_failed_items_match_scalar(self):
+        input_sets = _input_sets(VECTORIZE_MIN_BATCH)
+        input_sets[2] = {"x": "1", "y": "0"}
+        input_sets[5] = {"x": "abc", "y": "1"}
+        input_sets[7] = {}
+        input_sets[9] = "x=1"
+        input_sets[11] = {"x": "1,5", "y": ""}
+
+        scalar = execute_calculation_batch(self.plan, input_sets, vectorize=False)
+        vectorized = execute_calculation_batch(self.plan, input_sets)
+        self.assertEqual(
+            json.dumps(vectorized, sort_keys=True), json.dumps(scalar, sort_keys=True)
+        )
+        self.assertEqual(
+            [item["index"] for item in vectorized if item["status"] == "error"],
+            [2, 5, 7, 9, 11],
+        )
+        self.assertEqual(
+            vectorized[7]["error"], "Необходимо предоставить входные данные"
+        )
+        # Остальные наборы вычислены векторно, а не скалярным движком
+        computed = execute_calculation_plan_vectorized(
+            self.plan,
+            [
+                prepare_input_data(item) if isinstance(item, dict) and item else None
+                for item in input_sets
+            ],
+        )
+        self.assertEqual(
+            [index for index, item in enumerate(computed) if item is None],
+            [2, 5, 7, 9, 11],
+        )
+        self.assertEqual(vectorized[3]["result"], "1.00")
+        self.assertEqual(vectorized[15]["convergence"], "unsatisfactory")
+
+    def test_error_in_vectorized_engine_falls_back_to_scalar(self):
+        input_sets = _input_sets(VECTORIZE_MIN_BATCH)
+        expected = execute_calculation_batch(self.plan, input_sets, vectorize=False)
+        with mock.patch.object(
+            calculation_service,
+            "execute_calculation_plan_vectorized",
+            side_effect=RuntimeError("сбой"),
+        ):
+            self.assertEqual(execute_calculation_batch(self.plan, input_sets), expected)
+
+    def _post(self, input_data_list):
+        request = APIRequestFactory().post(
+            "/api/calculate-batch/",
+            {"research_method": METHOD, "input_data_list": input_data_list},
+            format="json",
+        )
+        return calculate_batch(request)
+
+    def test_api(self):
+        input_sets = _input_sets(3) + [{"x": "1", "y": "0"}]
+        response = self._post(input_sets)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["succeeded"], response.data["failed"]), (3, 1))
+        self.assertEqual(
+            [item["status"] for item in response.data["results"]],
+            ["success", "success", "success", "error"],
+        )
+
+    def test_api_rejects_large_batch(self):
+        spy = self._spy()
+        response = self._post(_input_sets(MAX_BATCH_SIZE + 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(MAX_BATCH_SIZE), response.data["error"])
+        spy.assert_not_called()
+        self.assertEqual(self._post(_input_sets(MAX_BATCH_SIZE)).status_code, 200)
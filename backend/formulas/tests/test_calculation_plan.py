@@ -0,0 +1,116 @@
+from django.test import SimpleTestCase
+from rest_framework import serializers
+from ..models import ResearchMethod
+from ..serializers import ResearchMethodSerializer
+from ..services.calculation_service import execute_calculation_plan
+from ..utils.calculation_plan import build_calculation_plan
+
+
+def _method(fields, formula="x", rounding_type="decimal"):
+    return {
+        "formula": formula,
+        "measurement_error": {},
+        "unit": "%",
+        "input_data": {"fields": []},
+        "intermediate_data": {
+            "fields": [
+                {"name": name, "formula": field_formula, "show_calculation": True}
+                for name, field_formula in fields
+            ]
+        },
+        "convergence_conditions": {"formulas": []},
+        "rounding_type": rounding_type,
+        "rounding_decimal": 2,
+    }
+
+
+class CalculationPlanOrderTests(SimpleTestCase):
+    def _order(self, fields, formula="x"):
+        plan = build_calculation_plan(_method(fields, formula))
+        return [step["name"] for step in plan["steps"]]
+
+    def test_dependencies_before_dependents(self):
+        order = self._order([("c", "b + 1"), ("b", "a * 2"), ("a", "m1 + m2")])
+        self.assertEqual(order, ["a", "b", "c"])
+
+    def test_keeps_list_order_when_valid(self):
+        order = self._order([("p", "m1"), ("q", "m2"), ("r", "p + q")])
+        self.assertEqual(order, ["p", "q", "r"])
+
+    def test_independent_fields_keep_list_order(self):
+        # q не зависит от остальных и остается на своем месте в списке
+        order = self._order([("r", "p * 2"), ("q", "m2"), ("p", "m1")])
+        self.assertEqual(order, ["q", "p", "r"])
+
+    def test_depends_on(self):
+        plan = build_calculation_plan(
+            _method([("b", "a + a2"), ("a", "m"), ("a2", "m")])
+        )
+        steps = {step["name"]: step for step in plan["steps"]}
+        self.assertEqual(steps["b"]["depends_on"], ["a", "a2"])
+        self.assertEqual(steps["a"]["depends_on"], [])
+
+    def test_cycle(self):
+        with self.assertRaisesMessage(
+            ValueError, "Циклическая зависимость промежуточных полей: a, b"
+        ):
+            build_calculation_plan(
+                _method([("a", "b + 1"), ("b", "a * 2"), ("c", "m")])
+            )
+
+    def test_self_reference_is_not_cycle(self):
+        # Поле может ссылаться на входное значение с тем же именем
+        plan = build_calculation_plan(_method([("a", "a * 2")]))
+        self.assertEqual([step["name"] for step in plan["steps"]], ["a"])
+
+    def test_duplicate_names_last_wins(self):
+        # Как при расчете по списку полей: последнее значение перезаписывает
+        # предыдущее
+        with self.assertLogs("formulas.utils.calculation_plan", "WARNING") as logs:
+            plan = build_calculation_plan(
+                _method([("a₁", "m"), ("b", "m + 1"), ("a1", "m * 2")], "a1 + b")
+            )
+        self.assertIn("Повторяющееся имя промежуточного поля: a₁", logs.output[0])
+        self.assertEqual(
+            [(step["name"], step["formula"]) for step in plan["steps"]],
+            [("b", "m + 1"), ("a1", "m * 2")],
+        )
+        response = execute_calculation_plan(plan, {"m": "3"})
+        self.assertEqual(response["intermediate_results"], {"b": "4.0", "a1": "6.0"})
+        self.assertEqual(response["result"], "10.00")
+
+
+class ResearchMethodPlanValidationTests(SimpleTestCase):
+    def _validate(self, instance, fields):
+        serializer = ResearchMethodSerializer(instance=instance)
+        return serializer.validate(
+            {"intermediate_data": _method(fields)["intermediate_data"]}
+        )
+
+    def _instance(self, fields):
+        return ResearchMethod(id=1, name="Метод", **_method(fields))
+
+    def test_new_method_with_cycle_is_rejected(self):
+        serializer = ResearchMethodSerializer()
+        with self.assertRaises(serializers.ValidationError) as context:
+            serializer.validate(_method([("a", "b"), ("b", "a")]))
+        self.assertIn("calculation_plan", context.exception.detail)
+
+    def test_edit_introducing_cycle_is_rejected(self):
+        instance = self._instance([("a", "m"), ("b", "a")])
+        with self.assertRaises(serializers.ValidationError) as context:
+            self._validate(instance, [("a", "b"), ("b", "a")])
+        self.assertIn("calculation_plan", context.exception.detail)
+
+    def test_stored_method_with_cycle_stays_editable(self):
+        instance = self._instance([("a", "b"), ("b", "a")])
+        with self.assertLogs("formulas.serializers", "WARNING"):
+            data = self._validate(instance, [("a", "b"), ("b", "a"), ("c", "m")])
+        self.assertEqual(data["calculation_plan"], {})
+
+    def test_fixed_method_gets_plan(self):
+        instance = self._instance([("a", "b"), ("b", "a")])
+        data = self._validate(instance, [("a", "m"), ("b", "a")])
+        self.assertEqual(
+            [step["name"] for step in data["calculation_plan"]["steps"]], ["a", "b"]
+        )
@@ -0,0 +1,164 @@
+import logging
+from unittest import mock
+from django.test import SimpleTestCase
+from ..services.calculation_service import (
+    execute_calculation_plan,
+    get_calculation_plan,
+    select_convergence,
+)
+from ..utils.formula_compiler import FUNCTIONS
+from ..utils.formula_utils import (
+    ConditionEvaluation,
+    VariableBinding,
+    calculate_convergence_steps,
+    clear_formula_cache,
+    evaluate_formula,
+)
+
+# Второе и третье условия содержат сравнения, пропускаемые при and/or
+CONDITIONS = [
+    "abs(x-y₁)<=0.5",
+    "abs(x-y₁)>0.5 and abs(x)>100 and abs(y₁)>0",
+    "abs(x)>1 or abs(y₁)>1",
+    "not abs(x-y₁)>=2",
+    "1>0",
+]
+
+INPUTS = [
+    {"x": "1,5", "y₁": "1.2"},
+    {"x": "1.5", "y₁": "3"},
+    {"x": "150", "y₁": "0"},
+    {"x": "0", "y₁": "-0.5"},
+]
+
+
+class ConditionEvaluationTests(SimpleTestCase):
+    """
+    Условия повторяемости вычисляются один раз, а шаги расчета совпадают с
+    шагами, которые строятся вычислением условия заново.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        # Функция abs считает вызовы; формулы компилируются заново с ней
+        self.calls = 0
+
+        def counting_abs(value):
+            self.calls += 1
+            return abs(value)
+
+        patcher = mock.patch.dict(FUNCTIONS, {"abs": (counting_abs, 1, 1)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        clear_formula_cache()
+        self.addCleanup(clear_formula_cache)
+
+    def _expected(self, input_data):
+        # Как раньше: каждое условие и каждая его часть вычисляются отдельно
+        calls = self.calls
+        results = [
+            evaluate_formula(formula, input_data, is_condition=True)
+            for formula in CONDITIONS
+        ]
+        steps = [
+            calculate_convergence_steps(formula, input_data) for formula in CONDITIONS
+        ]
+        self.calls = calls
+        return results, steps
+
+    def test_each_comparison_is_evaluated_once(self):
+        # Вызовы abs во вычисленных сравнениях каждого условия
+        evaluated = {
+            0: [1, 1, 1, 1, 0],
+            1: [1, 2, 1, 1, 0],
+            2: [1, 3, 1, 1, 0],
+            3: [1, 1, 2, 1, 0],
+        }
+        # Вызовы abs во всех сравнениях условия
+        total = [1, 3, 2, 1, 0]
+        for case, input_data in enumerate(INPUTS):
+            with self.subTest(input_data=input_data):
+                self.calls = 0
+                evaluation = ConditionEvaluation(
+                    CONDITIONS, VariableBinding(input_data)
+                )
+                self.assertEqual(self.calls, sum(evaluated[case]))
+                for index in range(len(CONDITIONS)):
+                    self.calls = 0
+                    evaluation.calculation_steps(index)
+                    # Вычисляются только сравнения, пропущенные при and/or
+                    self.assertEqual(self.calls, total[index] - evaluated[case][index])
+
+    def test_matches_separate_evaluation(self):
+        for input_data in INPUTS:
+            with self.subTest(input_data=input_data):
+                evaluation = ConditionEvaluation(
+                    CONDITIONS, VariableBinding(input_data)
+                )
+                results, steps = self._expected(input_data)
+                self.assertEqual(evaluation.results, results)
+                self.assertEqual(
+                    [
+                        evaluation.calculation_steps(index)
+                        for index in range(len(CONDITIONS))
+                    ],
+                    steps,
+                )
+
+    def test_error_message(self):
+        with self.assertRaises(ValueError) as expected:
+            evaluate_formula("x/y₁>1", {"x": "1", "y₁": "0"}, is_condition=True)
+        with self.assertRaises(ValueError) as context:
+            ConditionEvaluation(
+                ["x>0", "x/y₁>1"], VariableBinding({"x": "1", "y₁": "0"})
+            )
+        self.assertEqual(str(context.exception), str(expected.exception))
+
+    def test_conditions_info(self):
+        convergence_values = [
+            "satisfactory",
+            "unsatisfactory",
+            "traces",
+            "unsatisfactory",
+            "satisfactory",
+        ]
+        method = {
+            "formula": "x",
+            "measurement_error": {"type": "fixed", "value": "0.1"},
+            "unit": "%",
+            "input_data": {"fields": [{"name": "x"}, {"name": "y₁"}]},
+            "intermediate_data": {"fields": []},
+            "convergence_conditions": {
+                "formulas": [
+                    {"formula": formula, "convergence_value": value}
+                    for formula, value in zip(CONDITIONS, convergence_values)
+                ]
+            },
+            "rounding_type": "decimal",
+            "rounding_decimal": 2,
+        }
+        plan = get_calculation_plan(method)
+        for input_data in INPUTS:
+            with self.subTest(input_data=input_data):
+                response = execute_calculation_plan(plan, input_data)
+                results, steps = self._expected(input_data)
+                convergence, _ = select_convergence(
+                    plan["convergence_conditions"], results
+                )
+                self.assertEqual(response["convergence"], convergence)
+                self.assertEqual(
+                    response["conditions_info"],
+                    [
+                        {
+                            "formula": formula,
+                            "satisfied": result,
+                            "convergence_value": value,
+                            "calculation_steps": step,
+                        }
+                        for formula, value, result, step in zip(
+                            CONDITIONS, convergence_values, results, steps
+                        )
+                        if value == convergence
+                    ],
+                )
@@ -0,0 +1,166 @@
+from io import StringIO
+import logging
+import time
+from unittest import mock
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from ..management.commands import refresh_employee_names
+from .stub_servers import LocalServer
+from ..utils import employee_utils
+from ..utils.employee_utils import EmployeeNameCache
+from ..utils.http_client import clear_http_client
+
+# Общий кэш в памяти вместо таблицы в базе данных ("shared")
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "names": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "employee-names-tests",
+    },
+}
+
+
+def _make_cache(negative_timeout=0.2, timeout=60):
+    return EmployeeNameCache(
+        maxsize=100,
+        backend="names",
+        timeout=timeout,
+        negative_timeout=negative_timeout,
+    )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class EmployeeNameCacheTests(SimpleTestCase):
+    """
+    ФИО хранятся в кэше процесса и в общем кэше; неудачный запрос
+    запоминается на negative_timeout секунд.
+    """
+
+    def setUp(self):
+        caches["names"].clear()
+
+    def test_shared_between_processes(self):
+        first, second = _make_cache(), _make_cache()
+        first.set_many({"a": "Иванов И. И.", "b": ""})
+        self.assertEqual(
+            second.get_many(["a", "b", "c"]), {"a": "Иванов И. И.", "b": ""}
+        )
+        info = second.info()
+        self.assertEqual((info["shared_hits"], info["misses"]), (2, 1))
+
+    def test_negative_entry_expires(self):
+        first, second = _make_cache(), _make_cache()
+        first.set_many({"a": "Иванов И. И.", "b": ""})
+        self.assertEqual(first.get("b"), "")
+        time.sleep(0.3)
+        # Пустое ФИО истекло и в процессе, и в общем кэше, найденное - нет
+        self.assertIsNone(first.get("b"))
+        self.assertIsNone(second.get("b"))
+        self.assertEqual(first.get("a"), "Иванов И. И.")
+        self.assertEqual(second.get("a"), "Иванов И. И.")
+
+    def test_shared_entry_keeps_remaining_lifetime(self):
+        # Запись из общего кэша действует в процессе только оставшееся время
+        first, second = _make_cache(timeout=0.5), _make_cache(timeout=0.5)
+        first.set("a", "Иванов И. И.")
+        time.sleep(0.3)
+        self.assertEqual(second.get("a"), "Иванов И. И.")
+        time.sleep(0.3)
+        self.assertIsNone(first.get("a"))
+        self.assertIsNone(second.get("a"))
+
+    def test_shared_entry_without_expiration_time(self):
+        # Запись, сохраненная без времени истечения, действует в процессе
+        # negative_timeout секунд
+        key = EmployeeNameCache.make_key("a")
+        caches["names"].set(key, "Иванов И. И.", 60)
+        cache = _make_cache()
+        self.assertEqual(cache.get("a"), "Иванов И. И.")
+        caches["names"].delete(key)
+        self.assertEqual(cache.get("a"), "Иванов И. И.")
+        time.sleep(0.3)
+        self.assertIsNone(cache.get("a"))
+
+    def test_without_shared_backend(self):
+        cache = EmployeeNameCache(maxsize=2, backend=None, negative_timeout=0.2)
+        cache.set_many({"a": "А", "b": "Б", "c": "В"})
+        # Вытесняется давно не использованная запись
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"b": "Б", "c": "В"})
+        self.assertEqual(_make_cache().get_many(["b", "c"]), {})
+
+
+@override_settings(CACHES=TEST_CACHES, HTTP_RETRIES=0)
+class RefreshEmployeeNamesTests(SimpleTestCase):
+    """
+    Команда refresh_employee_names запрашивает ФИО списком и обновляет кэш.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = LocalServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        caches["names"].clear()
+        clear_http_client()
+        self.addCleanup(clear_http_client)
+        self.server.reset()
+        self.server.employee_delay = 0
+        self.cache = _make_cache(negative_timeout=60)
+        for target in (employee_utils, refresh_employee_names):
+            patcher = mock.patch.object(target, "employee_name_cache", self.cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(employee_utils, "HR_API_URL", self.server.url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _refresh(self, *hashes, **options):
+        output = StringIO()
+        arguments = [f"--hash={hash_md5}" for hash_md5 in hashes]
+        call_command("refresh_employee_names", *arguments, stdout=output, **options)
+        return output.getvalue()
+
+    def test_refresh(self):
+        self.cache.set("hash1", "Старое ФИО")
+        output = self._refresh("hash1", "hash2", "unknown-1")
+        self.assertEqual(self.server.employee_requests, 3)
+        self.assertIn("получено 2, не получено 1", output)
+        self.assertEqual(
+            _make_cache().get_many(["hash1", "hash2", "unknown-1"]),
+            {"hash1": "Сотрудник hash1", "hash2": "Сотрудник hash2"},
+        )
+
+    def test_failed_request_keeps_stored_name(self):
+        self.cache.set("unknown-2", "Сохраненное ФИО")
+        self._refresh("unknown-2")
+        self.assertEqual(self.cache.get("unknown-2"), "Сохраненное ФИО")
+
+    def test_missing_only(self):
+        self.cache.set_many({"hash1": "Сотрудник hash1", "unknown-3": ""})
+        self._refresh("hash1", "hash3", "unknown-3", missing=True)
+        # Неудачный запрос запрашивается снова, найденное ФИО - нет
+        self.assertEqual(self.server.employee_requests, 2)
+        self.assertEqual(
+            self._refresh("hash1", missing=True).strip(),
+            "Нет сотрудников для обновления",
+        )
+
+    def test_requests_are_concurrent(self):
+        self.server.employee_delay = 0.05
+        hashes = [f"hash{index}" for index in range(16)]
+        started = time.perf_counter()
+        self._refresh(*hashes, workers=8)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(self.server.employee_requests, 16)
+        self.assertLess(elapsed, 16 * 0.05 / 2)
+        self.assertEqual(len(self.cache.get_many(hashes)), 16)
@@ -0,0 +1,82 @@
+import random
+import struct
+from decimal import Decimal
+from unittest import skipUnless
+from django.test import SimpleTestCase
+from ..utils.formula_compiler import FormulaSyntaxError, compile_node, parse
+from ..utils.formula_utils import evaluate_formula
+from ..utils.vectorized_formula import (
+    VectorContext,
+    compile_vector_formula,
+    is_vectorization_available,
+    np,
+)
+
+
+def _bits(value):
+    return struct.pack("d", float(value))
+
+
+class IntegerDivisionTests(SimpleTestCase):
+    """
+    Операторы // и % вычисляются так же, как eval в прежнем движке.
+    """
+
+    FORMULAS = ("a % b", "a // b", "a // 2 + b % 3", "-a % b * 2", "a ** 2 // b")
+
+    def _cases(self, count=500):
+        rng = random.Random(20240611)
+        for _ in range(count):
+            a = rng.choice([rng.uniform(-1000, 1000), float(rng.randint(-50, 50))])
+            b = rng.choice([rng.uniform(-100, 100), float(rng.randint(1, 9))])
+            yield {"a": a, "b": b}
+
+    def test_matches_python(self):
+        for formula in self.FORMULAS:
+            function = compile_node(parse(formula))
+            for values in self._cases():
+                with self.subTest(formula=formula, values=values):
+                    self.assertEqual(
+                        _bits(function(values)), _bits(eval(formula, {}, values))
+                    )
+
+    def test_precedence(self):
+        self.assertEqual(compile_node(parse("7 - 5 % 3 * 2"))({}), 7 - 5 % 3 * 2)
+        self.assertEqual(compile_node(parse("2 ** 5 // 3"))({}), 2**5 // 3)
+        self.assertEqual(compile_node(parse("-7 // 2"))({}), -7 // 2)
+
+    def test_evaluate_formula(self):
+        self.assertEqual(evaluate_formula("a % 4", {"a": "10,5"}), Decimal("2.5"))
+        self.assertEqual(evaluate_formula("a // 4", {"a": "10,5"}), Decimal("2.0"))
+        with self.assertRaises(ValueError):
+            evaluate_formula("a % b", {"a": "1", "b": "0"})
+
+    def test_invalid_syntax(self):
+        for formula in ("a %% b", "a /// b", "% a"):
+            with self.subTest(formula=formula):
+                with self.assertRaises(FormulaSyntaxError):
+                    parse(formula)
+
+    @skipUnless(is_vectorization_available(), "NumPy не установлен")
+    def test_vectorized_matches_scalar(self):
+        cases = list(self._cases()) + [{"a": 5.0, "b": 0.0}]
+        columns = {
+            "a": np.array([values["a"] for values in cases]),
+            "b": np.array([values["b"] for values in cases]),
+        }
+        for formula in self.FORMULAS:
+            compiled = compile_vector_formula(formula)
+            self.assertIsNotNone(compiled, formula)
+            context = VectorContext(columns, len(cases))
+            result = compiled.evaluate(context)
+            function = compile_node(parse(formula))
+            for index, values in enumerate(cases):
+                with self.subTest(formula=formula, values=values):
+                    try:
+                        expected = function(values)
+                    except ZeroDivisionError:
+                        # Набор пересчитывается скалярным движком
+                        self.assertTrue(context.invalid[index])
+                        continue
+                    self.assertFalse(context.invalid[index])
+                    self.assertEqual(_bits(result[index]), _bits(expected))
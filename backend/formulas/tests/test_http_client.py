@@ -0,0 +1,159 @@
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from django.test import SimpleTestCase, override_settings
+from .stub_servers import LocalServer
+from ..utils.http_client import HttpClient, clear_http_client, get_http_client
+
+
+class HttpClientTests(SimpleTestCase):
+    """
+    Общий HTTP-клиент на локальном сервере с keep-alive.
+    """
+
+    POOL_MAXSIZE = 4
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = LocalServer()
+        cls.server.start()
+        cls.host = urlsplit(cls.server.url).netloc
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.reset()
+        self.client = HttpClient(
+            connect_timeout=1,
+            read_timeout=0.3,
+            retries=2,
+            backoff_factor=0.01,
+            pool_maxsize=self.POOL_MAXSIZE,
+        )
+        self.addCleanup(self.client.close)
+
+    def _metrics(self):
+        return self.client.info()[self.host]
+
+    def test_sequential_requests_reuse_connection(self):
+        for _ in range(50):
+            self.assertTrue(self.client.get(f"{self.server.url}/ok").ok)
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(self._metrics()["requests"], 50)
+        self.assertEqual(self._metrics()["connections"], 1)
+
+    def test_concurrent_requests_are_bounded_by_pool(self):
+        results = []
+
+        def worker():
+            for _ in range(25):
+                results.append(self.client.get(f"{self.server.url}/ok").ok)
+
+        threads = [threading.Thread(target=worker) for _ in range(self.POOL_MAXSIZE)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True] * 25 * self.POOL_MAXSIZE)
+        self.assertLessEqual(len(self.server.connections), self.POOL_MAXSIZE)
+
+    def test_get_is_retried_on_503(self):
+        response = self.client.get(f"{self.server.url}/flaky?key=get&fail=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.attempts["get"], 3)
+        self.assertEqual(self._metrics()["retries"], 2)
+        self.assertEqual(self._metrics()["errors"], 0)
+
+    def test_exhausted_retries_return_last_response(self):
+        response = self.client.get(f"{self.server.url}/flaky?key=fail&fail=10")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.attempts["fail"], 3)
+        self.assertEqual(self._metrics()["errors"], 1)
+
+    def test_post_is_not_retried(self):
+        # Повтор запроса, изменяющего данные, мог бы выполнить его дважды
+        response = self.client.session.post(
+            f"{self.server.url}/flaky?key=post&fail=1", data=b"{}", timeout=1
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.attempts["post"], 1)
+
+    def test_read_timeout_is_not_retried(self):
+        started = time.perf_counter()
+        with self.assertRaises(requests.RequestException):
+            self.client.get(f"{self.server.url}/slow?delay=1")
+        elapsed = time.perf_counter() - started
+        # Одна попытка 0,3 с: повтор после таймаута чтения ждал бы снова
+        self.assertGreaterEqual(elapsed, 0.3)
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(self._metrics()["errors"], 1)
+        self.assertEqual(self._metrics()["requests"], 1)
+        self.assertEqual(self._metrics()["retries"], 0)
+
+    def test_connect_error_is_retried(self):
+        # Порт закрытого сервера: каждая попытка - ошибка соединения
+        server = LocalServer()
+        server.httpd.server_close()
+        started = time.perf_counter()
+        with self.assertRaises(requests.ConnectionError) as context:
+            self.client.get(f"{server.url}/ok")
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertIn("Max retries exceeded", str(context.exception))
+        self.assertEqual(self.client.info()[urlsplit(server.url).netloc]["errors"], 1)
+
+    def test_max_duration(self):
+        # Три попытки по 1 + 0,3 с и задержка 0,02 с перед вторым повтором
+        self.assertAlmostEqual(self.client.max_duration(), 3.92)
+        self.assertAlmostEqual(self.client.max_duration(2), 12.02)
+        client = HttpClient(retries=0)
+        self.addCleanup(client.close)
+        self.assertEqual(client.max_duration(5), 10)
+
+    def test_connections_are_idle_pooled_connections(self):
+        url = f"{self.server.url}/ok"
+        for _ in range(3):
+            self.client.get(url)
+        self.assertEqual(
+            (self._metrics()["connections"], self._metrics()["connections_created"]),
+            (1, 1),
+        )
+        # Соединение, занятое запросом, не ожидает в пуле
+        pools = self.client.adapter.poolmanager.pools
+        self.assertEqual(len(pools), 1)
+        pool = pools.get(next(iter(pools.keys())))
+        connection = pool._get_conn()
+        self.assertEqual(self._metrics()["connections"], 0)
+        # Новое соединение вместо потерянного: всего создано два, открыто одно
+        connection.close()
+        self.client.get(url)
+        self.assertEqual(
+            (self._metrics()["connections"], self._metrics()["connections_created"]),
+            (1, 2),
+        )
+
+    def test_request_timeout_overrides_client_timeout(self):
+        started = time.perf_counter()
+        with self.assertRaises(requests.RequestException):
+            self.client.get(f"{self.server.url}/slow?delay=1", timeout=0.1)
+        self.assertLess(time.perf_counter() - started, 0.8)
+
+    @override_settings(
+        HTTP_CONNECT_TIMEOUT=2,
+        HTTP_READ_TIMEOUT=7,
+        HTTP_RETRIES=1,
+        HTTP_RETRY_BACKOFF=0,
+        HTTP_POOL_MAXSIZE=3,
+    )
+    def test_shared_client_uses_settings(self):
+        clear_http_client()
+        self.addCleanup(clear_http_client)
+        client = get_http_client()
+        self.assertIs(get_http_client(), client)
+        self.assertEqual(client.timeout, (2, 7))
+        self.assertEqual(client.adapter.max_retries.total, 1)
+        self.assertEqual(client.adapter._pool_maxsize, 3)
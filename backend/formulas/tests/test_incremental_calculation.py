@@ -0,0 +1,59 @@
+import logging
+from django.test import SimpleTestCase
+from ..services.calculation_service import (
+    execute_calculation_plan,
+    execute_calculation_plan_incremental,
+    get_calculation_plan,
+    prepare_input_data,
+)
+from ..services.result_cache import result_cache
+from ..utils.benchmark_utils import generate_input_sets, load_fixture_methods
+
+
+class IncrementalResultCacheTests(SimpleTestCase):
+    """
+    Инкрементальный расчет использует кэш результатов так же, как обычный.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        result_cache.clear()
+        self.addCleanup(result_cache.clear)
+
+        # Метод без справочных таблиц: их версии читаются из базы данных
+        for _, method in load_fixture_methods():
+            self.plan = get_calculation_plan(method)
+            if not self.plan.get("tables"):
+                break
+        self.input_sets = generate_input_sets(method, 2, seed=20240611)
+
+    def _strip(self, response_data):
+        response_data = dict(response_data)
+        response_data.pop("evaluation_token")
+        response_data.pop("recalculated_fields")
+        return response_data
+
+    def test_repeated_input_is_served_from_cache(self):
+        first_input, second_input = self.input_sets
+        expected = execute_calculation_plan(self.plan, prepare_input_data(first_input))
+
+        first = execute_calculation_plan_incremental(self.plan, first_input)
+        self.assertEqual(self._strip(first), expected)
+        self.assertEqual(result_cache.info()["hits"], 0)
+
+        # Тот же расчет без токена (другая вкладка, обновленная страница)
+        second = execute_calculation_plan_incremental(self.plan, first_input)
+        self.assertEqual(result_cache.info()["hits"], 1)
+        self.assertEqual(self._strip(second), expected)
+        self.assertEqual(second["recalculated_fields"], [])
+        self.assertNotEqual(second["evaluation_token"], first["evaluation_token"])
+
+        # Токен, полученный из кэша, годится для следующего расчета
+        third = execute_calculation_plan_incremental(
+            self.plan, None, second["evaluation_token"], second_input
+        )
+        self.assertEqual(
+            self._strip(third),
+            execute_calculation_plan(self.plan, prepare_input_data(second_input)),
+        )
@@ -0,0 +1,142 @@
+from http.server import ThreadingHTTPServer
+import logging
+import threading
+import time
+from django.test import SimpleTestCase, override_settings
+from ..utils.http_client import clear_http_client
+from ..utils.keycloak_keys import PublicKeyCache, PublicKeyError
+from .stub_servers import KeycloakRealm, make_keycloak_handler
+
+
+# Каждая загрузка ключей - один запрос, без повторов
+@override_settings(HTTP_RETRIES=0)
+class PublicKeyCacheTests(SimpleTestCase):
+    """
+    Кэш открытых ключей на локальном заменителе Keycloak.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.realm = KeycloakRealm(latency=0.02)
+        cls.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), make_keycloak_handler(cls.realm)
+        )
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/certs"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        clear_http_client()
+        self.addCleanup(clear_http_client)
+        self.realm.failing = False
+        self.realm.failures = 0
+        self.realm.rotate("key-1")
+        self.keys = PublicKeyCache(self.url, timeout=2, min_refresh_interval=0.2)
+
+    def _same_key(self, key, kid):
+        expected = self.realm.private_keys[kid].public_key().public_numbers()
+        return key.public_numbers() == expected
+
+    def test_single_flight(self):
+        # Одновременные запросы без загруженных ключей: одна загрузка
+        threads_count = 20
+        barrier = threading.Barrier(threads_count)
+        results = []
+
+        def worker():
+            barrier.wait()
+            try:
+                results.append(self._same_key(self.keys.get_key("key-1"), "key-1"))
+            except PublicKeyError:
+                results.append(False)
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True] * threads_count)
+        self.assertEqual(self.keys.fetches, 1)
+
+    @override_settings(HTTP_RETRIES=4, HTTP_RETRY_BACKOFF=0)
+    def test_waiters_wait_for_retries(self):
+        # Загрузка с четырьмя повторами длится дольше таймаута запроса; потоки,
+        # ждущие ее, получают ключи, а не ошибку
+        self.realm.failures = 4
+        self.realm.latency = 0.35
+        self.addCleanup(setattr, self.realm, "latency", self.realm.latency)
+        keys = PublicKeyCache(self.url, timeout=0.4, min_refresh_interval=10)
+        threads_count = 5
+        barrier = threading.Barrier(threads_count)
+        results = []
+
+        def worker():
+            barrier.wait()
+            try:
+                results.append(self._same_key(keys.get_key("key-1"), "key-1"))
+            except PublicKeyError:
+                results.append(False)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreater(time.perf_counter() - started, keys.timeout + 1)
+        self.assertEqual(results, [True] * threads_count)
+        self.assertEqual(keys.fetches, 1)
+
+    def test_stale_keys_on_failure(self):
+        # Keycloak недоступен, срок ключей истек: используются сохраненные
+        self.keys.get_key("key-1")
+        self.realm.failing = True
+        self.keys.ttl = 0.05
+        time.sleep(0.1)
+        fetches = self.keys.fetches
+        for _ in range(50):
+            self.assertTrue(self._same_key(self.keys.get_key("key-1"), "key-1"))
+        time.sleep(0.3)
+        self.assertTrue(self._same_key(self.keys.get_key("key-1"), "key-1"))
+        # Фоновые попытки загрузки не чаще min_refresh_interval
+        time.sleep(0.1)
+        self.assertLessEqual(self.keys.fetches - fetches, 2)
+
+    def test_key_rotation(self):
+        # Токен с новым kid вызывает загрузку ключей
+        self.keys.get_key("key-1")
+        time.sleep(0.3)
+        self.realm.rotate("key-2")
+        fetches = self.keys.fetches
+        self.assertTrue(self._same_key(self.keys.get_key("key-2"), "key-2"))
+        self.assertEqual(self.keys.fetches - fetches, 1)
+
+    def test_unknown_kid_flood(self):
+        # Подбор kid не приводит к загрузке на каждый токен
+        self.keys.get_key("key-1")
+        time.sleep(0.3)
+        fetches = self.keys.fetches
+        for index in range(50):
+            with self.assertRaises(PublicKeyError):
+                self.keys.get_key(f"unknown-{index}")
+        self.assertLessEqual(self.keys.fetches - fetches, 1)
+
+    def test_no_keys_and_keycloak_unavailable(self):
+        # Ключей нет и Keycloak недоступен: повторные запросы не ждут ответа
+        self.realm.failing = True
+        with self.assertRaises(PublicKeyError):
+            self.keys.get_key("key-1")
+        started = time.perf_counter()
+        for _ in range(20):
+            with self.assertRaises(PublicKeyError):
+                self.keys.get_key("key-1")
+        self.assertLess(time.perf_counter() - started, self.realm.latency)
+        self.assertEqual(self.keys.fetches, 1)
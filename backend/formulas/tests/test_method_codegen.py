@@ -0,0 +1,241 @@
+from collections import Counter
+import logging
+import os
+import tempfile
+from django.test import SimpleTestCase
+from ..services.calculation_service import (
+    CalculationError,
+    _complete_calculation,
+    _evaluate_steps,
+    execute_calculation_plan,
+    get_calculation_plan,
+    prepare_input_data,
+)
+from ..utils.benchmark_utils import generate_edge_input_sets, load_fixture_methods
+from ..utils.method_codegen import _load_code, _save_code, get_method_function
+
+# Повторяющиеся подвыражения, постоянные части, округление полей, диапазоны
+# и все ветви повторяемости
+METHOD = {
+    "formula": "a+c+r+e",
+    "measurement_error": {"type": "formula", "value": "result*0.01+abs(x-y)/10"},
+    "unit": "%",
+    "input_data": {"fields": [{"name": "x"}, {"name": "y"}]},
+    "intermediate_data": {
+        "fields": [
+            {"name": "a", "formula": "(x+y)/2+(x+y)/2*0+2*3"},
+            {"name": "b", "formula": "pow(abs(x-y),2)+abs(x-y)"},
+            {
+                "name": "c",
+                "formula": "a*b/(x+y+1)",
+                "use_multiple_rounding": True,
+                "rounding_type": "decimal",
+                "rounding_decimal": 3,
+            },
+            {
+                "name": "d",
+                "formula": "b+(x+y)/2",
+                "use_multiple_rounding": True,
+                "rounding_type": "multiple",
+                "multiple_value": "0.5",
+            },
+            {
+                "name": "e",
+                "formula": "max(a,b,d)-min(x,y)",
+                "show_calculation": False,
+            },
+            {
+                "name": "r",
+                "formula": "0",
+                "range_calculation": {
+                    "ranges": [
+                        {"condition": "x<0", "formula": "-1"},
+                        {"condition": "0<=x<=10", "formula": "x*2"},
+                        {"condition": "10<x<=100", "formula": "x+(x+y)/2"},
+                    ]
+                },
+            },
+        ]
+    },
+    "convergence_conditions": {
+        "formulas": [
+            {
+                "formula": "abs(x-y)>50",
+                "convergence_value": "custom",
+                "custom_value": "более 50",
+            },
+            {"formula": "x<0", "convergence_value": "absence"},
+            {"formula": "x=0 and y=0", "convergence_value": "traces"},
+            {
+                "formula": "abs(x-y)>5 and abs(x-y)<=50",
+                "convergence_value": "unsatisfactory",
+            },
+            {"formula": "abs(x-y)<=5", "convergence_value": "satisfactory"},
+        ]
+    },
+    "rounding_type": "significant",
+    "rounding_decimal": 3,
+}
+
+INPUTS = [
+    {"x": "1", "y": "2"},
+    {"x": "1,5", "y": "2"},
+    {"x": "1", "y": "10"},
+    {"x": "0", "y": "0"},
+    {"x": "-5", "y": "1"},
+    {"x": "1", "y": "100"},
+    {"x": "200", "y": "199"},
+    {"x": "50", "y": "50.5"},
+    {"x": "10", "y": ""},
+    {"x": "1e-12", "y": "3"},
+    # Ошибки: деление на ноль, нечисловое значение, переполнение
+    {"x": "2", "y": "-3"},
+    {"x": "abc", "y": "1"},
+    {"x": "1e308", "y": "1e308"},
+]
+
+
+def _typed(value):
+    # Ответы сравниваются вместе с типами значений
+    if isinstance(value, dict):
+        return {key: _typed(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_typed(item) for item in value]
+    return type(value).__name__, str(value)
+
+
+class CodeCacheDirTests(SimpleTestCase):
+    """
+    Сохраненный код методов загружается только из защищенного каталога и
+    только с верной подписью.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = os.path.join(temp_dir.name, "method_code")
+        self.path = os.path.join(self.directory, "method.bin")
+        self.code = compile("result = 6 * 7", "<method test>", "exec")
+
+    def _run(self, code):
+        namespace = {}
+        exec(code, namespace)
+        return namespace["result"]
+
+    def test_round_trip(self):
+        _save_code(self.path, self.code)
+        self.assertEqual(os.stat(self.directory).st_mode & 0o777, 0o700)
+        self.assertEqual(self._run(_load_code(self.path)), 42)
+
+    def test_tampered_file_is_rejected(self):
+        _save_code(self.path, self.code)
+        with open(self.path, "rb") as file:
+            content = bytearray(file.read())
+        content[-1] ^= 1
+        with open(self.path, "wb") as file:
+            file.write(content)
+        self.assertIsNone(_load_code(self.path))
+
+    def test_foreign_code_is_rejected(self):
+        # Файл в старом формате (без подписи) или записанный другим
+        # приложением не выполняется
+        _save_code(self.path, self.code)
+        with open(self.path, "wb") as file:
+            file.write(b"\0" * 32 + b"not marshal data")
+        self.assertIsNone(_load_code(self.path))
+
+    def test_writable_directory_is_not_used(self):
+        _save_code(self.path, self.code)
+        os.chmod(self.directory, 0o777)
+        self.assertIsNone(_load_code(self.path))
+
+        os.remove(self.path)
+        _save_code(self.path, self.code)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_symlinked_directory_is_not_used(self):
+        _save_code(self.path, self.code)
+        link = self.directory + "-link"
+        os.symlink(self.directory, link)
+        self.assertIsNone(_load_code(os.path.join(link, "method.bin")))
+
+
+class GeneratedCodeTests(SimpleTestCase):
+    """
+    Сгенерированная функция метода дает те же ответы и ошибки, что и
+    пошаговое выполнение плана.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def _scalar(self, plan, input_data):
+        try:
+            variables, intermediate_results, _ = _evaluate_steps(plan, input_data)
+            return _complete_calculation(plan, variables, intermediate_results)
+        except Exception as e:
+            return e
+
+    def _check(self, method, input_sets, label):
+        plan = get_calculation_plan(method)
+        function = get_method_function(plan)
+        self.assertIsNotNone(function)
+        counts = Counter()
+        for input_data in input_sets:
+            input_data = prepare_input_data(input_data)
+            expected = self._scalar(plan, input_data)
+            try:
+                actual = function(dict(input_data))
+            except Exception as e:
+                actual = e
+            with self.subTest(method=label, input_data=input_data):
+                if isinstance(expected, Exception):
+                    # Текст ошибки формирует пошаговое выполнение
+                    self.assertTrue(actual is None or isinstance(actual, Exception))
+                    with self.assertRaises(type(expected)) as context:
+                        execute_calculation_plan(plan, input_data)
+                    self.assertEqual(str(context.exception), str(expected))
+                    counts["error"] += 1
+                elif actual is None:
+                    counts["fallback"] += 1
+                else:
+                    self.assertNotIsInstance(actual, Exception)
+                    self.assertEqual(_typed(actual), _typed(expected))
+                    counts[actual["convergence"]] += 1
+        return counts
+
+    def test_method(self):
+        counts = self._check(METHOD, INPUTS, "METHOD")
+        self.assertEqual(
+            counts,
+            {
+                "satisfactory": 5,
+                "custom": 1,
+                "absence": 1,
+                "traces": 1,
+                "unsatisfactory": 2,
+                "error": 3,
+            },
+        )
+
+    def test_fixtures(self):
+        methods = load_fixture_methods()
+        self.assertTrue(methods)
+        counts = Counter()
+        for fixture_name, method in methods:
+            counts.update(
+                self._check(
+                    method,
+                    generate_edge_input_sets(method, 100, 20240611),
+                    fixture_name,
+                )
+            )
+        # Все фикстуры выполняются сгенерированным кодом, встречаются все ветви
+        self.assertNotIn("fallback", counts)
+        self.assertLessEqual(
+            {"satisfactory", "unsatisfactory", "absence", "custom", "traces", "error"},
+            set(counts),
+        )
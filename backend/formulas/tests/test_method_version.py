@@ -0,0 +1,81 @@
+import logging
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from ..api.calculation_api import calculate_result
+from ..models import ResearchMethod
+from ..services.calculation_service import get_method_version
+
+
+class MethodVersionTests(TestCase):
+    """
+    Расчет по сохраненному методу с версией, загруженной клиентом.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.method = ResearchMethod.objects.create(
+            name="Сумма",
+            formula="x+y",
+            measurement_error={"type": "fixed", "value": "0.1"},
+            unit="%",
+            measurement_method="Метод",
+            nd_code="ГОСТ 1",
+            nd_name="НД",
+            input_data={"fields": [{"name": "x"}, {"name": "y"}]},
+            intermediate_data={"fields": []},
+            convergence_conditions={"formulas": []},
+            rounding_type="decimal",
+            rounding_decimal=2,
+        )
+
+    def _calculate(self, **data):
+        request = APIRequestFactory().post(
+            "/api/calculate/",
+            {"method_id": self.method.pk, "input_data": {"x": "1", "y": "2"}, **data},
+            format="json",
+        )
+        return calculate_result(request)
+
+    def test_matching_version(self):
+        version = get_method_version(self.method.updated_at)
+        response = self._calculate(method_version=version)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["result"], "3.00")
+        self.assertEqual(response.data["method_version"], version)
+
+    def test_missing_version(self):
+        response = self._calculate()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["result"], "3.00")
+        self.assertEqual(
+            response.data["method_version"],
+            get_method_version(self.method.updated_at),
+        )
+
+    def test_stale_version(self):
+        version = get_method_version(self.method.updated_at)
+        self.assertEqual(self._calculate(method_version=version).status_code, 200)
+
+        # Метод изменен после загрузки клиентом
+        self.method.formula = "x*y"
+        self.method.save()
+        response = self._calculate(method_version=version)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("Метод исследования был изменен", response.data["error"])
+
+        # Клиент загрузил новую версию метода
+        response = self._calculate(
+            method_version=get_method_version(self.method.updated_at)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["result"], "2.00")
+
+    def test_invalid_version(self):
+        response = self._calculate(method_version="вчера")
+        self.assertEqual(response.status_code, 409)
+
+    def test_deleted_method(self):
+        self.method.is_deleted = True
+        self.method.save()
+        self.assertEqual(self._calculate().status_code, 404)
@@ -0,0 +1,192 @@
+from decimal import Decimal
+import math
+from django.test import SimpleTestCase
+from ..utils.formula_compiler import EPSILON
+from ..utils.formula_utils import (
+    _compile_formula,
+    _compile_range_table,
+    _get_band,
+    _iter_range_candidates,
+    _prepare_variables,
+    evaluate_formula,
+)
+
+
+def _ranges(*conditions):
+    return [
+        {"condition": condition, "formula": f"{index}+t*0"}
+        for index, condition in enumerate(conditions)
+    ]
+
+
+def _linear_scan(ranges, variables):
+    # Последовательная проверка всех условий, как до индекса
+    decimal_vars = _prepare_variables(variables)
+    for item in ranges:
+        if _compile_formula(item["condition"], True).evaluate(decimal_vars):
+            result = _compile_formula(item["formula"]).evaluate(decimal_vars)
+            return Decimal(str(float(result)))
+    return Decimal("0")
+
+
+def _band(condition):
+    return _get_band(_compile_formula(condition, True).tree)
+
+
+# Полосы с разрывом (60; 70) и отдельной точкой 100
+BANDS = _ranges(
+    "0<t<=20",
+    "20<t and t<=40",
+    "t>40 and t<=60",
+    "70<=t<=80",
+    "t=100",
+    "1e12<t<=2e12",
+)
+
+
+class RangeTableTests(SimpleTestCase):
+    """
+    Индекс полос таблицы диапазонов дает тот же диапазон, что и
+    последовательная проверка условий.
+    """
+
+    def _values(self, ranges):
+        table = _compile_range_table(tuple(item["condition"] for item in ranges))
+        bounds = [
+            bound
+            for bound in table.breakpoints
+            # Границы расширены на запас; исходные значения - целые
+            for bound in (float(round(bound)), bound)
+        ]
+        values = [-1e15, -5.0, 0.0, 65.0, 90.0, 1e6, 5e12, math.pi]
+        for bound in bounds:
+            magnitude = max(abs(bound), 1)
+            for delta in (
+                0,
+                EPSILON / 2,
+                -EPSILON / 2,
+                EPSILON,
+                -EPSILON,
+                2 * EPSILON,
+                -2 * EPSILON,
+                1e-9,
+                -1e-9,
+                magnitude * 2.0**-50,
+                -magnitude * 2.0**-50,
+                magnitude * 1e-12,
+                -magnitude * 1e-12,
+            ):
+                values.append(bound + delta)
+        return values
+
+    def _check(self, ranges):
+        range_calculation = {"ranges": ranges}
+        checked = 0
+        for value in self._values(ranges):
+            variables = {"t": repr(value)}
+            expected = _linear_scan(ranges, variables)
+            actual = evaluate_formula(
+                "t", variables, range_calculation=range_calculation
+            )
+            with self.subTest(value=value):
+                self.assertEqual(str(actual), str(expected))
+            checked += 1
+        return checked
+
+    def test_bands(self):
+        table = _compile_range_table(tuple(item["condition"] for item in BANDS))
+        self.assertEqual(table.variable, "t")
+        self.assertEqual(len(table.breakpoints), 12)
+        self.assertGreater(self._check(BANDS), 100)
+
+    def test_boundaries(self):
+        # Диапазон 0 дает "0.0", отсутствие подходящего диапазона - "0"
+        cases = [
+            ("0", "0"),
+            ("0.00000000001", "0"),
+            ("0.000001", "0.0"),
+            ("20", "0.0"),
+            ("20.00000000001", "0.0"),
+            ("20.001", "1.0"),
+            ("60", "2.0"),
+            ("65", "0"),
+            ("69.99999999999", "3.0"),
+            ("100", "4.0"),
+            ("99.99999999999", "4.0"),
+            ("100.001", "0"),
+            ("-1", "0"),
+            ("1,5e12", "5.0"),
+        ]
+        for value, expected in cases:
+            with self.subTest(value=value):
+                self.assertEqual(
+                    str(
+                        evaluate_formula(
+                            "t", {"t": value}, range_calculation={"ranges": BANDS}
+                        )
+                    ),
+                    expected,
+                )
+
+    def test_gap_and_outside_values_skip_bands(self):
+        # Полоса, граница которой совпадает с границей отрезка, остается среди
+        # кандидатов; остальные полосы не проверяются
+        self.assertLessEqual(set(_iter_range_candidates(BANDS, {"t": 65.0})), {2})
+        self.assertEqual(list(_iter_range_candidates(BANDS, {"t": -5.0})), [])
+        self.assertLessEqual(set(_iter_range_candidates(BANDS, {"t": 3e12})), {5})
+        self.assertEqual(list(_iter_range_candidates(BANDS, {"t": 90.0})), [3])
+        candidates = list(_iter_range_candidates(BANDS, {"t": 30.0}))
+        self.assertIn(1, candidates)
+        self.assertLessEqual(set(candidates), {0, 1})
+
+    def test_general_conditions_keep_order(self):
+        # Условия другого вида проверяются для любого значения, первым
+        # выполнившимся остается первое по порядку
+        ranges = _ranges(
+            "0<t<=20",
+            "abs(t-20)<1",
+            "20<t<=40",
+            "t>x",
+            "40<t<=60",
+        )
+        candidates = list(_iter_range_candidates(ranges, {"t": 30.0, "x": 0.0}))
+        self.assertEqual(candidates, sorted(candidates))
+        self.assertLessEqual({1, 2, 3}, set(candidates))
+        self.assertNotIn(4, candidates)
+        for x in ("0", "1000"):
+            with self.subTest(x=x):
+                for value in self._values(ranges):
+                    variables = {"t": repr(value), "x": x}
+                    self.assertEqual(
+                        str(
+                            evaluate_formula(
+                                "t", variables, range_calculation={"ranges": ranges}
+                            )
+                        ),
+                        str(_linear_scan(ranges, variables)),
+                    )
+
+    def test_overlapping_bands(self):
+        self._check(_ranges("0<=t<=50", "10<t<=20", "t>=50", "t<=0", "t=50"))
+
+    def test_not_indexed(self):
+        # Меньше двух полос по одной переменной или нет переменной в индексе
+        self.assertIsNone(_compile_range_table(("0<t<=20", "abs(t)>20")))
+        self.assertIsNone(_compile_range_table(("0<t<=20",)))
+        ranges = _ranges("0<t<=20", "20<t<=40")
+        self.assertEqual(list(_iter_range_candidates(ranges, {"x": 1.0})), [0, 1])
+        self.assertEqual(list(_iter_range_candidates(ranges, {"t": math.nan})), [0, 1])
+
+    def test_get_band(self):
+        def slack(bound):
+            return 4 * EPSILON + abs(bound) * 2.0**-48
+
+        self.assertEqual(_band("0<t<=20"), ("t", -slack(0), 20 + slack(20)))
+        self.assertEqual(_band("20>=t"), ("t", -math.inf, 20 + slack(20)))
+        self.assertEqual(_band("t=2*5"), ("t", 10 - slack(10), 10 + slack(10)))
+        self.assertEqual(_band("t>1 and t>3"), ("t", 3 - slack(3), math.inf))
+        self.assertIsNone(_band("t>1 and s<3"))
+        self.assertIsNone(_band("t>x"))
+        self.assertIsNone(_band("t>1 or t<0"))
+        self.assertIsNone(_band("not t>1"))
+        self.assertIsNone(_band("abs(t)<1"))
@@ -0,0 +1,252 @@
+import csv
+from io import StringIO
+import logging
+import os
+import tempfile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from ..models import Calculation, Laboratory, ResearchMethod, Sample
+from ..services.recalculation_service import recalculate_calculations
+
+METHOD = {
+    "formula": "x+y",
+    "measurement_error": {"type": "fixed", "value": "0.1"},
+    "unit": "%",
+    "measurement_method": "Метод",
+    "nd_code": "ГОСТ 1",
+    "nd_name": "НД",
+    "input_data": {"fields": [{"name": "x"}, {"name": "y"}]},
+    "intermediate_data": {"fields": []},
+    "convergence_conditions": {
+        "formulas": [{"formula": "abs(x-y)>10", "convergence_value": "unsatisfactory"}]
+    },
+    "rounding_type": "decimal",
+    "rounding_decimal": 2,
+}
+
+# Название расчета -> (входные данные, сохраненные результат и погрешность,
+# ожидаемый статус, результат и погрешность после пересчета)
+ROWS = {
+    "same": ({"x": "1", "y": "2"}, "3,00", "0,10", "unchanged", "3,00", "0,10"),
+    "same_sign": ({"x": "1", "y": "2"}, "3,00", "±0,10", "unchanged", "3,00", "±0,10"),
+    "same_dot": ({"x": "1", "y": "2"}, "3.00", "0.10", "unchanged", "3.00", "0.10"),
+    # Особый результат сохраняется с погрешностью "-" или null
+    "same_special": (
+        {"x": "1", "y": "20"},
+        "Неудовлетворительно",
+        "-",
+        "unchanged",
+        "Неудовлетворительно",
+        "-",
+    ),
+    "same_special_null": (
+        {"x": "1", "y": "20"},
+        "Неудовлетворительно",
+        None,
+        "unchanged",
+        "Неудовлетворительно",
+        None,
+    ),
+    "changed_sign": ({"x": "1", "y": "3"}, "3,00", "±0,10", "changed", "4,00", "±0,10"),
+    "changed_dot": ({"x": "1", "y": "3"}, "3.0", "0.1", "changed", "4.00", "0.10"),
+    "changed_from_special": (
+        {"x": "1", "y": "2"},
+        "Неудовлетворительно",
+        None,
+        "changed",
+        "3,00",
+        "0,10",
+    ),
+    "changed_to_special": (
+        {"x": "1", "y": "20"},
+        "21,00",
+        "±0,10",
+        "changed",
+        "Неудовлетворительно",
+        "-",
+    ),
+    "failed": ({"x": "a", "y": "1"}, "1,00", "0,10", "failed", "1,00", "0,10"),
+}
+
+
+def _create_calculations():
+    laboratory = Laboratory.objects.create(name="ЛАБ", full_name="Лаборатория")
+    method = ResearchMethod.objects.create(name="Сумма", **METHOD)
+    # Метод с циклом в промежуточных полях: план построить нельзя
+    broken_method = ResearchMethod.objects.create(
+        name="Цикл",
+        **{
+            **METHOD,
+            "formula": "a",
+            "intermediate_data": {
+                "fields": [{"name": "a", "formula": "b"}, {"name": "b", "formula": "a"}]
+            },
+        },
+    )
+
+    def create(name, research_method, input_data, result, measurement_error):
+        sample = Sample.objects.create(
+            registration_number=name, test_object="Нефть", laboratory=laboratory
+        )
+        return Calculation.objects.create(
+            input_data=input_data,
+            result=result,
+            executor="hash",
+            measurement_error=measurement_error,
+            unit="%",
+            laboratory_activity_date="2024-06-11",
+            sample=sample,
+            laboratory=laboratory,
+            research_method=research_method,
+        )
+
+    calculations = {name: create(name, method, *row[:3]) for name, row in ROWS.items()}
+    calculations["broken_method"] = create(
+        "broken_method", broken_method, {"x": "1", "y": "2"}, "3,00", "0,10"
+    )
+    deleted = create("deleted", method, {"x": "1", "y": "3"}, "3,00", "0,10")
+    deleted.is_deleted = True
+    deleted.save()
+    return calculations, deleted
+
+
+def _stored(calculation):
+    calculation.refresh_from_db()
+    return (
+        calculation.result,
+        calculation.measurement_error,
+        calculation.unit,
+        calculation.updated_at,
+        calculation.updated_by,
+    )
+
+
+class RecalculationMixin:
+    """
+    Пересчет сохраненных расчетов по текущему плану метода.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.calculations, self.deleted = _create_calculations()
+
+    def _recalculate(self, **options):
+        statuses = {}
+        names = {
+            calculation.pk: name for name, calculation in self.calculations.items()
+        }
+
+        def on_row(status, row, values, error):
+            statuses[names[row[0]]] = status
+
+        report = recalculate_calculations(
+            Calculation.objects.all(), on_row=on_row, **options
+        )
+        return report, statuses
+
+    def _check_report(self, report, statuses, updated):
+        self.assertEqual(
+            statuses,
+            {
+                **{name: row[3] for name, row in ROWS.items()},
+                "broken_method": "failed",
+            },
+        )
+        self.assertEqual(
+            report.as_dict(),
+            {
+                "total": 11,
+                "changed": 4,
+                "unchanged": 5,
+                "failed": 2,
+                "updated": updated,
+            },
+        )
+
+    def _check_written(self, before):
+        for name, calculation in self.calculations.items():
+            with self.subTest(name=name):
+                stored = _stored(calculation)
+                if name in ROWS:
+                    status, result, measurement_error = ROWS[name][3:]
+                else:
+                    status, result, measurement_error = "failed", "3,00", "0,10"
+                self.assertEqual(stored[:3], (result, measurement_error, "%"))
+                if status == "changed":
+                    self.assertGreater(stored[3], before[name][3])
+                    self.assertEqual(stored[4], "recalculation")
+                else:
+                    self.assertEqual(stored, before[name])
+        # Удаленные расчеты не пересчитываются
+        self.assertEqual(_stored(self.deleted)[0], "3,00")
+
+
+class RecalculationTests(RecalculationMixin, TestCase):
+    def test_dry_run_leaves_database_unchanged(self):
+        before = {name: _stored(item) for name, item in self.calculations.items()}
+        report, statuses = self._recalculate(dry_run=True)
+        self._check_report(report, statuses, updated=0)
+        self.assertEqual(
+            {name: _stored(item) for name, item in self.calculations.items()}, before
+        )
+
+    def test_only_changed_rows_are_written(self):
+        before = {name: _stored(item) for name, item in self.calculations.items()}
+        report, statuses = self._recalculate(user="recalculation", chunk_size=3)
+        self._check_report(report, statuses, updated=4)
+        self._check_written(before)
+
+        # Повторный пересчет ничего не меняет
+        report, _ = self._recalculate()
+        self.assertEqual((report.changed, report.unchanged), (0, 9))
+
+    def test_command_report(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "report.csv")
+            output = StringIO()
+            call_command(
+                "recalculate_calculations",
+                dry_run=True,
+                workers=1,
+                report=path,
+                stdout=output,
+            )
+            with open(path, encoding="utf-8") as report_file:
+                rows = list(csv.DictReader(report_file))
+
+        self.assertIn(
+            "Всего: 11, изменилось: 4, без изменений: 5, ошибок: 2", output.getvalue()
+        )
+        self.assertIn("Пробный запуск: база данных не изменена", output.getvalue())
+        names = {item.pk: name for name, item in self.calculations.items()}
+        report = {names[int(row["id"])]: row for row in rows}
+        self.assertEqual(
+            {name: row["status"] for name, row in report.items()},
+            {
+                "changed_sign": "changed",
+                "changed_dot": "changed",
+                "changed_from_special": "changed",
+                "changed_to_special": "changed",
+                "failed": "failed",
+                "broken_method": "failed",
+            },
+        )
+        self.assertEqual(report["changed_sign"]["new_measurement_error"], "±0,10")
+        self.assertEqual(report["changed_dot"]["new_result"], "4.00")
+        self.assertIn("Циклическая зависимость", report["broken_method"]["error"])
+        self.assertEqual(
+            Calculation.objects.get(pk=self.calculations["changed_dot"].pk).result,
+            "3.0",
+        )
+
+
+class RecalculationWorkersTests(RecalculationMixin, TransactionTestCase):
+    # Процессы пула получают части расчетов; запись выполняет основной процесс
+    def test_worker_pool(self):
+        before = {name: _stored(item) for name, item in self.calculations.items()}
+        report, statuses = self._recalculate(
+            user="recalculation", workers=2, chunk_size=2
+        )
+        self._check_report(report, statuses, updated=4)
+        self._check_written(before)
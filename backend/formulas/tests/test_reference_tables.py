@@ -0,0 +1,235 @@
+import logging
+from unittest import mock
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+from ..models import ReferenceTable
+from ..services.calculation_service import (
+    execute_calculation_plan,
+    get_calculation_plan,
+)
+from ..utils import reference_tables
+from ..utils.formula_compiler import EPSILON
+from ..utils.formula_utils import evaluate_formula
+from ..utils.reference_tables import (
+    LookupTable,
+    clear_reference_tables,
+    get_reference_table_versions,
+)
+
+# Ключи 10, 20, 40; значения 1, 2, 6
+LINE = LookupTable("line", [10, 20, 40], [1, 2, 6])
+
+# Строки 0 и 10, столбцы 0, 1, 2; значение = 1 * строка + столбец
+GRID = LookupTable("grid", [0, 10], [[0, 1, 2], [10, 11, 12]], columns=[0, 1, 2])
+
+
+class LookupTableTests(SimpleTestCase):
+    """
+    Ступенчатый поиск и интерполяция по справочной таблице.
+    """
+
+    def test_lookup(self):
+        cases = [
+            (10, 1),
+            (15, 1),
+            (20 - EPSILON / 2, 2),
+            (20, 2),
+            (39.999, 2),
+            (40, 6),
+            # Крайние ключи сравниваются с эпсилоном
+            (10 - EPSILON / 2, 1),
+            (40 + EPSILON / 2, 6),
+        ]
+        for x, expected in cases:
+            with self.subTest(x=x):
+                self.assertEqual(LINE.lookup(x), expected)
+        self.assertEqual(GRID.lookup(5, 1.5), 1)
+        self.assertEqual(GRID.lookup(10, 2 + EPSILON / 2), 12)
+
+    def test_interpolate(self):
+        cases = [
+            (15, 1.5),
+            (30, 4),
+            (20, 2),
+            (20 + EPSILON / 2, 2),
+            (10 - EPSILON / 2, 1),
+            (40 + EPSILON / 2, 6),
+        ]
+        for x, expected in cases:
+            with self.subTest(x=x):
+                self.assertEqual(LINE.interpolate(x), expected)
+        self.assertAlmostEqual(GRID.interpolate(5, 1.5), 6.5)
+        self.assertAlmostEqual(GRID.interpolate(0, 0.5), 0.5)
+        self.assertAlmostEqual(GRID.interpolate(2.5, 1), 3.5)
+        self.assertEqual(GRID.interpolate(10, 2), 12)
+
+    def test_out_of_range(self):
+        for function in (LINE.lookup, LINE.interpolate):
+            for x in (10 - 2 * EPSILON, 40 + 2 * EPSILON, -1e9):
+                with self.subTest(function=function.__name__, x=x):
+                    with self.assertRaises(ValueError) as context:
+                        function(x)
+                    self.assertIn(
+                        "вне диапазона справочной таблицы 'line' (10 - 40)",
+                        str(context.exception),
+                    )
+        with self.assertRaises(ValueError):
+            GRID.interpolate(5, 3)
+
+    def test_argument_count(self):
+        with self.assertRaises(ValueError) as context:
+            LINE.lookup(15, 1)
+        self.assertIn("требует аргументов: 1", str(context.exception))
+        with self.assertRaises(ValueError) as context:
+            GRID.interpolate(5)
+        self.assertIn("требует аргументов: 2", str(context.exception))
+
+    def test_invalid_table(self):
+        cases = [
+            (([], []), {}, "Ключи строк должны быть непустым списком чисел"),
+            (([1, 1], [1, 2]), {}, "Ключи строк должны строго возрастать"),
+            ((["a", 2], [1, 2]), {}, "Ключи строк должны быть числами"),
+            (([1, "inf"], [1, 2]), {}, "Ключи строк должны быть конечными числами"),
+            (([1, 2], [1]), {}, "Количество значений не совпадает"),
+            (([1, 2], [1, "x"]), {}, "Значения таблицы должны быть числами"),
+            (
+                ([1, 2], [[1, 2], [3]]),
+                {"columns": [1, 2]},
+                "Количество значений в строке не совпадает",
+            ),
+            (
+                ([1, 2], [[1], [2]]),
+                {"columns": [2, 1]},
+                "Ключи столбцов должны строго возрастать",
+            ),
+        ]
+        for args, kwargs, message in cases:
+            with self.subTest(message=message):
+                with self.assertRaises(ValueError) as context:
+                    LookupTable("t", *args, **kwargs)
+                self.assertIn(message, str(context.exception))
+
+
+class ReferenceTableTests(TestCase):
+    """
+    Функции table() и interp() в формулах и загрузка таблиц из базы.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        clear_reference_tables()
+        self.addCleanup(clear_reference_tables)
+        self.line = ReferenceTable.objects.create(
+            code="line", name="Линия", row_values=[10, 20, 40], values=[1, 2, 6]
+        )
+        ReferenceTable.objects.create(
+            code="grid₁",
+            name="Сетка",
+            row_values=[0, 10],
+            column_values=[0, 1, 2],
+            values=[[0, 1, 2], [10, 11, 12]],
+        )
+
+    def _check_interval(self, interval):
+        patcher = mock.patch.object(
+            reference_tables, "REFERENCE_TABLES_CHECK_INTERVAL", interval
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_formula_functions(self):
+        variables = {"t": "15", "c": "1,5"}
+        self.assertEqual(evaluate_formula("table(line, t)", variables), 1)
+        self.assertEqual(evaluate_formula("interp(line, t*2)", variables), 4)
+        # Код таблицы нормализуется, как имена переменных
+        self.assertEqual(evaluate_formula("interp(grid1, t/3, c)", variables), 6.5)
+        self.assertEqual(evaluate_formula("table(grid₁, t/3, c)", variables), 1)
+
+        errors = [
+            ("table(line, t*10)", "вне диапазона справочной таблицы 'line'"),
+            ("table(missing, t)", "Справочная таблица 'missing' не найдена"),
+            ("interp(grid1, t)", "требует аргументов: 2"),
+        ]
+        for formula, message in errors:
+            with self.subTest(formula=formula):
+                with self.assertRaises(ValueError) as context:
+                    evaluate_formula(formula, variables)
+                self.assertIn(message, str(context.exception))
+
+    def test_reload_after_change(self):
+        self._check_interval(3600)
+        plan = get_calculation_plan(
+            {
+                "formula": "interp(line, t)",
+                "measurement_error": {"type": "fixed", "value": "0.1"},
+                "unit": "%",
+                "input_data": {"fields": [{"name": "t"}]},
+                "intermediate_data": {"fields": []},
+                "convergence_conditions": {"formulas": []},
+                "rounding_type": "decimal",
+                "rounding_decimal": 2,
+            }
+        )
+        self.assertEqual(plan["tables"], ["line"])
+        self.assertEqual(execute_calculation_plan(plan, {"t": "15"})["result"], "1.50")
+        version = get_reference_table_versions(["line"])[0]
+
+        self.line.values = [10, 20, 60]
+        self.line.save()
+        # До следующей проверки используется загруженная таблица
+        self.assertEqual(evaluate_formula("table(line, t)", {"t": "40"}), 6)
+
+        self._check_interval(0)
+        self.assertEqual(execute_calculation_plan(plan, {"t": "15"})["result"], "15.00")
+        self.assertEqual(evaluate_formula("table(line, t)", {"t": "40"}), 60)
+        self.assertNotEqual(get_reference_table_versions(["line"])[0], version)
+
+        self.line.is_deleted = True
+        self.line.save()
+        self.assertEqual(get_reference_table_versions(["line", "grid1"])[0], None)
+        with self.assertRaises(ValueError):
+            evaluate_formula("table(line, t)", {"t": "15"})
+
+    def test_invalid_table_is_skipped(self):
+        # Таблица, сохраненная в обход проверки, не мешает загрузке остальных
+        ReferenceTable.objects.bulk_create(
+            [
+                ReferenceTable(
+                    code="broken", name="Ошибка", row_values=[2, 1], values=[1, 2]
+                )
+            ]
+        )
+        self.assertEqual(get_reference_table_versions(["broken", "line"])[0], None)
+        self.assertEqual(evaluate_formula("table(line, t)", {"t": "20"}), 2)
+
+    def test_clean(self):
+        table = ReferenceTable(
+            code=" density ", name="Плотность", row_values=[1, 2], values=[3, 4]
+        )
+        table.clean()
+        self.assertEqual(table.code, "density")
+
+        cases = [
+            ({"code": "1abc"}, "code"),
+            ({"code": "a-b"}, "code"),
+            ({"code": "and"}, "code"),
+            ({"code": ""}, "code"),
+            ({"row_values": [2, 1]}, "values"),
+            ({"values": [1, 2, 3]}, "values"),
+            ({"column_values": [1, 2]}, "values"),
+        ]
+        for changes, field in cases:
+            with self.subTest(changes=changes):
+                table = ReferenceTable(
+                    **{
+                        "code": "density",
+                        "name": "Плотность",
+                        "row_values": [1, 2],
+                        "values": [3, 4],
+                        **changes,
+                    }
+                )
+                with self.assertRaises(ValidationError) as context:
+                    table.save()
+                self.assertEqual(list(context.exception.message_dict), [field])
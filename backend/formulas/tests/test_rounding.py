@@ -0,0 +1,118 @@
+import random
+from decimal import Decimal, ROUND_HALF_UP
+from django.test import SimpleTestCase
+from ..utils.rounding import round_result
+
+
+def _legacy_round_to_significant_figures(number, significant_figures):
+    # Прежняя реализация из formula_utils (до переноса в rounding)
+    if number == 0:
+        return 0
+
+    d = Decimal(str(float(number)))
+    str_num = f"{d:E}"
+    mantissa, exp = str_num.split("E")
+    exp = int(exp)
+    mantissa = mantissa.replace(".", "").rstrip("0")
+
+    if len(mantissa) > significant_figures:
+        decimal_mantissa = Decimal(mantissa[: significant_figures + 1]) / Decimal("10")
+        mantissa = str(decimal_mantissa.quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+    mantissa = mantissa.ljust(significant_figures, "0")
+
+    if exp >= 0:
+        if exp + 1 >= len(mantissa):
+            result = Decimal(mantissa + "0" * (exp + 1 - len(mantissa)))
+        else:
+            result = Decimal(mantissa[: exp + 1] + "." + mantissa[exp + 1 :])
+    else:
+        result = Decimal("0." + "0" * (-exp - 1) + mantissa)
+
+    return result
+
+
+def _legacy_round_result(result, rounding_type, rounding_decimal):
+    if rounding_type == "decimal":
+        d = Decimal(str(float(result)))
+        return d.quantize(Decimal("0.1") ** rounding_decimal, rounding=ROUND_HALF_UP)
+    else:
+        return _legacy_round_to_significant_figures(result, rounding_decimal)
+
+
+def _outcome(function, *args):
+    """
+    Результат вызова в сравнимом виде: тип и запись числа или тип ошибки.
+    """
+    try:
+        value = function(*args)
+    except Exception as e:
+        return ("error", type(e).__name__)
+    return (type(value).__name__, repr(value))
+
+
+def _generate_numbers(count, seed):
+    """
+    Случайные числа разных порядков, в том числе на границах округления
+    (…5, …95, …9995), отрицательные и Decimal.
+    """
+    rnd = random.Random(seed)
+    numbers = []
+    for _ in range(count):
+        digits = "".join(rnd.choice("0123456789") for _ in range(rnd.randint(1, 16)))
+        digits = digits.lstrip("0") or "1"
+        kind = rnd.random()
+        if kind < 0.3:
+            digits += "5"
+        elif kind < 0.45:
+            digits += "9" * rnd.randint(1, 4) + "5"
+        number = float(f"{digits}e{rnd.randint(-12, 12) - len(digits)}")
+        if rnd.random() < 0.1:
+            number = -number
+        numbers.append(number if rnd.random() < 0.8 else Decimal(str(number)))
+    return numbers
+
+
+class RoundResultTests(SimpleTestCase):
+    """
+    round_result дает те же значения (включая запись Decimal) и те же
+    ошибки, что и прежняя реализация.
+    """
+
+    SEED = 20240611
+
+    def _assert_matches_legacy(self, rounding_type, precisions, numbers):
+        for number in numbers:
+            for precision in precisions:
+                with self.subTest(number=number, precision=precision):
+                    self.assertEqual(
+                        _outcome(round_result, number, rounding_type, precision),
+                        _outcome(
+                            _legacy_round_result, number, rounding_type, precision
+                        ),
+                    )
+
+    def test_significant_figures_random(self):
+        self._assert_matches_legacy(
+            "significant", (1, 2, 3, 4, 6), _generate_numbers(3000, self.SEED)
+        )
+
+    def test_decimal_places_random(self):
+        self._assert_matches_legacy(
+            "decimal", (0, 1, 2, 4), _generate_numbers(3000, self.SEED + 1)
+        )
+
+    def test_boundary_values(self):
+        numbers = [0, 0.0, -0.0, 1, 5, 10, 100, 0.5, 9.95, 99.5, 0.995, 1e-7, 1.5e-7]
+        numbers += [-9.95, Decimal("0.0125"), Decimal("123.45"), "2,5", "abc"]
+        numbers += [float("inf"), float("nan"), 1e300, 5e-324]
+        self._assert_matches_legacy("significant", (1, 2, 3, 17, 18, 0), numbers)
+        self._assert_matches_legacy("decimal", (0, 2, 15, -1), numbers)
+
+    def test_representation(self):
+        self.assertEqual(repr(round_result(1.2, "significant", 4)), "Decimal('1.200')")
+        self.assertEqual(
+            repr(round_result(123456, "significant", 2)), "Decimal('120000')"
+        )
+        self.assertEqual(repr(round_result(9.95, "significant", 2)), "Decimal('1.00')")
+        self.assertEqual(round_result(0.125, "decimal", 2), Decimal("0.13"))
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+from ..api.calculation_api import (
+    get_calculation_cache_stats,
+    get_calculation_metrics_stats,
+)
+from ..utils.calculation_metrics import clear_calculation_metrics
+from ..views.user_views import get_authentication_cache_stats
+from ..views.views import get_http_client_stats
+
+
+class StatsPermissionTests(SimpleTestCase):
+    """
+    Статистика процесса доступна только редакторам.
+    """
+
+    VIEWS = (
+        get_calculation_cache_stats,
+        get_calculation_metrics_stats,
+        get_authentication_cache_stats,
+        get_http_client_stats,
+    )
+
+    def setUp(self):
+        # Метрики расчетов по ID метода запрашивают названия методов из базы
+        clear_calculation_metrics()
+        self.addCleanup(clear_calculation_metrics)
+
+    def _get(self, view, user):
+        request = APIRequestFactory().get("/stats/")
+        force_authenticate(request, user=user)
+        return view(request)
+
+    def test_forbidden_for_non_editor(self):
+        user = SimpleNamespace(is_authenticated=True, is_staff=False)
+        for view in self.VIEWS:
+            for current in (AnonymousUser(), user):
+                with self.subTest(view=view.__name__, user=current):
+                    response = self._get(view, current)
+                    self.assertEqual(response.status_code, 403)
+                    self.assertIn("error", response.data)
+
+    def test_allowed_for_staff(self):
+        user = SimpleNamespace(is_authenticated=True, is_staff=True)
+        for view in self.VIEWS:
+            with self.subTest(view=view.__name__):
+                self.assertEqual(self._get(view, user).status_code, 200)
@@ -0,0 +1,146 @@
+import logging
+import math
+from unittest import skipUnless
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory
+from ..api.calculation_api import calculate_uncertainty
+from ..services.calculation_service import CalculationError, get_calculation_plan
+from ..services.uncertainty_service import propagate_uncertainty
+from ..utils.vectorized_formula import is_vectorization_available
+
+# Результат s = x + 2y; повторяемость удовлетворительна при |x - y| <= 100
+METHOD = {
+    "name": "Сумма",
+    "formula": "s",
+    "measurement_error": {"type": "fixed", "value": "0.1"},
+    "unit": "у.е.",
+    "input_data": {"fields": [{"name": "x"}, {"name": "y"}]},
+    "intermediate_data": {
+        "fields": [
+            {
+                "name": "s",
+                "formula": "x+2*y",
+                "use_multiple_rounding": False,
+            }
+        ]
+    },
+    "convergence_conditions": {
+        "formulas": [
+            {"formula": "abs(x-y)<=100", "convergence_value": "satisfactory"},
+            {"formula": "abs(x-y)>100", "convergence_value": "unsatisfactory"},
+        ]
+    },
+    "rounding_type": "decimal",
+    "rounding_decimal": 2,
+}
+
+INPUT_DATA = {"x": "10", "y": "5"}
+SAMPLES = 200000
+SEED = 20240611
+
+
+@skipUnless(is_vectorization_available(), "NumPy не установлен")
+class PropagateUncertaintyTests(SimpleTestCase):
+    """
+    Распределение результата совпадает с аналитическим для линейной формулы.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.plan = get_calculation_plan(METHOD)
+
+    def _propagate(self, uncertainties, samples=SAMPLES, seed=SEED):
+        return propagate_uncertainty(
+            self.plan, INPUT_DATA, uncertainties, samples, seed
+        )
+
+    def test_normal_distribution(self):
+        # u(s)² = u(x)² + 4u(y)² = 0.01 + 0.01
+        data = self._propagate({"x": 0.1, "y": "0,05"})
+        expected_std = math.sqrt(0.02)
+        result = data["result"]
+
+        self.assertEqual(data["valid_samples"], SAMPLES)
+        self.assertEqual(data["convergence"], {"satisfactory": SAMPLES})
+        self.assertEqual(data["nominal"]["result"], "20.00")
+        self.assertAlmostEqual(result["mean"], 20, delta=0.002)
+        self.assertAlmostEqual(result["std"], expected_std, delta=0.002)
+        self.assertAlmostEqual(result["percentiles"]["50"], 20, delta=0.002)
+        for percentile, z in (("2.5", -1.96), ("97.5", 1.96), ("25", -0.6745)):
+            with self.subTest(percentile=percentile):
+                self.assertAlmostEqual(
+                    result["percentiles"][percentile],
+                    20 + z * expected_std,
+                    delta=0.005,
+                )
+        self.assertAlmostEqual(
+            result["expanded_uncertainty"], 1.96 * expected_std, delta=0.005
+        )
+
+        shares = {item["name"]: item["share"] for item in data["contributions"]}
+        self.assertEqual(set(shares), {"x", "y"})
+        self.assertAlmostEqual(shares["x"], 0.5, delta=0.01)
+        self.assertAlmostEqual(shares["y"], 0.5, delta=0.01)
+        self.assertAlmostEqual(sum(shares.values()), 1)
+
+    def test_uniform_distribution_and_contributions(self):
+        # Равномерный закон с полушириной a: u = a / √3
+        data = self._propagate(
+            {"x": {"distribution": "uniform", "value": 0.3}, "y": 0.01}
+        )
+        expected_var = 0.3**2 / 3 + 4 * 0.01**2
+        self.assertAlmostEqual(
+            data["result"]["std"], math.sqrt(expected_var), delta=0.002
+        )
+        contributions = data["contributions"]
+        self.assertEqual(contributions[0]["name"], "x")
+        self.assertAlmostEqual(
+            contributions[0]["share"], 0.3**2 / 3 / expected_var, delta=0.01
+        )
+
+    def test_unsatisfactory_samples_are_excluded(self):
+        # Разброс x достаточен, чтобы часть выборок нарушала |x - y| <= 100
+        data = self._propagate({"x": 100}, samples=10000)
+        convergence = data["convergence"]
+        self.assertEqual(sum(convergence.values()), 10000)
+        self.assertGreater(convergence["unsatisfactory"], 0)
+        self.assertEqual(data["valid_samples"], convergence["satisfactory"])
+
+    def test_seed_is_reproducible(self):
+        first = self._propagate({"x": 0.1}, samples=1000)
+        self.assertEqual(self._propagate({"x": 0.1}, samples=1000), first)
+        self.assertNotEqual(
+            self._propagate({"x": 0.1}, samples=1000, seed=SEED + 1), first
+        )
+
+    def test_invalid_arguments(self):
+        for uncertainties, samples in (
+            ({}, 1000),
+            ({"z": 0.1}, 1000),
+            ({"x": -1}, 1000),
+            ({"x": {"distribution": "poisson", "value": 1}}, 1000),
+            ({"x": 0.1}, 1),
+        ):
+            with self.subTest(uncertainties=uncertainties, samples=samples):
+                with self.assertRaises(CalculationError):
+                    self._propagate(uncertainties, samples=samples)
+
+    def test_api(self):
+        request = APIRequestFactory().post(
+            "/api/calculate-uncertainty/",
+            {
+                "research_method": METHOD,
+                "input_data": INPUT_DATA,
+                "uncertainties": {"x": 0.1},
+                "samples": 1000,
+                "seed": SEED,
+            },
+            format="json",
+        )
+        response = calculate_uncertainty(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["result"],
+            self._propagate({"x": 0.1}, samples=1000)["result"],
+        )
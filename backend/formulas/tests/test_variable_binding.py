@@ -0,0 +1,123 @@
+import logging
+from django.test import SimpleTestCase
+from ..utils.formula_utils import (
+    _SUBSCRIPT_TABLE,
+    VariableBinding,
+    calculate_convergence_steps,
+    evaluate_formula,
+    get_display_values,
+)
+
+INPUT_DATA = {"m₁": "1,5", "m₂": " 2,25 ", "Vₐ": "10", "k": "0.5", "x₁₀": "-3"}
+
+# Промежуточные поля в порядке вычисления
+FIELDS = [
+    ("a₁", "m1+m₂*k"),
+    ("b", "a1/Va+x10"),
+    ("c₂", "pow(b,2)-a₁"),
+]
+
+CONDITIONS = ["abs(m₁-m2)<=1 and c2>0", "b<0 or Vₐ>100"]
+
+
+def _old_values(variables):
+    # Как до привязки: каждое имя нормализуется заменами по одному символу,
+    # а значения преобразуются заново при каждом вычислении
+    values = {}
+    for name, value in variables.items():
+        for code, normal in _SUBSCRIPT_TABLE.items():
+            name = name.replace(chr(code), normal)
+        if isinstance(value, str):
+            value = value.strip().replace(",", ".")
+        values[name] = float(value)
+    return values
+
+
+def _error(function, *args, **kwargs):
+    try:
+        function(*args, **kwargs)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+class VariableBindingTests(SimpleTestCase):
+    """
+    Привязка переменных одного расчета дает те же значения и ошибки, что и
+    преобразование переменных при каждом вычислении формулы.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_matches_per_formula_lookup(self):
+        binding = VariableBinding(INPUT_DATA)
+        variables = dict(INPUT_DATA)
+        for name, formula in FIELDS:
+            with self.subTest(field=name):
+                value = evaluate_formula(formula, binding)
+                self.assertEqual(value, evaluate_formula(formula, dict(variables)))
+                binding[name] = str(value)
+                variables[name] = str(value)
+                self.assertEqual(binding.values, _old_values(variables))
+                self.assertEqual(binding.display_values, get_display_values(variables))
+
+        self.assertEqual(binding.values["a1"], 2.625)
+        self.assertEqual(binding.values["Va"], 10.0)
+        for formula in CONDITIONS:
+            with self.subTest(condition=formula):
+                self.assertEqual(
+                    evaluate_formula(formula, binding, is_condition=True),
+                    evaluate_formula(formula, dict(variables), is_condition=True),
+                )
+                self.assertEqual(
+                    calculate_convergence_steps(formula, binding),
+                    calculate_convergence_steps(formula, dict(variables)),
+                )
+
+    def test_missing_variable(self):
+        binding = VariableBinding(INPUT_DATA)
+        for formula in ("m1+y", "m₃*2"):
+            with self.subTest(formula=formula):
+                expected = _error(evaluate_formula, formula, dict(INPUT_DATA))
+                self.assertIsNotNone(expected)
+                self.assertEqual(_error(evaluate_formula, formula, binding), expected)
+        # Поле, добавленное после ошибки, доступно следующим формулам
+        binding["y"] = "4"
+        self.assertEqual(evaluate_formula("m1+y", binding), 5.5)
+
+    def test_invalid_value(self):
+        variables = {**INPUT_DATA, "z": "1,5,0"}
+        binding = VariableBinding(variables)
+        expected = _error(evaluate_formula, "m1+z", dict(variables))
+        self.assertIn("Ошибка преобразования значения z = 1.5.0", expected)
+        self.assertEqual(_error(evaluate_formula, "m1+z", binding), expected)
+
+        # Неверное значение промежуточного поля проявляется при следующем
+        # вычислении, как без привязки
+        binding = VariableBinding(INPUT_DATA)
+        self.assertEqual(evaluate_formula("m1", binding), 1.5)
+        binding["w"] = "abc"
+        self.assertEqual(
+            _error(evaluate_formula, "m1", binding),
+            _error(evaluate_formula, "m1", {**INPUT_DATA, "w": "abc"}),
+        )
+        binding["w"] = "2,5"
+        self.assertEqual(evaluate_formula("m1+w", binding), 4.0)
+
+    def test_replaced_and_colliding_names(self):
+        # Имена m₁ и m1 совпадают после нормализации; значение определяется
+        # порядком полей, как при преобразовании всех переменных
+        binding = VariableBinding(INPUT_DATA)
+        variables = dict(INPUT_DATA)
+        self.assertEqual(evaluate_formula("m1", binding), 1.5)
+        for name, value in (("m1", "7"), ("m₁", "3,5"), ("k", "2")):
+            with self.subTest(name=name, value=value):
+                binding[name] = value
+                variables[name] = value
+                self.assertEqual(binding.values, _old_values(variables))
+                self.assertEqual(
+                    evaluate_formula("m1*k", binding),
+                    evaluate_formula("m1*k", dict(variables)),
+                )
@@ -0,0 +1,55 @@
+import json
+import logging
+from unittest import skipUnless
+from django.test import SimpleTestCase
+from ..services.calculation_service import (
+    execute_calculation_batch,
+    get_calculation_plan,
+    prepare_input_data,
+)
+from ..services.vectorized_calculation import execute_calculation_plan_vectorized
+from ..utils.benchmark_utils import generate_edge_input_sets, load_fixture_methods
+from ..utils.vectorized_formula import is_vectorization_available
+
+
+@skipUnless(is_vectorization_available(), "NumPy не установлен")
+class VectorizedCalculationTests(SimpleTestCase):
+    """
+    Векторный движок дает те же ответы, что и скалярный, на всех методах
+    из research_methods_fixtures.
+    """
+
+    COUNT = 200
+    SEED = 20240611
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_fixtures_match_scalar(self):
+        methods = load_fixture_methods()
+        self.assertTrue(methods)
+        for fixture_name, method in methods:
+            plan = get_calculation_plan(method)
+            input_sets = generate_edge_input_sets(method, self.COUNT, self.SEED)
+            scalar = execute_calculation_batch(plan, input_sets, vectorize=False)
+            vectorized = execute_calculation_batch(plan, input_sets)
+            for expected, actual in zip(scalar, vectorized):
+                with self.subTest(fixture=fixture_name, index=expected["index"]):
+                    self.assertEqual(
+                        json.dumps(actual, sort_keys=True),
+                        json.dumps(expected, sort_keys=True),
+                    )
+
+    def test_fixtures_are_vectorized(self):
+        # Сверка имеет смысл, только если наборы действительно считаются
+        # векторно, а не уходят целиком на скалярный движок
+        covered = 0
+        for _, method in load_fixture_methods():
+            plan = get_calculation_plan(method)
+            input_sets = generate_edge_input_sets(method, self.COUNT, self.SEED)
+            results = execute_calculation_plan_vectorized(
+                plan, [prepare_input_data(item) for item in input_sets]
+            )
+            covered += sum(result is not None for result in results)
+        self.assertGreater(covered, 0)
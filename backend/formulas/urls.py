@@ -10,6 +10,7 @@ from .views.views import (
     CalculationViewSet,
     SampleViewSet,
     check_status_api,
+    get_http_client_stats,
 )
 from .views.excel_views import (
     ExcelTemplateViewSet,
@@ -18,9 +19,16 @@ from .views.excel_views import (
 )
 from .views.report_views import ReportTemplateViewSet
 from .views.equipment_views import EquipmentViewSet
-from .views.user_views import UserViewSet
+from .views.reference_table_views import ReferenceTableViewSet
+from .views.user_views import UserViewSet, get_authentication_cache_stats
 from .api.calculation_api import (
     calculate_result,
+    calculate_batch,
+    calculate_uncertainty,
+    get_calculation_cache_stats,
+    get_calculation_metrics_stats,
+    calculation_profiles,
+    download_calculation_profile,
     update_research_method_status,
     save_calculation,
     update_methods_order,
@@ -47,6 +55,7 @@ router.register(r"protocols", ProtocolViewSet, basename="protocol")
 router.register(r"samples", SampleViewSet, basename="sample")
 router.register(r"calculations", CalculationViewSet, basename="calculation")
 router.register(r"equipment", EquipmentViewSet, basename="equipment")
+router.register(r"reference-tables", ReferenceTableViewSet, basename="reference-table")
 router.register(r"excel-templates", ExcelTemplateViewSet, basename="excel-template")
 router.register(r"report-templates", ReportTemplateViewSet, basename="report-template")
 router.register(r"users", UserViewSet, basename="user")
@@ -56,7 +65,39 @@ urlpatterns = [
     path("save-excel/", save_excel, name="save-excel"),
     path("get-excel-styles/", get_excel_styles, name="get_excel_styles"),
     path("monitoring/", check_status_api, name="monitoring"),
+    path("http-client-stats/", get_http_client_stats, name="http_client_stats"),
     path("calculate/", calculate_result, name="calculate_result"),
+    path("calculate-batch/", calculate_batch, name="calculate_batch"),
+    path(
+        "calculate-uncertainty/",
+        calculate_uncertainty,
+        name="calculate_uncertainty",
+    ),
+    path(
+        "calculation-cache-stats/",
+        get_calculation_cache_stats,
+        name="calculation_cache_stats",
+    ),
+    path(
+        "calculation-metrics/",
+        get_calculation_metrics_stats,
+        name="calculation_metrics",
+    ),
+    path(
+        "calculation-profiles/",
+        calculation_profiles,
+        name="calculation_profiles",
+    ),
+    path(
+        "calculation-profiles/<str:profile_id>/",
+        download_calculation_profile,
+        name="download_calculation_profile",
+    ),
+    path(
+        "authentication-cache-stats/",
+        get_authentication_cache_stats,
+        name="authentication_cache_stats",
+    ),
     path("save-calculation/", save_calculation, name="save_calculation"),
     path("get-fixtures/", get_fixtures, name="get_fixtures"),
     path(
@@ -0,0 +1,154 @@
+import json
+import os
+import random
+import tracemalloc
+from django.conf import settings
+
+SUBSCRIPT_DIGITS = "₀₁₂₃₄₅₆₇₈₉"
+
+# Характерные значения входных данных (температуры, плотности, массы, объемы)
+TYPICAL_VALUES = (0.003, 0.008, 0.05, 0.5, 0.9, 1.2, 5, 12, 18, 20.5, 45, 100, 850)
+
+# Значения, которые должны уходить на скалярный движок или давать ошибки
+EDGE_VALUES = ("", "0", "0,0", " 1,5 ", "abc", "1e400", "-0", 0, 7)
+
+
+def get_fixtures_path():
+    return os.path.join(settings.BASE_DIR, "formulas", "research_methods_fixtures")
+
+
+def load_fixture_methods(object_types=("oil_products", "condensate")):
+    """
+    Загружает методы исследования из research_methods_fixtures.
+
+    Returns:
+        list: Пары (имя фикстуры вида oil_products/01, описание метода)
+    """
+    methods = []
+    for object_type in object_types:
+        fixtures_path = os.path.join(get_fixtures_path(), object_type)
+        if not os.path.exists(fixtures_path):
+            continue
+        for filename in sorted(os.listdir(fixtures_path)):
+            if not filename.endswith(".json"):
+                continue
+            with open(
+                os.path.join(fixtures_path, filename), "r", encoding="utf-8"
+            ) as file:
+                method = json.load(file)
+            fixture_name = f"{object_type}/{os.path.splitext(filename)[0]}"
+            method.setdefault("id", fixture_name)
+            methods.append((fixture_name, method))
+    return methods
+
+
+def generate_input_sets(method, count, seed=0):
+    """
+    Генерирует наборы входных данных для метода.
+
+    Параллельные измерения одной величины (t₁₁, t₁₂, t₂₁...) получают близкие
+    значения, поэтому в выборку попадают и удовлетворительная, и
+    неудовлетворительная повторяемость.
+    """
+    rnd = random.Random(seed)
+    fields = method.get("input_data", {}).get("fields", [])
+    input_sets = []
+    for _ in range(count):
+        spread = rnd.choice([0, 0.0001, 0.001, 0.01, 0.05])
+        bases = {}
+        input_data = {}
+        for field in fields:
+            stem = field["name"].rstrip(SUBSCRIPT_DIGITS)
+            if stem not in bases:
+                bases[stem] = rnd.choice(TYPICAL_VALUES) * rnd.uniform(0.5, 1.5)
+            value = bases[stem] * (1 + rnd.uniform(-spread, spread))
+            input_data[field["name"]] = f"{value:.{rnd.randint(1, 4)}f}"
+        input_sets.append(input_data)
+    return input_sets
+
+
+def generate_edge_input_sets(method, count, seed=0):
+    """
+    Генерирует наборы входных данных с граничными значениями: каждый
+    десятый набор содержит значение из EDGE_VALUES, еще каждый десятый -
+    одинаковые параллельные измерения (нулевые разности).
+    """
+    rnd = random.Random(seed)
+    input_sets = generate_input_sets(method, count, seed)
+    for input_data in input_sets[: count // 10]:
+        key = rnd.choice(list(input_data))
+        input_data[key] = rnd.choice(EDGE_VALUES)
+    for input_data in input_sets[count // 10 : count // 5]:
+        value = rnd.choice(["1", "0", "12.5"])
+        for key in input_data:
+            input_data[key] = value
+    rnd.shuffle(input_sets)
+    return input_sets
+
+
+def summarize_timings(timings):
+    """
+    Сводит длительности вызовов (в секундах) в показатели замера.
+
+    Returns:
+        dict: Количество вызовов, p50 и p95 в микросекундах и
+            пропускная способность (вызовов в секунду)
+    """
+    timings = sorted(timings)
+    if not timings:
+        return {"count": 0, "p50_us": None, "p95_us": None, "ops_per_sec": None}
+    total = sum(timings)
+    return {
+        "count": len(timings),
+        "p50_us": round(_percentile(timings, 50) * 1e6, 2),
+        "p95_us": round(_percentile(timings, 95) * 1e6, 2),
+        "ops_per_sec": round(len(timings) / total, 1) if total else None,
+    }
+
+
+def _percentile(sorted_values, percent):
+    # Линейная интерполяция между соседними значениями (как numpy.percentile)
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return (
+        sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+    )
+
+
+def measure_allocations(function, calls):
+    """
+    Замеряет выделение памяти вызовами function через tracemalloc.
+
+    Args:
+        function (callable): Замеряемая функция
+        calls (list): Аргументы вызовов (кортежи)
+
+    Returns:
+        dict: Средние на вызов пиковый объем выделенной памяти и объем
+            памяти, оставшейся занятой после вызова (байт)
+    """
+    if not calls:
+        return {"peak_bytes": None, "retained_bytes": None}
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    peak_total = 0
+    retained_total = 0
+    try:
+        for args in calls:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            function(*args)
+            after, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - before
+            retained_total += after - before
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return {
+        "peak_bytes": peak_total // len(calls),
+        "retained_bytes": retained_total // len(calls),
+    }
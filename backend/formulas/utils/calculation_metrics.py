@@ -0,0 +1,340 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import contextvars
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.utils import timezone
+from .latency import LATENCY_BUCKETS_MS, LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Этапы расчета в порядке отметок времени, которые ставит расчет
+CALCULATION_PHASES = ("intermediate", "convergence", "result", "measurement_error")
+
+# Количество профилей, хранимых в процессе
+CALCULATION_PROFILE_LIMIT = getattr(settings, "CALCULATION_PROFILE_LIMIT", 20)
+
+# Наибольшее количество расчетов в одном профиле
+MAX_PROFILE_CALCULATIONS = 1000
+
+# Ключ метода -> MethodMetrics
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+# Метод, расчет которого замеряется в текущем запросе
+_current_method = contextvars.ContextVar("measured_method", default=None)
+
+# Ключ метода -> профиль, ожидающий расчетов; ID профиля -> профиль
+_pending_profiles = {}
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+# Профилировщик может работать только в одном расчете одновременно
+_profiler_lock = threading.Lock()
+
+
+def get_method_key(method_id, plan):
+    """
+    Возвращает ключ метода для метрик: ID метода или, для метода без ID,
+    хэш его описания.
+    """
+    if method_id not in (None, ""):
+        return str(method_id)
+    return f"source:{plan['source_hash'][:12]}"
+
+
+class MethodMetrics:
+    """
+    Метрики расчетов одного метода исследования.
+
+    Attributes:
+        name (str): Название метода (если известно)
+        phases (dict): Этап -> LatencyHistogram. Кроме этапов
+            CALCULATION_PHASES: request и batch (запрос целиком), vectorized
+            (векторный расчет, время на один набор)
+        errors (int): Количество запросов, завершившихся ошибкой
+    """
+
+    __slots__ = ("name", "phases", "errors")
+
+    def __init__(self, name=None):
+        self.name = name
+        self.phases = {}
+        self.errors = 0
+
+    def observe(self, phase, value, count=1):
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = LatencyHistogram()
+        histogram.observe(value, count)
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "errors": self.errors,
+            "phases": {
+                phase: histogram.as_dict() for phase, histogram in self.phases.items()
+            },
+        }
+
+
+class MeasuredMethod:
+    """
+    Метод, расчет которого замеряется в текущем запросе.
+    """
+
+    __slots__ = ("key", "name")
+
+    def __init__(self, key, name=None):
+        self.key = key
+        self.name = name
+
+
+def _get_metrics(method):
+    # Вызывается под _metrics_lock
+    metrics = _metrics.get(method.key)
+    if metrics is None:
+        metrics = _metrics[method.key] = MethodMetrics(method.name)
+    elif method.name and metrics.name != method.name:
+        metrics.name = method.name
+    return metrics
+
+
+def start_phases():
+    """
+    Возвращает список отметок времени этапов расчета (первая - начало
+    расчета) или None, если расчет не замеряется.
+
+    Расчет добавляет в список время окончания каждого этапа
+    CALCULATION_PHASES по порядку.
+    """
+    if _current_method.get() is None:
+        return None
+    return [time.perf_counter()]
+
+
+def record_phases(marks):
+    """
+    Записывает длительности этапов расчета по отметкам времени.
+    """
+    method = _current_method.get()
+    if method is None or not marks:
+        return
+    with _metrics_lock:
+        metrics = _get_metrics(method)
+        for phase, started, finished in zip(CALCULATION_PHASES, marks, marks[1:]):
+            metrics.observe(phase, (finished - started) * 1000)
+
+
+def record_phase(phase, seconds, count=1):
+    """
+    Записывает длительность этапа расчета, одинаковую для count наборов.
+    """
+    method = _current_method.get()
+    if method is None:
+        return
+    with _metrics_lock:
+        _get_metrics(method).observe(phase, seconds * 1000, count)
+
+
+@contextmanager
+def measure_method(key, name=None, kind="request"):
+    """
+    Замеряет расчет метода внутри блока.
+
+    Время всего блока записывается в этап kind, исключение считается
+    ошибкой. Этапы расчета записывают функции расчета (start_phases и
+    record_phases). Если для метода запрошен профиль, блок выполняется
+    под cProfile.
+    """
+    method = MeasuredMethod(key, name)
+    token = _current_method.set(method)
+    profile = _take_pending_profile(key)
+    started = time.perf_counter()
+    failed = False
+    try:
+        if profile is not None:
+            with profile.capture():
+                yield method
+        else:
+            yield method
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        _current_method.reset(token)
+        with _metrics_lock:
+            metrics = _get_metrics(method)
+            metrics.observe(kind, elapsed)
+            if failed:
+                metrics.errors += 1
+        if profile is not None:
+            _finish_profile_calculation(profile)
+
+
+def get_calculation_metrics():
+    """
+    Возвращает метрики расчетов по методам.
+    """
+    with _metrics_lock:
+        methods = {key: metrics.as_dict() for key, metrics in _metrics.items()}
+    return {
+        "buckets_ms": list(LATENCY_BUCKETS_MS),
+        "phases": list(CALCULATION_PHASES),
+        "methods": methods,
+    }
+
+
+def clear_calculation_metrics():
+    """
+    Сбрасывает метрики расчетов.
+    """
+    with _metrics_lock:
+        _metrics.clear()
+
+
+class CalculationProfile:
+    """
+    Профиль (cProfile) расчетов одного метода.
+
+    Attributes:
+        profile_id (str): ID профиля
+        method_key (str): Ключ метода
+        requested (int): Сколько расчетов нужно профилировать
+        captured (int): Сколько расчетов профилировано
+        created_at (datetime): Время запроса профиля
+        finished_at (datetime): Время завершения профиля или None
+        data (bytes): Статистика в формате pstats (после завершения)
+    """
+
+    __slots__ = (
+        "profile_id",
+        "method_key",
+        "requested",
+        "captured",
+        "created_at",
+        "finished_at",
+        "profiler",
+        "data",
+    )
+
+    def __init__(self, method_key, requested):
+        self.profile_id = uuid.uuid4().hex
+        self.method_key = method_key
+        self.requested = requested
+        self.captured = 0
+        self.created_at = timezone.now()
+        self.finished_at = None
+        self.profiler = cProfile.Profile()
+        self.data = None
+
+    @contextmanager
+    def capture(self):
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    def as_dict(self):
+        return {
+            "id": self.profile_id,
+            "method": self.method_key,
+            "requested": self.requested,
+            "captured": self.captured,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "ready": self.data is not None,
+        }
+
+    def summary(self, limit=40):
+        """
+        Возвращает текстовую сводку профиля (функции по общему времени).
+        """
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+
+def request_profile(method_key, calculations=1):
+    """
+    Запрашивает профиль следующих calculations расчетов метода в этом
+    процессе. Предыдущий незавершенный профиль метода заменяется.
+
+    Raises:
+        ValueError: Если количество расчетов вне допустимого диапазона
+    """
+    if not 1 <= calculations <= MAX_PROFILE_CALCULATIONS:
+        raise ValueError(
+            f"Количество расчетов должно быть от 1 до {MAX_PROFILE_CALCULATIONS}"
+        )
+    profile = CalculationProfile(str(method_key), calculations)
+    with _profiles_lock:
+        previous = _pending_profiles.get(profile.method_key)
+        if previous is not None:
+            _profiles.pop(previous.profile_id, None)
+        _pending_profiles[profile.method_key] = profile
+        _profiles[profile.profile_id] = profile
+        while len(_profiles) > CALCULATION_PROFILE_LIMIT:
+            _, removed = _profiles.popitem(last=False)
+            if _pending_profiles.get(removed.method_key) is removed:
+                del _pending_profiles[removed.method_key]
+    return profile
+
+
+def _take_pending_profile(key):
+    """
+    Возвращает профиль, ожидающий расчета метода, и занимает профилировщик.
+    Если профилировщик занят другим расчетом, этот расчет не профилируется.
+    """
+    if not _pending_profiles or key not in _pending_profiles:
+        return None
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+    with _profiles_lock:
+        profile = _pending_profiles.get(key)
+    if profile is None:
+        _profiler_lock.release()
+    return profile
+
+
+def _finish_profile_calculation(profile):
+    try:
+        with _profiles_lock:
+            profile.captured += 1
+            if profile.captured < profile.requested:
+                return
+            if _pending_profiles.get(profile.method_key) is profile:
+                del _pending_profiles[profile.method_key]
+        profile.profiler.create_stats()
+        profile.data = marshal.dumps(profile.profiler.stats)
+        profile.finished_at = timezone.now()
+        logger.info(
+            f"Профиль расчета метода {profile.method_key} готов: {profile.profile_id}"
+        )
+    finally:
+        _profiler_lock.release()
+
+
+def get_profile(profile_id):
+    """
+    Возвращает профиль по ID или None.
+    """
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def get_profiles():
+    """
+    Возвращает профили процесса, начиная с последнего запрошенного.
+    """
+    with _profiles_lock:
+        return list(reversed(_profiles.values()))
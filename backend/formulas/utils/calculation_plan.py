@@ -0,0 +1,316 @@
+import hashlib
+import heapq
+import json
+import logging
+from .formula_compiler import get_table_names, get_variable_names
+from .formula_utils import check_formula_syntax, _replace_subscript_digits
+
+logger = logging.getLogger(__name__)
+
+# Версия формата плана. Планы с другой версией пересобираются.
+PLAN_VERSION = 3
+
+# Поля метода исследования, из которых строится план расчета
+PLAN_SOURCE_FIELDS = (
+    "formula",
+    "measurement_error",
+    "unit",
+    "input_data",
+    "intermediate_data",
+    "convergence_conditions",
+    "rounding_type",
+    "rounding_decimal",
+)
+
+
+def get_plan_source_hash(method):
+    """
+    Возвращает хэш полей метода, от которых зависит план расчета.
+    """
+    source = {key: method.get(key) for key in PLAN_SOURCE_FIELDS}
+    dump = json.dumps(source, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(dump.encode("utf-8")).hexdigest()
+
+
+def is_plan_current(plan, method):
+    """
+    Проверяет, что план построен текущей версией компилятора для этого метода.
+    """
+    return (
+        isinstance(plan, dict)
+        and plan.get("version") == PLAN_VERSION
+        and plan.get("source_hash") == get_plan_source_hash(method)
+    )
+
+
+def _formula_names(formula, is_condition=False):
+    """
+    Возвращает нормализованные имена переменных, используемых в формуле.
+    """
+    compiled = check_formula_syntax(formula, is_condition=is_condition)
+    if compiled.tree is None:
+        return []
+    return get_variable_names(compiled.tree)
+
+
+def _plan_tables(plan):
+    """
+    Возвращает отсортированные коды справочных таблиц, используемых в
+    формулах плана.
+    """
+    formulas = [(plan["formula"], False)]
+    for step in plan["steps"]:
+        if step["kind"] == "formula":
+            formulas.append((step["formula"], False))
+        elif step["kind"] == "range":
+            for range_item in step["range_calculation"]["ranges"]:
+                formulas.append((range_item["condition"], True))
+                formulas.append((range_item["formula"], False))
+    for condition in plan["convergence_conditions"]:
+        formulas.append((condition["formula"], True))
+    if plan["measurement_error"].get("type") == "formula":
+        formulas.append((plan["measurement_error"]["value"], False))
+
+    tables = set()
+    for formula, is_condition in formulas:
+        compiled = check_formula_syntax(formula, is_condition=is_condition)
+        if compiled.tree is not None:
+            tables.update(get_table_names(compiled.tree))
+    return sorted(tables)
+
+
+def _build_step(field):
+    """
+    Строит шаг плана для промежуточного поля.
+
+    Returns:
+        tuple: (шаг плана, нормализованные имена переменных, от которых он зависит)
+    """
+    name = field["name"]
+    step = {"name": name, "show": field.get("show_calculation", True)}
+
+    if field.get("use_threshold_table"):
+        threshold_values = field.get("threshold_table_values") or {}
+        step["kind"] = "threshold"
+        step["threshold_table_values"] = {
+            "target_variable": threshold_values.get("target_variable"),
+            "higher_variable": threshold_values.get("higher_variable"),
+            "lower_variable": threshold_values.get("lower_variable"),
+            # Поле формулы задается позже, когда известны все поля метода
+            "formula": None,
+        }
+        names = [
+            _replace_subscript_digits(value)
+            for value in threshold_values.values()
+            if isinstance(value, str)
+        ]
+        return step, names
+
+    range_calculation = field.get("range_calculation")
+    if range_calculation and "ranges" in range_calculation:
+        step["kind"] = "range"
+        step["formula"] = field["formula"]
+        step["range_calculation"] = {"ranges": range_calculation["ranges"]}
+        names = []
+        for range_item in range_calculation["ranges"]:
+            names.extend(_formula_names(range_item["condition"], is_condition=True))
+            names.extend(_formula_names(range_item["formula"]))
+        return step, names
+
+    step["kind"] = "formula"
+    step["formula"] = field["formula"]
+    step["rounding_params"] = None
+    if field.get("use_multiple_rounding"):
+        step["rounding_params"] = {
+            "use_multiple_rounding": True,
+            "rounding_type": field.get("rounding_type"),
+            "rounding_decimal": field.get("rounding_decimal"),
+            "multiple_value": field.get("multiple_value"),
+        }
+    return step, _formula_names(field["formula"])
+
+
+def _topological_order(steps, dependencies):
+    """
+    Упорядочивает шаги так, чтобы каждое поле вычислялось после своих
+    зависимостей. При отсутствии ограничений сохраняется исходный порядок.
+    """
+    dependents = {index: [] for index in range(len(steps))}
+    remaining = {}
+    for index, depends_on in dependencies.items():
+        remaining[index] = len(depends_on)
+        for dependency in depends_on:
+            dependents[dependency].append(index)
+
+    ready = [index for index, count in remaining.items() if count == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        index = heapq.heappop(ready)
+        order.append(index)
+        for dependent in dependents[index]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                heapq.heappush(ready, dependent)
+
+    if len(order) != len(steps):
+        cyclic = [steps[index]["name"] for index in sorted(set(remaining) - set(order))]
+        raise ValueError(
+            f"Циклическая зависимость промежуточных полей: {', '.join(cyclic)}"
+        )
+    return order
+
+
+def build_calculation_plan(method):
+    """
+    Строит план расчета для метода исследования.
+
+    План содержит промежуточные поля в порядке зависимостей (входные данные ->
+    промежуточные поля -> результат и погрешность), без полей, которые не
+    отображаются и ни на что не влияют, с разрешенными полями табличных
+    значений и готовыми параметрами округления.
+
+    Raises:
+        ValueError: Если метод содержит некорректные формулы или циклы
+    """
+    if method.get("rounding_type") not in ["decimal", "significant"]:
+        raise ValueError("Неверный тип округления")
+
+    intermediate_fields = (method.get("intermediate_data") or {}).get("fields", [])
+    fields = [
+        field
+        for field in intermediate_fields
+        if field.get("name", "").strip() and field.get("formula", "").strip()
+    ]
+
+    # Поле с повторяющимся именем заменяет предыдущие, как при расчете по
+    # списку полей, где более позднее значение перезаписывает ранее вычисленное
+    last_indexes = {
+        _replace_subscript_digits(field["name"]): index
+        for index, field in enumerate(fields)
+    }
+    step_fields = []
+    for index, field in enumerate(fields):
+        if last_indexes[_replace_subscript_digits(field["name"])] != index:
+            logger.warning(
+                f"Повторяющееся имя промежуточного поля: {field['name']}, "
+                f"используется последнее поле с этим именем"
+            )
+            continue
+        step_fields.append(field)
+
+    steps = []
+    step_names = []
+    indexes = {}
+    for field in step_fields:
+        normalized_name = _replace_subscript_digits(field["name"])
+        try:
+            step, names = _build_step(field)
+        except ValueError as e:
+            raise ValueError(
+                f"Ошибка в формуле промежуточного поля {field['name']}: {str(e)}"
+            )
+        indexes[normalized_name] = len(steps)
+        steps.append(step)
+        step_names.append(names)
+
+    # Поле с формулой для target_variable в методе ближайших табличных значений
+    for step, field in zip(steps, step_fields):
+        if step["kind"] == "threshold":
+            threshold_values = step["threshold_table_values"]
+            target_variable = threshold_values["target_variable"]
+            target_field = next(
+                (item for item in fields if item["name"] == target_variable), None
+            )
+            threshold_values["formula"] = (
+                target_field["formula"] if target_field else field["formula"]
+            )
+
+    dependencies = {}
+    uses = {}
+    for index, (step, names) in enumerate(zip(steps, step_names)):
+        if step["kind"] == "threshold":
+            names = names + [
+                _replace_subscript_digits(step["threshold_table_values"]["formula"])
+            ]
+        uses[index] = sorted(set(names))
+        dependencies[index] = sorted(
+            {
+                indexes[name]
+                for name in names
+                if name in indexes and indexes[name] != index
+            }
+        )
+
+    order = _topological_order(steps, dependencies)
+
+    # Имена, от которых зависят условия повторяемости, результат и погрешность
+    try:
+        required_names = set(_formula_names(method.get("formula", "")))
+    except ValueError as e:
+        raise ValueError(f"Ошибка в формуле расчета: {str(e)}")
+
+    convergence_conditions = []
+    for condition in (method.get("convergence_conditions") or {}).get("formulas", []):
+        try:
+            required_names.update(
+                _formula_names(condition["formula"], is_condition=True)
+            )
+        except ValueError as e:
+            raise ValueError(
+                f"Ошибка в условии повторяемости {condition['formula']}: {str(e)}"
+            )
+        convergence_conditions.append(
+            {
+                "formula": condition["formula"],
+                "convergence_value": condition["convergence_value"],
+                "custom_value": condition.get("custom_value"),
+            }
+        )
+
+    measurement_error = method.get("measurement_error") or {}
+    if measurement_error.get("type") == "formula":
+        try:
+            required_names.update(_formula_names(measurement_error["value"]))
+        except ValueError as e:
+            raise ValueError(f"Ошибка в формуле погрешности: {str(e)}")
+
+    # Оставляем отображаемые поля и все поля, от которых что-либо зависит
+    required = {indexes[name] for name in required_names if name in indexes}
+    required.update(index for index, step in enumerate(steps) if step["show"])
+    pending = list(required)
+    while pending:
+        for dependency in dependencies[pending.pop()]:
+            if dependency not in required:
+                required.add(dependency)
+                pending.append(dependency)
+
+    plan_steps = []
+    for index in order:
+        if index not in required:
+            continue
+        step = dict(steps[index])
+        step["depends_on"] = [
+            steps[dependency]["name"] for dependency in dependencies[index]
+        ]
+        # Нормализованные имена переменных и полей, от которых зависит шаг
+        step["uses"] = uses[index]
+        plan_steps.append(step)
+
+    plan = {
+        "version": PLAN_VERSION,
+        "source_hash": get_plan_source_hash(method),
+        "steps": plan_steps,
+        "dropped_fields": [
+            steps[index]["name"] for index in order if index not in required
+        ],
+        "convergence_conditions": convergence_conditions,
+        "formula": method.get("formula", ""),
+        "rounding_type": method["rounding_type"],
+        "rounding_decimal": method.get("rounding_decimal"),
+        "measurement_error": measurement_error,
+        "unit": method.get("unit"),
+    }
+    # Коды справочных таблиц: их версии входят в ключи кэшей результатов
+    plan["tables"] = _plan_tables(plan)
+    return plan
@@ -0,0 +1,118 @@
+from collections import deque
+from contextlib import contextmanager
+import contextvars
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from django.conf import settings
+
+# Журнал, в который записываются сохраняемые трассировки (одна строка JSON)
+trace_logger = logging.getLogger("formulas.calculation_trace")
+
+# Количество последних событий, хранимых в трассировке запроса
+TRACE_BUFFER_SIZE = getattr(settings, "CALCULATION_TRACE_BUFFER_SIZE", 200)
+
+# Доля успешных запросов, трассировка которых записывается в журнал
+TRACE_SAMPLE_RATE = getattr(settings, "CALCULATION_TRACE_SAMPLE_RATE", 0.0)
+
+_current_trace = contextvars.ContextVar("calculation_trace", default=None)
+
+
+def _plain(value):
+    """
+    Преобразует значение поля события в тип, который можно записать в JSON.
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else str(value)
+    if value is None or isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return str(value)
+
+
+class CalculationTrace:
+    """
+    Трассировка одного запроса расчета.
+
+    События хранятся в кольцевом буфере без форматирования: ссылки на
+    значения и время. В текст они превращаются, только если трассировку
+    нужно вернуть клиенту или записать в журнал.
+
+    Attributes:
+        trace_id (str): Идентификатор трассировки
+        sampled (bool): Запрос попал в выборку и записывается в журнал
+        events (deque): Последние события (время, имя, поля)
+        count (int): Общее количество событий, включая вытесненные
+    """
+
+    __slots__ = ("trace_id", "sampled", "started", "events", "count")
+
+    def __init__(self, size=TRACE_BUFFER_SIZE, sampled=False):
+        self.trace_id = uuid.uuid4().hex
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.events = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, event, fields):
+        self.events.append((time.perf_counter(), event, fields))
+        self.count += 1
+
+    def as_dict(self):
+        """
+        Возвращает события трассировки в виде, пригодном для JSON.
+        """
+        events = []
+        for moment, event, fields in self.events:
+            item = {"time_ms": round((moment - self.started) * 1000, 3), "event": event}
+            item.update((key, _plain(value)) for key, value in fields.items())
+            events.append(item)
+        return {
+            "trace_id": self.trace_id,
+            "events": events,
+            "dropped": self.count - len(events),
+        }
+
+    def write(self, reason):
+        """
+        Записывает трассировку в журнал formulas.calculation_trace.
+        """
+        data = self.as_dict()
+        data["reason"] = reason
+        trace_logger.info(json.dumps(data, ensure_ascii=False))
+
+
+def trace(event, **fields):
+    """
+    Добавляет событие в трассировку текущего запроса.
+
+    Вне запроса с трассировкой ничего не делает. Значения полей не
+    копируются и не форматируются, поэтому передавать нужно значения,
+    которые не изменятся до конца запроса.
+    """
+    current = _current_trace.get()
+    if current is not None:
+        current.add(event, fields)
+
+
+@contextmanager
+def calculation_trace():
+    """
+    Включает трассировку для кода внутри блока.
+
+    Запрос попадает в выборку с вероятностью CALCULATION_TRACE_SAMPLE_RATE.
+    """
+    current = CalculationTrace(
+        sampled=TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE
+    )
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
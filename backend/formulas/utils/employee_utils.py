@@ -1,9 +1,18 @@
 import os
-import functools
-import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import hashlib
+import threading
+import time
 from dotenv import load_dotenv
 import logging
 import urllib3
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.utils import timezone
+from .http_client import get_http_client
 
 load_dotenv()
 
@@ -11,20 +20,184 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 HR_API_URL = os.getenv("HR_API_URL")
 HR_API_KEY = os.getenv("HR_API_KEY")
+# Количество одновременных запросов к HR-API при получении ФИО списком
+HR_API_CONCURRENCY = int(os.getenv("HR_API_CONCURRENCY", "8"))
+
+EMPLOYEE_NAME_CACHE_KEY_PREFIX = "employee_name"
 
 logger = logging.getLogger(__name__)
 
 
-@functools.lru_cache(maxsize=512)
-def get_employee_name(hash_md5: str) -> str:
-    """Возвращает ФИО сотрудника по hashMd5 через HR-API."""
-    if not hash_md5:
-        return ""
+class EmployeeNameCache:
+    """
+    Кэш ФИО сотрудников по hashMd5.
+
+    Записи хранятся в LRU-кэше процесса и, если задан алиас, в общем кэше
+    Django: ФИО, полученное одним процессом, не запрашивается остальными, а
+    при постоянном бэкенде (база данных, Redis) сохраняется после
+    перезапуска. ФИО действует timeout секунд. Пустая строка (HR-API не
+    вернул ФИО) действует negative_timeout секунд, после чего ФИО
+    запрашивается снова.
+
+    В общем кэше вместе с ФИО хранится время истечения записи: запись,
+    прочитанная из общего кэша, действует в процессе только оставшееся
+    время, а не полный срок заново.
+    """
+
+    def __init__(self, maxsize, backend=None, timeout=86400, negative_timeout=300):
+        self.maxsize = maxsize
+        self.backend = backend
+        self.timeout = timeout
+        self.negative_timeout = negative_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local_hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def make_key(hash_md5):
+        digest = hashlib.sha1(hash_md5.encode("utf-8")).hexdigest()
+        return f"{EMPLOYEE_NAME_CACHE_KEY_PREFIX}:{digest}"
+
+    def get(self, hash_md5):
+        """
+        Возвращает ФИО, пустую строку для неудачного запроса или None.
+        """
+        return self.get_many([hash_md5]).get(hash_md5)
+
+    def get_many(self, hashes):
+        """
+        Возвращает найденные в кэше ФИО (hashMd5 -> ФИО).
+        """
+        names = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for hash_md5 in hashes:
+                entry = self._entries.get(hash_md5)
+                if entry is not None and entry[0] <= now:
+                    del self._entries[hash_md5]
+                    entry = None
+                if entry is None:
+                    missing.append(hash_md5)
+                    continue
+                self._entries.move_to_end(hash_md5)
+                names[hash_md5] = entry[1]
+            self._local_hits += len(names)
+
+        shared = self._get_shared(missing)
+        with self._lock:
+            for hash_md5, (name, timeout) in shared.items():
+                self._store_local(hash_md5, name, timeout)
+                names[hash_md5] = name
+            self._shared_hits += len(shared)
+            self._misses += len(missing) - len(shared)
+        return names
+
+    def set(self, hash_md5, name):
+        self.set_many({hash_md5: name})
 
+    def set_many(self, names):
+        with self._lock:
+            for hash_md5, name in names.items():
+                self._store_local(hash_md5, name)
+        if self.backend is None or not names:
+            return
+        now = time.time()
+        found = {
+            self.make_key(h): (now + self.timeout, name)
+            for h, name in names.items()
+            if name
+        }
+        failed = {
+            self.make_key(h): (now + self.negative_timeout, name)
+            for h, name in names.items()
+            if not name
+        }
+        try:
+            if found:
+                caches[self.backend].set_many(found, self.timeout)
+            if failed:
+                caches[self.backend].set_many(failed, self.negative_timeout)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить ФИО в общий кэш: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._local_hits = self._shared_hits = self._misses = 0
+
+    def info(self):
+        """
+        Возвращает статистику кэша.
+        """
+        with self._lock:
+            hits = self._local_hits + self._shared_hits
+            requests = hits + self._misses
+            return {
+                "hits": hits,
+                "local_hits": self._local_hits,
+                "shared_hits": self._shared_hits,
+                "misses": self._misses,
+                "hit_rate": round(hits / requests, 4) if requests else None,
+                "maxsize": self.maxsize,
+                "currsize": len(self._entries),
+                "backend": self.backend,
+            }
+
+    def _get_shared(self, hashes):
+        """
+        Возвращает записи общего кэша: hashMd5 -> (ФИО, оставшееся время
+        действия записи, сек.).
+        """
+        if self.backend is None or not hashes:
+            return {}
+        keys = {self.make_key(hash_md5): hash_md5 for hash_md5 in hashes}
+        try:
+            values = caches[self.backend].get_many(list(keys))
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать ФИО из общего кэша: {str(e)}")
+            return {}
+        now = time.time()
+        entries = {}
+        for key, value in values.items():
+            if isinstance(value, str):
+                # Запись без времени истечения (сохранена до его появления):
+                # оставшееся время неизвестно, в процессе она действует
+                # negative_timeout секунд
+                entries[keys[key]] = (value, self.negative_timeout)
+            elif isinstance(value, (tuple, list)) and len(value) == 2:
+                expires_at, name = value
+                if expires_at > now:
+                    entries[keys[key]] = (name, expires_at - now)
+        return entries
+
+    def _store_local(self, hash_md5, name, timeout=None):
+        if self.maxsize <= 0:
+            return
+        full_timeout = self.timeout if name else self.negative_timeout
+        timeout = full_timeout if timeout is None else min(timeout, full_timeout)
+        self._entries[hash_md5] = (time.monotonic() + timeout, name)
+        self._entries.move_to_end(hash_md5)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+employee_name_cache = EmployeeNameCache(
+    maxsize=getattr(settings, "EMPLOYEE_NAME_CACHE_SIZE", 4096),
+    backend=getattr(settings, "EMPLOYEE_NAME_CACHE_BACKEND", None),
+    timeout=getattr(settings, "EMPLOYEE_NAME_CACHE_TIMEOUT", 86400),
+    negative_timeout=getattr(settings, "EMPLOYEE_NAME_NEGATIVE_TIMEOUT", 300),
+)
+
+
+def _fetch_employee_name(hash_md5):
+    """Запрашивает ФИО сотрудника по hashMd5 в HR-API."""
     logger.debug(f"Запрашиваем ФИО сотрудника по hash {hash_md5}")
 
     try:
-        resp = requests.get(
+        resp = get_http_client().get(
             f"{HR_API_URL}/api/Employee/by-hash/{hash_md5}",
             headers={"X-API-KEY": HR_API_KEY},
             timeout=3,
@@ -45,3 +218,124 @@ def get_employee_name(hash_md5: str) -> str:
         logger.exception("Ошибка запроса HR-API для hash %s: %s", hash_md5, e)
 
     return ""
+
+
+def fetch_employee_names(hashes, max_workers=None) -> dict:
+    """
+    Запрашивает ФИО сотрудников в HR-API без обращения к кэшу, не более
+    max_workers запросов одновременно (по умолчанию HR_API_CONCURRENCY).
+
+    Returns:
+        dict: hashMd5 -> ФИО (пустая строка, если получить ФИО не удалось)
+    """
+    hashes = list(hashes)
+    if not hashes:
+        return {}
+
+    workers = min(max_workers or HR_API_CONCURRENCY, len(hashes))
+    logger.debug(f"Запрашиваем ФИО {len(hashes)} сотрудников, потоков: {workers}")
+    if workers <= 1:
+        return {hash_md5: _fetch_employee_name(hash_md5) for hash_md5 in hashes}
+    with ThreadPoolExecutor(workers, thread_name_prefix="hr-api") as executor:
+        return dict(zip(hashes, executor.map(_fetch_employee_name, hashes)))
+
+
+def get_employee_name(hash_md5: str) -> str:
+    """Возвращает ФИО сотрудника по hashMd5 через HR-API."""
+    if not hash_md5:
+        return ""
+
+    name = employee_name_cache.get(hash_md5)
+    if name is None:
+        name = _fetch_employee_name(hash_md5)
+        employee_name_cache.set(hash_md5, name)
+    return name
+
+
+def resolve_employee_names(hashes, max_workers=None) -> dict:
+    """
+    Возвращает ФИО сотрудников по списку hashMd5.
+
+    Повторяющиеся и пустые hashMd5 отбрасываются, ФИО из кэша возвращаются
+    без запроса, остальные запрашиваются в HR-API одновременно (не более
+    max_workers запросов, по умолчанию HR_API_CONCURRENCY).
+
+    Args:
+        hashes (iterable): hashMd5 сотрудников
+        max_workers (int): Наибольшее количество одновременных запросов
+
+    Returns:
+        dict: hashMd5 -> ФИО (пустая строка, если получить ФИО не удалось)
+    """
+    unique = list(dict.fromkeys(hash_md5 for hash_md5 in hashes if hash_md5))
+    names = employee_name_cache.get_many(unique)
+    missing = [hash_md5 for hash_md5 in unique if hash_md5 not in names]
+    if missing:
+        fetched = fetch_employee_names(missing, max_workers)
+        employee_name_cache.set_many(fetched)
+        names.update(fetched)
+    return names
+
+
+def get_executor_hashes(days=None):
+    """
+    Возвращает hashMd5 исполнителей расчетов (за последние days дней).
+    """
+    from ..models import Calculation
+
+    calculations = Calculation.objects.filter(is_deleted=False)
+    if days:
+        calculations = calculations.filter(
+            created_at__gte=timezone.now() - timedelta(days=days)
+        )
+    return [
+        hash_md5
+        for hash_md5 in calculations.values_list("executor", flat=True)
+        .order_by()
+        .distinct()
+        if hash_md5
+    ]
+
+
+def warm_up_employee_names(days=None):
+    """
+    Загружает ФИО исполнителей недавних расчетов из общего кэша в кэш
+    процесса. HR-API не запрашивается: отсутствующие ФИО обновляет команда
+    refresh_employee_names или первый запрос.
+
+    Returns:
+        int: Количество загруженных ФИО
+    """
+    if employee_name_cache.backend is None:
+        return 0
+    if days is None:
+        days = getattr(settings, "EMPLOYEE_NAME_WARMUP_DAYS", 180)
+    names = employee_name_cache.get_many(get_executor_hashes(days))
+    logger.info(f"Загружено ФИО сотрудников из общего кэша: {len(names)}")
+    return len(names)
+
+
+def start_employee_names_warm_up():
+    """
+    Запускает загрузку ФИО в фоновом потоке (при запуске процесса), чтобы не
+    задерживать обработку первых запросов.
+    """
+    if employee_name_cache.backend is None or not getattr(
+        settings, "EMPLOYEE_NAME_WARMUP_DAYS", 180
+    ):
+        return
+
+    def warm_up():
+        try:
+            warm_up_employee_names()
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить ФИО сотрудников: {str(e)}")
+        finally:
+            connection.close()
+
+    threading.Thread(target=warm_up, name="employee-names", daemon=True).start()
+
+
+def clear_employee_names():
+    """Очищает кэш ФИО сотрудников в процессе."""
+    employee_name_cache.clear()
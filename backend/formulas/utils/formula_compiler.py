@@ -0,0 +1,647 @@
+import operator
+import re
+
+# Эпсилон для сравнения чисел с плавающей точкой
+EPSILON = 1e-10
+
+# Функции, разрешенные в формулах, и допустимое количество аргументов
+FUNCTIONS = {
+    "abs": (abs, 1, 1),
+    "pow": (pow, 2, 3),
+    "round": (round, 1, 2),
+    "max": (max, 2, None),
+    "min": (min, 2, None),
+}
+
+# Функции поиска в справочных таблицах: первым аргументом передается код
+# таблицы, затем один или два ключа. Значение - метод LookupTable.
+TABLE_FUNCTIONS = {
+    "table": "lookup",
+    "interp": "interpolate",
+}
+
+KEYWORDS = {"and", "or", "not"}
+
+COMPARISON_OPERATORS = ("<=", ">=", "<", ">", "=")
+
+_BINARY_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "//": operator.floordiv,
+    "%": operator.mod,
+    "**": operator.pow,
+}
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<space>\s+)
+    |(?P<number>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+    |(?P<name>[^\W\d]\w*)
+    |(?P<op>\*\*|//|<=|>=|[-+*/%(),<>=])
+    """,
+    re.VERBOSE,
+)
+
+
+class FormulaSyntaxError(ValueError):
+    """
+    Ошибка разбора формулы.
+    """
+
+
+class Token:
+    __slots__ = ("kind", "value", "start", "end")
+
+    def __init__(self, kind, value, start, end):
+        self.kind = kind
+        self.value = value
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.value!r}, {self.start})"
+
+
+def tokenize(text):
+    """
+    Разбивает текст формулы на токены.
+    """
+    tokens = []
+    position = 0
+    length = len(text)
+    while position < length:
+        match = _TOKEN_RE.match(text, position)
+        if not match:
+            raise FormulaSyntaxError(
+                f"Недопустимый символ '{text[position]}' в позиции {position + 1}"
+            )
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "name" and value in KEYWORDS:
+            kind = "keyword"
+        if kind != "space":
+            tokens.append(Token(kind, value, match.start(), match.end()))
+        position = match.end()
+    tokens.append(Token("end", "", length, length))
+    return tokens
+
+
+# Узлы синтаксического дерева. Атрибут is_bool определяет тип узла:
+# логические узлы (сравнения и связки) и числовые (все остальные).
+
+
+class Node:
+    __slots__ = ("start", "end")
+    is_bool = False
+
+    def children(self):
+        return ()
+
+
+class Number(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value, start, end):
+        self.value = value
+        self.start = start
+        self.end = end
+
+
+class Name(Node):
+    __slots__ = ("name",)
+
+    def __init__(self, name, start, end):
+        self.name = name
+        self.start = start
+        self.end = end
+
+
+class UnaryOp(Node):
+    __slots__ = ("op", "operand")
+
+    def __init__(self, op, operand, start, end):
+        self.op = op
+        self.operand = operand
+        self.start = start
+        self.end = end
+
+    def children(self):
+        return (self.operand,)
+
+
+class BinOp(Node):
+    __slots__ = ("op", "left", "right")
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.start = left.start
+        self.end = right.end
+
+    def children(self):
+        return (self.left, self.right)
+
+
+class Call(Node):
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, args, start, end):
+        self.func = func
+        self.args = args
+        self.start = start
+        self.end = end
+
+    def children(self):
+        return tuple(self.args)
+
+
+class TableCall(Node):
+    __slots__ = ("func", "table", "args")
+
+    def __init__(self, func, table, args, start, end):
+        self.func = func
+        self.table = table
+        self.args = args
+        self.start = start
+        self.end = end
+
+    def children(self):
+        return tuple(self.args)
+
+
+class Compare(Node):
+    __slots__ = ("op", "left", "right")
+    is_bool = True
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.start = left.start
+        self.end = right.end
+
+    def children(self):
+        return (self.left, self.right)
+
+
+class BoolOp(Node):
+    __slots__ = ("op", "values")
+    is_bool = True
+
+    def __init__(self, op, values):
+        self.op = op
+        self.values = values
+        self.start = values[0].start
+        self.end = values[-1].end
+
+    def children(self):
+        return tuple(self.values)
+
+
+class Not(Node):
+    __slots__ = ("operand",)
+    is_bool = True
+
+    def __init__(self, operand, start):
+        self.operand = operand
+        self.start = start
+        self.end = operand.end
+
+    def children(self):
+        return (self.operand,)
+
+
+class Parser:
+    """
+    Парсер формул методом рекурсивного спуска.
+
+    Приоритет операций (от низшего к высшему): or, and, not, сравнения
+    (допускаются цепочки вида 0 < t <= 20), + -, * / // %, унарные + -, **.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    @property
+    def current(self):
+        return self.tokens[self.position]
+
+    def _advance(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _accept(self, *values):
+        token = self.current
+        if token.kind in ("op", "keyword") and token.value in values:
+            self.position += 1
+            return token
+        return None
+
+    def _expect(self, value):
+        token = self._accept(value)
+        if token is None:
+            self._error(f"ожидается '{value}'")
+        return token
+
+    def _error(self, message):
+        token = self.current
+        found = f"'{token.value}'" if token.kind != "end" else "конец формулы"
+        raise FormulaSyntaxError(
+            f"Ошибка в позиции {token.start + 1}: {message}, найдено {found}"
+        )
+
+    def parse(self):
+        if self.current.kind == "end":
+            raise FormulaSyntaxError("Пустая формула")
+        node = self._parse_or()
+        if self.current.kind != "end":
+            self._error("ожидается конец формулы")
+        return node
+
+    def _parse_or(self):
+        values = [self._parse_and()]
+        while self._accept("or"):
+            values.append(self._parse_and())
+        if len(values) == 1:
+            return values[0]
+        return BoolOp("or", [_require_bool(value) for value in values])
+
+    def _parse_and(self):
+        values = [self._parse_not()]
+        while self._accept("and"):
+            values.append(self._parse_not())
+        if len(values) == 1:
+            return values[0]
+        return BoolOp("and", [_require_bool(value) for value in values])
+
+    def _parse_not(self):
+        token = self._accept("not")
+        if token:
+            return Not(_require_bool(self._parse_not()), token.start)
+        return self._parse_comparison()
+
+    def _parse_comparison(self):
+        left = self._parse_sum()
+        comparisons = []
+        while True:
+            token = self._accept(*COMPARISON_OPERATORS)
+            if token is None:
+                break
+            right = self._parse_sum()
+            comparisons.append(
+                Compare(token.value, _require_number(left), _require_number(right))
+            )
+            left = right
+        if not comparisons:
+            return left
+        if len(comparisons) == 1:
+            return comparisons[0]
+        return BoolOp("and", comparisons)
+
+    def _parse_sum(self):
+        node = self._parse_product()
+        while True:
+            token = self._accept("+", "-")
+            if token is None:
+                return node
+            right = self._parse_product()
+            node = BinOp(token.value, _require_number(node), _require_number(right))
+
+    def _parse_product(self):
+        node = self._parse_unary()
+        while True:
+            token = self._accept("*", "/", "//", "%")
+            if token is None:
+                return node
+            right = self._parse_unary()
+            node = BinOp(token.value, _require_number(node), _require_number(right))
+
+    def _parse_unary(self):
+        token = self._accept("+", "-")
+        if token:
+            operand = _require_number(self._parse_unary())
+            return UnaryOp(token.value, operand, token.start, operand.end)
+        return self._parse_power()
+
+    def _parse_power(self):
+        node = self._parse_atom()
+        if self._accept("**"):
+            # Возведение в степень правоассоциативно и связывает сильнее
+            # унарного минуса слева, как в Python: -2**2 == -4
+            exponent = self._parse_unary()
+            node = BinOp("**", _require_number(node), _require_number(exponent))
+        return node
+
+    def _parse_atom(self):
+        token = self.current
+        if token.kind == "number":
+            self._advance()
+            return Number(_parse_number(token.value), token.start, token.end)
+        if token.kind == "name":
+            self._advance()
+            if self._accept("("):
+                return self._parse_call(token)
+            return Name(token.value, token.start, token.end)
+        if self._accept("("):
+            node = self._parse_or()
+            end = self._expect(")").end
+            if not node.is_bool:
+                # Скобки входят в выражение, чтобы исходный текст сравнения
+                # вида (a+b)/2<=c восстанавливался целиком
+                node.start = token.start
+                node.end = end
+            return node
+        self._error("ожидается число, переменная или '('")
+
+    def _parse_call(self, name_token):
+        if name_token.value in TABLE_FUNCTIONS:
+            return self._parse_table_call(name_token)
+        if name_token.value not in FUNCTIONS:
+            raise FormulaSyntaxError(
+                f"Недопустимая функция '{name_token.value}' в позиции {name_token.start + 1}"
+            )
+        args = []
+        if not self._accept(")"):
+            args.append(_require_number(self._parse_or()))
+            while self._accept(","):
+                args.append(_require_number(self._parse_or()))
+            self._expect(")")
+        _, min_args, max_args = FUNCTIONS[name_token.value]
+        if len(args) < min_args or (max_args is not None and len(args) > max_args):
+            raise FormulaSyntaxError(
+                f"Неверное количество аргументов функции '{name_token.value}': {len(args)}"
+            )
+        end = self.tokens[self.position - 1].end
+        return Call(name_token.value, args, name_token.start, end)
+
+    def _parse_table_call(self, name_token):
+        table_token = self.current
+        if table_token.kind != "name":
+            self._error("ожидается код справочной таблицы")
+        self._advance()
+        args = []
+        while self._accept(","):
+            args.append(_require_number(self._parse_or()))
+        self._expect(")")
+        if len(args) not in (1, 2):
+            raise FormulaSyntaxError(
+                f"Неверное количество аргументов функции '{name_token.value}': "
+                f"{len(args) + 1}"
+            )
+        end = self.tokens[self.position - 1].end
+        return TableCall(
+            name_token.value, table_token.value, args, name_token.start, end
+        )
+
+
+def _parse_number(value):
+    if "." in value or "e" in value or "E" in value:
+        return float(value)
+    return int(value)
+
+
+def _require_number(node):
+    if node.is_bool:
+        raise FormulaSyntaxError(
+            f"Ожидается числовое выражение в позиции {node.start + 1}"
+        )
+    return node
+
+
+def _require_bool(node):
+    if not node.is_bool:
+        raise FormulaSyntaxError(
+            f"Ожидается условие сравнения в позиции {node.start + 1}"
+        )
+    return node
+
+
+def parse(text):
+    """
+    Разбирает текст формулы в синтаксическое дерево.
+    """
+    return Parser(text).parse()
+
+
+def iter_nodes(node):
+    """
+    Обходит все узлы дерева в порядке следования в формуле.
+    """
+    yield node
+    for child in node.children():
+        yield from iter_nodes(child)
+
+
+def get_variable_names(node):
+    """
+    Возвращает имена переменных, используемых в дереве, в порядке появления.
+    """
+    names = []
+    for item in iter_nodes(node):
+        if isinstance(item, Name) and item.name not in names:
+            names.append(item.name)
+    return names
+
+
+def get_table_names(node):
+    """
+    Возвращает коды справочных таблиц, используемых в дереве, в порядке появления.
+    """
+    names = []
+    for item in iter_nodes(node):
+        if isinstance(item, TableCall) and item.table not in names:
+            names.append(item.table)
+    return names
+
+
+def is_constant(node):
+    """
+    Проверяет, что числовое выражение не зависит от переменных и таблиц,
+    то есть может быть вычислено заранее.
+    """
+    return not node.is_bool and not any(
+        isinstance(item, (Name, TableCall)) for item in iter_nodes(node)
+    )
+
+
+def iter_comparisons(node):
+    """
+    Возвращает все сравнения, входящие в условие, в порядке следования.
+    """
+    return [item for item in iter_nodes(node) if isinstance(item, Compare)]
+
+
+def compile_node(node):
+    """
+    Превращает синтаксическое дерево в дерево замыканий.
+
+    Полученная функция принимает словарь значений переменных (нормализованное
+    имя -> float) и вычисляет формулу за один проход.
+    """
+    if isinstance(node, Number):
+        value = node.value
+        return lambda variables: value
+
+    if isinstance(node, Name):
+        name = node.name
+
+        def load(variables):
+            try:
+                return variables[name]
+            except KeyError:
+                raise NameError(f"name '{name}' is not defined") from None
+
+        return load
+
+    if isinstance(node, UnaryOp):
+        operand = compile_node(node.operand)
+        if node.op == "-":
+            return lambda variables: -operand(variables)
+        return lambda variables: +operand(variables)
+
+    if isinstance(node, BinOp):
+        function = _BINARY_OPERATORS[node.op]
+        left = compile_node(node.left)
+        right = compile_node(node.right)
+        return lambda variables: function(left(variables), right(variables))
+
+    if isinstance(node, Call):
+        function = FUNCTIONS[node.func][0]
+        args = [compile_node(arg) for arg in node.args]
+        if len(args) == 1:
+            arg = args[0]
+            return lambda variables: function(arg(variables))
+        return lambda variables: function(*[arg(variables) for arg in args])
+
+    if isinstance(node, TableCall):
+        from .reference_tables import get_reference_table
+
+        # Таблица берется при каждом вычислении: она может измениться после
+        # компиляции формулы
+        code = node.table
+        method = TABLE_FUNCTIONS[node.func]
+        args = [compile_node(arg) for arg in node.args]
+        return lambda variables: getattr(get_reference_table(code), method)(
+            *[float(arg(variables)) for arg in args]
+        )
+
+    if isinstance(node, Compare):
+        return compile_comparison(node)
+
+    if isinstance(node, BoolOp):
+        values = [compile_node(value) for value in node.values]
+        if node.op == "and":
+            return lambda variables: all(value(variables) for value in values)
+        return lambda variables: any(value(variables) for value in values)
+
+    if isinstance(node, Not):
+        operand = compile_node(node.operand)
+        return lambda variables: not operand(variables)
+
+    raise FormulaSyntaxError(f"Недопустимый элемент формулы: {type(node).__name__}")
+
+
+# Наибольший размер (в битах) целой степени, вычисляемой при свертке.
+# Степени вида 9**9**9 вычисляются очень долго, а такие значения все равно
+# не сворачиваются.
+_FOLD_MAX_POWER_BITS = 512
+
+
+def _fold_value(node):
+    """
+    Вычисляет постоянное выражение так же, как compile_node, но не
+    вычисляет слишком большие целые степени.
+    """
+    if isinstance(node, Number):
+        return node.value
+    values = [_fold_value(child) for child in node.children()]
+    if isinstance(node, UnaryOp):
+        return -values[0] if node.op == "-" else +values[0]
+    if (isinstance(node, BinOp) and node.op == "**") or (
+        isinstance(node, Call) and node.func == "pow" and len(values) == 2
+    ):
+        base, exponent = values
+        if (
+            type(base) is int
+            and type(exponent) is int
+            and abs(base) > 1
+            and exponent * abs(base).bit_length() > _FOLD_MAX_POWER_BITS
+        ):
+            raise OverflowError("Слишком большая степень")
+    if isinstance(node, BinOp):
+        return _BINARY_OPERATORS[node.op](*values)
+    if isinstance(node, Call):
+        return FUNCTIONS[node.func][0](*values)
+    raise FormulaSyntaxError(f"Недопустимый элемент формулы: {type(node).__name__}")
+
+
+def fold_constant(node):
+    """
+    Вычисляет числовое выражение без переменных.
+
+    Returns:
+        int | float: Значение выражения или None, если выражение содержит
+            переменные, вычисляется с ошибкой или дает значение другого типа
+            (ошибка в таком случае возникнет при вычислении формулы)
+    """
+    if not is_constant(node):
+        return None
+    try:
+        value = _fold_value(node)
+    except Exception:
+        return None
+    if type(value) is int:
+        # Очень большие целые не сворачиваются: их запись слишком длинная
+        return value if abs(value) < 10**50 else None
+    if type(value) is float:
+        return value
+    return None
+
+
+def compare_values(op, left_result, right_result):
+    """
+    Сравнивает два числа с учетом эпсилона.
+    """
+    if op == "<=":
+        return left_result <= (right_result + EPSILON)
+    elif op == ">=":
+        return left_result >= (right_result - EPSILON)
+    elif op == ">":
+        return left_result > (right_result + EPSILON)
+    elif op == "<":
+        return left_result < (right_result - EPSILON)
+    else:  # =
+        return abs(left_result - right_result) < EPSILON
+
+
+def compile_operands(node):
+    """
+    Возвращает функцию, вычисляющую левую и правую части сравнения.
+    """
+    left = compile_node(node.left)
+    right = compile_node(node.right)
+    return lambda variables: (float(left(variables)), float(right(variables)))
+
+
+def compile_comparison(node):
+    operands = compile_operands(node)
+    op = node.op
+
+    def check(variables):
+        left_result, right_result = operands(variables)
+        return compare_values(op, left_result, right_result)
+
+    return check
+
+
+def format_number(value):
+    """
+    Форматирует число для отображения в шагах расчета.
+    """
+    return f"{value:g}".replace(".", ",")
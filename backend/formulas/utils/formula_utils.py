@@ -1,78 +1,128 @@
-from decimal import Decimal, ROUND_HALF_UP
+import bisect
+from collections import namedtuple
+from decimal import Decimal
+import functools
 import logging
+import math
+from .formula_compiler import (
+    EPSILON,
+    BoolOp,
+    Compare,
+    Name,
+    Not,
+    compare_values,
+    compile_node,
+    compile_operands,
+    fold_constant,
+    format_number,
+    iter_comparisons,
+    iter_nodes,
+    parse,
+)
+from .calculation_trace import trace
+from .rounding import _round_to_multiple, round_result
 
 logger = logging.getLogger(__name__)
 
 
-def _round_to_significant_figures(number, significant_figures):
+def round_value(
+    value,
+    rounding_type=None,
+    rounding_decimal=None,
+    threshold_table_values=None,
+    variables=None,
+):
     """
-    Округляет число до заданного количества значащих цифр.
+    Округляет промежуточное значение или выбирает ближайшее табличное значение.
     """
-    if number == 0:
-        return 0
-
-    d = Decimal(str(float(number)))
-    str_num = f"{d:E}"
-    mantissa, exp = str_num.split("E")
-    exp = int(exp)
-    mantissa = mantissa.replace(".", "").rstrip("0")
-
-    if len(mantissa) > significant_figures:
-        decimal_mantissa = Decimal(mantissa[: significant_figures + 1]) / Decimal("10")
-        mantissa = str(decimal_mantissa.quantize(Decimal("1"), rounding=ROUND_HALF_UP))
-
-    mantissa = mantissa.ljust(significant_figures, "0")
+    try:
+        if value is None:
+            return value
 
-    if exp >= 0:
-        if exp + 1 >= len(mantissa):
-            result = Decimal(mantissa + "0" * (exp + 1 - len(mantissa)))
+        # Преобразуем value в число, если оно передано как строка
+        if isinstance(value, str):
+            value = float(value.replace(",", "."))
         else:
-            result = Decimal(mantissa[: exp + 1] + "." + mantissa[exp + 1 :])
-    else:
-        result = Decimal("0." + "0" * (-exp - 1) + mantissa)
-
-    return result
-
-
-def _get_decimal_places(number):
-    """
-    Возвращает количество знаков после запятой в числе.
-    """
-    str_num = str(Decimal(str(float(number))))
-    if "." not in str_num:
-        return 0
-    return len(str_num.split(".")[1])
-
-
-def _round_to_multiple(number, multiple):
-    """
-    Округляет число до ближайшего кратного заданному числу.
-    """
-    try:
-        d = Decimal(str(float(number)))
-        m = Decimal(str(float(multiple)))
-        return Decimal(round(d / m) * m)
-    except Exception as e:
-        raise ValueError(f"Ошибка при округлении до кратного: {str(e)}")
+            value = float(value)
+
+        if rounding_type == "threshold_table":
+            if (
+                not threshold_table_values
+                or not isinstance(threshold_table_values, dict)
+                or not variables
+            ):
+                logger.error(
+                    "Отсутствуют необходимые параметры для табличного округления"
+                )
+                return value
 
+            target_variable = threshold_table_values.get("target_variable")
+            higher_variable = threshold_table_values.get("higher_variable")
+            lower_variable = threshold_table_values.get("lower_variable")
+            formula = threshold_table_values.get("formula")
 
-def round_result(result, rounding_type, rounding_decimal):
-    """
-    Округляет результат по заданному типу и количеству знаков.
-    """
-    if rounding_type == "decimal":
-        d = Decimal(str(float(result)))
-        # Используем ROUND_HALF_UP для округления 0.5 вверх
-        return d.quantize(Decimal("0.1") ** rounding_decimal, rounding=ROUND_HALF_UP)
-    else:  # significant
-        return _round_to_significant_figures(result, rounding_decimal)
+            if not all([target_variable, higher_variable, lower_variable, formula]):
+                logger.error("Не все необходимые переменные определены")
+                return value
 
+            # Получаем значения из variables
+            try:
+                target_value = float(
+                    str(variables.get(target_variable, "0")).replace(",", ".")
+                )
+                formula_value = float(
+                    str(variables.get(formula, "0")).replace(",", ".")
+                )
+                higher_value = float(
+                    str(variables.get(higher_variable, "0")).replace(",", ".")
+                )
+                lower_value = float(
+                    str(variables.get(lower_variable, "0")).replace(",", ".")
+                )
 
-def _replace_subscript_digits(text):
-    """
-    Заменяет подстрочные символы на обычные.
-    """
-    subscript_map = {
+            except (ValueError, TypeError) as e:
+                logger.error(f"Ошибка преобразования значений: {str(e)}")
+                logger.error(f"target={variables.get(target_variable)}")
+                logger.error(f"formula={variables.get(formula)}")
+                logger.error(f"higher={variables.get(higher_variable)}")
+                logger.error(f"lower={variables.get(lower_variable)}")
+                return value
+
+            # Сравнение и выбор значения
+            selected = higher_value if formula_value < target_value else lower_value
+            trace(
+                "threshold",
+                value=value,
+                target=target_variable,
+                target_value=target_value,
+                formula=formula,
+                formula_value=formula_value,
+                higher_value=higher_value,
+                lower_value=lower_value,
+                selected=selected,
+            )
+            return selected
+
+        elif rounding_type == "multiple":
+            if not rounding_decimal:
+                return value
+            return round(value / rounding_decimal) * rounding_decimal
+
+        elif rounding_type == "decimal":
+            if rounding_decimal is None:
+                return value
+            return round(value, rounding_decimal)
+
+        return value
+
+    except (ValueError, TypeError) as e:
+        logger.error(f"Ошибка в round_value: {str(e)}")
+        return value
+
+
+# Подстрочные символы и их обычные записи (одна таблица для str.translate)
+_SUBSCRIPT_TABLE = str.maketrans(
+    {
         "₀": "0",
         "₁": "1",
         "₂": "2",
@@ -106,11 +156,321 @@ def _replace_subscript_digits(text):
         "ᵩ": "φ",
         "ᵪ": "χ",
     }
+)
+
+# Размер кэша нормализованных имен переменных (на один процесс)
+NAME_CACHE_SIZE = 4096
+
+
+def _replace_subscript_digits(text):
+    """
+    Заменяет подстрочные символы на обычные.
+    """
+    return text.translate(_SUBSCRIPT_TABLE)
+
+
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+def normalize_name(name):
+    """
+    Возвращает нормализованное имя переменной.
+
+    Имена ограничены полями методов, поэтому каждое нормализуется один раз
+    на процесс.
+    """
+    return name.translate(_SUBSCRIPT_TABLE)
+
+
+class VariableBinding:
+    """
+    Переменные одного расчета.
+
+    Хранит исходные значения по именам полей и числовые значения по
+    нормализованным именам. Числовые значения строятся при первом
+    вычислении формулы и затем дополняются промежуточными полями, поэтому
+    все формулы и условия расчета используют один словарь вместо
+    преобразования всех переменных при каждом вычислении.
+
+    Attributes:
+        variables (dict): Исходные значения (имя поля -> значение)
+    """
+
+    __slots__ = ("variables", "_values", "_display_values")
+
+    def __init__(self, variables):
+        self.variables = dict(variables)
+        self._values = None
+        self._display_values = None
+
+    @property
+    def values(self):
+        """
+        Числовые значения по нормализованным именам (как _prepare_variables).
+
+        Raises:
+            ValueError: Если значение переменной не преобразуется в число
+        """
+        if self._values is None:
+            self._values = _prepare_variables(self.variables)
+        return self._values
+
+    @property
+    def display_values(self):
+        """
+        Значения для подстановки в текст условий (как get_display_values).
+        """
+        if self._display_values is None:
+            self._display_values = get_display_values(self.variables)
+        return self._display_values
+
+    def __getitem__(self, name):
+        return self.variables[name]
+
+    def __setitem__(self, name, value):
+        replaced = name in self.variables
+        self.variables[name] = value
+        self._display_values = None
+        if self._values is None:
+            return
+        if replaced:
+            # Замененное значение сохраняет место среди переменных, и при
+            # совпадении нормализованных имен результат зависит от порядка
+            self._values = None
+            return
+        try:
+            self._values[normalize_name(name)] = _to_number(name, value)
+        except ValueError:
+            # Ошибка возникнет при следующем вычислении, как без привязки
+            self._values = None
+
+    def __contains__(self, name):
+        return name in self.variables
+
+    def __len__(self):
+        return len(self.variables)
+
+    def get(self, name, default=None):
+        return self.variables.get(name, default)
+
+
+# Размер кэша скомпилированных формул (на один процесс)
+FORMULA_CACHE_SIZE = 1024
+
+CompiledFormula = namedtuple(
+    "CompiledFormula", ["text", "literal", "tree", "evaluate", "comparisons"]
+)
+
+
+@functools.lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def _compile_formula(formula, is_condition=False):
+    """
+    Разбирает формулу один раз и возвращает скомпилированное представление.
+
+    Формула разбирается в синтаксическое дерево (см. formula_compiler),
+    которое превращается в дерево замыканий, вычисляемое за один проход.
+
+    Args:
+        formula (str): Исходный текст формулы
+        is_condition (bool): Формула является условием
+    """
+    text = _replace_subscript_digits(formula)
+    text = text.replace("×", "*").replace("÷", "/")
+
+    # Простое число не требует разбора
+    try:
+        literal = Decimal(str(float(text)))
+        return CompiledFormula(text, literal, None, None, ())
+    except ValueError:
+        pass
+
+    tree = parse(text)
+    if is_condition and not tree.is_bool:
+        raise ValueError(f"Неподдерживаемый оператор сравнения в формуле: {text}")
+    if not is_condition and tree.is_bool:
+        raise ValueError(f"Ожидается числовое выражение, а не условие: {text}")
+
+    comparisons = tuple(
+        (node, compile_operands(node)) for node in iter_comparisons(tree)
+    )
+    return CompiledFormula(text, None, tree, compile_node(tree), comparisons)
+
+
+def get_formula_cache_info():
+    """
+    Возвращает статистику кэша скомпилированных формул.
+    """
+    info = _compile_formula.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "maxsize": info.maxsize,
+        "currsize": info.currsize,
+    }
+
+
+def clear_formula_cache():
+    """
+    Очищает кэш скомпилированных формул и таблиц диапазонов.
+    """
+    _compile_formula.cache_clear()
+    _compile_range_table.cache_clear()
+
+
+# Размер кэша индексов таблиц диапазонов (на один процесс)
+RANGE_TABLE_CACHE_SIZE = 256
+
+# Запас на границах полос: сравнения выполняются с эпсилоном, а сложение
+# с эпсилоном теряет точность для больших значений
+_BAND_SLACK = 4 * EPSILON
+_BAND_RELATIVE_SLACK = 2.0**-48
+
+RangeTable = namedtuple("RangeTable", ["variable", "breakpoints", "candidates"])
+
+
+def _get_band(tree):
+    """
+    Возвращает переменную и границы условия-полосы вида 0 < t <= 20.
+
+    Условие является полосой, если это сравнение или and сравнений одной
+    переменной с выражениями без переменных. Границы расширены так, что
+    при любом значении вне них условие заведомо не выполняется.
+
+    Returns:
+        tuple: (имя переменной, нижняя граница, верхняя граница) или None
+    """
+    if isinstance(tree, Compare):
+        comparisons = [tree]
+    elif isinstance(tree, BoolOp) and tree.op == "and":
+        comparisons = tree.values
+        if not all(isinstance(item, Compare) for item in comparisons):
+            return None
+    else:
+        return None
+
+    variable = None
+    lower, upper = -math.inf, math.inf
+    for comparison in comparisons:
+        if isinstance(comparison.left, Name):
+            name, bound_node, op = comparison.left.name, comparison.right, comparison.op
+        elif isinstance(comparison.right, Name):
+            # c < t равносильно t > c
+            name, bound_node = comparison.right.name, comparison.left
+            op = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "=": "="}[comparison.op]
+        else:
+            return None
+        if variable not in (None, name):
+            return None
+        variable = name
+        bound = fold_constant(bound_node)
+        if bound is None or not math.isfinite(bound):
+            return None
+        bound = float(bound)
+
+        slack = _BAND_SLACK + abs(bound) * _BAND_RELATIVE_SLACK
+        if op in ("<", "<=", "="):
+            upper = min(upper, bound + slack)
+        if op in (">", ">=", "="):
+            lower = max(lower, bound - slack)
+    return variable, lower, upper
+
+
+@functools.lru_cache(maxsize=RANGE_TABLE_CACHE_SIZE)
+def _compile_range_table(conditions):
+    """
+    Строит индекс границ для таблицы диапазонов.
+
+    Условия-полосы по одной переменной раскладываются по отрезкам между
+    отсортированными границами; для каждого отрезка хранятся номера
+    диапазонов, которые могут выполниться (полосы, пересекающие отрезок, и
+    все условия другого вида) в исходном порядке.
+
+    Returns:
+        RangeTable: Индекс или None, если в таблице меньше двух полос
+    """
+    bands = {}
+    general = []
+    variable = None
+    for index, condition in enumerate(conditions):
+        compiled = _compile_formula(condition, True)
+        band = _get_band(compiled.tree) if compiled.tree is not None else None
+        if band and variable in (None, band[0]):
+            variable = band[0]
+            bands[index] = band[1:]
+        else:
+            general.append(index)
+
+    if len(bands) < 2:
+        return None
+
+    breakpoints = sorted(
+        {bound for bounds in bands.values() for bound in bounds if math.isfinite(bound)}
+    )
+    edges = [-math.inf] + breakpoints + [math.inf]
+    candidates = []
+    # Отрезок number покрывает значения edges[number] <= t < edges[number + 1]
+    for number in range(len(breakpoints) + 1):
+        start, end = edges[number], edges[number + 1]
+        matching = [
+            index
+            for index, (lower, upper) in bands.items()
+            if lower < end and upper >= start and lower <= upper
+        ]
+        candidates.append(tuple(sorted(matching + general)))
+    return RangeTable(variable, breakpoints, candidates)
+
+
+def _iter_range_candidates(ranges, decimal_vars):
+    """
+    Возвращает номера диапазонов, условия которых нужно проверить по порядку.
+
+    Для таблиц с полосами по одной переменной отрезок находится бинарным
+    поиском; остальные таблицы проверяются целиком.
+    """
+    try:
+        table = _compile_range_table(tuple(item["condition"] for item in ranges))
+    except Exception:
+        # Ошибки в условиях сообщаются при последовательной проверке
+        table = None
+    if table is not None:
+        value = decimal_vars.get(table.variable)
+        if value is not None and math.isfinite(value):
+            return table.candidates[bisect.bisect_right(table.breakpoints, value)]
+    return range(len(ranges))
+
+
+def check_formula_syntax(formula, is_condition=False):
+    """
+    Проверяет, что формула или условие корректно разбирается.
+
+    Raises:
+        ValueError: Если формула содержит синтаксическую ошибку
+    """
+    compiled = _compile_formula(formula, is_condition)
+    if is_condition and compiled.literal is not None:
+        raise ValueError(f"Неподдерживаемый оператор сравнения в формуле: {formula}")
+    return compiled
 
-    result = text
-    for subscript, normal in subscript_map.items():
-        result = result.replace(subscript, normal)
-    return result
+
+def _to_number(name, value):
+    try:
+        if isinstance(value, str):
+            value = value.strip().replace(",", ".")
+        return float(value)
+    except Exception as e:
+        raise ValueError(
+            f"Ошибка преобразования значения {name} = {value} в число: {str(e)}"
+        )
+
+
+def _prepare_variables(variables):
+    """
+    Создает словарь переменных для вычисления формулы.
+    """
+    if isinstance(variables, VariableBinding):
+        return variables.values
+    decimal_vars = {}
+    for name, value in variables.items():
+        decimal_vars[normalize_name(name)] = _to_number(name, value)
+    return decimal_vars
 
 
 def evaluate_formula(
@@ -119,6 +479,9 @@ def evaluate_formula(
     """
     Вычисляет результат формулы.
 
+    Разобранные формулы кэшируются в _compile_formula, поэтому каждая
+    уникальная формула компилируется один раз на процесс.
+
     Args:
         variables (dict): Словарь переменных и их значений
         is_condition (bool): Флаг, указывающий что это вычисление условия
@@ -126,268 +489,332 @@ def evaluate_formula(
         rounding_params (dict): Параметры округления (тип и значение)
     """
     try:
-        formula = _replace_subscript_digits(formula)
-        formula = formula.replace("×", "*").replace("÷", "/")
-
         # Если есть диапазонный расчет, сразу его применяем
         if not is_condition and range_calculation and "ranges" in range_calculation:
-            # Создаем словарь переменных для диапазонного расчета
-            decimal_vars = {}
-            for name, value in variables.items():
-                try:
-                    if isinstance(value, str):
-                        value = value.strip().replace(",", ".")
-                    new_name = _replace_subscript_digits(name)
-                    decimal_vars[new_name] = float(value)
-                except Exception as e:
-                    raise ValueError(
-                        f"Ошибка преобразования значения {name} = {value} в число: {str(e)}"
-                    )
+            decimal_vars = _prepare_variables(variables)
+
+            # Проверяем диапазоны, в которые может попасть значение
+            ranges = range_calculation["ranges"]
+            for index in _iter_range_candidates(ranges, decimal_vars):
+                range_item = ranges[index]
+                condition = _compile_formula(range_item["condition"], True)
+                if condition.literal is not None:
+                    condition_met = bool(condition.literal)
+                else:
+                    condition_met = condition.evaluate(decimal_vars)
 
-            safe_dict = {
-                "__builtins__": {},
-                "abs": abs,
-                "pow": pow,
-                "round": round,
-                "max": max,
-                "min": min,
-            }
-            safe_dict.update(decimal_vars)
-
-            # Проверяем каждый диапазон
-            for range_item in range_calculation["ranges"]:
-                # Сначала разбиваем условие на части по or
-                or_conditions = range_item["condition"].split(" or ")
-                any_or_condition_met = False
-
-                for or_condition in or_conditions:
-                    # Разбиваем каждое or-условие на and-условия
-                    and_conditions = or_condition.strip().split(" and ")
-                    all_and_conditions_met = True
-
-                    for and_condition in and_conditions:
-                        and_condition = and_condition.strip().strip(
-                            "()"
-                        )  # Убираем скобки
-                        condition_result = evaluate_formula(
-                            and_condition, variables, is_condition=True
-                        )
-                        if not condition_result:
-                            all_and_conditions_met = False
-                            break
-
-                    if all_and_conditions_met:
-                        any_or_condition_met = True
-                        break
-
-                if any_or_condition_met:
+                if condition_met:
                     # Если условие выполняется, вычисляем формулу из диапазона
-                    result = float(
-                        eval(range_item["formula"], {"__builtins__": None}, safe_dict)
-                    )
+                    range_formula = _compile_formula(range_item["formula"])
+                    if range_formula.literal is not None:
+                        return range_formula.literal
+                    result = float(range_formula.evaluate(decimal_vars))
                     return Decimal(str(result))
 
             # Если ни одно условие не выполнилось, возвращаем 0
             return Decimal("0")
 
-        # Проверяем, является ли формула простым числом
-        try:
-            return Decimal(str(float(formula)))
-        except ValueError:
-            pass
+        compiled = _compile_formula(formula, is_condition)
+        formula = compiled.text
 
-        # Создаем словарь переменных для обычного расчета
-        decimal_vars = {}
-        for name, value in variables.items():
-            try:
-                if isinstance(value, str):
-                    value = value.strip().replace(",", ".")
-                new_name = _replace_subscript_digits(name)
-                decimal_vars[new_name] = float(value)
-            except Exception as e:
-                raise ValueError(
-                    f"Ошибка преобразования значения {name} = {value} в число: {str(e)}"
-                )
+        # Формула является простым числом
+        if compiled.literal is not None:
+            return compiled.literal
 
-        safe_dict = {
-            "__builtins__": {},
-            "abs": abs,
-            "pow": pow,
-            "round": round,
-            "max": max,
-            "min": min,
-        }
-        safe_dict.update(decimal_vars)
+        decimal_vars = _prepare_variables(variables)
 
         if is_condition:
-            # Проверяем наличие OR в условии
-            if " or " in formula:
-                or_conditions = formula.split(" or ")
-                for or_condition in or_conditions:
-                    # Для каждого OR условия проверяем AND условия
-                    and_conditions = or_condition.strip().split(" and ")
-                    all_and_conditions_met = True
-
-                    for and_condition in and_conditions:
-                        and_condition = and_condition.strip().strip("()")
-                        condition_result = evaluate_formula(
-                            and_condition, variables, is_condition=True
-                        )
-                        if not condition_result:
-                            all_and_conditions_met = False
-                            break
-
-                    if all_and_conditions_met:
-                        return True
-                return False
-            # Проверяем наличие AND в условии
-            elif " and " in formula:
-                and_conditions = formula.split(" and ")
-                for and_condition in and_conditions:
-                    and_condition = and_condition.strip().strip("()")
-                    condition_result = evaluate_formula(
-                        and_condition, variables, is_condition=True
-                    )
-                    if not condition_result:
-                        return False
-                return True
-            else:
-                # Для условий разбиваем формулу на части
-                for operator in ["<=", ">=", ">", "<", "="]:
-                    if operator in formula:
-                        left, right = formula.split(operator)
-                        # Вычисляем левую и правую части
-                        left_result = float(
-                            eval(left, {"__builtins__": None}, safe_dict)
-                        )
-                        right_result = float(
-                            eval(right, {"__builtins__": None}, safe_dict)
-                        )
-
-                        # Добавляем эпсилон для сравнения чисел с плавающей точкой
-                        epsilon = 1e-10
-
-                        if operator == "<=":
-                            return left_result <= (right_result + epsilon)
-                        elif operator == ">=":
-                            return left_result >= (right_result - epsilon)
-                        elif operator == ">":
-                            return left_result > (right_result + epsilon)
-                        elif operator == "<":
-                            return left_result < (right_result - epsilon)
-                        else:  # =
-                            return abs(left_result - right_result) < 1e-10
-
-                raise ValueError(
-                    f"Неподдерживаемый оператор сравнения в формуле: {formula}"
-                )
-        else:
-            result = float(eval(formula, {"__builtins__": None}, safe_dict))
-            result = Decimal(str(result))
-
-            # Применяем округление, если заданы параметры
-            if rounding_params:
-                if rounding_params.get("use_multiple_rounding"):
-                    if rounding_params.get("rounding_type") == "multiple":
-                        multiple = float(rounding_params.get("multiple_value", "1"))
-                        result = _round_to_multiple(result, multiple)
-                    else:
-                        result = round_result(
-                            result,
-                            rounding_params.get("rounding_type"),
-                            rounding_params.get("rounding_decimal"),
-                        )
-
-            return result
+            return compiled.evaluate(decimal_vars)
+
+        result = float(compiled.evaluate(decimal_vars))
+        result = Decimal(str(result))
+
+        # Применяем округление, если заданы параметры
+        return apply_rounding_params(result, rounding_params)
 
     except Exception as e:
         raise ValueError(f"Ошибка при вычислении формулы '{formula}': {str(e)}")
 
 
+def apply_rounding_params(result, rounding_params):
+    """
+    Округляет значение промежуточного поля по его параметрам округления.
+    """
+    if rounding_params:
+        if rounding_params.get("use_multiple_rounding"):
+            if rounding_params.get("rounding_type") == "multiple":
+                multiple = float(rounding_params.get("multiple_value", "1"))
+                result = _round_to_multiple(result, multiple)
+            else:
+                result = round_result(
+                    result,
+                    rounding_params.get("rounding_type"),
+                    rounding_params.get("rounding_decimal"),
+                )
+    return result
+
+
 def calculate_convergence_steps(formula, variables):
     """
     Вычисляет шаги расчета повторяемости.
     """
     try:
-        # Заменяем переменные на их значения
-        step1 = formula
-        for name, value in variables.items():
-            if isinstance(value, str):
-                value = value.strip().replace(",", ".")
-            step1 = step1.replace(name, str(value))
-
-        safe_dict = {
-            "abs": abs,
-            "pow": pow,
-            "round": round,
-            "max": max,
-            "min": min,
-        }
-
-        # Обрабатываем сложные условия
-        if " or " in formula:
-            or_conditions = step1.split(" or ")
-            steps = []
-            for or_condition in or_conditions:
-                if " and " in or_condition:
-                    and_conditions = or_condition.strip().split(" and ")
-                    and_steps = []
-                    for and_condition in and_conditions:
-                        and_condition = and_condition.strip().strip("()")
-                        step = _calculate_single_condition(and_condition, safe_dict)
-                        if step:
-                            and_steps.append(step)
-                    if and_steps:
-                        steps.append({"type": "and", "conditions": and_steps})
-                else:
-                    step = _calculate_single_condition(
-                        or_condition.strip().strip("()"), safe_dict
-                    )
-                    if step:
-                        steps.append({"type": "single", "condition": step})
-            return {"type": "or", "steps": steps}
-        elif " and " in formula:
-            and_conditions = step1.split(" and ")
-            steps = []
-            for and_condition in and_conditions:
-                step = _calculate_single_condition(
-                    and_condition.strip().strip("()"), safe_dict
-                )
-                if step:
-                    steps.append(step)
-            return {"type": "and", "steps": steps}
-        else:
-            # Обрабатываем простое условие
-            step = _calculate_single_condition(step1, safe_dict)
-            if step:
-                return {"type": "single", "step": step}
-
-        return None
+        compiled = _compile_formula(formula, is_condition=True)
+        if compiled.tree is None:
+            return None
+
+        decimal_vars = _prepare_variables(variables)
+        display_values = get_display_values(variables)
+
+        steps_by_node = {}
+        for node, operands in compiled.comparisons:
+            steps_by_node[node] = _calculate_single_condition(
+                formula, node, operands, decimal_vars, display_values
+            )
+        return build_convergence_steps(compiled.tree, steps_by_node)
     except Exception as e:
         logger.error(f"Ошибка при вычислении шагов повторяемости: {str(e)}")
         return None
 
 
-def _calculate_single_condition(condition, safe_dict):
+class ConditionEvaluation:
     """
-    Вычисляет шаги для одиночного условия.
+    Условия повторяемости, вычисленные за один проход.
+
+    Каждое условие вычисляется один раз; значения частей сравнений
+    запоминаются и используются для шагов расчета, поэтому условия не
+    пересчитываются ни при выборе результата, ни при формировании
+    conditions_info.
+
+    Attributes:
+        results (list): Результат каждого условия (в порядке формул)
     """
-    for operator in ["<=", ">=", ">", "<", "="]:
-        if operator in condition:
-            left, right = condition.split(operator)
+
+    def __init__(self, formulas, variables):
+        """
+        Raises:
+            ValueError: Если одно из условий не удалось вычислить (текст
+                ошибки такой же, как у evaluate_formula)
+        """
+        self.formulas = formulas
+        self.variables = variables
+        self.results = []
+        self._compiled = []
+        self._operands = []
+        self._decimal_vars = None
+        self._display_values = None
+
+        for formula in formulas:
+            text = formula
             try:
-                left_result = float(eval(left, {"__builtins__": {}}, safe_dict))
-                right_result = float(eval(right, {"__builtins__": {}}, safe_dict))
+                compiled = _compile_formula(formula, is_condition=True)
+                text = compiled.text
+                operands = {}
+                if compiled.literal is not None:
+                    satisfied = compiled.literal
+                else:
+                    if self._decimal_vars is None:
+                        self._decimal_vars = _prepare_variables(variables)
+                    satisfied = _evaluate_condition_node(
+                        compiled.tree,
+                        dict(compiled.comparisons),
+                        self._decimal_vars,
+                        operands,
+                    )
+            except Exception as e:
+                raise ValueError(f"Ошибка при вычислении формулы '{text}': {str(e)}")
+            self._compiled.append(compiled)
+            self._operands.append(operands)
+            self.results.append(satisfied)
+
+    @classmethod
+    def from_results(
+        cls, formulas, variables, decimal_vars, compiled, results, operands
+    ):
+        """
+        Создает объект по условиям, уже вычисленным в другом месте
+        (например, в сгенерированной функции метода).
+
+        Args:
+            decimal_vars (dict): Значения переменных для вычисления
+            compiled (list): Скомпилированные условия (_compile_formula)
+            results (list): Результаты условий
+            operands (list): Вычисленные части сравнений каждого условия
+                (узел сравнения -> (левая, правая))
+        """
+        evaluation = cls.__new__(cls)
+        evaluation.formulas = formulas
+        evaluation.variables = variables
+        evaluation.results = results
+        evaluation._compiled = compiled
+        evaluation._operands = operands
+        evaluation._decimal_vars = decimal_vars
+        evaluation._display_values = None
+        return evaluation
+
+    def calculation_steps(self, index):
+        """
+        Возвращает шаги расчета условия (как calculate_convergence_steps).
+        """
+        compiled = self._compiled[index]
+        if compiled.tree is None:
+            return None
+        if self._display_values is None:
+            self._display_values = get_display_values(self.variables)
+
+        formula = self.formulas[index]
+        recorded = self._operands[index]
+        steps_by_node = {}
+        for node, operands in compiled.comparisons:
+            if node in recorded:
+                left_result, right_result = recorded[node]
+                steps_by_node[node] = format_condition_step(
+                    formula, node, self._display_values, left_result, right_result
+                )
+            else:
+                # Сравнение было пропущено при вычислении условия (and/or)
+                steps_by_node[node] = _calculate_single_condition(
+                    formula, node, operands, self._decimal_vars, self._display_values
+                )
+        return build_convergence_steps(compiled.tree, steps_by_node)
 
-                # Форматируем числа для красивого отображения
-                left_str = f"{left_result:g}".replace(".", ",")
-                right_str = f"{right_result:g}".replace(".", ",")
 
-                return {
-                    "original": condition.replace("*", "×").replace("/", "÷"),
-                    "evaluated": f"{left_str}{operator}{right_str}",
-                }
-            except Exception as e:
-                logger.error(f"Ошибка при вычислении условия {condition}: {str(e)}")
-                return None
+def _evaluate_condition_node(node, comparisons, decimal_vars, recorded):
+    """
+    Вычисляет узел условия, запоминая вычисленные части сравнений.
+
+    Порядок вычисления и сокращенное вычисление and/or такие же, как в
+    compile_node.
+    """
+    if isinstance(node, Compare):
+        left_result, right_result = comparisons[node](decimal_vars)
+        recorded[node] = (left_result, right_result)
+        return compare_values(node.op, left_result, right_result)
+    if isinstance(node, BoolOp):
+        values = (
+            _evaluate_condition_node(value, comparisons, decimal_vars, recorded)
+            for value in node.values
+        )
+        return all(values) if node.op == "and" else any(values)
+    if isinstance(node, Not):
+        return not _evaluate_condition_node(
+            node.operand, comparisons, decimal_vars, recorded
+        )
+    raise ValueError(f"Недопустимый элемент условия: {type(node).__name__}")
+
+
+def get_display_values(variables):
+    """
+    Возвращает значения переменных в том виде, в котором они подставляются
+    в текст условия (нормализованное имя -> строка).
+    """
+    if isinstance(variables, VariableBinding):
+        return variables.display_values
+    display_values = {}
+    for name, value in variables.items():
+        if isinstance(value, str):
+            value = value.strip().replace(",", ".")
+        display_values[normalize_name(name)] = str(value)
+    return display_values
+
+
+def build_convergence_steps(tree, steps_by_node):
+    """
+    Собирает шаги отдельных сравнений в структуру шагов условия.
+
+    Args:
+        tree (Node): Синтаксическое дерево условия
+        steps_by_node (dict): Шаг для каждого узла сравнения (или None)
+    """
+
+    def collect(node):
+        return [
+            steps_by_node[comparison]
+            for comparison in iter_comparisons(node)
+            if steps_by_node[comparison]
+        ]
+
+    if isinstance(tree, BoolOp) and tree.op == "or":
+        steps = []
+        for or_condition in tree.values:
+            if isinstance(or_condition, Compare):
+                step = steps_by_node[or_condition]
+                if step:
+                    steps.append({"type": "single", "condition": step})
+            else:
+                and_steps = collect(or_condition)
+                if and_steps:
+                    steps.append({"type": "and", "conditions": and_steps})
+        return {"type": "or", "steps": steps}
+    elif isinstance(tree, Compare):
+        # Обрабатываем простое условие
+        step = steps_by_node[tree]
+        if step:
+            return {"type": "single", "step": step}
+    else:
+        return {"type": "and", "steps": collect(tree)}
+
     return None
+
+
+def format_condition_step(formula, node, display_values, left_result, right_result):
+    """
+    Формирует шаг для одиночного сравнения по вычисленным частям.
+
+    Args:
+        formula (str): Исходный текст условия
+        node (Compare): Узел сравнения в синтаксическом дереве условия
+        display_values (dict): Значения переменных для подстановки в текст
+        left_result (float): Значение левой части
+        right_result (float): Значение правой части
+    """
+    # Форматируем числа для красивого отображения
+    left_str = format_number(left_result)
+    right_str = format_number(right_result)
+
+    return {
+        "original": _substitute_condition_values(formula, node, display_values)
+        .replace("*", "×")
+        .replace("/", "÷"),
+        "evaluated": f"{left_str}{node.op}{right_str}",
+    }
+
+
+def _substitute_condition_values(formula, node, display_values):
+    """
+    Подставляет значения переменных в исходный текст сравнения.
+    """
+    parts = []
+    position = node.start
+    names = sorted(
+        (item for item in iter_nodes(node) if isinstance(item, Name)),
+        key=lambda item: item.start,
+    )
+    for name in names:
+        parts.append(formula[position : name.start])
+        parts.append(display_values.get(name.name, formula[name.start : name.end]))
+        position = name.end
+    parts.append(formula[position : node.end])
+    return "".join(parts)
+
+
+def _calculate_single_condition(formula, node, operands, decimal_vars, display_values):
+    """
+    Вычисляет шаги для одиночного условия.
+
+    Args:
+        formula (str): Исходный текст условия
+        node (Compare): Узел сравнения в синтаксическом дереве условия
+        operands (callable): Функция, вычисляющая левую и правую части
+        decimal_vars (dict): Значения переменных для вычисления
+        display_values (dict): Значения переменных для подстановки в текст
+    """
+    try:
+        left_result, right_result = operands(decimal_vars)
+        return format_condition_step(
+            formula, node, display_values, left_result, right_result
+        )
+    except Exception as e:
+        condition = _substitute_condition_values(formula, node, display_values)
+        logger.error(f"Ошибка при вычислении условия {condition}: {str(e)}")
+        return None
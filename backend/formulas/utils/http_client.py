@@ -0,0 +1,227 @@
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from .latency import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Статусы ответа, при которых GET-запрос повторяется
+RETRY_STATUSES = (502, 503, 504)
+
+
+class HostMetrics:
+    """
+    Метрики запросов к одному хосту.
+
+    Attributes:
+        requests (int): Количество запросов
+        errors (int): Запросы, завершившиеся исключением или статусом 5xx
+        retries (int): Количество повторов запросов
+        latency (LatencyHistogram): Время запроса вместе с повторами, мс
+    """
+
+    __slots__ = ("requests", "errors", "retries", "latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latency = LatencyHistogram()
+
+
+class HttpClient:
+    """
+    Клиент исходящих HTTP-запросов с пулами соединений по хостам.
+
+    Соединения переиспользуются между запросами (keep-alive), GET-запросы
+    при ошибке соединения и статусах RETRY_STATUSES повторяются с
+    экспоненциальной задержкой. Таймаут чтения не повторяется: иначе
+    запрос к зависшему сервису ждал бы (retries + 1) таймаутов чтения.
+    Клиент общий для всех потоков процесса.
+
+    Args:
+        connect_timeout (float): Таймаут установки соединения, сек.
+        read_timeout (float): Таймаут чтения ответа, сек.
+        retries (int): Количество повторов GET-запроса
+        backoff_factor (float): Задержка перед повтором: backoff_factor *
+            2 ** (номер повтора - 1), сек.
+        pool_maxsize (int): Количество соединений, хранимых для одного хоста
+    """
+
+    def __init__(
+        self,
+        connect_timeout=3,
+        read_timeout=10,
+        retries=2,
+        backoff_factor=0.2,
+        pool_maxsize=10,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(
+                total=retries,
+                read=0,
+                backoff_factor=backoff_factor,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                raise_on_status=False,
+                respect_retry_after_header=False,
+            ),
+        )
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None, **kwargs):
+        """
+        Выполняет GET-запрос через пул соединений.
+
+        Args:
+            url (str): Адрес
+            timeout: Таймаут, сек. (число или пара (соединение, чтение));
+                по умолчанию таймауты клиента
+            **kwargs: Параметры requests (headers, params, verify и т.д.)
+
+        Returns:
+            requests.Response: Ответ (после повторов - последний)
+
+        Raises:
+            requests.RequestException: Если запрос не выполнен
+        """
+        host = urlsplit(url).netloc
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            self._record(host, started, error=True, retries=0)
+            raise
+        retry = getattr(response.raw, "retries", None)
+        self._record(
+            host,
+            started,
+            error=response.status_code >= 500,
+            retries=len(retry.history) if retry is not None else 0,
+        )
+        return response
+
+    def _record(self, host, started, error, retries):
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            metrics = self._metrics.get(host)
+            if metrics is None:
+                metrics = self._metrics[host] = HostMetrics()
+            metrics.requests += 1
+            metrics.errors += error
+            metrics.retries += retries
+            metrics.latency.observe(elapsed)
+
+    def max_duration(self, timeout=None):
+        """
+        Возвращает наибольшую длительность GET-запроса вместе с повторами
+        и задержками между ними, сек.
+
+        Args:
+            timeout: Таймаут запроса (как в get); по умолчанию таймауты
+                клиента
+        """
+        timeout = timeout or self.timeout
+        if not isinstance(timeout, (tuple, list)):
+            timeout = (timeout, timeout)
+        retry = self.adapter.max_retries
+        # Перед первым повтором задержки нет, перед повтором n -
+        # backoff_factor * 2 ** (n - 1)
+        backoff = sum(
+            min(retry.backoff_max, retry.backoff_factor * 2 ** (number - 1))
+            for number in range(2, self.retries + 1)
+        )
+        return (self.retries + 1) * sum(timeout) + backoff
+
+    def _connections(self):
+        """
+        Возвращает по хостам количество открытых соединений, ожидающих в
+        пулах следующего запроса, и количество соединений, созданных за
+        время работы пулов.
+        """
+        connections = {}
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = key.key_host
+            if key.key_port is not None:
+                host = f"{host}:{key.key_port}"
+            # Очередь пула заполнена None до pool_maxsize; соединения,
+            # занятые запросами, в очереди отсутствуют
+            queue = pool.pool.queue if pool.pool is not None else ()
+            idle = sum(conn is not None for conn in list(queue))
+            open_connections, created = connections.get(host, (0, 0))
+            connections[host] = (
+                open_connections + idle,
+                created + pool.num_connections,
+            )
+        return connections
+
+    def info(self):
+        """
+        Возвращает метрики запросов по хостам.
+        """
+        connections = self._connections()
+        with self._lock:
+            return {
+                host: {
+                    "requests": metrics.requests,
+                    "errors": metrics.errors,
+                    "retries": metrics.retries,
+                    "connections": connections.get(host, (0, 0))[0],
+                    "connections_created": connections.get(host, (0, 0))[1],
+                    "latency": metrics.latency.as_dict(),
+                }
+                for host, metrics in self._metrics.items()
+            }
+
+    def close(self):
+        self.session.close()
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Возвращает общий HTTP-клиент процесса с параметрами из настроек HTTP_*.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HttpClient(
+                    connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+                    read_timeout=settings.HTTP_READ_TIMEOUT,
+                    retries=settings.HTTP_RETRIES,
+                    backoff_factor=settings.HTTP_RETRY_BACKOFF,
+                    pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+                )
+    return _http_client
+
+
+def clear_http_client():
+    """
+    Закрывает соединения общего клиента; при следующем обращении он будет
+    создан заново по текущим настройкам.
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
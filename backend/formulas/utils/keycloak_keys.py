@@ -0,0 +1,223 @@
+import json
+import logging
+import threading
+import time
+import jwt
+from django.conf import settings
+from .http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+class PublicKeyError(Exception):
+    """
+    Не удалось получить открытые ключи realm и нет сохраненных ключей.
+    """
+
+
+def _parse_keys(data):
+    """
+    Возвращает ключи подписи из ответа JWKS (kid -> открытый ключ RSA).
+
+    Если ключ подписи один, он же возвращается под ключом None для токенов
+    без kid.
+    """
+    keys = {}
+    for item in data.get("keys", []):
+        if item.get("kty") != "RSA" or item.get("use", "sig") != "sig":
+            continue
+        keys[item.get("kid")] = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(item))
+    if len(keys) == 1:
+        keys[None] = next(iter(keys.values()))
+    return keys
+
+
+class PublicKeyCache:
+    """
+    Открытые ключи realm Keycloak, общие для всех потоков процесса.
+
+    - Ключи действуют ttl секунд после загрузки.
+    - Устаревшие ключи (не дольше stale_ttl после истечения) продолжают
+      использоваться, пока в фоне загружаются новые.
+    - Если загрузить ключи не удалось, используются устаревшие.
+    - Загрузка выполняется одним потоком; остальные потоки, которым нужны
+      ключи, ждут ее результата.
+    - Неизвестный kid вызывает загрузку ключей.
+    - Загрузки вне расписания (неизвестный kid, повтор после ошибки)
+      выполняются не чаще одного раза в min_refresh_interval секунд, поэтому
+      при недоступности Keycloak и подборе kid запросы не ждут каждый раз
+      таймаута.
+
+    Attributes:
+        url (str): Адрес JWKS realm
+        fetches (int): Количество загрузок ключей (для проверок и метрик)
+    """
+
+    def __init__(
+        self,
+        url,
+        ttl=300,
+        stale_ttl=86400,
+        timeout=5,
+        verify=True,
+        min_refresh_interval=10,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.verify = verify
+        self.min_refresh_interval = min_refresh_interval
+        self.fetches = 0
+        self._keys = {}
+        self._loaded_at = None
+        self._attempted_at = None
+        self._lock = threading.Lock()
+        self._flight = None
+
+    def get_key(self, kid=None):
+        """
+        Возвращает открытый ключ по kid.
+
+        Raises:
+            PublicKeyError: Если ключи не загружены и загрузить их не удалось
+                или ключа с таким kid нет
+        """
+        age = self._age()
+        if age is not None and age < self.ttl + self.stale_ttl and kid in self._keys:
+            if age >= self.ttl and self._may_refresh():
+                self._refresh_in_background()
+            return self._keys[kid]
+
+        # Ключи не загружены, устарели окончательно или kid неизвестен
+        if self._may_refresh():
+            self._refresh()
+
+        key = self._keys.get(kid)
+        age = self._age()
+        if key is None or age is None or age >= self.ttl + self.stale_ttl:
+            raise PublicKeyError(f"Открытый ключ не найден (kid={kid})")
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+            self._loaded_at = None
+            self._attempted_at = None
+
+    def info(self):
+        age = self._age()
+        return {
+            "url": self.url,
+            "keys": len([kid for kid in self._keys if kid is not None]),
+            "age": round(age, 1) if age is not None else None,
+            "fetches": self.fetches,
+        }
+
+    def _may_refresh(self):
+        attempted_at = self._attempted_at
+        return (
+            attempted_at is None
+            or time.monotonic() - attempted_at >= self.min_refresh_interval
+        )
+
+    def _age(self):
+        loaded_at = self._loaded_at
+        return None if loaded_at is None else time.monotonic() - loaded_at
+
+    def _fetch(self):
+        self.fetches += 1
+        response = get_http_client().get(
+            self.url, timeout=self.timeout, verify=self.verify
+        )
+        if response.status_code != 200:
+            raise PublicKeyError(
+                f"Ошибка получения открытых ключей: HTTP {response.status_code}"
+            )
+        keys = _parse_keys(response.json())
+        if not keys:
+            raise PublicKeyError("В ответе нет ключей подписи")
+        return keys
+
+    def _start_flight(self):
+        """
+        Отмечает начало загрузки ключей; возвращает None, если загрузка уже
+        идет.
+        """
+        with self._lock:
+            if self._flight is not None:
+                return None
+            self._flight = threading.Event()
+            return self._flight
+
+    def _refresh(self):
+        """
+        Загружает ключи; если загрузка уже идет, ждет ее завершения.
+        """
+        flight = self._start_flight()
+        if flight is not None:
+            self._load(flight)
+            return
+        flight = self._flight
+        if flight is not None:
+            # Загрузка с повторами может длиться дольше одного таймаута
+            flight.wait(get_http_client().max_duration(self.timeout) + 1)
+
+    def _refresh_in_background(self):
+        flight = self._start_flight()
+        if flight is not None:
+            threading.Thread(
+                target=self._load, args=(flight,), name="keycloak-keys", daemon=True
+            ).start()
+
+    def _load(self, flight):
+        try:
+            keys = self._fetch()
+            with self._lock:
+                self._keys = keys
+                self._loaded_at = time.monotonic()
+        except Exception as e:
+            if self._keys:
+                logger.warning(
+                    f"Не удалось обновить открытые ключи, используются сохраненные: {e}"
+                )
+            else:
+                logger.error(f"Не удалось получить открытые ключи: {e}")
+        finally:
+            with self._lock:
+                self._attempted_at = time.monotonic()
+                self._flight = None
+            flight.set()
+
+
+_public_keys = None
+_public_keys_lock = threading.Lock()
+
+
+def get_public_keys():
+    """
+    Возвращает кэш открытых ключей realm из настроек KEYCLOAK_*.
+    """
+    global _public_keys
+    if _public_keys is None:
+        with _public_keys_lock:
+            if _public_keys is None:
+                _public_keys = PublicKeyCache(
+                    settings.KEYCLOAK_CERTS_URL,
+                    ttl=settings.KEYCLOAK_KEYS_TTL,
+                    stale_ttl=settings.KEYCLOAK_KEYS_STALE_TTL,
+                    timeout=settings.KEYCLOAK_TIMEOUT,
+                    verify=settings.KEYCLOAK_CA_BUNDLE or True,
+                    min_refresh_interval=settings.KEYCLOAK_MIN_REFRESH_INTERVAL,
+                )
+    return _public_keys
+
+
+def clear_public_keys():
+    """
+    Сбрасывает кэш открытых ключей; при следующем обращении он будет создан
+    заново по текущим настройкам.
+    """
+    global _public_keys
+    with _public_keys_lock:
+        _public_keys = None
@@ -0,0 +1,83 @@
+import bisect
+
+# Верхние границы интервалов гистограмм времени (расчеты, HTTP-запросы), мс
+LATENCY_BUCKETS_MS = (
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+)
+
+
+class LatencyHistogram:
+    """
+    Гистограмма времени выполнения с фиксированными интервалами
+    LATENCY_BUCKETS_MS.
+
+    Attributes:
+        counts (list): Количество значений в каждом интервале (последний -
+            значения больше верхней границы)
+        count (int): Количество значений
+        total (float): Сумма значений, мс
+        maximum (float): Наибольшее значение, мс
+    """
+
+    __slots__ = ("counts", "count", "total", "maximum")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value, count=1):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, value)] += count
+        self.count += count
+        self.total += value * count
+        if value > self.maximum:
+            self.maximum = value
+
+    def quantile(self, q):
+        """
+        Возвращает верхнюю границу интервала, в который попадает квантиль
+        (для последнего интервала - наибольшее значение).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(LATENCY_BUCKETS_MS[index], self.maximum)
+                return self.maximum
+        return self.maximum
+
+    def as_dict(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(LATENCY_BUCKETS_MS + ("+Inf",), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "max_ms": round(self.maximum, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets,
+        }
@@ -0,0 +1,749 @@
+from collections import Counter, OrderedDict
+from decimal import Decimal
+import hashlib
+import hmac
+import logging
+import marshal
+import math
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+from .formula_compiler import (
+    EPSILON,
+    TABLE_FUNCTIONS,
+    BinOp,
+    BoolOp,
+    Call,
+    Compare,
+    Name,
+    Not,
+    Number,
+    TableCall,
+    UnaryOp,
+    compare_values,
+    fold_constant,
+    get_variable_names,
+    iter_nodes,
+)
+from .formula_utils import (
+    ConditionEvaluation,
+    _compile_formula,
+    _prepare_variables,
+    normalize_name,
+    apply_rounding_params,
+)
+from .reference_tables import get_reference_table
+from .rounding import round_result
+
+logger = logging.getLogger(__name__)
+
+# Версия генератора. Меняется при любом изменении генерируемого кода,
+# чтобы не загружать сохраненный на диске код старого формата.
+CODEGEN_VERSION = 4
+
+# Количество функций методов, хранимых в процессе
+METHOD_FUNCTION_CACHE_SIZE = 256
+
+# Особые результаты повторяемости в порядке приоритета
+_SPECIAL_CONVERGENCE = ("absence", "traces", "unsatisfactory")
+
+# (версия плана, хэш метода) -> функция метода или None
+_method_functions = OrderedDict()
+_method_functions_lock = threading.Lock()
+
+
+class _Generator:
+    """
+    Генерирует исходный текст модуля с функцией calculate для плана расчета.
+
+    Формулы превращаются в выражения Python над словарем v (нормализованное
+    имя -> float), значения которого вычисляются один раз, а не при каждой
+    формуле. Порядок вычислений, сравнения с эпсилоном и преобразования
+    значений такие же, как в evaluate_formula, round_value и
+    ConditionEvaluation. Для неподдерживаемых случаев функция возвращает
+    None, а любое исключение означает, что расчет нужно выполнить обычным
+    способом (он же сформирует текст ошибки).
+    """
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.header = []
+        self.body = []
+        self.constants = {}
+        self.counts = Counter()
+        self.temporaries = {}
+        self.temporary_count = 0
+        self.folded = {}
+        self.plains = {}
+        self.trees = []
+
+    def constant(self, expression):
+        """
+        Возвращает имя константы модуля, вычисляемой при загрузке кода.
+        """
+        name = self.constants.get(expression)
+        if name is None:
+            name = f"_K{len(self.constants)}"
+            self.constants[expression] = name
+            self.header.append(f"{name} = {expression}")
+        return name
+
+    def emit(self, line, indent=1):
+        self.body.append("    " * indent + line)
+
+    def expression(self, node, recorded=None, conditional=False):
+        """
+        Возвращает выражение Python для узла синтаксического дерева.
+
+        Выражения без переменных заменяются значениями. Повторяющиеся в
+        методе подвыражения вычисляются один раз и сохраняются во временные
+        переменные; временная переменная создается только там, где
+        выражение вычисляется всегда (не в ветке диапазона и не после
+        сокращенного and/or условия), и перестает использоваться, когда
+        меняется одна из ее переменных.
+
+        Args:
+            recorded (str): Имя словаря, в который записываются вычисленные
+                части сравнений (для шагов расчета повторяемости)
+            conditional (bool): Выражение вычисляется не при каждом вызове
+        """
+        if node.is_bool:
+            return self._condition(node, recorded, conditional)
+
+        constant = self.fold(node)
+        if constant is not None:
+            return constant
+        if isinstance(node, Name):
+            return f"v[{node.name!r}]"
+
+        key = self.plain(node)
+        if self.counts[key] < 2:
+            return self._operation(node, recorded, conditional)
+        if key in self.temporaries:
+            return self.temporaries[key][0]
+        text = self._operation(node, recorded, conditional)
+        if conditional:
+            return text
+        temporary = f"_t{self.temporary_count}"
+        self.temporary_count += 1
+        self.temporaries[key] = (temporary, set(get_variable_names(node)))
+        return f"({temporary} := {text})"
+
+    def _operation(self, node, recorded, conditional):
+        if isinstance(node, UnaryOp):
+            return f"({node.op}{self.expression(node.operand, recorded, conditional)})"
+        if isinstance(node, BinOp):
+            left = self.expression(node.left, recorded, conditional)
+            right = self.expression(node.right, recorded, conditional)
+            return f"({left} {node.op} {right})"
+        if isinstance(node, Call):
+            args = ", ".join(
+                self.expression(arg, recorded, conditional) for arg in node.args
+            )
+            return f"_{node.func}({args})"
+        if isinstance(node, TableCall):
+            args = ", ".join(
+                f"float({self.expression(arg, recorded, conditional)})"
+                for arg in node.args
+            )
+            return self._table_call(node, args)
+        raise ValueError(f"Недопустимый элемент формулы: {type(node).__name__}")
+
+    def _condition(self, node, recorded, conditional):
+        if isinstance(node, Compare):
+            left = f"float({self.expression(node.left, recorded, conditional)})"
+            right = f"float({self.expression(node.right, recorded, conditional)})"
+            if recorded is not None:
+                return f"_record({recorded}, {self.node(node)}, {left}, {right})"
+            if node.op == "=":
+                return f"(_abs({left} - {right}) < _EPSILON)"
+            if node.op in ("<=", ">"):
+                return f"({left} {node.op} ({right} + _EPSILON))"
+            return f"({left} {node.op} ({right} - _EPSILON))"
+        if isinstance(node, BoolOp):
+            # Все части, кроме первой, могут не вычисляться
+            values = [self.expression(node.values[0], recorded, conditional)]
+            values.extend(
+                self.expression(value, recorded, True) for value in node.values[1:]
+            )
+            return f"({f' {node.op} '.join(values)})"
+        if isinstance(node, Not):
+            return f"(not {self.expression(node.operand, recorded, conditional)})"
+        raise ValueError(f"Недопустимый элемент формулы: {type(node).__name__}")
+
+    def fold(self, node):
+        """
+        Возвращает запись значения выражения без переменных или None.
+        """
+        if id(node) not in self.folded:
+            value = node.value if isinstance(node, Number) else fold_constant(node)
+            if value is None:
+                text = None
+            elif isinstance(value, float) and not math.isfinite(value):
+                text = self.constant(f"float({str(value)!r})")
+            else:
+                # Отрицательные значения в скобках: -8 ** 0.5 != (-8) ** 0.5
+                text = repr(value)
+                if text.startswith("-"):
+                    text = f"({text})"
+            self.folded[id(node)] = text
+        return self.folded[id(node)]
+
+    def plain(self, node):
+        """
+        Возвращает запись числового выражения без временных переменных;
+        одинаковая запись означает одинаковое вычисление.
+        """
+        text = self.plains.get(id(node))
+        if text is None:
+            text = self.fold(node)
+            if text is not None:
+                pass
+            elif isinstance(node, Name):
+                text = f"v[{node.name!r}]"
+            elif isinstance(node, UnaryOp):
+                text = f"({node.op}{self.plain(node.operand)})"
+            elif isinstance(node, BinOp):
+                text = f"({self.plain(node.left)} {node.op} {self.plain(node.right)})"
+            elif isinstance(node, TableCall):
+                text = self._table_call(
+                    node, ", ".join(f"float({self.plain(arg)})" for arg in node.args)
+                )
+            else:
+                text = (
+                    f"_{node.func}({', '.join(self.plain(arg) for arg in node.args)})"
+                )
+            self.plains[id(node)] = text
+        return text
+
+    def count_subexpressions(self):
+        """
+        Считает повторения подвыражений во всех формулах метода.
+        """
+        plan = self.plan
+        formulas = [(plan["formula"], False)]
+        for step in plan["steps"]:
+            if step["kind"] == "formula":
+                formulas.append((step["formula"], False))
+            elif step["kind"] == "range":
+                for range_item in step["range_calculation"]["ranges"]:
+                    formulas.append((range_item["condition"], True))
+                    formulas.append((range_item["formula"], False))
+        for condition in plan["convergence_conditions"]:
+            formulas.append((condition["formula"], True))
+        if plan["measurement_error"].get("type") == "formula":
+            formulas.append((plan["measurement_error"]["value"], False))
+
+        trees = []
+        for formula, is_condition in formulas:
+            compiled = _compile_formula(formula, is_condition)
+            if compiled.tree is not None:
+                trees.append(compiled.tree)
+        # Деревья хранятся, чтобы id узлов не переиспользовались
+        self.trees.extend(trees)
+
+        totals = Counter(
+            self.plain(node)
+            for tree in trees
+            for node in iter_nodes(tree)
+            if self._is_operation(node)
+        )
+
+        # Повтор подвыражения заменяется временной переменной целиком,
+        # поэтому его части при повторе не считаются
+        seen = set()
+
+        def visit(node):
+            if self._is_operation(node):
+                key = self.plain(node)
+                self.counts[key] += 1
+                if totals[key] > 1 and key in seen:
+                    return
+                seen.add(key)
+            for child in node.children():
+                visit(child)
+
+        for tree in trees:
+            visit(tree)
+
+    def _table_call(self, node, args):
+        return f"_table({node.table!r}).{TABLE_FUNCTIONS[node.func]}({args})"
+
+    def _is_operation(self, node):
+        return (
+            isinstance(node, (UnaryOp, BinOp, Call, TableCall))
+            and self.fold(node) is None
+        )
+
+    def invalidate(self, name):
+        """
+        Забывает временные переменные, зависящие от измененной переменной.
+        """
+        self.temporaries = {
+            key: value
+            for key, value in self.temporaries.items()
+            if name not in value[1]
+        }
+
+    def node(self, node):
+        """
+        Возвращает имя константы модуля с узлом сравнения условия.
+        """
+        return self._nodes[id(node)]
+
+    def decimal(self, value):
+        return self.constant(f"_D({str(value)!r})")
+
+    def numeric(self, formula, target, indent=1, conditional=False):
+        """
+        Записывает в target значение формулы так же, как evaluate_formula:
+        простое число - как есть, иначе Decimal(str(float(значение))).
+        """
+        compiled = _compile_formula(formula)
+        if compiled.literal is not None:
+            self.emit(f"{target} = {self.decimal(compiled.literal)}", indent)
+        else:
+            expression = self.expression(compiled.tree, conditional=conditional)
+            self.emit(f"{target} = _D(str(float({expression})))", indent)
+        return compiled
+
+    def generate(self):
+        plan = self.plan
+        step_names = [step["name"] for step in plan["steps"]]
+        error_config = plan["measurement_error"]
+        error_type = error_config.get("type")
+
+        self.emit("def calculate(input_data, marks=None):", indent=0)
+        if error_type == "formula" and any(
+            normalize_name(name) == "result" for name in step_names
+        ):
+            self.emit("return None")
+            return self.source()
+
+        # Совпадение имени входного и промежуточного поля меняет порядок
+        # значений в словаре переменных; такие расчеты выполняются обычным способом
+        for name in step_names:
+            self.emit(f"if {name!r} in input_data:")
+            self.emit("return None", indent=2)
+        self.emit("variables = dict(input_data)")
+        self.emit("v = _prepare_variables(variables)")
+        self.emit("intermediate_results = {}")
+
+        self.count_subexpressions()
+        for index, step in enumerate(plan["steps"]):
+            self.generate_step(index, step)
+        self.mark()
+
+        self.generate_conditions()
+        self.generate_result(error_config, error_type)
+        return self.source()
+
+    def generate_step(self, index, step):
+        name = step["name"]
+        if step["kind"] == "threshold":
+            table = step["threshold_table_values"]
+            args = ", ".join(
+                repr(table.get(key))
+                for key in ("target_variable", "formula", "higher_variable")
+            )
+            self.emit(
+                f"value = _threshold(variables, {args}, "
+                f"{table.get('lower_variable')!r})"
+            )
+        elif step["kind"] == "range":
+            ranges = step["range_calculation"]["ranges"]
+            for number, range_item in enumerate(ranges):
+                condition = _compile_formula(range_item["condition"], True)
+                if condition.literal is not None:
+                    test = f"bool({self.decimal(condition.literal)})"
+                else:
+                    # Условие первого диапазона проверяется всегда
+                    test = self.expression(condition.tree, conditional=number > 0)
+                self.emit(f"{'if' if number == 0 else 'elif'} {test}:")
+                self.numeric(range_item["formula"], "value", indent=2, conditional=True)
+            # Если ни одно условие не выполнилось, значение равно 0
+            if ranges:
+                self.emit("else:")
+                self.emit(f"value = {self.decimal('0')}", indent=2)
+            else:
+                self.emit(f"value = {self.decimal('0')}")
+        else:
+            compiled = self.numeric(step["formula"], "value")
+            if compiled.literal is None and step["rounding_params"]:
+                rounding = self.constant(f"_STEPS[{index}]['rounding_params']")
+                self.emit(f"value = _apply_rounding_params(value, {rounding})")
+
+        self.emit(f"variables[{name!r}] = value")
+        normalized_name = normalize_name(name)
+        self.emit(f"v[{normalized_name!r}] = float(value)")
+        self.invalidate(normalized_name)
+        if step["show"]:
+            self.emit(f"intermediate_results[{name!r}] = str(value)")
+
+    def generate_conditions(self):
+        conditions = self.plan["convergence_conditions"]
+        self._nodes = {}
+        compiled_names = []
+        for number, condition in enumerate(conditions):
+            compiled_name = self.constant(
+                f"_compile_formula({condition['formula']!r}, True)"
+            )
+            compiled_names.append(compiled_name)
+            compiled = _compile_formula(condition["formula"], True)
+            for position, (node, _) in enumerate(compiled.comparisons):
+                self._nodes[id(node)] = self.constant(
+                    f"{compiled_name}.comparisons[{position}][0]"
+                )
+
+            self.emit(f"operands{number} = {{}}")
+            if compiled.literal is not None:
+                self.emit(f"result{number} = {compiled_name}.literal")
+            else:
+                expression = self.expression(compiled.tree, f"operands{number}")
+                self.emit(f"result{number} = {expression}")
+
+        count = len(conditions)
+        results = ", ".join(f"result{number}" for number in range(count))
+        operands = ", ".join(f"operands{number}" for number in range(count))
+        self.emit(f"results = [{results}]")
+        self.emit(f"operands = [{operands}]")
+        self.emit(f"compiled = [{', '.join(compiled_names)}]")
+
+        # Выбор повторяемости, как в select_convergence
+        branches = []
+        for number, condition in enumerate(conditions):
+            if condition["convergence_value"] == "custom" and condition.get(
+                "custom_value"
+            ):
+                custom = self.constant(f"_CONDITIONS[{number}]['custom_value']")
+                branches.append((f"result{number}", f'"custom", {custom}'))
+        for convergence_value in _SPECIAL_CONVERGENCE:
+            tests = [
+                f"result{number}"
+                for number, condition in enumerate(conditions)
+                if condition["convergence_value"] == convergence_value
+            ]
+            if tests:
+                branches.append((" or ".join(tests), f'"{convergence_value}", None'))
+        for number, (test, value) in enumerate(branches):
+            self.emit(f"{'if' if number == 0 else 'elif'} {test}:")
+            self.emit(f"convergence, custom_value = {value}", indent=2)
+        if branches:
+            self.emit("else:")
+            self.emit('convergence, custom_value = "satisfactory", None', indent=2)
+        else:
+            self.emit('convergence, custom_value = "satisfactory", None')
+
+        self.emit(
+            "conditions_info = _conditions_info(_CONDITIONS, compiled, convergence, "
+            "results, operands, variables, v)"
+        )
+        self.mark()
+        self.emit('if convergence != "satisfactory":')
+        self.emit("return {", indent=2)
+        self.emit('"convergence": convergence,', indent=3)
+        self.emit('"intermediate_results": intermediate_results,', indent=3)
+        self.emit(
+            '"result": custom_value if convergence == "custom" else None,', indent=3
+        )
+        self.emit('"measurement_error": None,', indent=3)
+        self.emit('"unit": _UNIT,', indent=3)
+        self.emit('"conditions_info": conditions_info,', indent=3)
+        self.emit("}", indent=2)
+
+    def generate_result(self, error_config, error_type):
+        self.numeric(self.plan["formula"], "result")
+        rounding_decimal = self.constant("_PLAN['rounding_decimal']")
+        self.emit(
+            f"result = _round_result(result, {self.plan['rounding_type']!r}, "
+            f"{rounding_decimal})"
+        )
+        self.emit("result_text = str(result)")
+        self.emit(
+            'places = len(result_text.split(".")[-1]) if "." in result_text else 0'
+        )
+        self.mark()
+
+        if error_type == "fixed":
+            value = self.constant("_PLAN['measurement_error']['value']")
+            self.emit(f"measurement_error = float({value})")
+        elif error_type == "formula":
+            self.emit('if "result" in v:')
+            self.emit("return None", indent=2)
+            self.emit('variables["result"] = result')
+            self.emit('v["result"] = float(result)')
+            self.invalidate("result")
+            self.numeric(error_config["value"], "measurement_error")
+            self.emit("measurement_error = float(measurement_error)")
+        else:
+            self.emit("measurement_error = 0")
+        self.emit("measurement_error = round(_D(str(measurement_error)), places)")
+        self.mark()
+
+        self.emit("return {")
+        self.emit('"convergence": convergence,', indent=2)
+        self.emit('"intermediate_results": intermediate_results,', indent=2)
+        self.emit('"result": result_text,', indent=2)
+        self.emit('"measurement_error": str(measurement_error),', indent=2)
+        self.emit('"unit": _UNIT,', indent=2)
+        self.emit('"conditions_info": conditions_info,', indent=2)
+        self.emit("}")
+
+    def mark(self):
+        """
+        Добавляет отметку окончания этапа расчета (для метрик).
+        """
+        self.emit("if marks is not None:")
+        self.emit("marks.append(_clock())", indent=2)
+
+    def source(self):
+        return "\n".join(self.header + [""] + self.body) + "\n"
+
+
+def _threshold(variables, target_variable, formula, higher_variable, lower_variable):
+    """
+    Выбирает ближайшее табличное значение так же, как round_value.
+    """
+    if not variables or not all(
+        [target_variable, higher_variable, lower_variable, formula]
+    ):
+        return 0.0
+    try:
+        target_value = float(str(variables.get(target_variable, "0")).replace(",", "."))
+        formula_value = float(str(variables.get(formula, "0")).replace(",", "."))
+        higher_value = float(str(variables.get(higher_variable, "0")).replace(",", "."))
+        lower_value = float(str(variables.get(lower_variable, "0")).replace(",", "."))
+    except (ValueError, TypeError):
+        return 0.0
+    if formula_value < target_value:
+        return higher_value
+    return lower_value
+
+
+def _record(recorded, node, left_result, right_result):
+    recorded[node] = (left_result, right_result)
+    return compare_values(node.op, left_result, right_result)
+
+
+def _conditions_info(
+    conditions, compiled, convergence_result, results, operands, variables, v
+):
+    """
+    Формирует информацию о выбранных условиях, как _complete_calculation.
+    """
+    evaluation = None
+    conditions_info = []
+    for index, condition in enumerate(conditions):
+        if condition["convergence_value"] != convergence_result:
+            continue
+        if evaluation is None:
+            evaluation = ConditionEvaluation.from_results(
+                [item["formula"] for item in conditions],
+                variables,
+                v,
+                compiled,
+                results,
+                operands,
+            )
+        conditions_info.append(
+            {
+                "formula": condition["formula"],
+                "satisfied": results[index],
+                "convergence_value": condition["convergence_value"],
+                "calculation_steps": evaluation.calculation_steps(index),
+            }
+        )
+    return conditions_info
+
+
+def generate_method_source(plan):
+    """
+    Генерирует исходный текст модуля с функцией calculate(input_data, marks)
+    для плана расчета.
+
+    Функция возвращает данные ответа, как execute_calculation_plan, или
+    None, если расчет нужно выполнить обычным способом. В список marks
+    (если передан) добавляется время окончания каждого этапа расчета.
+    """
+    return _Generator(plan).generate()
+
+
+def _get_namespace(plan):
+    namespace = {
+        "_D": Decimal,
+        "_clock": time.perf_counter,
+        "_EPSILON": EPSILON,
+        "_abs": abs,
+        "_pow": pow,
+        "_round": round,
+        "_max": max,
+        "_min": min,
+        "_table": get_reference_table,
+        "_prepare_variables": _prepare_variables,
+        "_compile_formula": _compile_formula,
+        "_apply_rounding_params": apply_rounding_params,
+        "_round_result": round_result,
+        "_threshold": _threshold,
+        "_record": _record,
+        "_conditions_info": _conditions_info,
+        "_PLAN": plan,
+        "_STEPS": plan["steps"],
+        "_CONDITIONS": plan["convergence_conditions"],
+        "_UNIT": plan["unit"],
+    }
+    return namespace
+
+
+def get_code_cache_dir():
+    """
+    Возвращает каталог для сохраненного кода методов или None, если
+    сохранение на диск отключено.
+    """
+    return getattr(settings, "METHOD_CODE_CACHE_DIR", None) or None
+
+
+def _check_code_cache_dir(directory):
+    """
+    Проверяет, что каталог сохраненного кода можно использовать: это
+    каталог (не символическая ссылка), он принадлежит пользователю процесса
+    и недоступен для записи группе и остальным. Иначе код из него мог бы
+    подменить другой пользователь.
+    """
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{directory} не является каталогом")
+    if hasattr(os, "geteuid") and info.st_uid != os.geteuid():
+        raise PermissionError(f"Каталог {directory} принадлежит другому пользователю")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"Каталог {directory} доступен для записи другим")
+
+
+def _sign_code(data):
+    return salted_hmac("formulas.method_codegen", data, algorithm="sha256").digest()
+
+
+def _get_code_path(plan):
+    # Формат marshal зависит от версии Python
+    key = f"{plan['version']}-{plan['source_hash']}-{CODEGEN_VERSION}"
+    key = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(
+        get_code_cache_dir(), f"{key}.{sys.implementation.cache_tag}.bin"
+    )
+
+
+def _load_code(path):
+    """
+    Загружает сохраненный код метода. Файл содержит подпись HMAC (ключ -
+    SECRET_KEY) и код в формате marshal; файл с неверной подписью не
+    загружается.
+    """
+    try:
+        _check_code_cache_dir(os.path.dirname(path))
+        with open(path, "rb") as file:
+            content = file.read()
+        size = hashlib.sha256().digest_size
+        signature, data = content[:size], content[size:]
+        if not hmac.compare_digest(signature, _sign_code(data)):
+            raise ValueError("неверная подпись")
+        return marshal.loads(data)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Не удалось загрузить сохраненный код метода {path}: {str(e)}")
+        return None
+
+
+def _save_code(path, code):
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        _check_code_cache_dir(directory)
+        data = marshal.dumps(code)
+        # Запись во временный файл и переименование, чтобы другие процессы
+        # не прочитали файл, записанный не полностью
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(_sign_code(data) + data)
+            os.replace(temp_path, path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить код метода {path}: {str(e)}")
+
+
+def _compile_method(plan):
+    """
+    Возвращает объект кода модуля метода: с диска или сгенерированный заново.
+    """
+    path = _get_code_path(plan) if get_code_cache_dir() else None
+    if path is not None:
+        code = _load_code(path)
+        if code is not None:
+            return code
+
+    source = generate_method_source(plan)
+    code = compile(source, f"<method {plan['source_hash']}>", "exec")
+    if path is not None:
+        _save_code(path, code)
+    return code
+
+
+def get_method_function(plan):
+    """
+    Возвращает сгенерированную функцию расчета для плана.
+
+    Функции хранятся в процессе по версии плана и хэшу метода, а их код -
+    в каталоге METHOD_CODE_CACHE_DIR, чтобы другие процессы и перезапуски
+    не генерировали и не компилировали его заново.
+
+    Returns:
+        callable: Функция calculate(input_data, marks) или None, если для плана
+            не удалось сгенерировать код
+    """
+    key = (plan.get("version"), plan.get("source_hash"))
+    with _method_functions_lock:
+        if key in _method_functions:
+            _method_functions.move_to_end(key)
+            return _method_functions[key]
+
+    try:
+        namespace = _get_namespace(plan)
+        exec(_compile_method(plan), namespace)
+        function = namespace["calculate"]
+    except Exception as e:
+        logger.error(f"Не удалось сгенерировать код метода: {str(e)}")
+        function = None
+
+    with _method_functions_lock:
+        _method_functions[key] = function
+        _method_functions.move_to_end(key)
+        while len(_method_functions) > METHOD_FUNCTION_CACHE_SIZE:
+            _method_functions.popitem(last=False)
+    return function
+
+
+def get_method_function_cache_info():
+    """
+    Возвращает статистику кэша функций методов.
+    """
+    with _method_functions_lock:
+        return {
+            "maxsize": METHOD_FUNCTION_CACHE_SIZE,
+            "currsize": len(_method_functions),
+            "cache_dir": get_code_cache_dir(),
+        }
+
+
+def clear_method_functions():
+    """
+    Очищает кэш функций методов в процессе (код на диске сохраняется).
+    """
+    with _method_functions_lock:
+        _method_functions.clear()
@@ -0,0 +1,271 @@
+from array import array
+import bisect
+import logging
+import math
+import threading
+import time
+from django.conf import settings
+from django.db.models import Count, Max
+from .formula_compiler import EPSILON
+from .formula_utils import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Как часто процесс проверяет, не изменились ли таблицы в базе (секунды)
+REFERENCE_TABLES_CHECK_INTERVAL = getattr(
+    settings, "REFERENCE_TABLES_CHECK_INTERVAL", 5
+)
+
+# Нормализованный код -> LookupTable
+_tables = {}
+_tables_version = None
+_checked_at = None
+_tables_lock = threading.Lock()
+
+
+def _to_keys(values, name):
+    """
+    Преобразует ключи строк или столбцов в массив и проверяет их порядок.
+    """
+    if not isinstance(values, (list, tuple)) or not values:
+        raise ValueError(f"{name} должны быть непустым списком чисел")
+    try:
+        keys = array("d", (float(value) for value in values))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} должны быть числами")
+    if not all(math.isfinite(key) for key in keys):
+        raise ValueError(f"{name} должны быть конечными числами")
+    if any(keys[index] >= keys[index + 1] for index in range(len(keys) - 1)):
+        raise ValueError(f"{name} должны строго возрастать")
+    return keys
+
+
+class LookupTable:
+    """
+    Справочная таблица в компактном виде.
+
+    Ключи строк (и столбцов для двумерной таблицы) хранятся отсортированными
+    массивами float, значения - одним массивом по строкам. Поиск строки и
+    столбца - бинарный, ключи сравниваются с эпсилоном, как в формулах.
+
+    Attributes:
+        code (str): Нормализованный код таблицы
+        rows (array): Ключи строк по возрастанию
+        columns (array): Ключи столбцов по возрастанию или None
+        values (array): Значения по строкам
+        version (str): Версия таблицы (дата изменения)
+    """
+
+    __slots__ = ("code", "rows", "columns", "values", "version")
+
+    def __init__(self, code, rows, values, columns=None, version=None):
+        self.code = code
+        self.version = version
+        self.rows = _to_keys(rows, "Ключи строк")
+        self.columns = _to_keys(columns, "Ключи столбцов") if columns else None
+
+        if not isinstance(values, (list, tuple)) or len(values) != len(self.rows):
+            raise ValueError("Количество значений не совпадает с количеством строк")
+        if self.columns is not None:
+            if not all(
+                isinstance(row, (list, tuple)) and len(row) == len(self.columns)
+                for row in values
+            ):
+                raise ValueError(
+                    "Количество значений в строке не совпадает с количеством столбцов"
+                )
+            values = [value for row in values for value in row]
+        try:
+            self.values = array("d", (float(value) for value in values))
+        except (TypeError, ValueError):
+            raise ValueError("Значения таблицы должны быть числами")
+        if not all(math.isfinite(value) for value in self.values):
+            raise ValueError("Значения таблицы должны быть конечными числами")
+
+    def __len__(self):
+        return len(self.values)
+
+    def lookup(self, x, y=None):
+        """
+        Возвращает табличное значение для ближайших ключей, не больших
+        аргументов (ступенчатый поиск).
+
+        Raises:
+            ValueError: Если аргумент вне диапазона таблицы или количество
+                аргументов не соответствует размерности таблицы
+        """
+        self._check_arguments(y)
+        row = self._floor(self.rows, x)
+        if self.columns is None:
+            return self.values[row]
+        return self.values[row * len(self.columns) + self._floor(self.columns, y)]
+
+    def interpolate(self, x, y=None):
+        """
+        Возвращает значение, линейно интерполированное между соседними
+        ключами (билинейно для двумерной таблицы). Значения в узлах таблицы
+        возвращаются без вычислений.
+
+        Raises:
+            ValueError: Если аргумент вне диапазона таблицы или количество
+                аргументов не соответствует размерности таблицы
+        """
+        self._check_arguments(y)
+        row, row_weight = self._bracket(self.rows, x)
+        if self.columns is None:
+            return self._blend(self.values, row, row_weight)
+
+        column, column_weight = self._bracket(self.columns, y)
+        width = len(self.columns)
+        lower = self._blend(self.values, row * width + column, column_weight)
+        if row_weight is None:
+            return lower
+        upper = self._blend(self.values, (row + 1) * width + column, column_weight)
+        return lower + (upper - lower) * row_weight
+
+    def _check_arguments(self, y):
+        if (y is None) != (self.columns is None):
+            expected = 1 if self.columns is None else 2
+            raise ValueError(
+                f"Справочная таблица '{self.code}' требует аргументов: {expected}"
+            )
+
+    def _check_range(self, keys, value):
+        if not keys[0] - EPSILON <= value <= keys[-1] + EPSILON:
+            raise ValueError(
+                f"Значение {value:g} вне диапазона справочной таблицы '{self.code}' "
+                f"({keys[0]:g} - {keys[-1]:g})"
+            )
+
+    def _floor(self, keys, value):
+        self._check_range(keys, value)
+        return max(bisect.bisect_right(keys, value + EPSILON) - 1, 0)
+
+    def _bracket(self, keys, value):
+        """
+        Возвращает номер левого ключа и долю расстояния до правого ключа
+        (None, если значение совпадает с ключом).
+        """
+        self._check_range(keys, value)
+        index = bisect.bisect_left(keys, value - EPSILON)
+        if index < len(keys) and abs(keys[index] - value) < EPSILON:
+            return index, None
+        # Значения в пределах эпсилона за крайними ключами
+        if index == 0:
+            return 0, None
+        if index == len(keys):
+            return index - 1, None
+        index -= 1
+        return index, (value - keys[index]) / (keys[index + 1] - keys[index])
+
+    @staticmethod
+    def _blend(values, index, weight):
+        if weight is None:
+            return values[index]
+        return values[index] + (values[index + 1] - values[index]) * weight
+
+
+def _get_database_version():
+    from ..models import ReferenceTable
+
+    # Удаление таблицы (в том числе пометка удаленной) меняет количество
+    # записей или дату последнего изменения
+    version = ReferenceTable.objects.aggregate(
+        count=Count("id"), updated_at=Max("updated_at")
+    )
+    return version["count"], version["updated_at"]
+
+
+def _load_tables():
+    from ..models import ReferenceTable
+
+    tables = {}
+    rows = ReferenceTable.objects.filter(is_deleted=False).values_list(
+        "code", "row_values", "column_values", "values", "updated_at"
+    )
+    for code, row_values, column_values, values, updated_at in rows:
+        code = normalize_name(code)
+        try:
+            tables[code] = LookupTable(
+                code, row_values, values, column_values, updated_at.isoformat()
+            )
+        except ValueError as e:
+            logger.error(f"Некорректная справочная таблица {code}: {str(e)}")
+    return tables
+
+
+def _refresh_tables():
+    """
+    Перечитывает таблицы из базы, если они изменились.
+
+    Дата изменения проверяется не чаще одного раза в
+    REFERENCE_TABLES_CHECK_INTERVAL секунд; таблицы загружаются заново
+    только при изменении.
+    """
+    global _tables, _tables_version, _checked_at
+
+    now = time.monotonic()
+    if _checked_at is not None and now - _checked_at < REFERENCE_TABLES_CHECK_INTERVAL:
+        return
+    with _tables_lock:
+        if (
+            _checked_at is not None
+            and now - _checked_at < REFERENCE_TABLES_CHECK_INTERVAL
+        ):
+            return
+        version = _get_database_version()
+        if version != _tables_version:
+            _tables = _load_tables()
+            _tables_version = version
+            logger.info(f"Загружено справочных таблиц: {len(_tables)}")
+        _checked_at = now
+
+
+def get_reference_table(code):
+    """
+    Возвращает справочную таблицу по нормализованному коду.
+
+    Raises:
+        ValueError: Если таблица не найдена
+    """
+    _refresh_tables()
+    table = _tables.get(code)
+    if table is None:
+        raise ValueError(f"Справочная таблица '{code}' не найдена")
+    return table
+
+
+def get_reference_table_versions(codes):
+    """
+    Возвращает версии таблиц (None для отсутствующих) для ключей кэшей
+    результатов расчета.
+    """
+    if not codes:
+        return []
+    _refresh_tables()
+    tables = _tables
+    return [tables[code].version if code in tables else None for code in codes]
+
+
+def clear_reference_tables():
+    """
+    Сбрасывает загруженные таблицы; при следующем обращении они будут
+    прочитаны из базы.
+    """
+    global _tables, _tables_version, _checked_at
+    with _tables_lock:
+        _tables = {}
+        _tables_version = None
+        _checked_at = None
+
+
+def get_reference_tables_info():
+    """
+    Возвращает статистику загруженных таблиц.
+    """
+    tables = _tables
+    return {
+        "tables": len(tables),
+        "values": sum(len(table) for table in tables.values()),
+        "check_interval": REFERENCE_TABLES_CHECK_INTERVAL,
+    }
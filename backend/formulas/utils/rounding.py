@@ -0,0 +1,125 @@
+from decimal import Decimal, ROUND_HALF_UP
+import functools
+
+# Для большего числа значащих цифр используется строковый алгоритм
+ARITHMETIC_MAX_FIGURES = 17
+
+
+# Шаги округления до заданного количества знаков после запятой
+_DECIMAL_QUANTIZERS = {places: Decimal("0.1") ** places for places in range(-6, 16)}
+
+
+def get_decimal_quantizer(rounding_decimal):
+    """
+    Возвращает шаг округления до rounding_decimal знаков после запятой.
+    """
+    try:
+        return _DECIMAL_QUANTIZERS[rounding_decimal]
+    except (KeyError, TypeError):
+        return Decimal("0.1") ** rounding_decimal
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_exponent_quantizer(exponent):
+    return Decimal((0, (1,), exponent))
+
+
+def round_result(result, rounding_type, rounding_decimal):
+    """
+    Округляет результат по заданному типу и количеству знаков.
+    """
+    if rounding_type == "decimal":
+        d = Decimal(str(float(result)))
+        # Используем ROUND_HALF_UP для округления 0.5 вверх
+        return d.quantize(
+            get_decimal_quantizer(rounding_decimal), rounding=ROUND_HALF_UP
+        )
+    else:  # significant
+        return _round_to_significant_figures(result, rounding_decimal)
+
+
+def _round_to_significant_figures(number, significant_figures):
+    """
+    Округляет число до заданного количества значащих цифр.
+
+    Положительные числа округляются через quantize до порядка младшей
+    значащей цифры; результат совпадает с _round_to_significant_figures_text,
+    включая запись числа (1.200, 120000). Остальные случаи обрабатываются
+    строковым алгоритмом.
+    """
+    if number == 0:
+        return 0
+
+    d = Decimal(str(float(number)))
+    if (
+        d.is_signed()
+        or not d.is_finite()
+        or type(significant_figures) is not int
+        or not 0 < significant_figures <= ARITHMETIC_MAX_FIGURES
+    ):
+        return _round_to_significant_figures_text(number, significant_figures)
+
+    adjusted = d.adjusted()
+    exponent = adjusted - significant_figures + 1
+    rounded = d.quantize(_get_exponent_quantizer(exponent), rounding=ROUND_HALF_UP)
+    if rounded.adjusted() > adjusted:
+        # При переносе в старший разряд (9,95 -> 10) строковый алгоритм
+        # сохраняет исходный порядок числа
+        exponent -= 1
+        rounded = rounded.scaleb(-1)
+    if exponent >= 0:
+        return Decimal(int(rounded))
+    return rounded
+
+
+def _round_to_significant_figures_text(number, significant_figures):
+    """
+    Округляет число до заданного количества значащих цифр через строковое
+    представление мантиссы.
+    """
+    if number == 0:
+        return 0
+
+    d = Decimal(str(float(number)))
+    str_num = f"{d:E}"
+    mantissa, exp = str_num.split("E")
+    exp = int(exp)
+    mantissa = mantissa.replace(".", "").rstrip("0")
+
+    if len(mantissa) > significant_figures:
+        decimal_mantissa = Decimal(mantissa[: significant_figures + 1]) / Decimal("10")
+        mantissa = str(decimal_mantissa.quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+    mantissa = mantissa.ljust(significant_figures, "0")
+
+    if exp >= 0:
+        if exp + 1 >= len(mantissa):
+            result = Decimal(mantissa + "0" * (exp + 1 - len(mantissa)))
+        else:
+            result = Decimal(mantissa[: exp + 1] + "." + mantissa[exp + 1 :])
+    else:
+        result = Decimal("0." + "0" * (-exp - 1) + mantissa)
+
+    return result
+
+
+def _get_decimal_places(number):
+    """
+    Возвращает количество знаков после запятой в числе.
+    """
+    str_num = str(Decimal(str(float(number))))
+    if "." not in str_num:
+        return 0
+    return len(str_num.split(".")[1])
+
+
+def _round_to_multiple(number, multiple):
+    """
+    Округляет число до ближайшего кратного заданному числу.
+    """
+    try:
+        d = Decimal(str(float(number)))
+        m = Decimal(str(float(multiple)))
+        return Decimal(round(d / m) * m)
+    except Exception as e:
+        raise ValueError(f"Ошибка при округлении до кратного: {str(e)}")
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+from django.conf import settings
+
+
+class AuthenticationCache:
+    """
+    Кэш результатов аутентификации по токену.
+
+    Ключ - SHA-256 токена (сам токен не хранится), значение - декодированные
+    claims и неизменяемый снимок полей пользователя (объект модели между
+    потоками не передается). Запись действует до exp токена, но не дольше
+    max_ttl секунд, чтобы изменения пользователя в базе учитывались.
+    Токены без exp не кэшируются. При переполнении вытесняются давно не
+    использованные записи.
+    """
+
+    def __init__(self, maxsize, max_ttl):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    @staticmethod
+    def make_key(token):
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, key):
+        """
+        Возвращает (claims, снимок пользователя) или None.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, decoded_token, user_state = entry
+            if now >= expires_at:
+                del self._entries[key]
+                self._expired += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return decoded_token, user_state
+
+    def set(self, key, decoded_token, user_state):
+        expires = decoded_token.get("exp")
+        if not self.enabled or not isinstance(expires, (int, float)):
+            return
+        now = time.time()
+        expires_at = min(float(expires), now + self.max_ttl)
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._entries[key] = (expires_at, decoded_token, user_state)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._expired = self._evictions = 0
+
+    def info(self):
+        """
+        Возвращает статистику кэша.
+        """
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / requests, 4) if requests else None,
+                "expired": self._expired,
+                "evictions": self._evictions,
+                "maxsize": self.maxsize,
+                "currsize": len(self._entries),
+                "max_ttl": self.max_ttl,
+            }
+
+
+authentication_cache = AuthenticationCache(
+    maxsize=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 1024),
+    max_ttl=getattr(settings, "AUTH_TOKEN_CACHE_MAX_TTL", 300),
+)
@@ -0,0 +1,297 @@
+from collections import namedtuple
+import functools
+import itertools
+import math
+import operator
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен, без него используется скалярный движок
+    np = None
+
+from .formula_compiler import (
+    EPSILON,
+    TABLE_FUNCTIONS,
+    BinOp,
+    BoolOp,
+    Call,
+    Compare,
+    Name,
+    Not,
+    TableCall,
+    UnaryOp,
+    fold_constant,
+    is_constant,
+)
+from .formula_utils import FORMULA_CACHE_SIZE, _compile_formula
+
+_ARRAY_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    # Для float np.floor_divide и np.mod дают те же значения, что // и % в
+    # Python (включая знак нуля); деление на ноль отмечается как invalid
+    "//": operator.floordiv,
+    "%": operator.mod,
+}
+
+VectorFormula = namedtuple(
+    "VectorFormula", ["literal", "evaluate", "tree", "comparisons"]
+)
+
+
+class NotVectorizable(Exception):
+    """
+    Формула содержит конструкцию, которую нельзя вычислить над массивами
+    с тем же результатом, что и в скалярном движке.
+    """
+
+
+def is_vectorization_available():
+    """
+    Проверяет, установлен ли NumPy.
+    """
+    return np is not None
+
+
+class VectorContext:
+    """
+    Состояние вычисления формул над столбцами значений.
+
+    Attributes:
+        columns (dict): Нормализованное имя переменной -> массив float64
+        size (int): Количество наборов входных данных
+        invalid (ndarray): Наборы, которые нужно пересчитать скалярным
+            движком (деление на ноль, переполнение, NaN и т.п.)
+        operands (dict): Вычисленные части сравнений (узел -> (левая, правая))
+    """
+
+    __slots__ = ("columns", "size", "invalid", "operands")
+
+    def __init__(self, columns, size):
+        self.columns = columns
+        self.size = size
+        self.invalid = np.zeros(size, dtype=bool)
+        self.operands = {}
+
+    def check(self, values):
+        """
+        Отмечает наборы, в которых получилось нечисловое значение.
+
+        Скалярный движок в таких случаях либо выбрасывает исключение, либо
+        возвращает inf/NaN, поэтому эти наборы пересчитываются им же.
+        """
+        self.invalid |= ~np.isfinite(values)
+        return values
+
+
+def _iter_values(values, size):
+    if isinstance(values, np.ndarray):
+        return values.tolist()
+    return itertools.repeat(values, size)
+
+
+def _power(context, base, exponent):
+    """
+    Возведение в степень поэлементно средствами Python.
+
+    Реализации pow в NumPy и в libm могут различаться в последнем бите,
+    поэтому степень вычисляется так же, как в скалярном движке.
+    """
+    result = np.empty(context.size)
+    pairs = zip(_iter_values(base, context.size), _iter_values(exponent, context.size))
+    for index, (left, right) in enumerate(pairs):
+        try:
+            value = left**right
+        except ArithmeticError:
+            value = math.nan
+        if isinstance(value, complex):
+            value = math.nan
+        result[index] = value
+    return context.check(result)
+
+
+def _select_extreme(args, compare):
+    """
+    max/min с тем же выбором среди равных значений, что и во встроенных функциях.
+    """
+
+    def select(context):
+        result = args[0](context)
+        for arg in args[1:]:
+            value = arg(context)
+            result = np.where(compare(value, result), value, result)
+        return result
+
+    return select
+
+
+def _compile_table_call(node):
+    """
+    Поиск в справочной таблице поэлементно средствами Python, чтобы
+    значения совпадали со скалярным движком. Наборы, для которых поиск
+    завершился ошибкой, пересчитываются скалярным движком.
+    """
+    from .reference_tables import get_reference_table
+
+    code = node.table
+    method = TABLE_FUNCTIONS[node.func]
+    args = [_compile_vector_node(arg) for arg in node.args]
+
+    def lookup(context):
+        try:
+            function = getattr(get_reference_table(code), method)
+        except ValueError:
+            context.invalid[:] = True
+            return np.zeros(context.size)
+        result = np.empty(context.size)
+        columns = [_iter_values(arg(context), context.size) for arg in args]
+        for index, values in enumerate(zip(*columns)):
+            try:
+                result[index] = function(*values)
+            except (ValueError, TypeError):
+                result[index] = math.nan
+        return context.check(result)
+
+    return lookup
+
+
+def _compile_constant(node):
+    value = fold_constant(node)
+    if value is None or not math.isfinite(value):
+        raise NotVectorizable("Постоянное выражение не является конечным числом")
+    return lambda context: value
+
+
+def _compile_vector_node(node):
+    """
+    Превращает синтаксическое дерево в функцию над столбцами значений.
+    """
+    if is_constant(node):
+        # Выражения без переменных вычисляются один раз скалярным движком
+        return _compile_constant(node)
+
+    if isinstance(node, Name):
+        name = node.name
+
+        def load(context):
+            values = context.columns.get(name)
+            if values is None:
+                # Скалярный движок сообщит об отсутствующей переменной
+                context.invalid[:] = True
+                return np.zeros(context.size)
+            return values
+
+        return load
+
+    if isinstance(node, UnaryOp):
+        operand = _compile_vector_node(node.operand)
+        if node.op == "-":
+            return lambda context: -operand(context)
+        return operand
+
+    if isinstance(node, BinOp):
+        left = _compile_vector_node(node.left)
+        right = _compile_vector_node(node.right)
+        if node.op == "**":
+            return lambda context: _power(context, left(context), right(context))
+        function = _ARRAY_OPERATORS[node.op]
+        return lambda context: context.check(function(left(context), right(context)))
+
+    if isinstance(node, Call):
+        args = [_compile_vector_node(arg) for arg in node.args]
+        if node.func == "abs":
+            return lambda context: np.abs(args[0](context))
+        if node.func == "pow" and len(args) == 2:
+            base, exponent = args
+            return lambda context: _power(context, base(context), exponent(context))
+        if node.func == "max":
+            return _select_extreme(args, operator.gt)
+        if node.func == "min":
+            return _select_extreme(args, operator.lt)
+        raise NotVectorizable(f"Функция '{node.func}' не поддерживается")
+
+    if isinstance(node, TableCall):
+        return _compile_table_call(node)
+
+    if isinstance(node, Compare):
+        return _compile_vector_comparison(node)
+
+    if isinstance(node, BoolOp):
+        values = [_compile_vector_node(value) for value in node.values]
+        function = np.logical_and if node.op == "and" else np.logical_or
+        return lambda context: function.reduce([value(context) for value in values])
+
+    if isinstance(node, Not):
+        operand = _compile_vector_node(node.operand)
+        return lambda context: np.logical_not(operand(context))
+
+    raise NotVectorizable(f"Недопустимый элемент формулы: {type(node).__name__}")
+
+
+def _compile_vector_comparison(node):
+    left = _compile_vector_node(node.left)
+    right = _compile_vector_node(node.right)
+    op = node.op
+
+    def check(context):
+        left_result = left(context)
+        right_result = right(context)
+        # Части сравнения сохраняются для шагов расчета повторяемости
+        context.operands[node] = (left_result, right_result)
+        if op == "<=":
+            result = left_result <= (right_result + EPSILON)
+        elif op == ">=":
+            result = left_result >= (right_result - EPSILON)
+        elif op == ">":
+            result = left_result > (right_result + EPSILON)
+        elif op == "<":
+            result = left_result < (right_result - EPSILON)
+        else:  # =
+            result = np.abs(left_result - right_result) < EPSILON
+        return np.broadcast_to(result, context.size)
+
+    return check
+
+
+def get_operand_values(context, node, index):
+    """
+    Возвращает левую и правую части сравнения для одного набора.
+    """
+    left_result, right_result = context.operands[node]
+    if isinstance(left_result, np.ndarray):
+        left_result = left_result[index]
+    if isinstance(right_result, np.ndarray):
+        right_result = right_result[index]
+    return float(left_result), float(right_result)
+
+
+@functools.lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def compile_vector_formula(formula, is_condition=False):
+    """
+    Компилирует формулу для вычисления над столбцами значений.
+
+    Returns:
+        VectorFormula: literal - значение простого числа (Decimal),
+            evaluate - функция от VectorContext, возвращающая массив
+            значений, tree - синтаксическое дерево, comparisons - узлы
+            сравнений условия.
+            None, если формулу нельзя векторизовать.
+    """
+    if np is None:
+        return None
+    try:
+        compiled = _compile_formula(formula, is_condition)
+        if compiled.literal is not None:
+            return VectorFormula(compiled.literal, None, None, ())
+        function = _compile_vector_node(compiled.tree)
+    except (NotVectorizable, ValueError):
+        return None
+
+    def evaluate(context):
+        with np.errstate(all="ignore"):
+            return np.broadcast_to(function(context), context.size)
+
+    comparisons = tuple(node for node, _ in compiled.comparisons)
+    return VectorFormula(None, evaluate, compiled.tree, comparisons)
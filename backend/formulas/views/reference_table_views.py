@@ -0,0 +1,45 @@
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import viewsets
+from rest_framework.decorators import permission_classes
+from rest_framework.permissions import AllowAny
+from ..models import ReferenceTable
+from ..serializers import ReferenceTableSerializer
+
+
+@permission_classes([AllowAny])
+class ReferenceTableViewSet(viewsets.ModelViewSet):
+    serializer_class = ReferenceTableSerializer
+    queryset = ReferenceTable.objects.all()
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(is_deleted=False)
+
+        search = self.request.query_params.get("search")
+        if search:
+            queryset = queryset.filter(
+                Q(code__icontains=search)
+                | Q(name__icontains=search)
+                | Q(nd_code__icontains=search)
+            )
+
+        return queryset.order_by("code")
+
+    def perform_create(self, serializer):
+        user = getattr(self.request, "decoded_token", {})
+        serializer.save(user=user)
+
+    def perform_update(self, serializer):
+        user = getattr(self.request, "decoded_token", {})
+        serializer.save(user=user)
+
+    def perform_destroy(self, instance):
+        instance.is_deleted = True
+        instance.deleted_at = timezone.now()
+
+        try:
+            instance.deleted_by = self.request.user.preferred_username
+        except (AttributeError, TypeError):
+            instance.deleted_by = None
+
+        instance.save()
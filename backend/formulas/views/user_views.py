@@ -1,9 +1,15 @@
+import logging
 from django.db import connections
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import status, viewsets
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from ..serializers import UserSerializer
 from ..models import CustomUser
+from ..utils.keycloak_keys import get_public_keys
+from ..utils.token_cache import authentication_cache
+
+logger = logging.getLogger(__name__)
 
 
 def get_user_role(hach_snils):
@@ -27,6 +33,24 @@ def get_user_role(hach_snils):
         return row[0] if row else None
 
 
+def is_editor(request):
+    """
+    Проверяет, что запрос выполняет редактор методов (трассировка расчета в
+    ответе, профилирование, статистика процесса).
+    """
+    if getattr(request.user, "is_staff", False):
+        return True
+    decoded_token = getattr(request, "decoded_token", None) or {}
+    hash_snils = decoded_token.get("hashSnils")
+    if not hash_snils:
+        return False
+    try:
+        return get_user_role(hash_snils) == "editor"
+    except Exception as e:
+        logger.error(f"Не удалось получить роль пользователя: {str(e)}")
+        return False
+
+
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
@@ -62,3 +86,25 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
 
     def retrieve(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_authentication_cache_stats(request):
+    """
+    Возвращает статистику кэша аутентификации (попадания, промахи,
+    вытеснения) и открытых ключей Keycloak.
+    """
+    if not is_editor(request):
+        return Response(
+            {"error": "Статистика аутентификации доступна только редакторам"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    return Response(
+        {
+            "tokens": authentication_cache.info(),
+            "public_keys": get_public_keys().info(),
+        },
+        status=status.HTTP_200_OK,
+    )
@@ -30,7 +30,8 @@ from ..serializers import (
     ProtocolSerializer,
     SampleSerializer,
 )
-from .user_views import UserViewSet
+from .user_views import UserViewSet, is_editor
+from ..utils.http_client import get_http_client
 import logging
 
 logger = logging.getLogger(__name__)
@@ -806,6 +807,22 @@ def check_status_api(request):
         )
 
 
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_http_client_stats(request):
+    """
+    Возвращает метрики исходящих HTTP-запросов по хостам: количество
+    запросов, ошибок, повторов, открытых соединений и время запросов.
+    """
+    if not is_editor(request):
+        return Response(
+            {"error": "Метрики HTTP-запросов доступны только редакторам"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    return Response(get_http_client().info(), status=status.HTTP_200_OK)
+
+
 @permission_classes([AllowAny])
 class SampleViewSet(viewsets.ModelViewSet):
     serializer_class = SampleSerializer
@@ -7,6 +7,7 @@ then
     echo "PostgreSQL started"
 fi
 
+python manage.py createcachetable
 python manage.py collectstatic --noinput
 
 exec "$@"
\ No newline at end of file
@@ -60,6 +60,7 @@ const OilProductsPage = () => {
   const [isAddModalOpen, setIsAddModalOpen] = useState(false);
   const [isSaveModalOpen, setIsSaveModalOpen] = useState(false);
   const [lastCalculationResult, setLastCalculationResult] = useState({});
+  const [evaluationTokens, setEvaluationTokens] = useState({});
   const [researchMethods, setResearchMethods] = useState([]);
   const [methodGroups, setMethodGroups] = useState([]);
   const [currentMethod, setCurrentMethod] = useState(null);
@@ -83,6 +84,9 @@ const OilProductsPage = () => {
   const [methodsData, setMethodsData] = useState({});
   const [entityName, setEntityName] = useState('');
   const inputRefs = React.useRef({});
+  // Загруженные данные методов (по id): поля, единица измерения и версия
+  // (updated_at) для расчета без повторного запроса метода
+  const methodDetailsRef = React.useRef({});
   const [laboratoryActivityDate, setLaboratoryActivityDate] = useState(null);
   const [dateError, setDateError] = useState('');
 
@@ -228,6 +232,7 @@ const OilProductsPage = () => {
       const response = await axios.get(
         `${import.meta.env.VITE_API_URL}/api/research-methods/${methodId}/`
       );
+      methodDetailsRef.current[methodId] = response.data;
       setCurrentMethod(response.data);
     } catch (error) {
       console.error('Ошибка при загрузке деталей метода:', error);
@@ -693,10 +698,16 @@ const OilProductsPage = () => {
 
   const handleCalculate = async methodId => {
     try {
-      const methodDetailsResponse = await axios.get(
-        `${import.meta.env.VITE_API_URL}/api/research-methods/${methodId}/`
-      );
-      const methodDetails = methodDetailsResponse.data;
+      // Данные метода берутся из загруженных при выборе метода; если метод
+      // изменился, сервер ответит 409 и данные будут загружены заново
+      let methodDetails = methodDetailsRef.current[methodId];
+      if (!methodDetails) {
+        const methodDetailsResponse = await axios.get(
+          `${import.meta.env.VITE_API_URL}/api/research-methods/${methodId}/`
+        );
+        methodDetails = methodDetailsResponse.data;
+        methodDetailsRef.current[methodId] = methodDetails;
+      }
 
       const inputData = {};
       methodDetails.input_data.fields.forEach(field => {
@@ -707,11 +718,21 @@ const OilProductsPage = () => {
 
       setIsCalculating(true);
 
+      // Токен предыдущего расчета позволяет пересчитать только поля,
+      // зависящие от измененных входных данных
       const response = await axios.post(`${import.meta.env.VITE_API_URL}/api/calculate/`, {
         input_data: inputData,
-        research_method: methodDetails,
+        method_id: methodId,
+        method_version: methodDetails.updated_at,
+        incremental: true,
+        evaluation_token: evaluationTokens[methodId],
       });
 
+      setEvaluationTokens(prev => ({
+        ...prev,
+        [methodId]: response.data.evaluation_token,
+      }));
+
       const result = {
         ...response.data,
         result: response.data.result ? response.data.result.replace('.', ',') : null,
@@ -749,6 +770,28 @@ const OilProductsPage = () => {
         },
       }));
     } catch (error) {
+      if (error.response?.status === 409) {
+        // Метод изменен после загрузки (или устарел токен расчета):
+        // загружаем актуальные данные метода и начинаем расчет заново
+        delete methodDetailsRef.current[methodId];
+        setEvaluationTokens(prev => ({
+          ...prev,
+          [methodId]: undefined,
+        }));
+        try {
+          const refreshed = await axios.get(
+            `${import.meta.env.VITE_API_URL}/api/research-methods/${methodId}/`
+          );
+          methodDetailsRef.current[methodId] = refreshed.data;
+          setCurrentMethod(prev =>
+            prev?.id === methodId ? { ...refreshed.data, groupInfo: prev.groupInfo } : prev
+          );
+        } catch (refreshError) {
+          console.error('Ошибка при загрузке деталей метода:', refreshError);
+        }
+        message.warning('Метод исследования был изменен, данные метода обновлены. Повторите расчет');
+        return;
+      }
       console.error('Ошибка при расчете:', error);
       message.error(error.message || 'Ошибка при расчете');
     } finally {